@@ -4,6 +4,10 @@ Database Configuration
 เทียบเท่า config/database.js ใน Sequelize
 - สร้าง SQLAlchemy engine
 - สร้าง SessionLocal สำหรับ database sessions
+
+คอลัมน์ DateTime เป็น timestamp แบบไม่มี timezone และเก็บเวลา UTC เสมอ
+ทุก connection จึงตั้ง session timezone เป็น UTC (DB_CONNECT_ARGS) — ค่า datetime ที่มี timezone
+ถูกแปลงเป็น UTC ก่อนเก็บ ไม่ขึ้นกับ timezone ของ server/role
 """
 
 from sqlalchemy import create_engine
@@ -11,14 +15,20 @@ from sqlalchemy.orm import sessionmaker
 
 from app.config.settings import settings
 
+# ใช้กับทุก engine ที่เขียน/อ่านคอลัมน์เวลา (รวม tests และ benchmarks)
+DB_CONNECT_ARGS = {"options": "-c timezone=UTC"}
+
 # SQLAlchemy Engine
 engine = create_engine(
     settings.DATABASE_URL,
     pool_pre_ping=True,
+    connect_args=DB_CONNECT_ARGS,
 )
 
 # Session Factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# expire_on_commit=False: object ยังใช้ค่าเดิมได้หลัง commit โดยไม่ต้อง SELECT ใหม่
+# (ค่าที่ DB สร้างเอง เช่น PK, updated_seq ได้กลับมาจาก RETURNING ตอน flush แล้ว)
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
 
 
 def get_db():
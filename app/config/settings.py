@@ -6,6 +6,8 @@ Application Settings
 - โหลดค่าจาก .env file อัตโนมัติ
 """
 
+from typing import Literal
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -21,6 +23,66 @@ class Settings(BaseSettings):
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 720
 
+    # default response class ของ app — fast: orjson (ถ้าติดตั้ง), default: JSONResponse ของ FastAPI
+    JSON_RESPONSE_CLASS: Literal["fast", "default"] = "fast"
+
+    # บีบอัด response (gzip/brotli ตาม Accept-Encoding) — body เล็กกว่านี้ (bytes) ส่งแบบไม่บีบอัด
+    COMPRESSION_MINIMUM_SIZE: int = 1024
+
+    # Real-time table status stream (SSE) — ต่อ worker process
+    TABLE_STREAM_MAX_SUBSCRIBERS: int = 1000
+    TABLE_STREAM_QUEUE_SIZE: int = 32
+    TABLE_STREAM_HEARTBEAT_SECONDS: int = 15
+
+    # Kitchen order feed (WebSocket) — ต่อ worker process
+    ORDER_FEED_MAX_SUBSCRIBERS: int = 200
+    ORDER_FEED_QUEUE_SIZE: int = 64
+    ORDER_FEED_HISTORY_SIZE: int = 500
+    ORDER_FEED_HEARTBEAT_SECONDS: int = 20
+
+    # ETA ของ order — rolling window ของเวลาทำต่อเมนู + คิวครัว (ต่อ worker process)
+    ORDER_ETA_WINDOW_SIZE: int = 50  # จำนวน order ล่าสุดที่ใช้เฉลี่ยเวลาทำของแต่ละเมนู
+    ORDER_ETA_DEFAULT_PREP_SECONDS: int = 300  # เมนูที่ยังไม่มีข้อมูลเวลาทำ
+    ORDER_ETA_SYNC_SECONDS: int = 30  # โหลดคิวครัวจาก DB ใหม่ (เห็น order จาก worker อื่น)
+    KITCHEN_PARALLEL_ORDERS: int = 2  # จำนวน order ที่ครัวทำพร้อมกันได้
+
+    # Table availability index (in-memory ต่อ worker)
+    AVAILABILITY_INDEX_TTL_SECONDS: int = 60
+    # คู่ table_id ที่ยกมาต่อกันได้ เช่น [[1,2],[2,3]] — ว่าง = รวมโต๊ะใดก็ได้
+    TABLE_ADJACENCY: list[tuple[int, int]] = []
+    # จำนวนคนต่อกลุ่มสูงสุด (availability / การจอง / waitlist) — ตั้งตามที่นั่งรวมทั้งร้าน
+    MAX_PARTY_SIZE: int = 50
+
+    # Reservation hold sweeper — pending ที่ staff ไม่ตอบเกิน TTL → expired + ปล่อยโต๊ะ
+    RESERVATION_HOLD_SWEEP_ENABLED: bool = True
+    RESERVATION_HOLD_TTL_MINUTES: int = 30
+    RESERVATION_HOLD_SWEEP_INTERVAL_SECONDS: int = 60
+
+    # Reservation calendar (GET /reservations/calendar) — cache ต่อวัน ต่อ worker process
+    RESERVATION_CALENDAR_CACHE_TTL_SECONDS: int = 60
+    RESERVATION_CALENDAR_MAX_DAYS: int = 62
+
+    # Waitlist — คิวในหน่วยความจำ sync กับ DB ทุก WAITLIST_SYNC_SECONDS (เห็นการเปลี่ยนจาก worker อื่น)
+    WAITLIST_SYNC_SECONDS: int = 30
+    WAITLIST_MINUTES_PER_PARTY: int = 15  # เวลารอโดยประมาณต่อกลุ่มที่อยู่ก่อนหน้า
+    WAITLIST_MATCH_TTL_MINUTES: int = 10  # ได้โต๊ะแล้วไม่มานั่งเกินนี้ → no_show ปล่อยโต๊ะ
+    # sweep กลุ่มที่ไม่มานั่งเป็นงานเบื้องหลังของตัวเอง (ไม่ขึ้นกับ RESERVATION_HOLD_SWEEP_ENABLED)
+    WAITLIST_MATCH_SWEEP_ENABLED: bool = True
+    WAITLIST_MATCH_SWEEP_INTERVAL_SECONDS: int = 60
+
+    # Menu cache (GET /products/) — ต่อ worker process
+    MENU_CACHE_TTL_SECONDS: int = 300
+    PRODUCT_IMPORT_MAX_ROWS: int = 5000
+    PRODUCT_IMPORT_MAX_BYTES: int = 5 * 1024 * 1024  # ไฟล์ import อ่านเข้าหน่วยความจำได้ไม่เกินนี้
+
+    # Idempotency-Key สำหรับ POST /orders, POST /reservations
+    IDEMPOTENCY_TTL_HOURS: int = 24
+    IDEMPOTENCY_LOCK_SECONDS: int = 30  # request แรกค้างเกินนี้ (เช่น worker ตาย) → ให้ retry claim ใหม่ได้
+    IDEMPOTENCY_WAIT_SECONDS: float = 10  # request ซ้ำรอผลของ request แรกได้นานสุดเท่านี้ ก่อนตอบ 409
+    # ลบ key ที่หมดอายุเป็นงานเบื้องหลังของตัวเอง (ไม่ขึ้นกับ RESERVATION_HOLD_SWEEP_ENABLED)
+    IDEMPOTENCY_PURGE_ENABLED: bool = True
+    IDEMPOTENCY_PURGE_INTERVAL_SECONDS: int = 300
+
     # Email (for password reset)
     MAIL_USERNAME: str = ""
     MAIL_PASSWORD: str = ""
@@ -0,0 +1,151 @@
+"""
+Broadcaster
+
+ตัวกระจาย event แบบ in-process (หนึ่ง instance ต่อ worker) สำหรับ SSE / WebSocket
+- subscribe / unsubscribe: เรียกจาก event loop (async endpoint)
+- publish: เรียกได้จากทุก thread (เช่น service ที่รันใน threadpool หลัง commit)
+
+ทุก event (dict) จะถูกใส่ "version" ที่เพิ่มขึ้นเรื่อย ๆ และเก็บย้อนหลังได้
+history_size รายการ เพื่อให้ client ที่ reconnect ขอ event ที่พลาดไปได้
+version นับแยกต่อ instance จึงมาคู่กับ "epoch" (สุ่มใหม่ทุกครั้งที่ worker start)
+reconnect ไปคนละ worker หรือหลัง restart → epoch ไม่ตรง → ต้องโหลด snapshot ใหม่
+
+หน่วยความจำมีขอบเขต: จำกัดจำนวน subscribers, ขนาด queue ต่อ subscriber และ history
+ถ้า subscriber อ่านไม่ทัน (queue เต็ม) จะถูกตัดออก — ไม่ block ฝั่งที่ publish
+"""
+
+import asyncio
+import threading
+import uuid
+from collections import deque
+
+from app.core import metrics
+
+
+class BroadcasterFull(Exception):
+    """จำนวน subscribers เต็มแล้ว"""
+
+
+class SubscriptionClosed(Exception):
+    """subscription ถูกปิด (เช่น ถูกตัดเพราะอ่านไม่ทัน)"""
+
+
+_CLOSED = object()
+
+
+class Subscription:
+    """queue ของ subscriber หนึ่งราย"""
+
+    def __init__(self, queue_size: int):
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.closed = False
+
+    async def get(self, timeout: float | None = None) -> dict:
+        """รอ event ถัดไป — TimeoutError ถ้าไม่มี event ภายใน timeout"""
+        event = await asyncio.wait_for(self._queue.get(), timeout)
+        if event is _CLOSED:
+            raise SubscriptionClosed()
+        return event
+
+    def _put(self, event: dict) -> bool:
+        """ใส่ event ลง queue — คืน False ถ้า queue เต็ม"""
+        try:
+            self._queue.put_nowait(event)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    def _close(self):
+        """ล้าง queue แล้วใส่ sentinel ให้ฝั่งอ่านรู้ว่าถูกปิด"""
+        self.closed = True
+        while not self._queue.empty():
+            self._queue.get_nowait()
+        self._queue.put_nowait(_CLOSED)
+
+
+class Broadcaster:
+    """กระจาย event หนึ่งตัวไปยังทุก subscriber"""
+
+    def __init__(self, name: str, max_subscribers: int, queue_size: int, history_size: int = 0):
+        self.name = name
+        self.max_subscribers = max_subscribers
+        self.queue_size = queue_size
+        self.epoch = uuid.uuid4().hex
+        self.version = 0
+        self._history: deque[dict] = deque(maxlen=history_size)
+        self._lock = threading.Lock()
+        self._subscribers: set[Subscription] = set()
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def subscribe(
+        self, since: int | None = None, epoch: str | None = None
+    ) -> tuple[Subscription, list[dict] | None]:
+        """
+        สร้าง subscription ใหม่ — ต้องเรียกจาก event loop
+
+        คืน (subscription, backlog) โดย backlog คือ events ที่ version > since
+        หรือ None ถ้าไม่ได้ส่ง since มา / epoch ไม่ตรงกับ instance นี้ / history ย้อนไปไม่ถึง
+        (client ต้องโหลด snapshot ใหม่)
+        backlog อาจซ้ำกับ event แรก ๆ ใน queue — ฝั่งอ่านควรข้าม version ที่ส่งไปแล้ว
+        """
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                metrics.incr(f"{self.name}.rejected")
+                raise BroadcasterFull()
+
+            self._loop = asyncio.get_running_loop()
+            subscription = Subscription(self.queue_size)
+            self._subscribers.add(subscription)
+            backlog = self._replay(since) if epoch == self.epoch else None
+
+        metrics.incr(f"{self.name}.subscribed")
+        return subscription, backlog
+
+    def _replay(self, since: int | None) -> list[dict] | None:
+        """events หลัง version since จาก history (เรียกขณะถือ lock)"""
+        if since is None or since > self.version:
+            return None
+        if since == self.version:
+            return []
+        if not self._history or self._history[0]["version"] > since + 1:
+            return None
+        return [e for e in self._history if e["version"] > since]
+
+    def unsubscribe(self, subscription: Subscription):
+        """ยกเลิก subscription (เรียกซ้ำได้)"""
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def publish(self, event: dict) -> dict:
+        """ใส่ version ให้ event แล้วส่งไปยังทุก subscriber — thread-safe, ไม่ block"""
+        with self._lock:
+            self.version += 1
+            event = {**event, "epoch": self.epoch, "version": self.version}
+            if self._history.maxlen:
+                self._history.append(event)
+
+            loop = self._loop
+            if loop is not None and self._subscribers:
+                try:
+                    loop.call_soon_threadsafe(self._fan_out, event)
+                except RuntimeError:
+                    # event loop ถูกปิดไปแล้ว (เช่น ตอน shutdown)
+                    self._loop = None
+
+        return event
+
+    def _fan_out(self, event: dict):
+        """กระจาย event (รันบน event loop)"""
+        metrics.incr(f"{self.name}.published")
+        with self._lock:
+            subscribers = list(self._subscribers)
+
+        for subscription in subscribers:
+            if not subscription._put(event):
+                self.unsubscribe(subscription)
+                subscription._close()
+                metrics.incr(f"{self.name}.dropped")
@@ -0,0 +1,86 @@
+"""
+TTL Cache
+
+cache ผลลัพธ์ของ read endpoint ในหน่วยความจำ (ต่อ worker process) พร้อมอายุ (TTL)
+- get_or_load: คืนค่าจาก cache หรือเรียก loader แล้วเก็บไว้
+- get_many_or_load: หลาย key พร้อมกัน — key ที่ไม่มี/หมดอายุโหลดด้วย loader ครั้งเดียว
+- invalidate: ล้างทั้ง cache หรือเฉพาะบาง key — เรียกครั้งเดียวหลังการเขียนที่ commit แล้ว
+
+ค่าที่ loader โหลดระหว่างที่มีการ invalidate จะไม่ถูกเก็บ (ตรวจด้วย generation)
+จึงไม่มีข้อมูลเก่าค้างหลัง invalidate — ส่วน worker อื่นจะเห็นข้อมูลใหม่เมื่อครบ TTL
+ค่าใน cache ถูกแชร์ข้าม request เหมือน single-flight จึงห้ามแก้ไขหลังคืนค่า
+"""
+
+import threading
+import time
+from collections.abc import Callable, Iterable
+from typing import Any
+
+from app.core import metrics
+
+
+class TTLCache:
+    """cache แบบ key → (เวลาที่โหลด, ค่า) หมดอายุตาม ttl_seconds"""
+
+    def __init__(self, name: str, ttl_seconds: float):
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries: dict[str, tuple[float, Any]] = {}
+        self._generation = 0
+
+    def get_or_load(self, key: str, loader: Callable[[], Any]) -> Any:
+        """คืนค่าที่ยังไม่หมดอายุ หรือโหลดใหม่ด้วย loader"""
+        with self._lock:
+            entry = self._entries.get(key)
+            generation = self._generation
+        if entry and time.monotonic() - entry[0] < self.ttl_seconds:
+            metrics.incr(f"{self.name}.hit")
+            return entry[1]
+
+        metrics.incr(f"{self.name}.miss")
+        value = loader()
+        with self._lock:
+            if generation == self._generation:
+                self._entries[key] = (time.monotonic(), value)
+        return value
+
+    def get_many_or_load(
+        self, keys: list[str], loader: Callable[[list[str]], dict[str, Any]]
+    ) -> dict[str, Any]:
+        """คืนค่าของทุก key — key ที่ขาดถูกส่งให้ loader ครั้งเดียว (loader ต้องคืนค่าครบทุก key ที่ขอ)"""
+        now = time.monotonic()
+        with self._lock:
+            generation = self._generation
+            values = {}
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry and now - entry[0] < self.ttl_seconds:
+                    values[key] = entry[1]
+
+        missing = [key for key in keys if key not in values]
+        if values:
+            metrics.incr(f"{self.name}.hit", len(values))
+        if not missing:
+            return values
+
+        metrics.incr(f"{self.name}.miss", len(missing))
+        loaded = loader(missing)
+        with self._lock:
+            if generation == self._generation:
+                loaded_at = time.monotonic()
+                for key in missing:
+                    self._entries[key] = (loaded_at, loaded[key])
+        values.update(loaded)
+        return values
+
+    def invalidate(self, keys: Iterable[str] | None = None):
+        """ล้างทุก key หรือเฉพาะ keys ที่ระบุ"""
+        with self._lock:
+            if keys is None:
+                self._entries.clear()
+            else:
+                for key in keys:
+                    self._entries.pop(key, None)
+            self._generation += 1
+        metrics.incr(f"{self.name}.invalidated")
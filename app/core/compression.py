@@ -0,0 +1,217 @@
+"""
+Response Compression
+
+บีบอัด response ตาม Accept-Encoding ของ client (br > gzip)
+- negotiate_encoding: เลือก encoding จาก header Accept-Encoding (รองรับ q-value)
+- compress: บีบอัด bytes ทั้งก้อน
+- CompressionMiddleware: ASGI middleware — บีบอัด response ที่ใหญ่กว่า minimum_size
+  รองรับ StreamingResponse (บีบอัดทีละ chunk + flush) และข้าม text/event-stream
+- PrecompressedBody: JSON ที่ serialize แล้ว + ตัวที่บีบอัดแล้วต่อ encoding (สร้างครั้งแรกที่ถูกขอ)
+  เก็บใน cache ได้ — cache hit ไม่ต้อง serialize/บีบอัดซ้ำ
+
+brotli เป็น optional dependency — ไม่ได้ติดตั้ง → ใช้ gzip อย่างเดียว
+response ที่มี Content-Encoding อยู่แล้ว (เช่นจาก PrecompressedBody) middleware จะส่งต่อโดยไม่แตะ
+"""
+
+import threading
+import zlib
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core import metrics
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - ขึ้นกับ environment
+    brotli = None
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 4  # quality สูงกว่านี้ช้าเกินไปสำหรับการบีบอัดต่อ request
+
+# ลำดับที่เลือกเมื่อ client รับได้หลายแบบด้วย q เท่ากัน
+SUPPORTED_ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+EXCLUDED_MEDIA_TYPES = ("text/event-stream",)
+
+
+def negotiate_encoding(accept_encoding: str | None) -> str | None:
+    """encoding ที่ดีที่สุดที่ทั้ง client และ server รองรับ — None = ไม่บีบอัด"""
+    if not accept_encoding:
+        return None
+
+    weights: dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name.strip().lower()] = q
+
+    best, best_q = None, 0.0
+    for encoding in SUPPORTED_ENCODINGS:
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    """บีบอัด data ทั้งก้อนด้วย encoding ("br" หรือ "gzip")"""
+    if encoding == "br":
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    # wbits=31 → gzip container (header + crc)
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+    return compressor.compress(data) + compressor.flush()
+
+
+class _StreamEncoder:
+    """บีบอัดทีละ chunk — flush ทุก chunk เพื่อให้ client ได้ข้อมูลทันที (ไม่ค้างใน buffer)"""
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        else:
+            self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def chunk(self, data: bytes) -> bytes:
+        if self.encoding == "br":
+            return self._compressor.process(data) + self._compressor.flush()
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            return self._compressor.finish()
+        return self._compressor.flush()
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware บีบอัด response ตาม Accept-Encoding
+
+    - body ทั้งก้อนเล็กกว่า minimum_size → ส่งตามเดิม (บีบอัดไม่คุ้ม)
+    - response แบบ streaming (more_body) → บีบอัดทีละ chunk ไม่ต้องรอจนจบ
+    - text/event-stream หรือมี Content-Encoding อยู่แล้ว → ส่งต่อทันทีไม่แตะ
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        await _CompressionResponder(self.minimum_size, encoding, send)(self.app, scope, receive)
+
+
+class _CompressionResponder:
+    """สถานะของ response หนึ่งตัว — รอ body ก้อนแรกก่อนตัดสินว่าจะบีบอัดหรือไม่"""
+
+    def __init__(self, minimum_size: int, encoding: str, send: Send):
+        self.minimum_size = minimum_size
+        self.encoding = encoding
+        self.send = send
+        self.start: Message | None = None
+        self.passthrough = False
+        self.encoder: _StreamEncoder | None = None
+
+    async def __call__(self, app: ASGIApp, scope: Scope, receive: Receive):
+        await app(scope, receive, self.send_wrapper)
+
+    async def send_wrapper(self, message: Message):
+        if message["type"] == "http.response.start":
+            headers = Headers(raw=message["headers"])
+            media_type = headers.get("content-type", "").split(";")[0].strip()
+            if "content-encoding" in headers or media_type in EXCLUDED_MEDIA_TYPES:
+                # SSE ต้องส่ง header ออกไปทันที ไม่รอ event แรก
+                self.passthrough = True
+                await self.send(message)
+            else:
+                self.start = message
+            return
+
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.start is not None:
+            start, self.start = self.start, None
+            headers = MutableHeaders(raw=start["headers"])
+            if not more_body and len(body) < self.minimum_size:
+                self.passthrough = True
+                await self.send(start)
+                await self.send(message)
+                return
+
+            headers["Content-Encoding"] = self.encoding
+            headers.add_vary_header("Accept-Encoding")
+            metrics.incr(f"compression.{self.encoding}")
+            if not more_body:
+                compressed = compress(body, self.encoding)
+                headers["Content-Length"] = str(len(compressed))
+                await self.send(start)
+                await self.send({"type": "http.response.body", "body": compressed})
+                return
+
+            del headers["Content-Length"]
+            self.encoder = _StreamEncoder(self.encoding)
+            await self.send(start)
+
+        data = self.encoder.chunk(body) if body else b""
+        if not more_body:
+            data += self.encoder.finish()
+        await self.send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+
+class PrecompressedBody:
+    """
+    response body ที่ serialize แล้ว + ตัวที่บีบอัดแล้วต่อ encoding
+
+    แชร์ข้าม request ได้ (เก็บใน TTLCache / คืนจาก single-flight) — บีบอัดแต่ละ encoding ครั้งเดียว
+    """
+
+    def __init__(self, content: bytes, media_type: str = "application/json", minimum_size: int = 1024):
+        self.content = content
+        self.media_type = media_type
+        self.minimum_size = minimum_size
+        self._lock = threading.Lock()
+        self._variants: dict[str, bytes] = {}
+
+    def variant(self, encoding: str) -> bytes:
+        """body ที่บีบอัดด้วย encoding — สร้างครั้งแรกที่ถูกขอแล้วเก็บไว้"""
+        with self._lock:
+            data = self._variants.get(encoding)
+            if data is not None:
+                metrics.incr("compression.precompressed_hits")
+                return data
+            data = self._variants[encoding] = compress(self.content, encoding)
+            return data
+
+    def response(self, request: Request) -> Response:
+        """Response ตาม Accept-Encoding ของ request (ตัวที่บีบอัดไว้แล้ว ถ้ามี)"""
+        encoding = None
+        if len(self.content) >= self.minimum_size:
+            encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+        if encoding is None:
+            return Response(self.content, media_type=self.media_type, headers={"Vary": "Accept-Encoding"})
+        return Response(
+            self.variant(encoding),
+            media_type=self.media_type,
+            headers={"Content-Encoding": encoding, "Vary": "Accept-Encoding"},
+        )
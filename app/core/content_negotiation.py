@@ -0,0 +1,206 @@
+"""
+MessagePack Content Negotiation
+
+ให้ client (เช่น POS tablet) รับ/ส่งข้อมูลเป็น MessagePack แทน JSON ได้ทุก router
+- accepts_msgpack: header Accept ขอ application/msgpack มากกว่า (หรือเท่ากับ) JSON หรือไม่
+- MessagePackMiddleware: ASGI middleware
+  - request Content-Type: application/msgpack → แปลงเป็น JSON ก่อนถึง route (validate ด้วย Pydantic เหมือนเดิม)
+  - Accept: application/msgpack → แปลง response ที่เป็น application/json เป็น MessagePack
+- msgpack_request_body: openapi_extra ประกาศ request body แบบ msgpack ของ route
+
+แปลงที่ขอบของ app จึงไม่ต้องแก้ route/service — ค่าใน MessagePack เหมือน JSON ทุกอย่าง
+(datetime เป็น ISO string, ไม่มี bin) ยกเว้น request ที่ส่ง timestamp ext มาจะถูกแปลงเป็น ISO string ให้
+msgpack เป็น optional dependency — ไม่ได้ติดตั้ง → ตอบ JSON เสมอ และ request แบบ msgpack ได้ 415
+ต้องอยู่ "ใน" CompressionMiddleware — แปลงเป็น msgpack ก่อนแล้วจึงบีบอัด
+"""
+
+import json
+from typing import Any
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.responses import orjson, render_json
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - ขึ้นกับ environment
+    msgpack = None
+
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+MSGPACK_MEDIA_TYPES = (MSGPACK_MEDIA_TYPE, "application/x-msgpack")
+
+
+def _loads_json(body: bytes) -> Any:
+    return orjson.loads(body) if orjson is not None else json.loads(body)
+
+
+def accepts_msgpack(accept: str | None) -> bool:
+    """Accept มี application/msgpack (q > 0) และ q ไม่น้อยกว่า application/json"""
+    if not accept or msgpack is None:
+        return False
+
+    msgpack_q, json_q = 0.0, 0.0
+    for part in accept.split(","):
+        media_type, _, params = part.strip().partition(";")
+        media_type = media_type.strip().lower()
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if media_type in MSGPACK_MEDIA_TYPES:
+            msgpack_q = max(msgpack_q, q)
+        elif media_type == "application/json":
+            json_q = max(json_q, q)
+    return msgpack_q > 0 and msgpack_q >= json_q
+
+
+def _json_safe(value: Any) -> Any:
+    """ค่าที่ได้จาก msgpack → ค่าที่ JSON รองรับ (Timestamp ext → ISO string, bin → ValueError)"""
+    if isinstance(value, dict):
+        return {str(k): _json_safe(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_json_safe(v) for v in value]
+    if isinstance(value, (bytes, bytearray)):
+        raise ValueError("bin ไม่รองรับ")
+    if isinstance(value, msgpack.Timestamp):
+        return value.to_datetime().isoformat()
+    return value
+
+
+def _msgpack_to_json(body: bytes) -> bytes:
+    """แปลง body แบบ MessagePack เป็น JSON bytes — ValueError ถ้า decode ไม่ได้"""
+    try:
+        data = msgpack.unpackb(body, raw=False, strict_map_key=False)
+    except Exception as e:
+        raise ValueError(str(e)) from e
+    return render_json(_json_safe(data))
+
+
+def msgpack_request_body(model: type) -> dict:
+    """openapi_extra สำหรับ route ที่รับ model เป็น MessagePack ได้ด้วย (นอกจาก JSON)"""
+    return {
+        "requestBody": {
+            "content": {MSGPACK_MEDIA_TYPE: {"schema": {"$ref": f"#/components/schemas/{model.__name__}"}}}
+        }
+    }
+
+
+class MessagePackMiddleware:
+    """แปลง request/response ระหว่าง MessagePack กับ JSON ตาม Content-Type / Accept"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        content_type = headers.get("content-type", "").split(";")[0].strip().lower()
+        if content_type in MSGPACK_MEDIA_TYPES:
+            if msgpack is None:
+                response = JSONResponse({"detail": "ไม่รองรับ application/msgpack"}, status_code=415)
+                await response(scope, receive, send)
+                return
+            try:
+                scope, receive = await self._decode_request(scope, receive)
+            except ValueError:
+                response = JSONResponse({"detail": "MessagePack body ไม่ถูกต้อง"}, status_code=400)
+                await response(scope, receive, send)
+                return
+
+        if msgpack is None:
+            await self.app(scope, receive, send)
+            return
+
+        if accepts_msgpack(headers.get("accept")):
+            # ให้ route ตอบแบบไม่บีบอัด (PrecompressedBody) — CompressionMiddleware ด้านนอกบีบอัด msgpack เอง
+            scope = {
+                **scope,
+                "headers": [(k, v) for k, v in scope["headers"] if k != b"accept-encoding"],
+            }
+            await self.app(scope, receive, _MessagePackResponder(send).send)
+        else:
+            await self.app(scope, receive, _vary_sender(send))
+
+    async def _decode_request(self, scope: Scope, receive: Receive) -> tuple[Scope, Receive]:
+        """อ่าน body ทั้งหมด แปลงเป็น JSON แล้วคืน scope/receive ใหม่ให้ route (ValueError = decode ไม่ได้)"""
+        chunks = []
+        while True:
+            message = await receive()
+            if message["type"] != "http.request":
+                break
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                break
+
+        body = _msgpack_to_json(b"".join(chunks))
+        headers = MutableHeaders(scope={**scope, "headers": list(scope["headers"])})
+        headers["content-type"] = "application/json"
+        headers["content-length"] = str(len(body))
+        sent = False
+
+        async def replay() -> Message:
+            nonlocal sent
+            if not sent:
+                sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        return {**scope, "headers": headers.raw}, replay
+
+
+def _vary_sender(send: Send) -> Send:
+    """เพิ่ม Vary: Accept ให้ JSON response — cache ระหว่างทางต้องแยก JSON กับ msgpack"""
+
+    async def wrapped(message: Message):
+        if message["type"] == "http.response.start":
+            headers = MutableHeaders(raw=message["headers"])
+            if headers.get("content-type", "").startswith("application/json"):
+                headers.add_vary_header("Accept")
+        await send(message)
+
+    return wrapped
+
+
+class _MessagePackResponder:
+    """รวม body ของ JSON response ทั้งหมดแล้วส่งเป็น MessagePack ครั้งเดียว"""
+
+    def __init__(self, send: Send):
+        self._send = send
+        self.start: Message | None = None
+        self.chunks: list[bytes] = []
+
+    async def send(self, message: Message):
+        if message["type"] == "http.response.start":
+            headers = Headers(raw=message["headers"])
+            content_type = headers.get("content-type", "")
+            if content_type.startswith("application/json") and "content-encoding" not in headers:
+                self.start = message
+                return
+            await self._send(message)
+            return
+
+        if message["type"] != "http.response.body" or self.start is None:
+            await self._send(message)
+            return
+
+        self.chunks.append(message.get("body", b""))
+        if message.get("more_body", False):
+            return
+
+        body = b"".join(self.chunks)
+        if body:
+            body = msgpack.packb(_loads_json(body), use_bin_type=True)
+        headers = MutableHeaders(raw=self.start["headers"])
+        headers["content-type"] = MSGPACK_MEDIA_TYPE
+        headers["content-length"] = str(len(body))
+        headers.add_vary_header("Accept")
+        await self._send(self.start)
+        await self._send({"type": "http.response.body", "body": body})
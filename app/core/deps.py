@@ -6,7 +6,7 @@ FastAPI dependencies สำหรับ inject เข้า route handlers
 
 from typing import Annotated
 
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Query, WebSocket, WebSocketException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 
@@ -73,3 +73,32 @@ def require_role(allowed_roles: list[str]):
             )
         return current_user
     return role_checker
+
+def require_role_ws(allowed_roles: list[str]):
+    """Dependency factory สำหรับ WebSocket — รับ token จาก ?token= หรือ Authorization header"""
+    def ws_role_checker(
+        websocket: WebSocket,
+        token: str | None = Query(None),
+        db: Session = Depends(get_db),
+    ) -> User:
+        if token is None:
+            authorization = websocket.headers.get("authorization", "")
+            scheme, _, credentials = authorization.partition(" ")
+            if scheme.lower() == "bearer":
+                token = credentials
+
+        payload = decode_access_token(token) if token else None
+        user_id = payload.get("sub") if payload else None
+        if user_id is None:
+            raise WebSocketException(code=status.WS_1008_POLICY_VIOLATION, reason="Could not validate credentials")
+
+        try:
+            user = db.query(User).filter(User.user_id == int(user_id)).first()
+        finally:
+            # WebSocket อยู่ได้นาน — ไม่ถือ DB connection ไว้ตลอดการเชื่อมต่อ
+            db.close()
+
+        if user is None or user.user_role not in allowed_roles:
+            raise WebSocketException(code=status.WS_1008_POLICY_VIOLATION, reason="Not enough permissions")
+        return user
+    return ws_role_checker
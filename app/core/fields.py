@@ -0,0 +1,43 @@
+"""
+Sparse Fieldsets
+
+?fields=a,b,c บน list endpoints — client เลือกเฉพาะ field ที่ใช้ (เช่น table board ใช้แค่ table_id,status)
+- parse_fields: ตรวจชื่อ field กับ response schema (400 ถ้าไม่รู้จัก) แล้วคืนตามลำดับใน schema
+- select_rows: SELECT เฉพาะคอลัมน์ของ field ที่ขอ (core select ไม่สร้าง ORM object) → list ของ dict
+- FIELDS_DESCRIPTION: คำอธิบาย query parameter สำหรับ OpenAPI
+
+field ที่ไม่ได้ขอจะไม่ถูก query (select เฉพาะคอลัมน์ / load_only / ไม่ join) และไม่ถูก serialize
+"""
+
+from fastapi import HTTPException, status
+from pydantic import BaseModel
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+FIELDS_DESCRIPTION = "field ที่ต้องการ คั่นด้วย , (เช่น table_id,status) — ไม่ส่ง = ทุก field"
+
+
+def parse_fields(value: str | None, schema: type[BaseModel]) -> tuple[str, ...] | None:
+    """แยก ?fields= เป็นชื่อ field ของ schema — None ถ้าไม่ได้ส่งมา (= ทุก field)"""
+    if value is None:
+        return None
+
+    requested = {name.strip() for name in value.split(",") if name.strip()}
+    if not requested:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="ต้องระบุอย่างน้อยหนึ่ง field",
+        )
+    unknown = sorted(requested - schema.model_fields.keys())
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"ไม่รู้จัก field: {', '.join(unknown)} (ใช้ได้: {', '.join(schema.model_fields)})",
+        )
+    return tuple(name for name in schema.model_fields if name in requested)
+
+
+def select_rows(db: Session, model, fields: tuple[str, ...]) -> list[dict]:
+    """SELECT เฉพาะคอลัมน์ fields ของ model (ทุก field ต้องเป็นคอลัมน์) → list ของ dict ตามลำดับ fields"""
+    columns = [getattr(model, name) for name in fields]
+    return [dict(row._mapping) for row in db.execute(select(*columns))]
@@ -0,0 +1,68 @@
+"""
+Interval Index
+
+ดัชนีช่วงเวลาแบบ in-memory ของวันหนึ่ง — ต่อโต๊ะเก็บช่วงเวลาที่ถูกจองเรียงตามเวลาเริ่ม
+- add / remove: เพิ่ม/ลบช่วงเวลา (ตาม key เช่น ("reservation", id))
+- block / unblock: ทำให้โต๊ะไม่ว่างทั้งวัน (เช่น มี order ที่ยังไม่จบ)
+- is_free: ตรวจว่าโต๊ะว่างในช่วง [start, end) หรือไม่ — O(log n) ต่อโต๊ะ
+
+อาศัยว่าช่วงเวลาของโต๊ะเดียวกันไม่ซ้อนกัน (รับประกันโดย exclusion constraint
+ของ reservation_tables) จึงตรวจแค่ช่วงก่อนหน้าที่ใกล้ที่สุดก็พอ
+"""
+
+from bisect import bisect_left, insort
+from collections.abc import Hashable
+from datetime import datetime
+
+
+class DayIntervalIndex:
+    """interval index ของหนึ่งวัน"""
+
+    def __init__(self):
+        # table_id → [(start, end, key)] เรียงตาม start
+        self._intervals: dict[int, list[tuple[datetime, datetime, Hashable]]] = {}
+        # key → [(table_id, start, end)] สำหรับลบ
+        self._by_key: dict[Hashable, list[tuple[int, datetime, datetime]]] = {}
+        # table_id → keys ที่ block โต๊ะนี้อยู่
+        self._blocked: dict[int, set[Hashable]] = {}
+
+    def add(self, key: Hashable, table_ids: list[int], start: datetime, end: datetime):
+        """เพิ่มช่วงเวลา [start, end) ให้ทุกโต๊ะใน table_ids"""
+        self.remove(key)
+        for table_id in table_ids:
+            insort(self._intervals.setdefault(table_id, []), (start, end, key), key=lambda i: i[0])
+        self._by_key[key] = [(table_id, start, end) for table_id in table_ids]
+
+    def remove(self, key: Hashable):
+        """ลบช่วงเวลาทั้งหมดของ key (ไม่มี → ไม่ทำอะไร)"""
+        for table_id, start, end in self._by_key.pop(key, []):
+            intervals = self._intervals[table_id]
+            i = bisect_left(intervals, start, key=lambda i: i[0])
+            while i < len(intervals) and intervals[i][0] == start:
+                if intervals[i][2] == key:
+                    del intervals[i]
+                    break
+                i += 1
+
+    def block(self, key: Hashable, table_ids: list[int]):
+        """ทำให้โต๊ะไม่ว่างทั้งวันจนกว่าจะ unblock"""
+        for table_id in table_ids:
+            self._blocked.setdefault(table_id, set()).add(key)
+
+    def unblock(self, key: Hashable):
+        """ยกเลิก block ของ key"""
+        for keys in self._blocked.values():
+            keys.discard(key)
+
+    def is_free(self, table_id: int, start: datetime, end: datetime) -> bool:
+        """โต๊ะว่างตลอดช่วง [start, end) หรือไม่"""
+        if self._blocked.get(table_id):
+            return False
+
+        intervals = self._intervals.get(table_id)
+        if not intervals:
+            return True
+
+        # ช่วงสุดท้ายที่เริ่มก่อน end — ถ้าจบหลัง start แปลว่าซ้อน
+        i = bisect_left(intervals, end, key=lambda i: i[0]) - 1
+        return i < 0 or intervals[i][1] <= start
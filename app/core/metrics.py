@@ -0,0 +1,27 @@
+"""
+Metrics
+
+ตัวนับ (counters) แบบ in-process สำหรับดูพฤติกรรมของระบบ
+- incr: เพิ่มค่า counter ตามชื่อ
+- snapshot: คืนค่า counters ทั้งหมด (ใช้ใน GET /metrics)
+
+ค่าเป็นของแต่ละ worker process — ไม่ได้รวมข้าม worker
+"""
+
+import threading
+from collections import defaultdict
+
+_lock = threading.Lock()
+_counters: dict[str, int] = defaultdict(int)
+
+
+def incr(name: str, value: int = 1) -> None:
+    """เพิ่มค่า counter (thread-safe)"""
+    with _lock:
+        _counters[name] += value
+
+
+def snapshot() -> dict[str, int]:
+    """คืนสำเนาของ counters ทั้งหมด เรียงตามชื่อ"""
+    with _lock:
+        return dict(sorted(_counters.items()))
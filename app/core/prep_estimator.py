@@ -0,0 +1,138 @@
+"""
+Prep Time Estimator
+
+ประมาณเวลาที่ order จะเสร็จ จากเวลาทำจริงล่าสุดของแต่ละเมนู + คิวที่รออยู่ก่อนหน้า
+- record: เพิ่มเวลาทำ (วินาที) ของ order ที่เสร็จแล้วให้ทุกเมนูใน order
+- prep_seconds: เวลาทำโดยประมาณของ order (เมนูที่ช้าที่สุด — เมนูต่างๆ ทำพร้อมกันได้)
+- open / close: order เข้า/ออกจากคิวครัว
+- reset_queue: แทนที่คิวทั้งหมดด้วย order ที่เปิดอยู่จริง (เรียงตามลำดับที่เข้าคิว)
+- ahead: จำนวน order ที่ยังรออยู่ก่อนหน้า order นี้
+- estimate: (queue_ahead, prep_seconds, eta)
+
+เวลาทำเก็บเป็น rolling window (deque ขนาดคงที่ + ผลรวม) ต่อเมนู ค่าเฉลี่ยจึงเป็น O(1)
+ลำดับในคิว: ทุก order ได้เลขลำดับการเข้าคิว (เพิ่มขึ้นเรื่อย ๆ) และเก็บเลขของ order ที่ยังเปิดอยู่
+เป็น list ที่เรียงอยู่แล้ว (order ใหม่ต่อท้ายเสมอ) → ahead = bisect หาจำนวนเลขที่น้อยกว่า O(log n)
+order ที่ปิดจึงลดคิวเฉพาะ order ที่เข้าทีหลังมัน — order ที่เข้าทีหลังแล้วปิดก่อนไม่ทำให้ order ก่อนหน้าขยับ
+ไม่ thread-safe — ผู้เรียกต้องถือ lock เอง
+"""
+
+from bisect import bisect_left
+from collections import deque
+from collections.abc import Iterable
+from datetime import datetime, timedelta
+
+
+class RollingMean:
+    """ค่าเฉลี่ยของ n ค่าล่าสุด — เพิ่มค่าและอ่านค่าเฉลี่ยเป็น O(1)"""
+
+    def __init__(self, size: int):
+        self._values: deque[float] = deque(maxlen=size)
+        self._total = 0.0
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def add(self, value: float):
+        if len(self._values) == self._values.maxlen:
+            self._total -= self._values[0]
+        self._values.append(value)
+        self._total += value
+
+    def mean(self) -> float | None:
+        return self._total / len(self._values) if self._values else None
+
+
+class PrepTimeEstimator:
+    """สถานะของคิวครัวหนึ่ง worker"""
+
+    def __init__(self, window_size: int, default_prep_seconds: float, parallel_orders: int = 1):
+        self.window_size = window_size
+        self.default_prep_seconds = default_prep_seconds
+        self.parallel_orders = max(parallel_orders, 1)
+        # product_id → เวลาทำล่าสุดของเมนูนั้น
+        self._by_product: dict[int, RollingMean] = {}
+        # เวลาทำล่าสุดของทุกเมนูรวมกัน — ใช้เป็นเวลาต่อ order ที่รออยู่ก่อนหน้า
+        self._overall = RollingMean(window_size)
+        # order_id → เลขลำดับการเข้าคิว
+        self._open: dict[int, int] = {}
+        # เลขลำดับของ order ที่ยังเปิดอยู่ เรียงจากน้อยไปมาก
+        self._arrivals: list[int] = []
+        self._next_arrival = 0
+
+    def __len__(self) -> int:
+        return len(self._open)
+
+    def __contains__(self, order_id: int) -> bool:
+        return order_id in self._open
+
+    def record(self, product_ids: Iterable[int], seconds: float):
+        """เพิ่มเวลาทำของ order หนึ่งให้ทุกเมนูใน order"""
+        seconds = max(seconds, 0.0)
+        for product_id in set(product_ids):
+            window = self._by_product.get(product_id)
+            if window is None:
+                window = self._by_product[product_id] = RollingMean(self.window_size)
+            window.add(seconds)
+        self._overall.add(seconds)
+
+    def product_seconds(self, product_id: int) -> float:
+        """เวลาทำเฉลี่ยของเมนู (ยังไม่มีข้อมูล → ค่าเฉลี่ยรวม หรือค่า default)"""
+        window = self._by_product.get(product_id)
+        mean = window.mean() if window is not None else None
+        if mean is None:
+            mean = self._overall.mean()
+        return self.default_prep_seconds if mean is None else mean
+
+    def prep_seconds(self, product_ids: Iterable[int]) -> float:
+        """เวลาทำของ order = เมนูที่ช้าที่สุดใน order"""
+        return max((self.product_seconds(product_id) for product_id in set(product_ids)), default=0.0)
+
+    def open(self, order_id: int):
+        """order เข้าคิวครัว (อยู่ท้ายคิว — มีอยู่แล้ว → ไม่ทำอะไร)"""
+        if order_id not in self._open:
+            self._open[order_id] = self._next_arrival
+            self._arrivals.append(self._next_arrival)
+            self._next_arrival += 1
+
+    def close(self, order_id: int) -> bool:
+        """order ออกจากคิวครัว — คืน True ถ้า order อยู่ในคิวนี้"""
+        arrival = self._open.pop(order_id, None)
+        if arrival is None:
+            return False
+        del self._arrivals[bisect_left(self._arrivals, arrival)]
+        return True
+
+    def reset_queue(self, order_ids: Iterable[int]):
+        """แทนที่คิวด้วย order_ids (เรียงตามลำดับที่เข้าคิว) — เวลาทำที่เก็บไว้ยังอยู่"""
+        self._open = {}
+        self._arrivals = []
+        self._next_arrival = 0
+        for order_id in order_ids:
+            self.open(order_id)
+
+    def ahead(self, order_id: int) -> int:
+        """จำนวน order ที่ยังเปิดอยู่และเข้าคิวก่อน order นี้ (ไม่รู้จัก order → ถือว่าอยู่ท้ายคิว)"""
+        arrival = self._open.get(order_id)
+        if arrival is None:
+            return len(self._open)
+        return bisect_left(self._arrivals, arrival)
+
+    def estimate(
+        self, order_id: int, product_ids: Iterable[int], created_at: datetime, now: datetime
+    ) -> tuple[int, float, datetime]:
+        """
+        (queue_ahead, prep_seconds, eta) ของ order ที่ยังอยู่ในคิว
+
+        order ก่อนหน้าน้อยกว่าที่ครัวทำพร้อมกันได้ → กำลังทำอยู่: eta = max(now, created_at + prep)
+        ไม่เช่นนั้นรอ order ที่เกินมาก่อน: eta = now + เกินมา × (เวลาทำเฉลี่ย / parallel_orders) + prep
+        """
+        ahead = self.ahead(order_id)
+        prep = self.prep_seconds(product_ids)
+        if ahead < self.parallel_orders:
+            return ahead, prep, max(now, created_at + timedelta(seconds=prep))
+
+        per_order = self._overall.mean()
+        if per_order is None:
+            per_order = self.default_prep_seconds
+        wait = (ahead - self.parallel_orders + 1) * per_order / self.parallel_orders
+        return ahead, prep, now + timedelta(seconds=wait + prep)
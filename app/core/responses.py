@@ -0,0 +1,86 @@
+"""
+Response Classes
+
+JSON response ที่ serialize เร็วกว่า JSONResponse ของ starlette (json.dumps)
+- FastJSONResponse: ใช้ orjson — datetime/date/UUID/dataclass และ Pydantic model ได้โดยไม่ต้องผ่าน jsonable_encoder
+- render_json: serialize แบบเดียวกับ FastJSONResponse เป็น bytes (สำหรับเก็บ body ไว้ใน cache)
+- get_default_response_class: default_response_class ของ app ตาม settings.JSON_RESPONSE_CLASS
+- model_json / model_response: serialize ผลลัพธ์ที่เป็น response model อยู่แล้วครั้งเดียวด้วย TypeAdapter (cache ต่อชนิด)
+
+orjson เป็น optional dependency — ไม่ได้ติดตั้ง → FastJSONResponse กลับไปใช้ jsonable_encoder + json.dumps
+เมื่อ app มี default_response_class ของตัวเอง FastAPI จะ serialize response_model เป็น dict (Pydantic)
+แล้วส่งให้ FastJSONResponse แทนการ dump_json ตรง ๆ — ต่างกันเล็กน้อย (ดู benchmarks/bench_json_response.py)
+ส่วน route ที่ไม่มี response_model ยังผ่าน jsonable_encoder ก่อนถึง response class เสมอ
+route ที่คืน Response เอง (model_response) ข้ามทั้ง validate และ serialize ของ FastAPI
+"""
+
+from decimal import Decimal
+from functools import lru_cache
+from typing import Any
+
+from fastapi.datastructures import Default, DefaultPlaceholder
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, TypeAdapter
+from starlette.responses import Response
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - ขึ้นกับ environment
+    orjson = None
+
+
+def _default(value: Any) -> Any:
+    """ชนิดที่ orjson ไม่รู้จัก — Pydantic model, Decimal, set"""
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def render_json(content: Any) -> bytes:
+    """JSON bytes ด้วย orjson (ไม่มี orjson → jsonable_encoder + json.dumps แบบ JSONResponse)"""
+    if orjson is None:
+        return JSONResponse(jsonable_encoder(content)).body
+    return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse ที่ render ด้วย orjson (ไม่มี orjson → jsonable_encoder + json.dumps)"""
+
+    def render(self, content: Any) -> bytes:
+        return render_json(content)
+
+
+def get_default_response_class(name: str) -> type[Response] | DefaultPlaceholder:
+    """"fast" → FastJSONResponse, "default" → ค่า default ของ FastAPI (JSONResponse)"""
+    if name == "fast":
+        return FastJSONResponse
+    if name == "default":
+        return Default(JSONResponse)
+    raise ValueError(f"Unknown JSON_RESPONSE_CLASS: {name}")
+
+
+@lru_cache(maxsize=None)
+def _type_adapter(tp: Any) -> TypeAdapter:
+    """TypeAdapter ต่อชนิด — สร้าง schema/serializer ครั้งเดียวต่อ process"""
+    return TypeAdapter(tp)
+
+
+def model_json(tp: Any, value: Any) -> bytes:
+    """JSON bytes ของ value (ชนิด tp) ด้วย Pydantic โดยไม่ validate — ใช้เก็บ body ที่ serialize แล้วไว้ใน cache"""
+    return _type_adapter(tp).dump_json(value)
+
+
+def model_response(tp: Any, value: Any, status_code: int = 200) -> Response:
+    """
+    serialize value (ชนิด tp เช่น list[OrderResponse]) เป็น JSON ครั้งเดียวด้วย Pydantic (Rust)
+
+    ไม่ validate value — ใช้กับ model ที่ service สร้างจากข้อมูลใน DB แล้วเท่านั้น
+    route ยังควรประกาศ response_model=tp ไว้สำหรับ OpenAPI schema
+    """
+    body = model_json(tp, value)
+    return Response(content=body, status_code=status_code, media_type="application/json")
@@ -0,0 +1,68 @@
+"""
+Single-flight
+
+รวม request อ่านข้อมูลที่เหมือนกันซึ่งเข้ามาพร้อมกัน ให้ fetch จาก DB แค่ครั้งเดียว
+แล้วแจกผลลัพธ์ให้ทุก request ที่รออยู่ (คล้าย golang.org/x/sync/singleflight)
+
+- ใช้กับ route แบบ sync (def) ซึ่ง FastAPI รันใน threadpool → ใช้ threading
+- ผลลัพธ์ถูกแชร์ข้าม request จึงต้องเป็นข้อมูลที่ไม่ผูกกับ Session
+  (เช่น Pydantic models) และห้ามแก้ไขหลังคืนค่า
+- ไม่ใช่ cache — เมื่อ fetch เสร็จ key จะถูกลบทันที request ถัดไปจะ fetch ใหม่
+"""
+
+import threading
+from collections.abc import Callable
+from typing import Any
+
+from app.core import metrics
+
+
+class _Call:
+    """สถานะของการ fetch ที่กำลังทำงานอยู่สำหรับ key หนึ่ง"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException | None = None
+
+
+class SingleFlight:
+    """กลุ่มของ in-flight calls แยกตาม key"""
+
+    def __init__(self, name: str = "singleflight"):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls: dict[str, _Call] = {}
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        """เรียก fn สำหรับ key นี้ — ถ้ามีคนเรียกอยู่แล้ว รอแล้วใช้ผลลัพธ์เดียวกัน"""
+        with self._lock:
+            call = self._calls.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = _Call()
+                self._calls[key] = call
+
+        if not is_leader:
+            call.done.wait()
+            metrics.incr(f"{self.name}.{key}.coalesced")
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+            metrics.incr(f"{self.name}.{key}.executed")
+
+        return call.result
+
+
+# Instance กลางสำหรับ hot read endpoints (products, tables)
+read_flight = SingleFlight()
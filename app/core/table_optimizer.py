@@ -0,0 +1,194 @@
+"""
+Table Optimizer
+
+เลือกชุดโต๊ะว่างสำหรับกลุ่มลูกค้า ให้ที่นั่งเหลือ (waste) น้อยที่สุด
+ถ้าเท่ากันเลือกชุดที่ใช้โต๊ะน้อยกว่า
+
+- best_fit: คืน table_ids ที่ดีที่สุด (memoize ตาม (โต๊ะว่าง, จำนวนคน, adjacency))
+
+ไม่ส่ง adjacency → รวมโต๊ะใดก็ได้ ใช้ DP แบบ subset-sum บนความจุโต๊ะ
+adjacency คือคู่โต๊ะที่ยกมาต่อกันได้ — ชุดที่เลือกต้องต่อถึงกันเอง (connected subgraph)
+อยู่ component เดียวกันยังไม่พอ (โต๊ะ 1-2-3 เป็นแถว: 1+3 ต่อกันไม่ได้ถ้าไม่มี 2)
+จึงเริ่มจากชุดแบบ greedy แล้วไล่ชุดที่ต่อถึงกันทีละชุดแบบไม่ซ้ำ
+(ESU: ขยายจากโต๊ะราก ด้วยเพื่อนบ้านที่ id มากกว่าราก) เพื่อหาชุดที่ดีกว่า
+หยุดขยายเมื่อนั่งพอแล้ว ตัดกิ่งที่ที่นั่งรวมไม่ดีกว่าชุดที่ดีที่สุดที่เจอแล้ว
+และจำกัดจำนวนชุดที่ไล่ (MAX_SEARCH_NODES) — จำนวนชุดที่ต่อถึงกันโตแบบ exponential ตามขนาดกลุ่ม
+เกินงบแล้วคืนชุดที่ดีที่สุดที่เจอ (ต่อถึงกันเสมอ แต่อาจไม่ใช่ชุดที่ดีที่สุด)
+"""
+
+from functools import lru_cache
+
+_INF = float("inf")
+
+# จำนวนชุดที่ _connected_fit ไล่ได้สูงสุดต่อการเรียก — เกินนี้คืนชุดที่ดีที่สุดที่เจอแล้ว
+MAX_SEARCH_NODES = 500
+
+
+def _components(table_ids: list[int], adjacency: frozenset[tuple[int, int]]) -> list[set[int]]:
+    """แบ่งโต๊ะเป็นกลุ่มที่เชื่อมถึงกันตาม adjacency (union-find)"""
+    parent = {table_id: table_id for table_id in table_ids}
+
+    def find(x: int) -> int:
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for a, b in adjacency:
+        if a in parent and b in parent:
+            parent[find(a)] = find(b)
+
+    groups: dict[int, set[int]] = {}
+    for table_id in table_ids:
+        groups.setdefault(find(table_id), set()).add(table_id)
+    return list(groups.values())
+
+
+def _subset_sum(tables: list[tuple[int, int]], party_size: int) -> tuple[int, ...] | None:
+    """DP: ผลรวมความจุที่ >= party_size และน้อยที่สุด (เสมอ → โต๊ะน้อยสุด)"""
+    if not tables:
+        return None
+
+    # ชุดที่ดีที่สุดไม่มีทางเกิน party_size + ความจุสูงสุด - 1 (ไม่งั้นเอาโต๊ะออกได้อีกตัว)
+    limit = party_size + max(capacity for _, capacity in tables) - 1
+    count = [0] + [_INF] * limit
+    took = []
+    for _, capacity in tables:
+        row = bytearray(limit + 1)
+        for total in range(limit, capacity - 1, -1):
+            if count[total - capacity] + 1 < count[total]:
+                count[total] = count[total - capacity] + 1
+                row[total] = 1
+        took.append(row)
+
+    total = next((t for t in range(party_size, limit + 1) if count[t] != _INF), None)
+    if total is None:
+        return None
+
+    chosen = []
+    for i in range(len(tables) - 1, -1, -1):
+        if took[i][total]:
+            chosen.append(tables[i][0])
+            total -= tables[i][1]
+    return tuple(sorted(chosen))
+
+
+def _greedy_grow(
+    root: int, party_size: int, capacity_of: dict[int, int], neighbours: dict[int, set[int]]
+) -> list[int] | None:
+    """
+    ขยายจาก root ทีละโต๊ะจนนั่งพอ — ชุดที่ได้ต่อถึงกันเสมอ (None = component ไม่พอ)
+
+    โต๊ะข้างเคียงตัวเล็กสุดที่ปิดยอดได้ → จบ, ไม่งั้นเพิ่มตัวใหญ่สุด (ใช้โต๊ะน้อย)
+    """
+    subset, total = [root], capacity_of[root]
+    frontier = set(neighbours[root])
+    while total < party_size:
+        if not frontier:
+            return None
+        remaining = party_size - total
+        finishing = [t for t in frontier if capacity_of[t] >= remaining]
+        if finishing:
+            table_id = min(finishing, key=lambda t: (capacity_of[t], t))
+        else:
+            table_id = max(frontier, key=lambda t: (capacity_of[t], -t))
+        subset.append(table_id)
+        total += capacity_of[table_id]
+        frontier |= neighbours[table_id]
+        frontier.difference_update(subset)
+    return subset
+
+
+def _connected_fit(
+    tables: list[tuple[int, int]], party_size: int, adjacency: frozenset[tuple[int, int]]
+) -> tuple[int, ...] | None:
+    """
+    ชุดโต๊ะที่ต่อถึงกันตาม adjacency ที่ดีที่สุด (ผลรวมความจุน้อยสุด, เสมอ → โต๊ะน้อยสุด)
+
+    เริ่มจากผล greedy ของทุกโต๊ะราก แล้วค้นแบบ ESU เพื่อหาชุดที่ดีกว่า
+    หยุดทันทีเมื่อได้เท่าผลของ _subset_sum (ดีกว่านั้นไม่มี) หรือไล่ครบ MAX_SEARCH_NODES ชุด
+    """
+    bound = _subset_sum(tables, party_size)
+    if bound is None:
+        return None
+    capacity_of = dict(tables)
+    bound_key = (sum(capacity_of[t] for t in bound), len(bound))
+
+    neighbours: dict[int, set[int]] = {table_id: set() for table_id in capacity_of}
+    for a, b in adjacency:
+        if a in neighbours and b in neighbours and a != b:
+            neighbours[a].add(b)
+            neighbours[b].add(a)
+
+    best, best_key = None, None
+    for root in sorted(capacity_of):
+        grown = _greedy_grow(root, party_size, capacity_of, neighbours)
+        if grown is None:
+            continue
+        key = (sum(capacity_of[t] for t in grown), len(grown))
+        if best_key is None or key < best_key:
+            best, best_key = tuple(sorted(grown)), key
+            if best_key == bound_key:
+                return best
+    if best_key is None:
+        return best
+
+    budget = MAX_SEARCH_NODES
+
+    def extend(root: int, subset: list[int], total: int, extension: list[int], closed: set[int]):
+        nonlocal best, best_key, budget
+        if total >= party_size:
+            # ขยายต่อมีแต่เสียที่นั่งเพิ่ม
+            best, best_key = tuple(sorted(subset)), (total, len(subset))
+            return
+        extension = list(extension)
+        while extension and budget > 0 and best_key != bound_key:
+            table_id = extension.pop()
+            key = (total + capacity_of[table_id], len(subset) + 1)
+            if key >= best_key:
+                continue
+            budget -= 1
+            # เพื่อนบ้านใหม่เฉพาะที่ยังไม่ติดกับชุดเดิม — แต่ละชุดจึงถูกสร้างครั้งเดียว
+            fresh = [n for n in neighbours[table_id] if n > root and n not in closed]
+            extend(root, subset + [table_id], key[0], extension + fresh, closed | neighbours[table_id])
+
+    for root in sorted(capacity_of):
+        if budget <= 0 or best_key == bound_key:
+            break
+        if (capacity_of[root], 1) >= best_key:
+            continue
+        extension = [n for n in neighbours[root] if n > root]
+        extend(root, [root], capacity_of[root], extension, {root} | neighbours[root])
+    return best
+
+
+@lru_cache(maxsize=4096)
+def best_fit(
+    free: tuple[tuple[int, int], ...],
+    party_size: int,
+    adjacency: frozenset[tuple[int, int]] | None = None,
+) -> tuple[int, ...] | None:
+    """
+    เลือกชุดโต๊ะจาก free = ((table_id, capacity), ...) สำหรับ party_size คน
+
+    คืน table_ids (เรียงจากน้อยไปมาก) หรือ None ถ้าโต๊ะว่างทั้งหมดรวมกันยังไม่พอ
+    free ควรเรียงแบบเดียวกันทุกครั้ง เพื่อให้ memoize ได้ผล
+    """
+    # ตัดก่อนสร้างตาราง DP (ขนาดตาม party_size)
+    if sum(capacity for _, capacity in free) < party_size:
+        return None
+    capacity_of = dict(free)
+    if not adjacency:
+        return _subset_sum(list(free), party_size)
+
+    best, best_key = None, None
+    for group in _components(list(capacity_of), adjacency):
+        if sum(capacity_of[t] for t in group) < party_size:
+            continue
+        chosen = _connected_fit([(t, capacity_of[t]) for t in sorted(group)], party_size, adjacency)
+        if chosen is None:
+            continue
+        key = (sum(capacity_of[t] for t in chosen), len(chosen))
+        if best_key is None or key < best_key:
+            best, best_key = chosen, key
+    return best
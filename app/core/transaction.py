@@ -0,0 +1,44 @@
+"""
+Transaction Helpers
+
+งานที่ต้องเกิดหลัง commit จริงเท่านั้น (publish event, index ในหน่วยความจำ, ล้าง cache)
+- commit_then: commit แล้วเรียก callback — ถ้าอยู่ใน deferred_commit จะแค่ flush และเก็บ callback ไว้ใน session
+- deferred_commit: รวมการเขียนของ service กับของผู้เรียกเป็น transaction เดียว แล้ว commit ตอนจบ block
+  callbacks ที่เก็บไว้ถูกเรียกหลัง commit สำเร็จเท่านั้น — error ใน block → ไม่ commit และทิ้ง callbacks ทั้งหมด
+
+เช่น idempotency: order กับ response ที่เก็บ commit พร้อมกัน
+และ subscriber ไม่เห็น event ของ order ที่ถูก rollback ไป
+"""
+
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+
+from sqlalchemy.orm import Session
+
+# key ใน Session.info ของ callbacks ที่รอ commit (มีเฉพาะระหว่าง deferred_commit)
+_PENDING = "after_commit"
+
+
+def commit_then(db: Session, callback: Callable[[], None]):
+    """commit แล้วเรียก callback — ภายใน deferred_commit: flush แล้วเลื่อน callback ไปหลัง commit ของ block"""
+    pending = db.info.get(_PENDING)
+    if pending is not None:
+        db.flush()
+        pending.append(callback)
+        return
+    db.commit()
+    callback()
+
+
+@contextmanager
+def deferred_commit(db: Session) -> Iterator[None]:
+    """commit ทุกอย่างใน block ครั้งเดียวตอนจบ แล้วเรียก callbacks ของ commit_then ตามลำดับ"""
+    pending: list[Callable[[], None]] = []
+    db.info[_PENDING] = pending
+    try:
+        yield
+        db.commit()
+    finally:
+        del db.info[_PENDING]
+    for callback in pending:
+        callback()
@@ -0,0 +1,93 @@
+"""
+Waitlist Queue
+
+คิวรอโต๊ะแบบ in-memory — จัดลำดับตามขนาดกลุ่ม (party_size) และเวลาที่มาถึง
+- add / remove: เพิ่ม/ลบกลุ่มที่รอ
+- best_fit: กลุ่มที่ใหญ่ที่สุดที่นั่งพอกับความจุที่ว่าง (ขนาดเท่ากัน → มาก่อนได้ก่อน)
+- position: ลำดับในคิว (นับตามเวลาที่มาถึง, เริ่มที่ 1)
+- get: (party_size, arrived_at) ของกลุ่มที่รออยู่
+
+heap หนึ่งตัวต่อ party_size + list ของ party_size ที่มีคนรอ (เรียงด้วย bisect)
+best_fit จึงเป็น O(log n) — entry ที่ถูก remove ถูกทิ้งจาก heap ตอนถูกหยิบขึ้นมา (lazy deletion)
+ไม่ thread-safe — ผู้เรียกต้องถือ lock เอง
+"""
+
+import heapq
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime
+
+
+class WaitlistQueue:
+    """คิวรอโต๊ะของหนึ่ง worker"""
+
+    def __init__(self):
+        # party_size → heap ของ (arrived_at, entry_id)
+        self._heaps: dict[int, list[tuple[datetime, int]]] = {}
+        # party_size ที่ยังมีคนรอ เรียงจากน้อยไปมาก
+        self._sizes: list[int] = []
+        # (arrived_at, entry_id) ของทุกกลุ่มที่รอ เรียงตามเวลา — ใช้หา position
+        self._arrivals: list[tuple[datetime, int]] = []
+        # entry_id → (party_size, arrived_at)
+        self._entries: dict[int, tuple[int, datetime]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, entry_id: int) -> bool:
+        return entry_id in self._entries
+
+    def add(self, entry_id: int, party_size: int, arrived_at: datetime):
+        """เพิ่มกลุ่มที่รอ (มีอยู่แล้ว → ไม่ทำอะไร)"""
+        if entry_id in self._entries:
+            return
+        self._entries[entry_id] = (party_size, arrived_at)
+        insort(self._arrivals, (arrived_at, entry_id))
+        heap = self._heaps.get(party_size)
+        if heap is None:
+            heap = self._heaps[party_size] = []
+            insort(self._sizes, party_size)
+        heapq.heappush(heap, (arrived_at, entry_id))
+
+    def remove(self, entry_id: int):
+        """ลบกลุ่มออกจากคิว (ไม่มี → ไม่ทำอะไร) — heap ถูกเก็บกวาดตอน best_fit"""
+        entry = self._entries.pop(entry_id, None)
+        if entry is None:
+            return
+        i = bisect_left(self._arrivals, (entry[1], entry_id))
+        del self._arrivals[i]
+
+    def get(self, entry_id: int) -> tuple[int, datetime] | None:
+        """(party_size, arrived_at) ของกลุ่ม — None ถ้าไม่อยู่ในคิว"""
+        return self._entries.get(entry_id)
+
+    def position(self, entry_id: int) -> int | None:
+        """ลำดับในคิวตามเวลาที่มาถึง (1 = คิวแรก) — None ถ้าไม่อยู่ในคิว"""
+        entry = self._entries.get(entry_id)
+        if entry is None:
+            return None
+        return bisect_left(self._arrivals, (entry[1], entry_id)) + 1
+
+    def ordered(self) -> list[int]:
+        """entry_ids ทั้งหมดเรียงตามเวลาที่มาถึง"""
+        return [entry_id for _, entry_id in self._arrivals]
+
+    def _top(self, party_size: int) -> int | None:
+        """กลุ่มที่มาก่อนสุดของขนาดนี้ — ทิ้ง entry ที่ถูก remove ไปแล้วออกจาก heap"""
+        heap = self._heaps[party_size]
+        while heap and heap[0][1] not in self._entries:
+            heapq.heappop(heap)
+        if heap:
+            return heap[0][1]
+        del self._heaps[party_size]
+        del self._sizes[bisect_left(self._sizes, party_size)]
+        return None
+
+    def best_fit(self, capacity: int) -> int | None:
+        """entry_id ของกลุ่มที่ใหญ่ที่สุดที่ party_size <= capacity — None ถ้าไม่มีกลุ่มที่นั่งพอ"""
+        i = bisect_right(self._sizes, capacity)
+        while i > 0:
+            i -= 1
+            entry_id = self._top(self._sizes[i])
+            if entry_id is not None:
+                return entry_id
+        return None
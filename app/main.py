@@ -4,19 +4,46 @@ FastAPI Application Entry Point
 เทียบเท่า index.js ใน Express
 - สร้าง FastAPI app instance
 - ลงทะเบียน routers
-- ตั้งค่า middleware (CORS, etc.)
+- ตั้งค่า middleware (CORS, MessagePack content negotiation, บีบอัด response gzip/brotli)
+- default response class: orjson (settings.JSON_RESPONSE_CLASS)
+- lifespan: เริ่ม/หยุดงานเบื้องหลัง (การจอง pending, คิวรอที่ไม่มานั่ง, ลบ Idempotency-Key ที่หมดอายุ)
 """
 
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager, suppress
+
+from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 
-from app.routers import auth, orders, products, reservations, tables, users
+from app.config.settings import settings
+from app.core import metrics
+from app.core.compression import CompressionMiddleware
+from app.core.content_negotiation import MessagePackMiddleware
+from app.core.deps import require_role
+from app.core.responses import get_default_response_class
+from app.routers import auth, orders, products, reports, reservations, sync, tables, users, waitlist
+from app.services.hold_sweeper import start_sweepers
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """เริ่มงานเบื้องหลังที่เปิดไว้ตอน startup แล้ว cancel ตอน shutdown"""
+    sweepers = start_sweepers()
+    yield
+    for sweeper in sweepers:
+        sweeper.cancel()
+    for sweeper in sweepers:
+        with suppress(asyncio.CancelledError):
+            await sweeper
+
 
 app = FastAPI(
     title="Cafe Inn API",
     description="Coffee Shop Backend API - Learning Project",
     version="0.1.0",
+    lifespan=lifespan,
+    default_response_class=get_default_response_class(settings.JSON_RESPONSE_CLASS),
 )
 
 # CORS Middleware
@@ -28,6 +55,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# MessagePack ↔ JSON (Accept / Content-Type: application/msgpack) — ต้องอยู่ใน CompressionMiddleware
+app.add_middleware(MessagePackMiddleware)
+
+# Response compression (br/gzip) — ข้าม SSE และ response ที่บีบอัดมาแล้ว (PrecompressedBody)
+app.add_middleware(CompressionMiddleware, minimum_size=settings.COMPRESSION_MINIMUM_SIZE)
+
 
 # Health check endpoint
 @app.get("/health")
@@ -41,6 +74,12 @@ def health_check():
         )
 
 
+# In-process metrics (ต่อ worker) — admin only: มีปริมาณ request และชื่อ key ของ cache/single-flight
+@app.get("/metrics", dependencies=[Depends(require_role(["admin"]))])
+def read_metrics():
+    return metrics.snapshot()
+
+
 # Include routers
 app.include_router(auth.router, prefix="/auth", tags=["Authentication"])
 app.include_router(orders.router, prefix="/orders", tags=["Orders"])
@@ -48,4 +87,7 @@ app.include_router(products.router, prefix="/products", tags=["Products"])
 app.include_router(tables.router, prefix="/tables", tags=["Tables"])
 app.include_router(users.router, prefix="/users", tags=["Users"])
 app.include_router(reservations.router, prefix="/reservations", tags=["Reservations"])
+app.include_router(sync.router, prefix="/sync", tags=["Sync"])
+app.include_router(reports.router, prefix="/reports", tags=["Reports"])
+app.include_router(waitlist.router, prefix="/waitlist", tags=["Waitlist"])
 
@@ -8,5 +8,8 @@ from app.models.base import Base
 from app.models.user import User
 from app.models.product import Product
 from app.models.table import Table
-from app.models.reservation import Reservation
-from app.models.order import Order, OrderItem
\ No newline at end of file
+from app.models.reservation import Reservation, ReservationTable
+from app.models.order import Order, OrderItem
+from app.models.idempotency import IdempotencyKey
+from app.models.report import DailyReport
+from app.models.waitlist import WaitlistEntry
\ No newline at end of file
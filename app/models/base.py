@@ -6,12 +6,53 @@ Base class สำหรับ SQLAlchemy models ทั้งหมด
 
 from datetime import datetime, timezone
 
-from sqlalchemy import Column, DateTime
+from sqlalchemy import BigInteger, Column, DateTime, Sequence, Text, cast, func
 from sqlalchemy.orm import declarative_base
 
 Base = declarative_base()
 
+# Sequence กลางสำหรับ change cursor (delta sync) — ใช้ร่วมกันทุกตารางที่ sync ได้
+change_seq = Sequence("change_seq", metadata=Base.metadata)
+
+
+def utcnow() -> datetime:
+    """เวลาปัจจุบันแบบ naive UTC — รูปแบบเดียวกับคอลัมน์ DateTime ที่อ่านจาก DB (session timezone = UTC)"""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def naive_utc(value: datetime) -> datetime:
+    """แปลงเวลาแบบมี timezone เป็น naive UTC — ค่าที่ไม่มี timezone ถือว่าเป็น UTC อยู่แล้ว"""
+    if value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
 
 class TimestampMixin:
     """Mixin สำหรับ created_at timestamp"""
-    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
+    # naive UTC เหมือนค่าที่อ่านกลับจาก DB — response ของ POST (ไม่ refresh) กับ GET ได้รูปแบบเดียวกัน
+    created_at = Column(DateTime, default=utcnow, nullable=False)
+
+
+def current_xact_id():
+    """xid (xid8 → bigint) ของ transaction ที่กำลังเขียน — เพิ่มขึ้นเรื่อย ๆ ไม่วนกลับ"""
+    return cast(cast(func.pg_current_xact_id(), Text), BigInteger)
+
+
+class ChangeSeqMixin:
+    """
+    Mixin สำหรับ updated_seq + updated_xid — ได้ค่าใหม่ทุกครั้งที่ insert/update
+
+    updated_seq เรียงตามเวลาที่เขียน ไม่ใช่เวลาที่ commit (transaction ที่ได้ seq น้อยกว่าอาจ commit ทีหลัง)
+    updated_xid คือ transaction ที่เขียนแถว — delta sync ใช้คู่กับ xmin ของ snapshot
+    เพื่อส่งเฉพาะแถวของ transaction ที่จบแล้ว (ดู sync_service)
+    """
+    # ดึงค่า updated_seq กลับมาด้วย RETURNING ใน INSERT/UPDATE เลย ไม่ต้อง refresh หลัง commit
+    __mapper_args__ = {"eager_defaults": True}
+    updated_seq = Column(
+        BigInteger,
+        change_seq,
+        onupdate=change_seq.next_value(),
+        nullable=False,
+        index=True,
+    )
+    updated_xid = Column(BigInteger, default=current_xact_id(), onupdate=current_xact_id(), nullable=False)
@@ -0,0 +1,24 @@
+"""
+IdempotencyKey Model
+
+เก็บผลลัพธ์ของ POST ที่ส่ง header Idempotency-Key มา — retry ด้วย key เดิมได้ response เดิม
+"""
+
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, String
+from sqlalchemy.dialects.postgresql import JSONB
+
+from app.models.base import Base, TimestampMixin
+
+
+class IdempotencyKey(Base, TimestampMixin):
+    """Idempotency keys table - key ต่อ (scope, user)"""
+    __tablename__ = "idempotency_keys"
+
+    scope = Column(String(50), primary_key=True)  # 'orders', 'reservations'
+    user_id = Column(Integer, ForeignKey("users.user_id", ondelete="CASCADE"), primary_key=True)
+    key = Column(String(255), primary_key=True)
+    fingerprint = Column(String(64), nullable=False)  # sha256 ของ request body
+    status_code = Column(Integer, nullable=True)  # NULL = กำลังประมวลผล
+    response_body = Column(JSONB, nullable=True)
+    # กำลังประมวลผล → หมดเวลา lock, เสร็จแล้ว → หมดอายุ TTL (หลังจากนี้ claim ใหม่/ลบได้)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
@@ -4,14 +4,37 @@ Order & OrderItem Models
 เทียบเท่า models/Order.js + models/ProductsOrders.js
 """
 
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Index
 from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.orm import relationship
 
-from app.models.base import Base, TimestampMixin
+from app.models.base import Base, ChangeSeqMixin, TimestampMixin
 
+# order ที่ครัวยังต้องทำ (kitchen queue) — ต้องตรงกับเงื่อนไขของ partial index ix_orders_open
+OPEN_ORDER_STATUSES = ("pending", "preparing")
 
-class Order(Base, TimestampMixin):
+# state machine ของ order_status: status ปัจจุบัน → status ถัดไปที่อนุญาต
+# ต้องผ่านครัวตามลำดับ pending → preparing → ready → completed
+# ยกเลิกได้เฉพาะ order ที่ครัวยังไม่ทำเสร็จ (OPEN_ORDER_STATUSES)
+# completed / cancelled เป็นสถานะสุดท้าย — set ค่าเดิมซ้ำได้เสมอ (idempotent)
+ORDER_STATUS_TRANSITIONS = {
+    "pending": ("preparing", "cancelled"),
+    "preparing": ("ready", "cancelled"),
+    "ready": ("completed",),
+    "completed": (),
+    "cancelled": (),
+}
+
+
+def allowed_from_statuses(new_status: str) -> list[str]:
+    """status ทั้งหมดที่เปลี่ยนมาเป็น new_status ได้ (รวม new_status เอง)"""
+    return [
+        current for current, targets in ORDER_STATUS_TRANSITIONS.items()
+        if current == new_status or new_status in targets
+    ]
+
+
+class Order(Base, TimestampMixin, ChangeSeqMixin):
     """Orders table - คำสั่งซื้อ"""
     __tablename__ = "orders"
 
@@ -30,13 +53,24 @@ class Order(Base, TimestampMixin):
     reservation = relationship("Reservation", back_populates="orders")
     items = relationship("OrderItem", back_populates="order")
 
+    __table_args__ = (
+        # partial index: มีเฉพาะ order ที่ยังเปิดอยู่ → kitchen queue ไม่ต้องสแกน order ทั้งหมด
+        Index("ix_orders_open", "order_id", postgresql_where=order_status.in_(OPEN_ORDER_STATUSES)),
+        # orders ของวัน (GET /orders/, ปิดยอดวัน) → range scan แทนการสแกนทั้งตาราง
+        Index("ix_orders_created_at", "created_at"),
+        # ประวัติของลูกค้า (keyset pagination ใหม่ → เก่า) — order_id เป็นตัวตัดสินเมื่อเวลาเท่ากัน
+        Index("ix_orders_customer_created", "customer_id", "created_at", "order_id"),
+        # delta sync: ไล่ตาม transaction ที่เขียน แล้วตาม seq ภายใน transaction
+        Index("ix_orders_sync", "updated_xid", "updated_seq"),
+    )
+
 
 class OrderItem(Base):
     """Order Items table - รายการสินค้าในแต่ละ order"""
     __tablename__ = "order_items"
 
     id = Column(Integer, primary_key=True, autoincrement=True)
-    order_id = Column(Integer, ForeignKey("orders.order_id"), nullable=False)
+    order_id = Column(Integer, ForeignKey("orders.order_id"), nullable=False, index=True)
     product_id = Column(Integer, ForeignKey("products.product_id"), nullable=False)
     quantity = Column(Integer, nullable=False, default=1)
     sweetness = Column(String(50), nullable=True)
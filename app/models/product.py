@@ -16,7 +16,7 @@ class Product(Base):
     __tablename__ = "products"
 
     product_id = Column(Integer, primary_key=True, autoincrement=True)
-    product_name = Column(String(255), nullable=False)
+    product_name = Column(String(255), nullable=False, unique=True)  # unique → upsert ตามชื่อตอน import
     price = Column(Integer, nullable=False)
     sweetness_options = Column(ARRAY(String), default=[])
     milk_type_options = Column(ARRAY(String), default=[])
@@ -0,0 +1,25 @@
+"""
+DailyReport Model
+
+snapshot ยอดปิดวัน (close-out) — สร้างครั้งเดียวต่อวันทำการ แล้วไม่ถูกแก้ไขอีก
+"""
+
+from sqlalchemy import Column, Date, ForeignKey, Integer
+from sqlalchemy.dialects.postgresql import JSONB
+
+from app.models.base import Base, TimestampMixin
+
+
+class DailyReport(Base, TimestampMixin):
+    """Daily reports table - ยอดปิดวัน 1 แถวต่อวันทำการ (created_at = เวลาที่ปิดยอด)"""
+    __tablename__ = "daily_reports"
+
+    business_date = Column(Date, primary_key=True)
+    closed_by = Column(Integer, ForeignKey("users.user_id", ondelete="SET NULL"), nullable=True)
+    order_count = Column(Integer, nullable=False)
+    revenue = Column(Integer, nullable=False)  # ไม่รวม order ที่ cancelled
+    item_count = Column(Integer, nullable=False)
+    by_status = Column(JSONB, nullable=False)
+    by_staff = Column(JSONB, nullable=False)
+    by_product = Column(JSONB, nullable=False)
+    by_hour = Column(JSONB, nullable=False)
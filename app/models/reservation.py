@@ -1,17 +1,18 @@
 """
-Reservation Model
+Reservation & ReservationTable Models
 
 เทียบเท่า models/Reservations.js
++ reservation_tables: ช่วงเวลาที่แต่ละโต๊ะถูกจอง (กันจองซ้อนด้วย exclusion constraint)
 """
 
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
-from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index, func
+from sqlalchemy.dialects.postgresql import ARRAY, ExcludeConstraint, TSRANGE
 from sqlalchemy.orm import relationship
 
-from app.models.base import Base, TimestampMixin
+from app.models.base import Base, ChangeSeqMixin, TimestampMixin
 
 
-class Reservation(Base, TimestampMixin):
+class Reservation(Base, TimestampMixin, ChangeSeqMixin):
     """Reservations table - การจองโต๊ะ"""
     __tablename__ = "reservations"
 
@@ -21,6 +22,7 @@ class Reservation(Base, TimestampMixin):
     table_ids = Column(ARRAY(Integer), nullable=False)
     capacity = Column(Integer, nullable=False)
     reservation_time = Column(DateTime, nullable=False)
+    duration_minutes = Column(Integer, nullable=False, default=90)
     customer_amount = Column(Integer, nullable=False)
     reservation_detail = Column(String(255), nullable=True)
     cancel_detail = Column(String(255), nullable=True)
@@ -32,3 +34,37 @@ class Reservation(Base, TimestampMixin):
     customer = relationship("User", foreign_keys=[customer_id], back_populates="reservations_as_customer")
     staff = relationship("User", foreign_keys=[staff_id], back_populates="reservations_as_staff")
     orders = relationship("Order", back_populates="reservation")
+    table_slots = relationship("ReservationTable", back_populates="reservation", cascade="all, delete-orphan")
+
+    __table_args__ = (
+        # ปฏิทินการจอง: range scan ตาม reservation_time (+ กรอง status ได้จาก index เดียวกัน)
+        Index("ix_reservations_time_status", "reservation_time", "reservation_status"),
+        # ประวัติของลูกค้า (keyset pagination ใหม่ → เก่า) — reservation_id เป็นตัวตัดสินเมื่อเวลาเท่ากัน
+        Index("ix_reservations_customer_created", "customer_id", "created_at", "reservation_id"),
+        # delta sync: ไล่ตาม transaction ที่เขียน แล้วตาม seq ภายใน transaction
+        Index("ix_reservations_sync", "updated_xid", "updated_seq"),
+    )
+
+
+class ReservationTable(Base):
+    """Reservation ↔ Table mapping - ช่วงเวลาที่โต๊ะถูกจอง (เฉพาะการจองที่ยัง active)"""
+    __tablename__ = "reservation_tables"
+
+    reservation_id = Column(
+        Integer, ForeignKey("reservations.reservation_id", ondelete="CASCADE"), primary_key=True
+    )
+    table_id = Column(Integer, ForeignKey("tables.table_id", ondelete="CASCADE"), primary_key=True)
+    during = Column(TSRANGE, nullable=False)  # [reservation_time, reservation_time + duration)
+
+    __table_args__ = (
+        # โต๊ะเดียวกันห้ามมีช่วงเวลาซ้อนกัน — ตรวจด้วย GiST index ตัวเดียว (ไม่ scan)
+        # ใช้ int4range(table_id) แทน table_id = เพื่อไม่ต้องพึ่ง extension btree_gist
+        ExcludeConstraint(
+            (func.int4range(table_id, table_id, "[]"), "&&"),
+            (during, "&&"),
+            name="reservation_tables_no_overlap",
+            using="gist",
+        ),
+    )
+
+    reservation = relationship("Reservation", back_populates="table_slots")
@@ -18,3 +18,6 @@ class Table(Base, TimestampMixin):
     capacity = Column(Integer, nullable=False)
     status = Column(String(255), nullable=False, default="empty")  # 'empty', 'onHold', 'reserved', 'full'
     last_update = Column(DateTime, nullable=True)
+    version = Column(Integer, nullable=False, default=1)  # optimistic lock — ทุก UPDATE ตรวจ + เพิ่ม version
+
+    __mapper_args__ = {"version_id_col": version}
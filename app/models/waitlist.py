@@ -0,0 +1,28 @@
+"""
+WaitlistEntry Model
+
+คิวรอโต๊ะของลูกค้า walk-in เมื่อโต๊ะเต็ม — ต้นฉบับของคิวในหน่วยความจำ (app/core/waitlist_queue.py)
+"""
+
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, String
+from sqlalchemy.dialects.postgresql import ARRAY
+
+from app.models.base import Base, TimestampMixin
+
+
+class WaitlistEntry(Base, TimestampMixin):
+    """Waitlist entries table - กลุ่มลูกค้าที่รอโต๊ะ (created_at = เวลาที่เข้าคิว)"""
+    __tablename__ = "waitlist_entries"
+
+    entry_id = Column(Integer, primary_key=True, autoincrement=True)
+    customer_id = Column(Integer, ForeignKey("users.user_id", ondelete="CASCADE"), nullable=True)  # NULL = walk-in ที่ staff เพิ่มให้
+    name = Column(String(100), nullable=True)
+    party_size = Column(Integer, nullable=False)
+    status = Column(String(50), nullable=False, default="waiting")  # 'waiting', 'matched', 'left', 'no_show'
+    table_ids = Column(ARRAY(Integer), nullable=False, default=[])  # โต๊ะที่ได้ตอน matched
+    matched_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        # โหลดคิวเข้าหน่วยความจำ: มีเฉพาะกลุ่มที่ยังรออยู่
+        Index("ix_waitlist_waiting", "created_at", "entry_id", postgresql_where=(status == "waiting")),
+    )
@@ -1,39 +1,82 @@
 """
 Orders Router
 
-API endpoints สำหรับ orders (staff/admin only)
-- GET /orders/ — ดู orders วันนี้
+API endpoints สำหรับ orders (staff/admin only ยกเว้น ETA)
+- GET /orders/ — ดู orders วันนี้ (?fields= เลือกเฉพาะ field ที่ต้องการ)
+- GET /orders/kitchen-queue — items ที่ครัวต้องทำ รวมตามเมนู + options
 - GET /orders/{id} — ดู order เดี่ยว
-- POST /orders/ — สร้าง order + items
-- PATCH /orders/{id} — อัปเดต status/finish
+- GET /orders/{id}/eta — เวลาที่ order จะเสร็จโดยประมาณ (เจ้าของ order หรือ staff/admin)
+- POST /orders/ — สร้าง order + items (รองรับ header Idempotency-Key, body แบบ JSON หรือ MessagePack)
+- POST /orders/batch — สร้างหลาย orders ในครั้งเดียว (ผลลัพธ์แยกต่อ order)
+- PATCH /orders/bulk — เปลี่ยน status หลาย orders ในครั้งเดียว (ผลลัพธ์แยกต่อ order)
+- PATCH /orders/{id} — อัปเดต status/finish (409 ถ้า state machine ไม่อนุญาต)
+- WS /orders/ws — kitchen feed: push order ที่สร้าง/อัปเดต + delta ของ kitchen queue (resume ด้วย ?since=version)
 """
 
-from fastapi import APIRouter, Depends
+import asyncio
+
+from fastapi import APIRouter, Depends, Header, Query, WebSocket, WebSocketDisconnect, status
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 
 from app.config.database import get_db
-from app.core.deps import require_role
+from app.config.settings import settings
+from app.core.broadcaster import BroadcasterFull, SubscriptionClosed
+from app.core.content_negotiation import msgpack_request_body
+from app.core.deps import get_current_user, require_role, require_role_ws
+from app.core.fields import FIELDS_DESCRIPTION, parse_fields
+from app.core.responses import FastJSONResponse, model_response
 from app.models.user import User
-from app.schemas.order import OrderResponse, OrderCreate, OrderUpdate
+from app.schemas.order import (
+    KitchenQueueGroup,
+    OrderBatchCreate,
+    OrderBatchResponse,
+    OrderBulkResponse,
+    OrderBulkUpdate,
+    OrderCreate,
+    OrderEta,
+    OrderResponse,
+    OrderUpdate,
+)
 from app.services.order_service import (
+    order_events,
     get_all_orders,
+    get_all_orders_sparse,
+    get_kitchen_queue,
     get_order_by_id,
+    get_order_eta,
     create_order,
+    create_orders_batch,
     update_order,
+    update_orders_bulk,
 )
+from app.services.idempotency_service import run_idempotent
 
 router = APIRouter()
 
 
 # === Staff/Admin endpoints ===
 
-@router.get("/")
+@router.get("/", response_model=list[OrderResponse])
 def list_orders(
+    fields: str | None = Query(None, description=FIELDS_DESCRIPTION),
+    current_user: User = Depends(require_role(["staff", "admin"])),
+    db: Session = Depends(get_db),
+):
+    """ดู orders วันนี้ — staff/admin only (serialize ครั้งเดียว ไม่ validate ซ้ำ)"""
+    selected = parse_fields(fields, OrderResponse)
+    if selected:
+        return FastJSONResponse(get_all_orders_sparse(db, selected))
+    return model_response(list[OrderResponse], get_all_orders(db))
+
+
+@router.get("/kitchen-queue", response_model=list[KitchenQueueGroup])
+def kitchen_queue(
     current_user: User = Depends(require_role(["staff", "admin"])),
     db: Session = Depends(get_db),
 ):
-    """ดู orders วันนี้ — staff/admin only"""
-    return get_all_orders(db)
+    """items ของ order ที่ยังไม่เสร็จ รวมตามเมนู + options (ทำพร้อมกันทีเดียว) — staff/admin only"""
+    return get_kitchen_queue(db)
 
 
 @router.get("/{order_id}", response_model=OrderResponse)
@@ -46,14 +89,56 @@ def read_order(
     return get_order_by_id(db, order_id)
 
 
-@router.post("/", response_model=OrderResponse, status_code=201)
+@router.get("/{order_id}/eta", response_model=OrderEta)
+def read_order_eta(
+    order_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """เวลาที่ order จะเสร็จโดยประมาณ — เจ้าของ order หรือ staff/admin"""
+    return get_order_eta(db, current_user, order_id)
+
+
+@router.post("/", response_model=OrderResponse, status_code=201, openapi_extra=msgpack_request_body(OrderCreate))
 def add_order(
     data: OrderCreate,
+    idempotency_key: str | None = Header(None, max_length=255),
+    current_user: User = Depends(require_role(["staff", "admin"])),
+    db: Session = Depends(get_db),
+):
+    """สร้าง order + items — staff/admin only (retry ด้วย Idempotency-Key เดิมได้ order เดิม)"""
+    return run_idempotent(
+        db, "orders", current_user.user_id, idempotency_key, data,
+        lambda: create_order(db, current_user, data),
+        response_model=OrderResponse,
+        status_code=201,
+    )
+
+
+@router.post("/batch", response_model=OrderBatchResponse)
+def add_orders_batch(
+    data: OrderBatchCreate,
+    idempotency_key: str | None = Header(None, max_length=255),
+    current_user: User = Depends(require_role(["staff", "admin"])),
+    db: Session = Depends(get_db),
+):
+    """สร้างหลาย orders ในครั้งเดียว (POS ที่กลับมา online) — staff/admin only"""
+    return run_idempotent(
+        db, "orders.batch", current_user.user_id, idempotency_key, data,
+        lambda: create_orders_batch(db, current_user, data.orders),
+        response_model=OrderBatchResponse,
+        status_code=200,
+    )
+
+
+@router.patch("/bulk", response_model=OrderBulkResponse)
+def edit_orders_bulk(
+    data: OrderBulkUpdate,
     current_user: User = Depends(require_role(["staff", "admin"])),
     db: Session = Depends(get_db),
 ):
-    """สร้าง order + items — staff/admin only"""
-    return create_order(db, current_user, data)
+    """เปลี่ยน status หลาย orders ในครั้งเดียว — staff/admin only"""
+    return update_orders_bulk(db, data)
 
 
 @router.patch("/{order_id}", response_model=OrderResponse)
@@ -65,3 +150,77 @@ def edit_order(
 ):
     """อัปเดต order status/finish — staff/admin only"""
     return update_order(db, order_id, data)
+
+
+# === Kitchen feed (WebSocket) ===
+
+def _load_snapshot(db: Session) -> tuple[list[dict], list[dict]]:
+    """ดึง orders วันนี้ + kitchen queue สำหรับ snapshot แล้วปิด session ทันที"""
+    try:
+        orders = [OrderResponse.model_validate(o).model_dump(mode="json") for o in get_all_orders(db)]
+        queue = [KitchenQueueGroup.model_validate(g).model_dump(mode="json") for g in get_kitchen_queue(db)]
+        return orders, queue
+    finally:
+        db.close()
+
+
+@router.websocket("/ws")
+async def kitchen_feed(
+    websocket: WebSocket,
+    since: int | None = None,
+    epoch: str | None = None,
+    current_user: User = Depends(require_role_ws(["staff", "admin"])),
+    db: Session = Depends(get_db),
+):
+    """
+    Kitchen feed — staff/admin only
+
+    ส่ง {"type": "order", "epoch", "version", "order"} ทุกครั้งที่ order ถูกสร้าง/อัปเดต
+    และ {"type": "kitchen_queue", "epoch", "version", "product_ids", "groups"} — กลุ่มใหม่ทั้งหมดของเมนูใน
+    product_ids ให้แทนที่กลุ่มเดิมของเมนูเหล่านั้น
+    reconnect ด้วย ?since=<version ล่าสุดที่เห็น>&epoch=<epoch ที่มากับ version นั้น> เพื่อรับเฉพาะที่พลาดไป
+    version นับแยกต่อ worker — ถ้า epoch ไม่ตรง (ต่อเข้าคนละ worker / worker restart) หรือ history ย้อนไปไม่ถึง
+    จะได้ {"type": "snapshot", "epoch", "version", "orders", "kitchen_queue"} แทน
+    """
+    try:
+        subscription, backlog = order_events.subscribe(since, epoch)
+    except BroadcasterFull:
+        await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+        return
+
+    await websocket.accept()
+    try:
+        if backlog is None:
+            version = order_events.version
+            orders, queue = await run_in_threadpool(_load_snapshot, db)
+            await websocket.send_json({
+                "type": "snapshot",
+                "epoch": order_events.epoch,
+                "version": version,
+                "orders": orders,
+                "kitchen_queue": queue,
+            })
+            last_sent = version
+        else:
+            last_sent = since
+            for event in backlog:
+                await websocket.send_json(event)
+                last_sent = event["version"]
+
+        while True:
+            try:
+                event = await subscription.get(timeout=settings.ORDER_FEED_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                await websocket.send_json({"type": "ping", "epoch": order_events.epoch, "version": last_sent})
+                continue
+            if event["version"] <= last_sent:
+                continue
+            await websocket.send_json(event)
+            last_sent = event["version"]
+    except SubscriptionClosed:
+        # อ่านไม่ทัน → ตัดการเชื่อมต่อ ให้ client reconnect ด้วย ?since=
+        await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        order_events.unsubscribe(subscription)
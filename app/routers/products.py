@@ -2,26 +2,46 @@
 Products Router
 
 API endpoints สำหรับ products
-- GET /products/ — ดูเมนูทั้งหมด (public: 4 fields, staff/admin: ทุก fields)
+- GET /products/ — ดูเมนูทั้งหมด (public: 4 fields, staff/admin: ทุก fields, ?fields= เลือกเฉพาะบาง field)
 - GET /products/{id} — ดูเมนูเดี่ยว (public: 4 fields, staff/admin: ทุก fields)
 - POST /products/ — เพิ่มเมนู (staff/admin)
 - PUT /products/{id} — แก้เมนู (staff/admin)
 - DELETE /products/{id} — ลบเมนู (staff/admin)
+- POST /products/import — bulk import เมนูจาก CSV / JSON lines (admin)
+- GET /products/export — export เมนูทั้งหมดแบบ streaming (staff/admin)
 """
 
-from fastapi import APIRouter, Depends
+from typing import Literal
+
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Request, UploadFile, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
 from app.config.database import get_db
+from app.config.settings import settings
+from app.core.compression import PrecompressedBody
 from app.core.deps import get_current_user_optional, require_role
+from app.core.fields import FIELDS_DESCRIPTION, parse_fields
+from app.core.responses import model_json, render_json
+from app.core.singleflight import read_flight
 from app.models.user import User
-from app.schemas.product import ProductPublicResponse, ProductResponse, ProductCreate, ProductUpdate
+from app.schemas.product import (
+    ProductCreate,
+    ProductImportResponse,
+    ProductPublicResponse,
+    ProductResponse,
+    ProductUpdate,
+)
 from app.services.product_service import (
     get_all_products,
+    get_all_products_sparse,
     get_product_by_id,
     create_product,
     update_product,
     delete_product,
+    export_products,
+    import_products,
+    menu_cache,
 )
 
 router = APIRouter()
@@ -29,20 +49,66 @@ router = APIRouter()
 
 STAFF_ROLES = ["staff", "admin"]
 
+ImportFormat = Literal["csv", "jsonl"]
+MEDIA_TYPES = {"csv": "text/csv", "jsonl": "application/x-ndjson"}
+EXTENSIONS = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl"}
+
+
+def _read_upload(file: UploadFile, max_bytes: int) -> bytes:
+    """อ่านไฟล์ที่ upload ไม่เกิน max_bytes — เกิน → 413 (อ่านเกินมาแค่ 1 byte ไม่โหลดทั้งไฟล์)"""
+    if file.size is None or file.size <= max_bytes:
+        content = file.file.read(max_bytes + 1)
+        if len(content) <= max_bytes:
+            return content
+    raise HTTPException(
+        status_code=413,  # ชื่อ constant ต่างกันตามเวอร์ชัน starlette
+        detail=f"ไฟล์ import ต้องมีขนาดไม่เกิน {max_bytes:,} bytes",
+    )
+
 
 # === Public / Role-based endpoints ===
 
 @router.get("/")
 def list_products(
+    request: Request,
+    fields: str | None = Query(None, description=FIELDS_DESCRIPTION),
     db: Session = Depends(get_db),
     current_user: User | None = Depends(get_current_user_optional),
 ):
     """ดูเมนูทั้งหมด — staff/admin ได้ข้อมูลครบ, คนอื่นได้เฉพาะข้อมูลพื้นฐาน"""
-    products = get_all_products(db)
-
     if current_user and current_user.user_role in STAFF_ROLES:
-        return [ProductResponse.model_validate(p) for p in products]
-    return [ProductPublicResponse.model_validate(p) for p in products]
+        schema, variant = ProductResponse, "staff"
+    else:
+        schema, variant = ProductPublicResponse, "public"
+    # fields ตรวจกับ schema ของ role — public ขอ field ของ staff ไม่ได้
+    selected = parse_fields(fields, schema)
+
+    # cache ต่อ role variant (+ fields) — cache miss ที่เข้ามาพร้อมกันใช้ query เดียวร่วมกัน
+    # เก็บ JSON ที่ serialize แล้ว + ตัวที่บีบอัดแล้ว → cache hit ไม่ต้อง serialize/บีบอัดซ้ำ
+    key = f"products:{variant}:{','.join(selected)}" if selected else f"products:{variant}"
+
+    def load() -> PrecompressedBody:
+        if selected:
+            content = render_json(get_all_products_sparse(db, selected))
+        else:
+            content = model_json(list[schema], [schema.model_validate(p) for p in get_all_products(db)])
+        return PrecompressedBody(content, minimum_size=settings.COMPRESSION_MINIMUM_SIZE)
+
+    return menu_cache.get_or_load(key, lambda: read_flight.do(key, load)).response(request)
+
+
+@router.get("/export")
+def export_menu(
+    format: ImportFormat = Query("csv"),
+    current_user: User = Depends(require_role(STAFF_ROLES)),
+    db: Session = Depends(get_db),
+):
+    """export เมนูทั้งหมด (format เดียวกับ import) — staff/admin only"""
+    return StreamingResponse(
+        export_products(db.get_bind(), format),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="products.{format}"'},
+    )
 
 
 @router.get("/{product_id}")
@@ -71,6 +137,26 @@ def add_product(
     return create_product(db, data)
 
 
+@router.post("/import", response_model=ProductImportResponse)
+def import_menu(
+    file: UploadFile = File(...),
+    format: ImportFormat | None = Query(None, description="ไม่ระบุ → ดูจากนามสกุลไฟล์"),
+    current_user: User = Depends(require_role(["admin"])),
+    db: Session = Depends(get_db),
+):
+    """bulk import เมนู (upsert ตามชื่อ) จาก CSV / JSON lines — admin only"""
+    if format is None:
+        extension = "." + (file.filename or "").rsplit(".", 1)[-1].lower()
+        format = EXTENSIONS.get(extension)
+        if format is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="ระบุ format (csv, jsonl) หรือใช้ไฟล์ .csv / .jsonl",
+            )
+
+    return import_products(db, _read_upload(file, settings.PRODUCT_IMPORT_MAX_BYTES), format)
+
+
 @router.put("/{product_id}", response_model=ProductResponse)
 def edit_product(
     product_id: int,
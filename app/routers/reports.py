@@ -0,0 +1,44 @@
+"""
+Reports Router
+
+API endpoints สำหรับรายงานยอดขาย (staff/admin only)
+- POST /reports/close-day — ปิดยอดวันทำการ (สร้าง snapshot ครั้งแรก 201, ครั้งถัดไปคืน snapshot เดิม 200)
+- GET /reports/close-day/{business_date} — ดู snapshot ของวันที่ปิดยอดแล้ว
+"""
+
+from datetime import date
+
+from fastapi import APIRouter, Depends, Response, status
+from sqlalchemy.orm import Session
+
+from app.config.database import get_db
+from app.core.deps import require_role
+from app.models.user import User
+from app.schemas.report import CloseDayRequest, DailyReportResponse
+from app.services.report_service import close_day, get_daily_report
+
+router = APIRouter()
+
+
+@router.post("/close-day", response_model=DailyReportResponse, status_code=201)
+def close_business_day(
+    response: Response,
+    data: CloseDayRequest | None = None,
+    current_user: User = Depends(require_role(["staff", "admin"])),
+    db: Session = Depends(get_db),
+):
+    """ปิดยอดวันทำการ — staff/admin only"""
+    report, created = close_day(db, current_user, data.business_date if data else None)
+    if not created:
+        response.status_code = status.HTTP_200_OK
+    return report
+
+
+@router.get("/close-day/{business_date}", response_model=DailyReportResponse)
+def read_daily_report(
+    business_date: date,
+    current_user: User = Depends(require_role(["staff", "admin"])),
+    db: Session = Depends(get_db),
+):
+    """ดู snapshot ยอดปิดวัน — staff/admin only"""
+    return get_daily_report(db, business_date)
@@ -2,27 +2,36 @@
 Reservations Router
 
 API endpoints สำหรับ reservations
-- GET /reservations/ — ดูรายการจองทั้งหมดวันนี้ (staff/admin)
+- GET /reservations/ — ดูรายการจองทั้งหมดวันนี้ (staff/admin, ?fields= เลือกเฉพาะ field ที่ต้องการ)
 - GET /reservations/me — ดูการจองของตัวเองวันนี้ (ทุก role)
+- GET /reservations/calendar?from=&to= — รายการจองตามวันที่จอง แบ่งรายวัน (staff/admin)
 - GET /reservations/{id} — ดูรายการจองเดี่ยว (staff/admin)
-- POST /reservations/ — สร้างการจอง (ทุก role)
+- POST /reservations/ — สร้างการจอง (ทุก role, รองรับ header Idempotency-Key, body แบบ JSON หรือ MessagePack)
 - PATCH /reservations/{id} — อัปเดต status (staff/admin)
 """
 
-from fastapi import APIRouter, Depends
+from datetime import date
+
+from fastapi import APIRouter, Depends, Header, Query
 from sqlalchemy.orm import Session
 
 from app.config.database import get_db
+from app.core.content_negotiation import msgpack_request_body
 from app.core.deps import get_current_user, require_role
+from app.core.fields import FIELDS_DESCRIPTION, parse_fields
+from app.core.responses import FastJSONResponse, model_response
 from app.models.user import User
-from app.schemas.reservation import ReservationResponse, ReservationCreate, ReservationUpdate
+from app.schemas.reservation import CalendarDay, ReservationResponse, ReservationCreate, ReservationUpdate
 from app.services.reservation_service import (
     get_all_reservations,
+    get_all_reservations_sparse,
+    get_calendar,
     get_reservation_by_id,
     get_reservation_by_user,
     create_reservation,
     update_reservation,
 )
+from app.services.idempotency_service import run_idempotent
 
 router = APIRouter()
 
@@ -41,25 +50,48 @@ def my_reservation(
     return reservation
 
 
-@router.post("/", response_model=ReservationResponse, status_code=201)
+@router.post(
+    "/", response_model=ReservationResponse, status_code=201, openapi_extra=msgpack_request_body(ReservationCreate)
+)
 def add_reservation(
     data: ReservationCreate,
+    idempotency_key: str | None = Header(None, max_length=255),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
-    """สร้างการจองใหม่ — ทุก role"""
-    return create_reservation(db, current_user, data)
+    """สร้างการจองใหม่ — ทุก role (retry ด้วย Idempotency-Key เดิมได้การจองเดิม)"""
+    return run_idempotent(
+        db, "reservations", current_user.user_id, idempotency_key, data,
+        lambda: create_reservation(db, current_user, data),
+        response_model=ReservationResponse,
+        status_code=201,
+    )
 
 
 # === Staff/Admin endpoints ===
 
-@router.get("/")
+@router.get("/", response_model=list[ReservationResponse])
 def list_reservations(
+    fields: str | None = Query(None, description=FIELDS_DESCRIPTION),
+    current_user: User = Depends(require_role(["staff", "admin"])),
+    db: Session = Depends(get_db),
+):
+    """ดูรายการจองทั้งหมดวันนี้ — staff/admin only (serialize ครั้งเดียว ไม่ validate ซ้ำ)"""
+    selected = parse_fields(fields, ReservationResponse)
+    if selected:
+        return FastJSONResponse(get_all_reservations_sparse(db, selected))
+    return model_response(list[ReservationResponse], get_all_reservations(db))
+
+
+@router.get("/calendar", response_model=list[CalendarDay])
+def reservation_calendar(
+    start: date = Query(..., alias="from"),
+    end: date = Query(..., alias="to"),
     current_user: User = Depends(require_role(["staff", "admin"])),
     db: Session = Depends(get_db),
 ):
-    """ดูรายการจองทั้งหมดวันนี้ — staff/admin only"""
-    return get_all_reservations(db)
+    """ดูการจองตามวันที่จอง (reservation_time) ตั้งแต่ from ถึง to — staff/admin only"""
+    return get_calendar(db, start, end)
 
 
 @router.get("/{reservation_id}", response_model=ReservationResponse)
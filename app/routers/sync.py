@@ -0,0 +1,28 @@
+"""
+Sync Router
+
+API endpoints สำหรับ delta sync (staff/admin only)
+- GET /sync?since=<cursor> — orders + reservations ที่เปลี่ยนหลัง cursor
+"""
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+
+from app.config.database import get_db
+from app.core.deps import require_role
+from app.models.user import User
+from app.schemas.sync import SyncResponse
+from app.services.sync_service import get_changes_since
+
+router = APIRouter()
+
+
+@router.get("", response_model=SyncResponse)
+def sync_changes(
+    since: int = Query(0, ge=0),
+    limit: int = Query(500, ge=1, le=1000),
+    current_user: User = Depends(require_role(["staff", "admin"])),
+    db: Session = Depends(get_db),
+):
+    """ดึงเฉพาะแถวที่เปลี่ยนหลัง cursor — staff/admin only (ส่ง cursor ที่ได้กลับมาในครั้งถัดไป, 400 ถ้า cursor ไม่ถูกต้อง)"""
+    return get_changes_since(db, since, limit)
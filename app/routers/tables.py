@@ -2,22 +2,39 @@
 Tables Router
 
 API endpoints สำหรับ tables
-- GET /tables/ — ดูโต๊ะทั้งหมด (public)
+- GET /tables/ — ดูโต๊ะทั้งหมด (public, ?fields= เลือกเฉพาะ field ที่ต้องการ)
+- GET /tables/stream — SSE: snapshot + deltas ของ table status (public)
+- GET /tables/availability — ค้นหาโต๊ะว่าง ณ เวลาที่ต้องการ (public)
 - GET /tables/{id} — ดูโต๊ะเดี่ยว (staff/admin)
 - POST /tables/ — เพิ่มโต๊ะ (admin)
 - PUT /tables/{id} — แก้ไขโต๊ะ (staff/admin)
 - DELETE /tables/{id} — ลบโต๊ะ (admin)
 """
 
-from fastapi import APIRouter, Depends
+import asyncio
+import json
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
 from app.config.database import get_db
+from app.config.settings import settings
+from app.core.broadcaster import BroadcasterFull, Subscription, SubscriptionClosed
+from app.core.compression import PrecompressedBody
 from app.core.deps import require_role
+from app.core.fields import FIELDS_DESCRIPTION, parse_fields
+from app.core.responses import model_json, render_json
+from app.core.singleflight import read_flight
 from app.models.user import User
-from app.schemas.table import TableResponse, TableCreate, TableUpdate
+from app.schemas.table import TableAvailabilityResponse, TableResponse, TableCreate, TableUpdate
+from app.services.availability_service import find_availability
 from app.services.table_service import (
+    table_events,
     get_all_tables,
+    get_all_tables_sparse,
     get_table_by_id,
     create_table,
     update_table,
@@ -30,9 +47,92 @@ router = APIRouter()
 # === Public endpoints ===
 
 @router.get("/", response_model=list[TableResponse])
-def list_tables(db: Session = Depends(get_db)):
+def list_tables(
+    request: Request,
+    fields: str | None = Query(None, description=FIELDS_DESCRIPTION),
+    db: Session = Depends(get_db),
+):
     """ดูโต๊ะทั้งหมด — public"""
-    return get_all_tables(db)
+    selected = parse_fields(fields, TableResponse)
+    key = f"tables:public:{','.join(selected)}" if selected else "tables:public"
+
+    def load() -> PrecompressedBody:
+        if selected:
+            content = render_json(get_all_tables_sparse(db, selected))
+        else:
+            content = model_json(list[TableResponse], [TableResponse.model_validate(t) for t in get_all_tables(db)])
+        return PrecompressedBody(content, minimum_size=settings.COMPRESSION_MINIMUM_SIZE)
+
+    # request ที่เข้ามาพร้อมกันใช้ query + serialize + บีบอัดร่วมกัน (ไม่ใช่ cache — สถานะโต๊ะเปลี่ยนบ่อย)
+    return read_flight.do(key, load).response(request)
+
+
+@router.get("/availability", response_model=TableAvailabilityResponse)
+def table_availability(
+    time: datetime,
+    party_size: int = Query(..., ge=1, le=settings.MAX_PARTY_SIZE),
+    duration: int = Query(90, ge=15, le=480, description="ระยะเวลา (นาที)"),
+    db: Session = Depends(get_db),
+):
+    """ค้นหาโต๊ะว่าง + ชุดโต๊ะที่นั่งพอ ณ เวลาที่ต้องการ — public"""
+    return find_availability(db, time, party_size, duration)
+
+
+def _sse_message(event: str, data) -> str:
+    """จัดรูปแบบข้อความตาม Server-Sent Events"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def _load_snapshot(db: Session) -> list[dict]:
+    """ดึงสถานะโต๊ะทั้งหมด แล้วปิด session ทันที (ไม่ถือ connection ตลอดอายุ stream)"""
+    try:
+        return [TableResponse.model_validate(t).model_dump(mode="json") for t in get_all_tables(db)]
+    finally:
+        db.close()
+
+
+async def _table_event_stream(request: Request, subscription: Subscription, snapshot: list[dict]):
+    """ส่ง snapshot ก่อน แล้วตามด้วย deltas จน client ตัดการเชื่อมต่อ"""
+    try:
+        yield _sse_message("snapshot", snapshot)
+        while True:
+            try:
+                event = await subscription.get(timeout=settings.TABLE_STREAM_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                if await request.is_disconnected():
+                    break
+                yield ": keep-alive\n\n"
+                continue
+            except SubscriptionClosed:
+                break
+            yield _sse_message(event["type"], event)
+    finally:
+        table_events.unsubscribe(subscription)
+
+
+@router.get("/stream")
+async def stream_tables(request: Request, db: Session = Depends(get_db)):
+    """SSE stream ของ table status — public"""
+    try:
+        # subscribe ก่อนดึง snapshot เพื่อไม่ให้พลาด event ที่เกิดระหว่างนั้น
+        subscription, _ = table_events.subscribe()
+    except BroadcasterFull:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="มีผู้เชื่อมต่อเต็มแล้ว กรุณาลองใหม่ภายหลัง",
+        )
+
+    try:
+        snapshot = await run_in_threadpool(_load_snapshot, db)
+    except Exception:
+        table_events.unsubscribe(subscription)
+        raise
+
+    return StreamingResponse(
+        _table_event_stream(request, subscription, snapshot),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 # === Staff/Admin endpoints ===
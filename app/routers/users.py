@@ -4,21 +4,27 @@ Users Router
 API endpoints สำหรับ users
 - GET /users/me — ดูข้อมูลตัวเอง
 - PUT /users/me — แก้ไขข้อมูล (ต้องยืนยัน password)
-- GET /users/ — ดูรายการ users ทั้งหมด (admin only)
+- GET /users/me/history — ประวัติ orders + reservations ของตัวเอง (keyset pagination)
+- GET /users/ — ดูรายการ users ทั้งหมด (admin only, ?fields= เลือกเฉพาะ field ที่ต้องการ)
 - GET /users/{id} — ดูข้อมูล user ตาม ID (admin only)
 """
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
 
 from app.config.database import get_db
 from app.core.deps import get_current_user, require_role
+from app.core.fields import FIELDS_DESCRIPTION, parse_fields
+from app.core.responses import FastJSONResponse
 from app.models.user import User
+from app.schemas.history import HistoryPage
 from app.schemas.user import UserResponse, UserUpdate, UserListResponse
+from app.services.history_service import get_history
 from app.services.user_service import (
     get_user_profile,
     update_user_profile,
     get_all_users,
+    get_all_users_sparse,
     get_user_by_id,
 )
 
@@ -41,12 +47,27 @@ def update_my_profile(
     return update_user_profile(db, current_user, data)
 
 
+@router.get("/me/history", response_model=HistoryPage)
+def read_my_history(
+    cursor: str | None = Query(None, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """ประวัติ orders + reservations ของตัวเอง ใหม่ → เก่า (ส่ง next_cursor กลับมาเพื่อดูหน้าถัดไป)"""
+    return get_history(db, current_user, cursor, limit)
+
+
 @router.get("/", response_model=list[UserListResponse])
 def list_users(
+    fields: str | None = Query(None, description=FIELDS_DESCRIPTION),
     current_user: User = Depends(require_role(["admin"])),
     db: Session = Depends(get_db),
 ):
     """ดูรายการ users ทั้งหมด — admin only"""
+    selected = parse_fields(fields, UserListResponse)
+    if selected:
+        return FastJSONResponse(get_all_users_sparse(db, selected))
     return get_all_users(db)
 
 
@@ -0,0 +1,61 @@
+"""
+Waitlist Router
+
+API endpoints สำหรับคิวรอโต๊ะ
+- POST /waitlist/ — เข้าคิว (customer: คิวของตัวเอง, staff/admin: เพิ่ม walk-in)
+- GET /waitlist/ — คิวที่ยังรออยู่ทั้งหมด (staff/admin)
+- GET /waitlist/{id} — ลำดับ + เวลารอโดยประมาณ (เจ้าของคิว หรือ staff/admin)
+- DELETE /waitlist/{id} — ออกจากคิว (เจ้าของคิว หรือ staff/admin)
+
+กลุ่มที่รอถูกจับคู่กับโต๊ะอัตโนมัติเมื่อ order จบและปล่อยโต๊ะ (event waitlist_matched ใน /tables/stream)
+"""
+
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+
+from app.config.database import get_db
+from app.core.deps import get_current_user, require_role
+from app.models.user import User
+from app.schemas.waitlist import WaitlistJoin, WaitlistResponse
+from app.services.waitlist_service import get_entry, get_waitlist, join_waitlist, leave_waitlist
+
+router = APIRouter()
+
+
+@router.post("/", response_model=WaitlistResponse, status_code=201)
+def join(
+    data: WaitlistJoin,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """เข้าคิวรอโต๊ะ — ทุก role"""
+    return join_waitlist(db, current_user, data)
+
+
+@router.get("/", response_model=list[WaitlistResponse])
+def list_waitlist(
+    current_user: User = Depends(require_role(["staff", "admin"])),
+    db: Session = Depends(get_db),
+):
+    """คิวที่ยังรออยู่ตามลำดับ — staff/admin only"""
+    return get_waitlist(db)
+
+
+@router.get("/{entry_id}", response_model=WaitlistResponse)
+def read_entry(
+    entry_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """ดูลำดับคิว + เวลารอโดยประมาณ — เจ้าของคิว หรือ staff/admin"""
+    return get_entry(db, current_user, entry_id)
+
+
+@router.delete("/{entry_id}", response_model=WaitlistResponse)
+def leave(
+    entry_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """ออกจากคิว — เจ้าของคิว หรือ staff/admin"""
+    return leave_waitlist(db, current_user, entry_id)
@@ -0,0 +1,29 @@
+"""
+History Schemas
+
+Pydantic models สำหรับ History API
+- HistoryItem: order หรือ reservation หนึ่งรายการในประวัติ
+- HistoryPage: หนึ่งหน้าของประวัติ + cursor ของหน้าถัดไป
+"""
+
+from datetime import datetime
+from typing import Literal
+
+from pydantic import BaseModel
+
+from app.schemas.order import OrderResponse
+from app.schemas.reservation import ReservationResponse
+
+
+class HistoryItem(BaseModel):
+    """รายการในประวัติ — มี order หรือ reservation อย่างใดอย่างหนึ่งตาม type"""
+    type: Literal["order", "reservation"]
+    created_at: datetime
+    order: OrderResponse | None = None
+    reservation: ReservationResponse | None = None
+
+
+class HistoryPage(BaseModel):
+    """Response schema สำหรับ GET /users/me/history (ใหม่ → เก่า)"""
+    items: list[HistoryItem]
+    next_cursor: str | None = None
@@ -6,13 +6,22 @@ Pydantic models สำหรับ Order API
 - OrderItemResponse: ข้อมูล item สำหรับ response
 - OrderCreate: สร้าง order ใหม่
 - OrderUpdate: อัปเดต order status
-- OrderResponse: ข้อมูล order เต็ม + items + customer detail
+- OrderResponse: ข้อมูล order เต็ม + items + customer detail + eta
+- OrderEta: เวลาที่ order จะเสร็จโดยประมาณ + จำนวน order ที่รออยู่ก่อนหน้า
+- OrderBatchCreate / OrderBatchResponse: สร้างหลาย orders ในครั้งเดียว (offline POS sync)
+- OrderBulkUpdate / OrderBulkResponse: เปลี่ยน status หลาย orders ในครั้งเดียว
+- KitchenQueueGroup: items ที่ครัวต้องทำ รวมตามเมนู + options
 """
 
 from datetime import datetime
 
+from typing import Literal
+
 from pydantic import BaseModel, ConfigDict, Field
 
+# ต้องตรงกับ ORDER_STATUS_TRANSITIONS ใน app/models/order.py
+OrderStatus = Literal["pending", "preparing", "ready", "completed", "cancelled"]
+
 
 class OrderItemCreate(BaseModel):
     """Request schema สำหรับ item ภายใน order"""
@@ -54,7 +63,7 @@ class OrderCreate(BaseModel):
 
 class OrderUpdate(BaseModel):
     """Request schema สำหรับอัปเดต order — staff/admin"""
-    order_status: str | None = Field(None, max_length=50)
+    order_status: OrderStatus | None = None
     finish_at: datetime | None = None
 
 
@@ -71,5 +80,70 @@ class OrderResponse(BaseModel):
     net_price: int
     finish_at: datetime | None = None
     created_at: datetime
+    updated_seq: int | None = None
+    eta: datetime | None = None  # UTC — None เมื่อ order ออกจากคิวครัวแล้ว
     items: list[OrderItemResponse] = []
     customer_detail: CustomerDetail | None = None
+
+
+class OrderEta(BaseModel):
+    """ETA ของ order — queue_ahead/prep_seconds/eta เป็น None เมื่อ order ออกจากคิวครัวแล้ว"""
+    order_id: int
+    order_status: str
+    queue_ahead: int | None = None
+    prep_seconds: int | None = None
+    eta: datetime | None = None
+
+
+class OrderBatchCreate(BaseModel):
+    """Request schema สำหรับสร้างหลาย orders พร้อมกัน"""
+    orders: list[OrderCreate] = Field(..., min_length=1, max_length=500)
+
+
+class OrderBatchResult(BaseModel):
+    """ผลลัพธ์ของแต่ละ order ใน batch (ตามลำดับที่ส่งมา)"""
+    index: int
+    status_code: int
+    order: OrderResponse | None = None
+    detail: str | None = None
+
+
+class OrderBatchResponse(BaseModel):
+    """Response schema สำหรับ batch — order ที่ไม่ผ่านไม่ทำให้ order อื่น fail"""
+    created: int
+    failed: int
+    results: list[OrderBatchResult]
+
+
+class OrderBulkUpdate(BaseModel):
+    """Request schema สำหรับเปลี่ยน status หลาย orders — ทุก order ได้ transition เดียวกัน"""
+    order_ids: list[int] = Field(..., min_length=1, max_length=500)
+    order_status: OrderStatus
+    finish_at: datetime | None = None
+
+
+class OrderBulkResult(BaseModel):
+    """ผลลัพธ์ของแต่ละ order_id (ตามลำดับที่ส่งมา)"""
+    order_id: int
+    status_code: int
+    order: OrderResponse | None = None
+    detail: str | None = None
+
+
+class OrderBulkResponse(BaseModel):
+    """Response schema สำหรับ bulk update — order ที่เปลี่ยนไม่ได้ไม่ทำให้ order อื่น fail"""
+    updated: int
+    failed: int
+    results: list[OrderBulkResult]
+
+
+class KitchenQueueGroup(BaseModel):
+    """items ของ order ที่ยังเปิดอยู่ รวมตาม (product_id, product_type, milk_type, sweetness)"""
+    product_id: int
+    product_name: str
+    product_type: str | None = None
+    milk_type: str | None = None
+    sweetness: str | None = None
+    quantity: int
+    order_ids: list[int]
+    oldest_at: datetime
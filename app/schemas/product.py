@@ -6,6 +6,7 @@ Pydantic models สำหรับ Product API
 - ProductResponse: ข้อมูลเต็ม (staff/admin)
 - ProductCreate: สร้างเมนูใหม่
 - ProductUpdate: แก้ไขเมนู
+- ProductImportResponse: สรุปผลการ import เมนู (สร้าง/แก้/ไม่เปลี่ยน)
 """
 
 from pydantic import BaseModel, ConfigDict, Field
@@ -52,3 +53,17 @@ class ProductUpdate(BaseModel):
     milk_type_options: list[str] | None = None
     type_options: list[str] | None = None
     image: str | None = None
+
+
+class ProductImportItem(BaseModel):
+    """เมนูที่ถูกสร้างหรือแก้ไขจากการ import"""
+    product_id: int
+    product_name: str
+
+
+class ProductImportResponse(BaseModel):
+    """Response schema สำหรับ bulk import — diff เทียบกับเมนูเดิม"""
+    total: int
+    created: list[ProductImportItem]
+    updated: list[ProductImportItem]
+    unchanged: int
@@ -0,0 +1,62 @@
+"""
+Report Schemas
+
+Pydantic models สำหรับ Reports API
+- CloseDayRequest: วันทำการที่ต้องการปิดยอด (ไม่ส่ง = เมื่อวาน, วันตาม UTC)
+- StatusTotal / StaffTotal / ProductTotal / HourTotal: ยอดแยกตามมิติ
+- DailyReportResponse: snapshot ยอดปิดวัน
+"""
+
+from datetime import date, datetime
+
+from pydantic import BaseModel, ConfigDict
+
+
+class CloseDayRequest(BaseModel):
+    """Request schema สำหรับปิดยอดวัน"""
+    business_date: date | None = None
+
+
+class StatusTotal(BaseModel):
+    """ยอดต่อ order_status (revenue ของ cancelled = 0)"""
+    order_status: str
+    orders: int
+    revenue: int
+
+
+class StaffTotal(BaseModel):
+    """ยอดต่อพนักงานที่รับ order"""
+    staff_id: int
+    orders: int
+    revenue: int
+
+
+class ProductTotal(BaseModel):
+    """จำนวนที่ขายได้ต่อเมนู (ไม่รวม order ที่ cancelled)"""
+    product_id: int
+    product_name: str
+    quantity: int
+    orders: int
+
+
+class HourTotal(BaseModel):
+    """ยอดต่อชั่วโมงที่สร้าง order (0-23)"""
+    hour: int
+    orders: int
+    revenue: int
+
+
+class DailyReportResponse(BaseModel):
+    """Response schema สำหรับ snapshot ยอดปิดวัน"""
+    model_config = ConfigDict(from_attributes=True)
+
+    business_date: date
+    created_at: datetime
+    closed_by: int | None = None
+    order_count: int
+    revenue: int
+    item_count: int
+    by_status: list[StatusTotal]
+    by_staff: list[StaffTotal]
+    by_product: list[ProductTotal]
+    by_hour: list[HourTotal]
@@ -5,12 +5,15 @@ Pydantic models สำหรับ Reservation API
 - ReservationResponse: ข้อมูลการจอง + customer detail
 - ReservationCreate: สร้างการจอง
 - ReservationUpdate: อัปเดต status (staff)
+- CalendarDay: การจองของหนึ่งวันในปฏิทิน
 """
 
-from datetime import datetime
+from datetime import date, datetime
 
 from pydantic import BaseModel, ConfigDict, Field
 
+from app.config.settings import settings
+
 
 class CustomerDetail(BaseModel):
     """ข้อมูลลูกค้าแนบกับ reservation"""
@@ -28,6 +31,7 @@ class ReservationResponse(BaseModel):
     table_ids: list[int]
     capacity: int
     reservation_time: datetime
+    duration_minutes: int
     customer_amount: int
     reservation_detail: str | None = None
     cancel_detail: str | None = None
@@ -35,15 +39,17 @@ class ReservationResponse(BaseModel):
     response_at: datetime | None = None
     finish_at: datetime | None = None
     created_at: datetime
+    updated_seq: int | None = None
     customer_detail: CustomerDetail | None = None
 
 
 class ReservationCreate(BaseModel):
-    """Request schema สำหรับสร้างการจอง"""
-    table_ids: list[int] = Field(..., min_length=1)
-    capacity: int = Field(..., ge=1)
+    """Request schema สำหรับสร้างการจอง — ไม่ส่ง table_ids = ให้ระบบเลือกโต๊ะให้"""
+    table_ids: list[int] = Field(default_factory=list)
+    capacity: int | None = Field(None, ge=1)
     reservation_time: datetime
-    customer_amount: int = Field(..., ge=1)
+    duration_minutes: int = Field(90, ge=15, le=480)
+    customer_amount: int = Field(..., ge=1, le=settings.MAX_PARTY_SIZE)
     reservation_detail: str | None = None
 
 
@@ -53,3 +59,9 @@ class ReservationUpdate(BaseModel):
     response_at: datetime | None = None
     finish_at: datetime | None = None
     cancel_detail: str | None = None
+
+
+class CalendarDay(BaseModel):
+    """การจองที่ reservation_time อยู่ในวันนั้น เรียงตามเวลา"""
+    date: date
+    reservations: list[ReservationResponse]
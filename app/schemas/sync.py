@@ -0,0 +1,19 @@
+"""
+Sync Schemas
+
+Pydantic models สำหรับ Delta Sync API
+- SyncResponse: แถวที่เปลี่ยนหลัง cursor + cursor ใหม่
+"""
+
+from pydantic import BaseModel
+
+from app.schemas.order import OrderResponse
+from app.schemas.reservation import ReservationResponse
+
+
+class SyncResponse(BaseModel):
+    """Response schema สำหรับ GET /sync — cursor เป็นค่าทึบ (xid watermark) ส่งกลับมาใน since ครั้งถัดไป"""
+    cursor: int
+    has_more: bool = False
+    orders: list[OrderResponse] = []
+    reservations: list[ReservationResponse] = []
@@ -4,7 +4,8 @@ Table Schemas
 Pydantic models สำหรับ Table API
 - TableResponse: ข้อมูลโต๊ะ (response)
 - TableCreate: สร้างโต๊ะใหม่
-- TableUpdate: แก้ไขโต๊ะ
+- TableUpdate: แก้ไขโต๊ะ (ส่ง version มาเพื่อ compare-and-set ได้)
+- TableAvailabilityResponse: โต๊ะว่าง + ชุดโต๊ะ ณ เวลาที่ขอ
 """
 
 from datetime import datetime
@@ -22,6 +23,7 @@ class TableResponse(BaseModel):
     status: str
     last_update: datetime | None = None
     created_at: datetime
+    version: int
 
 
 class TableCreate(BaseModel):
@@ -36,3 +38,20 @@ class TableUpdate(BaseModel):
     table_number: str | None = Field(None, min_length=1, max_length=255)
     capacity: int | None = Field(None, ge=1)
     status: str | None = Field(None, max_length=255)
+    version: int | None = Field(None, ge=1, description="version ที่เห็นล่าสุด — ไม่ตรง → 409")
+
+
+class AvailableTable(BaseModel):
+    """โต๊ะว่างหนึ่งตัว"""
+    table_id: int
+    table_number: str
+    capacity: int
+
+
+class TableAvailabilityResponse(BaseModel):
+    """Response schema สำหรับ GET /tables/availability"""
+    time: datetime
+    duration_minutes: int
+    party_size: int
+    tables: list[AvailableTable]
+    combinations: list[list[AvailableTable]]
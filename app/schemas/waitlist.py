@@ -0,0 +1,35 @@
+"""
+Waitlist Schemas
+
+Pydantic models สำหรับ Waitlist API
+- WaitlistJoin: เข้าคิวรอโต๊ะ
+- WaitlistResponse: ข้อมูลคิว + ลำดับ + เวลารอโดยประมาณ
+"""
+
+from datetime import datetime
+
+from pydantic import BaseModel, ConfigDict, Field
+
+from app.config.settings import settings
+
+
+class WaitlistJoin(BaseModel):
+    """Request schema สำหรับเข้าคิว — staff/admin ต้องระบุ name ของลูกค้า walk-in"""
+    party_size: int = Field(..., ge=1, le=settings.MAX_PARTY_SIZE)
+    name: str | None = Field(None, max_length=100)
+
+
+class WaitlistResponse(BaseModel):
+    """Response schema สำหรับคิวรอโต๊ะ (position / estimated_wait_minutes มีเฉพาะตอน waiting)"""
+    model_config = ConfigDict(from_attributes=True)
+
+    entry_id: int
+    customer_id: int | None = None
+    name: str | None = None
+    party_size: int
+    status: str
+    table_ids: list[int]
+    created_at: datetime
+    matched_at: datetime | None = None
+    position: int | None = None
+    estimated_wait_minutes: int | None = None
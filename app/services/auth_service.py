@@ -58,6 +58,5 @@ def register_user(db: Session, username: str, password: str, name: str | None =
 
     db.add(new_user)
     db.commit()
-    db.refresh(new_user)
 
     return new_user
@@ -0,0 +1,193 @@
+"""
+Availability Service
+
+ค้นหาโต๊ะว่างจาก interval index ในหน่วยความจำ (หนึ่ง index ต่อวัน ต่อ worker)
+- find_availability: โต๊ะว่าง + ชุดโต๊ะที่รวมกันแล้วนั่งพอ ณ เวลา/ระยะเวลาที่ขอ
+- assign_tables: เลือกชุดโต๊ะว่างที่เสียที่นั่งน้อยที่สุด (ใช้ตอนจองแบบไม่ระบุโต๊ะ)
+- on_reservation_booked / on_reservation_released: อัปเดต index หลังการจอง commit
+- on_order_opened / on_order_closed: order ที่ยังไม่จบ → โต๊ะไม่ว่างทั้งวันนี้
+- invalidate_tables: ล้างข้อมูลโต๊ะ (capacity) เมื่อมีการเพิ่ม/แก้/ลบโต๊ะ
+
+เวลาทั้งหมดเป็น naive UTC แบบเดียวกับคอลัมน์ใน DB (วัน = วันตาม UTC)
+index ของแต่ละวันโหลดจาก DB ครั้งเดียวตอนถูกถามครั้งแรก แล้วอัปเดตทีละรายการ
+ตามการเขียนใน worker นี้ — การเขียนจาก worker อื่นจะเห็นเมื่อ index หมดอายุ
+(AVAILABILITY_INDEX_TTL_SECONDS) ส่วนการจองจริงยังถูกกันซ้อนด้วย exclusion constraint เสมอ
+"""
+
+import threading
+import time as time_module
+from datetime import date, datetime, time, timedelta
+
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import Range
+from sqlalchemy.orm import Session
+
+from app.config.settings import settings
+from app.core.interval_index import DayIntervalIndex
+from app.core.table_optimizer import best_fit
+from app.models.base import naive_utc, utcnow
+from app.models.order import Order
+from app.models.reservation import ReservationTable
+from app.models.table import Table
+
+_lock = threading.Lock()
+_days: dict[date, tuple[float, DayIntervalIndex]] = {}
+_tables: tuple[float, list[dict]] | None = None
+
+
+def _is_fresh(loaded_at: float) -> bool:
+    """index/cache ยังไม่หมดอายุ"""
+    return time_module.monotonic() - loaded_at < settings.AVAILABILITY_INDEX_TTL_SECONDS
+
+
+def _days_between(start: datetime, end: datetime) -> list[date]:
+    """วันทั้งหมดที่ช่วง [start, end) ครอบคลุม"""
+    last = (end - timedelta(microseconds=1)).date() if end > start else start.date()
+    return [start.date() + timedelta(days=n) for n in range((last - start.date()).days + 1)]
+
+
+def _load_day(db: Session, day: date) -> DayIntervalIndex:
+    """สร้าง index ของวันจาก reservation_tables (+ orders ที่ยังไม่จบ ถ้าเป็นวันนี้)"""
+    index = DayIntervalIndex()
+    day_start = datetime.combine(day, time.min)
+    day_range = Range(day_start, day_start + timedelta(days=1), bounds="[)")
+
+    slots = (
+        db.query(ReservationTable.reservation_id, ReservationTable.table_id, ReservationTable.during)
+        .filter(ReservationTable.during.overlaps(day_range))
+        .all()
+    )
+    by_reservation: dict[int, tuple[list[int], Range]] = {}
+    for reservation_id, table_id, during in slots:
+        by_reservation.setdefault(reservation_id, ([], during))[0].append(table_id)
+    for reservation_id, (table_ids, during) in by_reservation.items():
+        index.add(("reservation", reservation_id), table_ids, during.lower, during.upper)
+
+    if day == utcnow().date():
+        open_orders = (
+            db.query(Order.order_id, Order.table_ids)
+            .filter(
+                Order.created_at >= day_start,
+                Order.finish_at.is_(None),
+                func.cardinality(Order.table_ids) > 0,
+            )
+            .all()
+        )
+        for order_id, table_ids in open_orders:
+            index.block(("order", order_id), table_ids)
+
+    return index
+
+
+def _get_day(db: Session, day: date) -> DayIntervalIndex:
+    """คืน index ของวัน — โหลดใหม่ถ้ายังไม่มีหรือหมดอายุ"""
+    with _lock:
+        cached = _days.get(day)
+        if cached and _is_fresh(cached[0]):
+            return cached[1]
+
+    index = _load_day(db, day)
+    with _lock:
+        # เก็บเฉพาะวันนี้เป็นต้นไป — วันที่ผ่านไปแล้วไม่ต้องใช้อีก
+        today = utcnow().date()
+        for old in [d for d in _days if d < today]:
+            del _days[old]
+        _days[day] = (time_module.monotonic(), index)
+    return index
+
+
+def _get_tables(db: Session) -> list[dict]:
+    """ข้อมูลโต๊ะ (id, number, capacity) เรียงตาม capacity — cache ตาม TTL"""
+    global _tables
+    with _lock:
+        if _tables and _is_fresh(_tables[0]):
+            return _tables[1]
+
+    rows = db.query(Table.table_id, Table.table_number, Table.capacity).order_by(Table.capacity, Table.table_id)
+    tables = [
+        {"table_id": table_id, "table_number": table_number, "capacity": capacity}
+        for table_id, table_number, capacity in rows
+    ]
+    with _lock:
+        _tables = (time_module.monotonic(), tables)
+    return tables
+
+
+def _apply(day_start: datetime, day_end: datetime, fn):
+    """เรียก fn กับ index ของทุกวันที่โหลดไว้แล้วในช่วงนั้น (วันที่ยังไม่โหลดจะโหลดจาก DB ทีหลัง)"""
+    with _lock:
+        for day in _days_between(day_start, day_end):
+            if day in _days:
+                fn(_days[day][1])
+
+
+def on_reservation_booked(reservation_id: int, table_ids: list[int], start: datetime, end: datetime):
+    """เพิ่มการจองเข้า index"""
+    start, end = naive_utc(start), naive_utc(end)
+    _apply(start, end, lambda index: index.add(("reservation", reservation_id), table_ids, start, end))
+
+
+def on_reservation_released(reservation_id: int):
+    """ลบการจองออกจาก index (cancel/finish)"""
+    with _lock:
+        for _, index in _days.values():
+            index.remove(("reservation", reservation_id))
+
+
+def on_order_opened(order_id: int, table_ids: list[int]):
+    """order ที่ผูกกับโต๊ะ → โต๊ะไม่ว่างสำหรับวันนี้จนกว่า order จะจบ"""
+    now = utcnow()
+    _apply(now, now, lambda index: index.block(("order", order_id), table_ids))
+
+
+def on_order_closed(order_id: int):
+    """order จบ (finish_at) → ปล่อยโต๊ะ"""
+    with _lock:
+        for _, index in _days.values():
+            index.unblock(("order", order_id))
+
+
+def invalidate_tables():
+    """ล้าง cache ข้อมูลโต๊ะ — เรียกเมื่อเพิ่ม/แก้/ลบโต๊ะ"""
+    global _tables
+    with _lock:
+        _tables = None
+
+
+def _free_tables(db: Session, start: datetime, end: datetime) -> list[dict]:
+    """โต๊ะที่ว่างตลอดช่วง [start, end) เรียงตาม capacity"""
+    indexes = [_get_day(db, day) for day in _days_between(start, end)]
+    tables = _get_tables(db)
+
+    with _lock:
+        return [t for t in tables if all(index.is_free(t["table_id"], start, end) for index in indexes)]
+
+
+def _best_fit(free: list[dict], party_size: int) -> list[dict] | None:
+    """ชุดโต๊ะที่เสียที่นั่งน้อยที่สุด (เสมอ → ใช้โต๊ะน้อยกว่า) ตาม TABLE_ADJACENCY"""
+    by_id = {t["table_id"]: t for t in free}
+    adjacency = frozenset(settings.TABLE_ADJACENCY) or None
+    chosen = best_fit(tuple((t["table_id"], t["capacity"]) for t in free), party_size, adjacency)
+    return [by_id[table_id] for table_id in chosen] if chosen else None
+
+
+def find_availability(db: Session, start: datetime, party_size: int, duration_minutes: int) -> dict:
+    """หาโต๊ะว่างที่นั่งพอ + ชุดโต๊ะที่รวมกันแล้วนั่งพอ ในช่วง [start, start + duration)"""
+    start = naive_utc(start)
+    free = _free_tables(db, start, start + timedelta(minutes=duration_minutes))
+    best = _best_fit(free, party_size)
+
+    return {
+        "time": start,
+        "duration_minutes": duration_minutes,
+        "party_size": party_size,
+        "tables": [t for t in free if t["capacity"] >= party_size],
+        "combinations": [best] if best and len(best) > 1 else [],
+    }
+
+
+def assign_tables(db: Session, start: datetime, party_size: int, duration_minutes: int) -> list[dict] | None:
+    """เลือกโต๊ะให้อัตโนมัติ — None ถ้าโต๊ะว่างรวมกันแล้วยังนั่งไม่พอ"""
+    start = naive_utc(start)
+    free = _free_tables(db, start, start + timedelta(minutes=duration_minutes))
+    return _best_fit(free, party_size)
@@ -0,0 +1,97 @@
+"""
+ETA Service
+
+ประมาณเวลาที่ order จะเสร็จ (ต่อ worker process)
+- estimate: queue_ahead + prep_seconds + eta ของ order ที่ยังอยู่ในคิวครัว (None ถ้าไม่อยู่ในคิว)
+- on_order_opened: order ใหม่เข้าท้ายคิวครัว
+- on_order_closed: order ออกจากคิวครัว — ถ้าทำเสร็จ (ไม่ใช่ cancelled) เก็บเวลาทำต่อเมนู
+- invalidate_queue: ล้างคิวในหน่วยความจำ (โหลดจาก DB ใหม่ครั้งถัดไป)
+
+เวลาทำ = เวลาตั้งแต่ created_at จนถึงตอนที่ order ออกจาก pending/preparing
+ทั้งสองค่าเป็น naive UTC (created_at อ่านจาก session ที่ตั้ง timezone เป็น UTC — ดู DB_CONNECT_ARGS)
+เก็บแบบ rolling window ต่อเมนูใน PrepTimeEstimator และอัปเดตทีละ order หลัง commit
+ทุกการประมาณจึงเป็น O(จำนวนเมนูใน order) ไม่ query orders เลย
+คิวครัวโหลดจาก partial index ix_orders_open ทุก ORDER_ETA_SYNC_SECONDS เพื่อเห็น order จาก worker อื่น
+"""
+
+import threading
+import time as time_module
+from collections.abc import Iterable
+
+from sqlalchemy.orm import Session
+
+from app.config.settings import settings
+from app.core.prep_estimator import PrepTimeEstimator
+from app.models.base import naive_utc, utcnow
+from app.models.order import OPEN_ORDER_STATUSES, Order
+
+_lock = threading.Lock()
+_estimator = PrepTimeEstimator(
+    settings.ORDER_ETA_WINDOW_SIZE,
+    settings.ORDER_ETA_DEFAULT_PREP_SECONDS,
+    settings.KITCHEN_PARALLEL_ORDERS,
+)
+_synced_at: float | None = None
+
+
+def _sync(db: Session):
+    """โหลดคิวครัวใหม่ถ้าหมดอายุ — index-only scan บน ix_orders_open (order ที่เปิดอยู่เท่านั้น)"""
+    global _synced_at
+    with _lock:
+        if _synced_at is not None and time_module.monotonic() - _synced_at < settings.ORDER_ETA_SYNC_SECONDS:
+            return
+
+    order_ids = [
+        order_id for (order_id,) in
+        db.query(Order.order_id)
+        .filter(Order.order_status.in_(OPEN_ORDER_STATUSES))
+        .order_by(Order.order_id)
+    ]
+    with _lock:
+        _estimator.reset_queue(order_ids)
+        _synced_at = time_module.monotonic()
+
+
+def invalidate_queue():
+    """ล้างคิวในหน่วยความจำ — เวลาทำที่เก็บไว้ยังอยู่"""
+    global _synced_at
+    with _lock:
+        _estimator.reset_queue([])
+        _synced_at = None
+
+
+def estimate(order: Order, db: Session | None = None) -> dict | None:
+    """
+    queue_ahead, prep_seconds, eta ของ order ที่ยังเปิดอยู่ — order ที่ออกจากคิวแล้วคืน None
+    ส่ง db มาด้วย → โหลดคิวครัวใหม่ก่อนถ้าหมดอายุ
+    """
+    if order.order_status not in OPEN_ORDER_STATUSES:
+        return None
+    if db is not None:
+        _sync(db)
+    product_ids = [item.product_id for item in order.items]
+    with _lock:
+        ahead, prep, eta = _estimator.estimate(
+            order.order_id, product_ids, naive_utc(order.created_at), utcnow()
+        )
+    return {"queue_ahead": ahead, "prep_seconds": round(prep), "eta": eta}
+
+
+def on_order_opened(db: Session, order_ids: Iterable[int]):
+    """order ที่ commit แล้วเข้าท้ายคิวครัว (ตามลำดับที่ส่งมา)"""
+    _sync(db)
+    with _lock:
+        for order_id in order_ids:
+            _estimator.open(order_id)
+
+
+def on_order_closed(db: Session, orders: Iterable[Order]):
+    """order ที่ออกจาก pending/preparing แล้ว — เก็บเวลาทำของ order ที่ไม่ได้ถูกยกเลิก"""
+    now = utcnow()
+    with _lock:
+        for order in orders:
+            if _estimator.close(order.order_id) and order.order_status != "cancelled":
+                seconds = (now - naive_utc(order.created_at)).total_seconds()
+                _estimator.record((item.product_id for item in order.items), seconds)
+    # sync หลังปิด — คิวที่โหลดใหม่ไม่มี order เหล่านี้แล้ว จึงต้องเก็บเวลาทำก่อน
+    _sync(db)
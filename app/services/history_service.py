@@ -0,0 +1,100 @@
+"""
+History Service
+
+Business logic สำหรับประวัติของลูกค้า (GET /users/me/history)
+- get_history: orders + reservations ของลูกค้า เรียงใหม่ → เก่า แบ่งหน้าด้วย keyset cursor
+
+ลำดับรวมคือ (created_at, type, id) จากมากไปน้อย — cursor เก็บ key ของรายการสุดท้ายในหน้า
+แต่ละตารางดึงแค่ limit + 1 แถวถัดจาก cursor ด้วย index (customer_id, created_at, id)
+แล้ว merge สองฝั่ง ต้นทุนต่อหน้าจึงคงที่ ไม่ขึ้นกับว่าประวัติยาวแค่ไหน (ไม่มี OFFSET)
+"""
+
+import base64
+import heapq
+import json
+from datetime import datetime
+
+from fastapi import HTTPException, status
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Session, selectinload
+
+from app.models.order import Order
+from app.models.reservation import Reservation
+from app.models.user import User
+from app.services.order_service import _order_to_response
+from app.services.reservation_service import _reservation_to_response
+
+# type → (model, ชื่อคอลัมน์ id, ลำดับเมื่อ created_at เท่ากัน — มากกว่า = มาก่อน)
+_SOURCES = {
+    "order": (Order, "order_id", 1),
+    "reservation": (Reservation, "reservation_id", 0),
+}
+
+
+def _encode_cursor(key: tuple[datetime, int, int]) -> str:
+    """(created_at, rank, id) → cursor แบบ opaque"""
+    created_at, rank, row_id = key
+    raw = json.dumps([created_at.isoformat(), rank, row_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> tuple[datetime, int, int]:
+    """cursor → (created_at, rank, id) — 400 ถ้า cursor ไม่ถูกต้อง"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, rank, row_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), int(rank), int(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="cursor ไม่ถูกต้อง",
+        )
+
+
+def _page(db: Session, kind: str, customer_id: int, after: tuple | None, limit: int) -> list:
+    """แถวของตารางหนึ่งที่อยู่ถัดจาก cursor (ใหม่ → เก่า) มากสุด limit + 1 แถว"""
+    model, id_name, rank = _SOURCES[kind]
+    id_column = getattr(model, id_name)
+    query = db.query(model).filter(model.customer_id == customer_id)
+
+    if after is not None:
+        created_at, after_rank, after_id = after
+        # key ของตารางนี้ < cursor — rank คงที่ต่อตาราง จึงเหลือเงื่อนไขบน (created_at, id) ที่ใช้ index ได้
+        if rank < after_rank:
+            query = query.filter(model.created_at <= created_at)
+        elif rank > after_rank:
+            query = query.filter(model.created_at < created_at)
+        else:
+            # row comparison → เป็น Index Cond ได้ (OR ธรรมดาจะกลายเป็น Filter ที่ไล่อ่านตั้งแต่แถวแรก)
+            query = query.filter(tuple_(model.created_at, id_column) < tuple_(created_at, after_id))
+
+    if model is Order:
+        query = query.options(selectinload(Order.items))
+    return query.order_by(model.created_at.desc(), id_column.desc()).limit(limit + 1).all()
+
+
+def get_history(db: Session, user: User, cursor: str | None, limit: int) -> dict:
+    """หนึ่งหน้าของประวัติ orders + reservations ของ user — next_cursor = None เมื่อหมดแล้ว"""
+    after = _decode_cursor(cursor) if cursor else None
+
+    streams = []
+    for kind, (_, id_name, rank) in _SOURCES.items():
+        rows = _page(db, kind, user.user_id, after, limit)
+        streams.append([((row.created_at, rank, getattr(row, id_name)), kind, row) for row in rows])
+
+    merged = list(heapq.merge(*streams, key=lambda entry: entry[0], reverse=True))
+    page = merged[:limit]
+
+    items = []
+    for _, kind, row in page:
+        if kind == "order":
+            items.append({"type": kind, "created_at": row.created_at, "order": _order_to_response(row, user)})
+        else:
+            items.append({
+                "type": kind,
+                "created_at": row.created_at,
+                "reservation": _reservation_to_response(row, user),
+            })
+
+    next_cursor = _encode_cursor(page[-1][0]) if len(merged) > limit else None
+    return {"items": items, "next_cursor": next_cursor}
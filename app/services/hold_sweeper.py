@@ -0,0 +1,107 @@
+"""
+Reservation Hold Sweeper
+
+งานเบื้องหลังของแต่ละ worker (เริ่ม/หยุดจาก lifespan ของ app)
+- start_sweepers: เริ่ม task ของงานที่เปิดไว้ใน settings — แต่ละงานเปิด/ปิดและตั้งรอบได้แยกกัน
+  - hold sweep (RESERVATION_HOLD_SWEEP_*): sweep_once
+  - waitlist match sweep (WAITLIST_MATCH_SWEEP_*): sweep_waitlist_once
+  - idempotency purge (IDEMPOTENCY_PURGE_*): purge_idempotency_keys
+- run_periodic: วนเรียก steps ของงานหนึ่งทุก interval_seconds
+- sweep_once: expire การจองที่ pending เกิน TTL หนึ่งรอบ (session ของตัวเอง)
+- sweep_waitlist_once: กลุ่มในคิวรอที่ได้โต๊ะแล้วไม่มานั่งเกิน TTL → no_show ปล่อยโต๊ะ
+- purge_idempotency_keys: ลบ Idempotency-Key ที่หมดอายุ (ไม่ต้องลบในทุก POST)
+
+ทุก worker รัน loop เหล่านี้ได้ — advisory lock ใน expire_stale_holds / expire_stale_matches
+ทำให้มีเพียง worker เดียวที่ sweep ในแต่ละรอบ (purge เป็น DELETE ที่รันซ้ำได้)
+"""
+
+import asyncio
+import logging
+from collections.abc import Callable
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.config.database import SessionLocal
+from app.config.settings import settings
+from app.core import metrics
+from app.services.idempotency_service import purge_expired
+from app.services.reservation_service import expire_stale_holds
+from app.services.waitlist_service import expire_stale_matches
+
+logger = logging.getLogger(__name__)
+
+
+def sweep_once() -> list[int]:
+    """sweep หนึ่งรอบ — คืน reservation_ids ที่ expire"""
+    db = SessionLocal()
+    try:
+        expired = expire_stale_holds(db, settings.RESERVATION_HOLD_TTL_MINUTES)
+    finally:
+        db.close()
+    if expired:
+        logger.info("expired %d pending reservations: %s", len(expired), expired)
+    return expired
+
+
+def sweep_waitlist_once() -> list[int]:
+    """sweep กลุ่มที่ไม่มานั่งหนึ่งรอบ — คืน entry_ids ที่เป็น no_show"""
+    db = SessionLocal()
+    try:
+        no_shows = expire_stale_matches(db, settings.WAITLIST_MATCH_TTL_MINUTES)
+    finally:
+        db.close()
+    if no_shows:
+        logger.info("released tables of %d no-show waitlist entries: %s", len(no_shows), no_shows)
+    return no_shows
+
+
+def purge_idempotency_keys() -> int:
+    """ลบ Idempotency-Key ที่หมดอายุ — คืนจำนวนที่ลบ"""
+    db = SessionLocal()
+    try:
+        purged = purge_expired(db)
+        db.commit()
+        return purged
+    finally:
+        db.close()
+
+
+# step ของงานเบื้องหลัง: (function, metric ของ error, ชื่อใน log)
+Step = tuple[Callable, str, str]
+
+
+async def _run_step(step: Step):
+    """รัน step ใน threadpool — error ถูก log แล้วคืน None (step อื่น/รอบถัดไปยังทำงานต่อ)"""
+    fn, error_metric, name = step
+    try:
+        return await run_in_threadpool(fn)
+    except Exception:
+        metrics.incr(error_metric)
+        logger.exception("%s failed", name)
+        return None
+
+
+async def run_periodic(interval_seconds: float, steps: list[Step]):
+    """loop จนกว่า task จะถูก cancel — error ของรอบหนึ่งไม่ทำให้ loop หยุด"""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        for step in steps:
+            await _run_step(step)
+
+
+def start_sweepers() -> list[asyncio.Task]:
+    """เริ่มงานเบื้องหลังที่เปิดไว้ใน settings — คืน tasks ให้ lifespan cancel ตอน shutdown"""
+    jobs: list[tuple[float, list[Step]]] = []
+    if settings.RESERVATION_HOLD_SWEEP_ENABLED:
+        jobs.append((settings.RESERVATION_HOLD_SWEEP_INTERVAL_SECONDS, [
+            (sweep_once, "reservations.hold_sweep.errors", "reservation hold sweep"),
+        ]))
+    if settings.WAITLIST_MATCH_SWEEP_ENABLED:
+        jobs.append((settings.WAITLIST_MATCH_SWEEP_INTERVAL_SECONDS, [
+            (sweep_waitlist_once, "waitlist.match_sweep.errors", "waitlist match sweep"),
+        ]))
+    if settings.IDEMPOTENCY_PURGE_ENABLED:
+        jobs.append((settings.IDEMPOTENCY_PURGE_INTERVAL_SECONDS, [
+            (purge_idempotency_keys, "idempotency.purge.errors", "idempotency key purge"),
+        ]))
+    return [asyncio.create_task(run_periodic(interval, steps)) for interval, steps in jobs]
@@ -0,0 +1,187 @@
+"""
+Idempotency Service
+
+รองรับ header Idempotency-Key ของ POST ที่สร้างข้อมูล (orders, reservations)
+- run_idempotent: เรียก handler ครั้งเดียวต่อ key — retry ได้ response เดิมโดยไม่สร้างซ้ำ
+- purge_expired: ลบ key ที่หมดอายุแล้ว (เรียกจาก sweeper เบื้องหลัง ไม่ใช่ทุก request)
+
+key แยกตาม (scope, user_id) และถูก claim ด้วย INSERT ... ON CONFLICT ก่อนเรียก handler
+request ซ้ำที่เข้ามาพร้อมกันจะรอเฉพาะ row ของ key เดียวกัน (ไม่มี global lock)
+แล้ว poll จนกว่า request แรกจะเก็บ response เสร็จ
+
+สิ่งที่ handler เขียนกับ response ที่เก็บ commit ใน transaction เดียวกัน (deferred_commit)
+worker ตายหรือ commit ล้มเหลวระหว่างทาง → ไม่มีอะไรถูกเขียน retry จึงทำงานใหม่ได้โดยไม่สร้างซ้ำ
+งานหลัง commit ของ service (publish event, index ในหน่วยความจำ, ล้าง cache) รอจน commit นั้นสำเร็จ
+"""
+
+import hashlib
+import time
+from collections.abc import Callable
+from datetime import datetime, timedelta
+
+from fastapi import HTTPException, status
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.config.settings import settings
+from app.core import metrics
+from app.core.transaction import deferred_commit
+from app.models.idempotency import IdempotencyKey
+
+# ระยะห่างระหว่างการเช็คผลของ request แรก (วินาที)
+POLL_INTERVAL = 0.05
+
+
+def _fingerprint(payload: BaseModel) -> str:
+    """sha256 ของ request body — key เดิมต้องมากับ body เดิม"""
+    return hashlib.sha256(payload.model_dump_json().encode()).hexdigest()
+
+
+def _key_filter(scope: str, user_id: int, key: str):
+    """เงื่อนไข WHERE ของ key (primary key)"""
+    return (
+        IdempotencyKey.scope == scope,
+        IdempotencyKey.user_id == user_id,
+        IdempotencyKey.key == key,
+    )
+
+
+def purge_expired(db: Session) -> int:
+    """ลบ key ที่หมดอายุ (ใช้ index ของ expires_at)"""
+    result = db.execute(delete(IdempotencyKey).where(IdempotencyKey.expires_at < func.now()))
+    return result.rowcount
+
+
+def _claim(db: Session, scope: str, user_id: int, key: str, fingerprint: str) -> datetime | None:
+    """
+    จอง key สำหรับ request นี้ — คืน expires_at ของ claim (ใช้เป็น token) ถ้าได้สิทธิ์เรียก handler
+
+    INSERT ที่ชนกันจะรอ commit ของอีกฝั่งบน unique index ของ key นั้นเท่านั้น
+    row ที่หมดอายุแล้ว (lock ค้าง/เกิน TTL) ถูก claim ทับได้ — ไม่ต้องลบ key เก่าก่อน
+    """
+    stmt = insert(IdempotencyKey).values(
+        scope=scope,
+        user_id=user_id,
+        key=key,
+        fingerprint=fingerprint,
+        expires_at=func.now() + timedelta(seconds=settings.IDEMPOTENCY_LOCK_SECONDS),
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[IdempotencyKey.scope, IdempotencyKey.user_id, IdempotencyKey.key],
+        set_={
+            "fingerprint": stmt.excluded.fingerprint,
+            "status_code": None,
+            "response_body": None,
+            "expires_at": stmt.excluded.expires_at,
+        },
+        where=IdempotencyKey.expires_at < func.now(),
+    ).returning(IdempotencyKey.expires_at)
+
+    claimed = db.execute(stmt).scalar()
+    db.commit()
+    return claimed
+
+
+def _stored(db: Session, scope: str, user_id: int, key: str):
+    """อ่าน (fingerprint, status_code, response_body) ล่าสุดของ key — None ถ้าไม่มี"""
+    row = db.execute(
+        select(IdempotencyKey.fingerprint, IdempotencyKey.status_code, IdempotencyKey.response_body)
+        .where(*_key_filter(scope, user_id, key))
+    ).first()
+    db.commit()
+    return row
+
+
+def _release(db: Session, scope: str, user_id: int, key: str, claimed: datetime):
+    """handler ล้มเหลว → rollback สิ่งที่ handler เขียนแล้วลบ claim (ของเราเท่านั้น) ให้ retry ได้"""
+    db.rollback()
+    db.execute(delete(IdempotencyKey).where(*_key_filter(scope, user_id, key), IdempotencyKey.expires_at == claimed))
+    db.commit()
+
+
+def _complete(db: Session, scope: str, user_id: int, key: str, claimed: datetime, status_code: int, body):
+    """
+    เก็บ response แล้วต่ออายุเป็น TTL — commit พร้อมสิ่งที่ handler เขียนตอนจบ deferred_commit
+
+    claim ของเราหมดเวลาไปแล้วและ request อื่น claim ทับ (expires_at ไม่ตรง) → 409 (_release rollback ทั้งหมด)
+    """
+    result = db.execute(
+        update(IdempotencyKey)
+        .where(*_key_filter(scope, user_id, key), IdempotencyKey.expires_at == claimed)
+        .values(
+            status_code=status_code,
+            response_body=body,
+            expires_at=func.now() + timedelta(hours=settings.IDEMPOTENCY_TTL_HOURS),
+        )
+    )
+    if result.rowcount == 0:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="คำขอเดียวกันกำลังประมวลผลอยู่ กรุณาลองใหม่อีกครั้ง",
+        )
+
+
+def run_idempotent(
+    db: Session,
+    scope: str,
+    user_id: int,
+    key: str | None,
+    payload: BaseModel,
+    handler: Callable[[], dict],
+    response_model: type[BaseModel],
+    status_code: int,
+):
+    """
+    เรียก handler แบบ idempotent ตาม key
+
+    - ไม่มี key → เรียก handler ตามปกติ
+    - key ใหม่ → เรียก handler แล้วเก็บ response (ถ้า handler error → ลบ key ให้ retry ได้)
+    - key เดิม + body เดิม → คืน response ที่เก็บไว้ (header Idempotent-Replayed: true)
+    - key เดิม + body ต่าง → 422
+    - request แรกยังทำไม่เสร็จเกิน IDEMPOTENCY_WAIT_SECONDS → 409
+    """
+    if key is None:
+        return handler()
+
+    fingerprint = _fingerprint(payload)
+    deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_SECONDS
+
+    while (claimed := _claim(db, scope, user_id, key, fingerprint)) is None:
+        stored = _stored(db, scope, user_id, key)
+        if stored is None:
+            continue  # request แรกล้มเหลวและลบ key ไปแล้ว → claim ใหม่
+
+        if stored.fingerprint != fingerprint:
+            raise HTTPException(
+                status_code=422,  # ชื่อ constant ต่างกันตามเวอร์ชัน starlette
+                detail="Idempotency-Key นี้ถูกใช้กับข้อมูลอื่นแล้ว",
+            )
+
+        if stored.status_code is not None:
+            metrics.incr(f"idempotency.{scope}.replayed")
+            return JSONResponse(
+                content=stored.response_body,
+                status_code=stored.status_code,
+                headers={"Idempotent-Replayed": "true"},
+            )
+
+        if time.monotonic() >= deadline:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="คำขอเดียวกันกำลังประมวลผลอยู่ กรุณาลองใหม่อีกครั้ง",
+            )
+        time.sleep(POLL_INTERVAL)
+
+    try:
+        with deferred_commit(db):
+            result = handler()
+            body = response_model.model_validate(result).model_dump(mode="json")
+            _complete(db, scope, user_id, key, claimed, status_code, body)
+    except BaseException:
+        _release(db, scope, user_id, key, claimed)
+        raise
+    metrics.incr(f"idempotency.{scope}.executed")
+    return result
@@ -2,22 +2,126 @@
 Order Service
 
 Business logic สำหรับ orders endpoints
-- get_all_orders: ดึง orders วันนี้ + customer detail + items
+- get_all_orders: ดึง orders วันนี้ + customer detail + items (สร้าง OrderResponse ตรง ๆ, customers query เดียว)
+- get_all_orders_sparse: orders วันนี้เฉพาะ field ที่ขอ (?fields=) — ไม่โหลด items/customers ถ้าไม่ได้ขอ
 - get_order_by_id: ดึง order ตาม ID
+- get_order_eta: เวลาที่ order จะเสร็จโดยประมาณ (เจ้าของ order หรือ staff/admin)
 - create_order: สร้าง order + items + คำนวณ net_price + table status
-- update_order: อัปเดต status + ถ้า finish_at → table status → empty
+- create_orders_batch: สร้างหลาย orders ใน transaction เดียว (partial failure ต่อ order)
+- update_order: อัปเดต status ตาม state machine (409 ถ้าเปลี่ยนไม่ได้) + ถ้า finish_at → table status → empty
+  แล้วจับคู่โต๊ะที่ว่างกับกลุ่มในคิวรอ (waitlist)
+- update_orders_bulk: เปลี่ยน status หลาย orders ด้วย UPDATE เดียว (ผลแยกต่อ order_id)
+- get_kitchen_queue: items ของ order ที่ยังเปิดอยู่ รวมตามเมนู + options (GROUP BY เดียว)
+- order_events: broadcaster ของ kitchen feed (publish หลัง create/update commit)
 """
 
+import threading
+from contextlib import ExitStack
 from datetime import datetime, time
 
 from fastapi import HTTPException, status
-from sqlalchemy.orm import Session
-
-from app.models.order import Order, OrderItem
+from sqlalchemy import distinct, func, insert, update
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.orm import Session, load_only, selectinload
+
+from app.config.settings import settings
+from app.core.broadcaster import Broadcaster
+from app.core.transaction import commit_then
+from app.models.order import (
+    OPEN_ORDER_STATUSES,
+    ORDER_STATUS_TRANSITIONS,
+    Order,
+    OrderItem,
+    allowed_from_statuses,
+)
 from app.models.product import Product
-from app.models.table import Table
+from app.models.reservation import Reservation
 from app.models.user import User
-from app.schemas.order import OrderCreate, OrderUpdate
+from app.schemas.order import (
+    CustomerDetail,
+    KitchenQueueGroup,
+    OrderBulkUpdate,
+    OrderCreate,
+    OrderItemResponse,
+    OrderResponse,
+    OrderUpdate,
+)
+from app.services import availability_service, eta_service, waitlist_service
+from app.services.table_service import publish_table_changes, update_table_statuses
+
+# Broadcaster กลางของ worker สำหรับ kitchen feed (WebSocket /orders/ws)
+order_events = Broadcaster(
+    "orders.feed",
+    max_subscribers=settings.ORDER_FEED_MAX_SUBSCRIBERS,
+    queue_size=settings.ORDER_FEED_QUEUE_SIZE,
+    history_size=settings.ORDER_FEED_HISTORY_SIZE,
+)
+
+
+# product_id → lock ของการคำนวณ + publish kitchen queue ของเมนูนั้น (สร้างเมื่อใช้ครั้งแรก)
+_kitchen_queue_locks: dict[int, threading.Lock] = {}
+
+
+def _publish_order(order: OrderResponse):
+    """ส่ง order ที่ commit แล้วไปยัง kitchen feed ในรูป OrderResponse"""
+    order_events.publish({"type": "order", "order": order.model_dump(mode="json")})
+
+
+def get_kitchen_queue(db: Session, product_ids: set[int] | None = None) -> list[dict]:
+    """
+    รวม items ของ order ที่ยังเปิดอยู่ตาม (product_id, product_type, milk_type, sweetness)
+
+    GROUP BY เดียวบน partial index ix_orders_open — เรียงตาม order ที่รอนานที่สุดก่อน
+    ระบุ product_ids → คำนวณเฉพาะกลุ่มของเมนูเหล่านั้น (ใช้ส่ง delta ไปยัง kitchen feed)
+    """
+    group_columns = (
+        OrderItem.product_id,
+        Product.product_name,
+        OrderItem.product_type,
+        OrderItem.milk_type,
+        OrderItem.sweetness,
+    )
+    oldest_at = func.min(Order.created_at).label("oldest_at")
+
+    query = (
+        db.query(
+            *group_columns,
+            func.sum(OrderItem.quantity).label("quantity"),
+            func.array_agg(aggregate_order_by(distinct(OrderItem.order_id), OrderItem.order_id)).label("order_ids"),
+            oldest_at,
+        )
+        .join(Order, Order.order_id == OrderItem.order_id)
+        .join(Product, Product.product_id == OrderItem.product_id)
+        .filter(Order.order_status.in_(OPEN_ORDER_STATUSES))
+    )
+    if product_ids is not None:
+        query = query.filter(OrderItem.product_id.in_(product_ids))
+
+    rows = query.group_by(*group_columns).order_by(oldest_at, OrderItem.product_id).all()
+    return [row._asdict() for row in rows]
+
+
+def _publish_kitchen_queue(db: Session, product_ids: set[int]):
+    """
+    ส่ง delta ของ kitchen queue หลัง commit — กลุ่มทั้งหมดของ product_ids ที่ได้รับ
+    ให้แทนที่กลุ่มเดิมของเมนูเหล่านั้น (กลุ่มที่หายไป = ทำครบแล้ว)
+
+    คำนวณ + publish ขณะถือ lock ของทุกเมนูใน product_ids (จองตามลำดับ product_id กัน deadlock)
+    ไม่งั้น request ที่ query ก่อนแต่ publish ทีหลังจะส่งกลุ่มเก่าทับกลุ่มใหม่
+    ถือ lock อยู่ → query ทีหลังเสมอ จึงเห็นทุก commit ที่ delta ก่อนหน้าเห็น (read committed)
+    """
+    if not product_ids:
+        return
+    ordered = sorted(product_ids)
+    with ExitStack() as stack:
+        for product_id in ordered:
+            stack.enter_context(_kitchen_queue_locks.setdefault(product_id, threading.Lock()))
+        groups = get_kitchen_queue(db, product_ids)
+        order_events.publish({
+            "type": "kitchen_queue",
+            "product_ids": ordered,
+            "groups": [KitchenQueueGroup.model_validate(g).model_dump(mode="json") for g in groups],
+        })
 
 
 def _get_today_start() -> datetime:
@@ -26,76 +130,129 @@ def _get_today_start() -> datetime:
     return datetime.combine(now.date(), time.min)
 
 
-def _enrich_with_customer_detail(db: Session, order: Order) -> dict:
-    """เพิ่ม customer_detail (name, point) + items เข้าไปใน order data"""
-    data = {
-        "order_id": order.order_id,
-        "customer_id": order.customer_id,
-        "staff_id": order.staff_id,
-        "reservation_id": order.reservation_id,
-        "table_ids": order.table_ids or [],
-        "order_status": order.order_status,
-        "net_price": order.net_price,
-        "finish_at": order.finish_at,
-        "created_at": order.created_at,
-        "items": [
-            {
-                "id": item.id,
-                "order_id": item.order_id,
-                "product_id": item.product_id,
-                "quantity": item.quantity,
-                "sweetness": item.sweetness,
-                "milk_type": item.milk_type,
-                "product_type": item.product_type,
-                "note": item.note,
-            }
-            for item in order.items
-        ],
-    }
+def _order_to_response(order: Order, customer: User | None) -> OrderResponse:
+    """
+    แปลง order + items + customer_detail (name, point) เป็น OrderResponse
+
+    ข้อมูลมาจาก DB (ผ่าน constraint แล้ว) จึงสร้างด้วย model_construct โดยไม่ validate ซ้ำ
+    — field ใหม่ใน OrderResponse / OrderItemResponse ต้องเพิ่มที่นี่ด้วย
+    """
+    return OrderResponse.model_construct(
+        order_id=order.order_id,
+        customer_id=order.customer_id,
+        staff_id=order.staff_id,
+        reservation_id=order.reservation_id,
+        table_ids=order.table_ids or [],
+        order_status=order.order_status,
+        net_price=order.net_price,
+        finish_at=order.finish_at,
+        created_at=order.created_at,
+        updated_seq=order.updated_seq,
+        eta=(eta_service.estimate(order) or {}).get("eta"),
+        items=[_item_to_response(item) for item in order.items],
+        customer_detail=_customer_detail(order, customer),
+    )
+
 
+def _item_to_response(item: OrderItem) -> OrderItemResponse:
+    return OrderItemResponse.model_construct(
+        id=item.id,
+        order_id=item.order_id,
+        product_id=item.product_id,
+        quantity=item.quantity,
+        sweetness=item.sweetness,
+        milk_type=item.milk_type,
+        product_type=item.product_type,
+        note=item.note,
+    )
+
+
+def _customer_detail(order: Order, customer: User | None) -> CustomerDetail | None:
     # Customer detail enrichment (ตาม Node.js ต้นฉบับ)
-    if order.customer_id:
-        customer = db.query(User).filter(User.user_id == order.customer_id).first()
-        if customer:
-            data["customer_detail"] = {
-                "customer_name": customer.name or "-",
-                "point": customer.point or 0,
-            }
-        else:
-            data["customer_detail"] = {
-                "customer_name": "-",
-                "point": 0,
-            }
-    else:
-        data["customer_detail"] = None
+    if not order.customer_id:
+        return None
+    return CustomerDetail.model_construct(
+        customer_name=(customer.name or "-") if customer else "-",
+        point=(customer.point or 0) if customer else 0,
+    )
 
-    return data
 
+def _load_customers(db: Session, customer_ids: set[int]) -> dict[int, User]:
+    """customers ของหลาย orders ด้วย query เดียว"""
+    if not customer_ids:
+        return {}
+    return {u.user_id: u for u in db.query(User).filter(User.user_id.in_(customer_ids))}
 
-def _update_table_statuses(db: Session, table_ids: list[int], new_status: str):
-    """อัปเดต status ของหลาย tables พร้อมกัน"""
-    for table_id in table_ids:
-        table = db.query(Table).filter(Table.table_id == table_id).first()
-        if table:
-            table.status = new_status
 
+def _orders_to_responses(db: Session, orders: list[Order]) -> list[OrderResponse]:
+    """แปลงหลาย orders เป็น OrderResponse — ดึง customers ทั้งหมดครั้งเดียว (ไม่ query ต่อ order)"""
+    customers = _load_customers(db, {order.customer_id for order in orders if order.customer_id})
+    return [_order_to_response(order, customers.get(order.customer_id)) for order in orders]
 
-def get_all_orders(db: Session) -> list[dict]:
-    """ดึง orders วันนี้ เรียงจากใหม่ → เก่า + customer detail + items"""
+
+def _enrich_with_customer_detail(db: Session, order: Order) -> OrderResponse:
+    """เพิ่ม customer_detail (name, point) + items เข้าไปใน order data"""
+    customer = None
+    if order.customer_id:
+        customer = db.query(User).filter(User.user_id == order.customer_id).first()
+    return _order_to_response(order, customer)
+
+
+def get_all_orders(db: Session) -> list[OrderResponse]:
+    """ดึง orders วันนี้ เรียงจากใหม่ → เก่า + customer detail + items (3 queries ไม่ว่ามีกี่ orders)"""
 
     today_start = _get_today_start()
 
     orders = (
         db.query(Order)
+        .options(selectinload(Order.items))
         .filter(Order.created_at >= today_start)
         .order_by(Order.created_at.desc())
         .all()
     )
 
-    return [_enrich_with_customer_detail(db, o) for o in orders]
+    return _orders_to_responses(db, orders)
+
+
+def get_all_orders_sparse(db: Session, fields: tuple[str, ...]) -> list[dict]:
+    """
+    orders วันนี้เฉพาะ fields (ตรวจกับ OrderResponse แล้ว) เรียงจากใหม่ → เก่า
+
+    โหลดเฉพาะคอลัมน์ที่ต้องใช้ (load_only) — items โหลดเมื่อขอ items/eta,
+    customers โหลดเมื่อขอ customer_detail เท่านั้น
+    """
+    wanted = set(fields)
+    columns = {"order_id", "created_at"} | (wanted & set(Order.__table__.columns.keys()))
+    if "eta" in wanted:
+        columns.add("order_status")
+    if "customer_detail" in wanted:
+        columns.add("customer_id")
+
+    query = db.query(Order).options(load_only(*(getattr(Order, name) for name in columns)))
+    if wanted & {"items", "eta"}:
+        query = query.options(selectinload(Order.items))
+    orders = query.filter(Order.created_at >= _get_today_start()).order_by(Order.created_at.desc()).all()
+
+    customers = {}
+    if "customer_detail" in wanted:
+        customers = _load_customers(db, {order.customer_id for order in orders if order.customer_id})
+
+    computed = {
+        "table_ids": lambda order: order.table_ids or [],
+        "eta": lambda order: (eta_service.estimate(order) or {}).get("eta"),
+        "items": lambda order: [_item_to_response(item) for item in order.items],
+        "customer_detail": lambda order: _customer_detail(order, customers.get(order.customer_id)),
+    }
+    return [
+        {
+            name: computed[name](order) if name in computed else getattr(order, name)
+            for name in fields
+        }
+        for order in orders
+    ]
 
 
-def get_order_by_id(db: Session, order_id: int) -> dict:
+def get_order_by_id(db: Session, order_id: int) -> OrderResponse:
     """ดึง order ตาม ID — 404 ถ้าไม่พบ"""
 
     order = db.query(Order).filter(Order.order_id == order_id).first()
@@ -109,10 +266,31 @@ def get_order_by_id(db: Session, order_id: int) -> dict:
     return _enrich_with_customer_detail(db, order)
 
 
-def create_order(db: Session, staff: User, data: OrderCreate) -> dict:
+def get_order_eta(db: Session, user: User, order_id: int) -> dict:
+    """ETA ของ order — 404 ถ้าไม่พบ, 403 ถ้า customer ดู order ของคนอื่น"""
+
+    order = db.query(Order).filter(Order.order_id == order_id).first()
+
+    if not order:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="ไม่พบรายการสั่งซื้อ",
+        )
+    if user.user_role == "customer" and order.customer_id != user.user_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions",
+        )
+
+    estimate = eta_service.estimate(order, db) or {"queue_ahead": None, "prep_seconds": None, "eta": None}
+    return {"order_id": order.order_id, "order_status": order.order_status, **estimate}
+
+
+def create_order(db: Session, staff: User, data: OrderCreate) -> OrderResponse:
     """สร้าง order + items + คำนวณ net_price + table status → full"""
 
     # ตรวจสอบ customer_id (ถ้ามี)
+    customer = None
     if data.customer_id:
         customer = db.query(User).filter(User.user_id == data.customer_id).first()
         if not customer:
@@ -136,7 +314,8 @@ def create_order(db: Session, staff: User, data: OrderCreate) -> dict:
             product_map[item.product_id] = product
         net_price += product_map[item.product_id].price * item.quantity
 
-    # สร้าง order
+    # สร้าง order + items ผ่าน relationship — flush ครั้งเดียวตอน commit
+    # และ new_order.items พร้อมใช้ต่อโดยไม่ต้อง lazy load
     new_order = Order(
         customer_id=data.customer_id,
         staff_id=staff.user_id,
@@ -144,56 +323,318 @@ def create_order(db: Session, staff: User, data: OrderCreate) -> dict:
         table_ids=data.table_ids,
         order_status="pending",
         net_price=net_price,
+        items=[
+            OrderItem(
+                product_id=item.product_id,
+                quantity=item.quantity,
+                sweetness=item.sweetness,
+                milk_type=item.milk_type,
+                product_type=item.product_type,
+                note=item.note,
+            )
+            for item in data.items
+        ],
     )
 
     db.add(new_order)
-    db.flush()  # ให้ได้ order_id ก่อนสร้าง items
-
-    # สร้าง order items
-    for item in data.items:
-        order_item = OrderItem(
-            order_id=new_order.order_id,
-            product_id=item.product_id,
-            quantity=item.quantity,
-            sweetness=item.sweetness,
-            milk_type=item.milk_type,
-            product_type=item.product_type,
-            note=item.note,
-        )
-        db.add(order_item)
 
     # อัปเดต table status → full (เฉพาะ order ที่ผูกกับ table)
+    table_deltas = []
     if data.table_ids:
-        _update_table_statuses(db, data.table_ids, "full")
+        table_deltas = update_table_statuses(db, data.table_ids, "full")
+
+    db.flush()
+    result = _order_to_response(new_order, customer)
+
+    def after_commit():
+        publish_table_changes(table_deltas)
+        if data.table_ids:
+            availability_service.on_order_opened(new_order.order_id, data.table_ids)
+        eta_service.on_order_opened(db, [new_order.order_id])
+        _publish_order(result)
+        _publish_kitchen_queue(db, {item.product_id for item in data.items})
+
+    commit_then(db, after_commit)
+    return result
+
+
+def _batch_error(
+    data: OrderCreate,
+    prices: dict[int, int],
+    customers: dict[int, User],
+    reservation_ids: set[int],
+) -> str | None:
+    """ตรวจ order หนึ่งรายการใน batch — คืนข้อความ error หรือ None ถ้าผ่าน"""
+    if data.customer_id and data.customer_id not in customers:
+        return "ไม่พบข้อมูลลูกค้า"
+    if data.reservation_id and data.reservation_id not in reservation_ids:
+        return "ไม่พบรายการจอง"
+    for item in data.items:
+        if item.product_id not in prices:
+            return f"ไม่พบสินค้า ID {item.product_id}"
+    return None
 
-    db.commit()
-    db.refresh(new_order)
 
-    return _enrich_with_customer_detail(db, new_order)
+def create_orders_batch(db: Session, staff: User, orders: list[OrderCreate]) -> dict:
+    """
+    สร้างหลาย orders ใน transaction เดียว (POS ส่ง orders ที่ค้างไว้ตอน offline)
 
+    ดึง products / customers / reservations ครั้งเดียวทั้ง batch, insert orders และ items
+    แบบ multi-row และเปลี่ยน status โต๊ะทั้งหมดด้วย UPDATE เดียว
+    order ที่อ้างถึงข้อมูลที่ไม่มีอยู่ได้ผล 404 ของตัวเอง ส่วน order อื่นยังถูกสร้างตามปกติ
+    """
 
-def update_order(db: Session, order_id: int, data: OrderUpdate) -> dict:
-    """อัปเดต order status + ถ้า finish_at → table status → empty"""
+    product_ids = {item.product_id for data in orders for item in data.items}
+    prices = dict(
+        db.query(Product.product_id, Product.price).filter(Product.product_id.in_(product_ids)).all()
+    )
 
-    order = db.query(Order).filter(Order.order_id == order_id).first()
+    customer_ids = {data.customer_id for data in orders if data.customer_id}
+    customers = _load_customers(db, customer_ids)
+
+    reservation_ids = {data.reservation_id for data in orders if data.reservation_id}
+    if reservation_ids:
+        reservation_ids = {
+            reservation_id for (reservation_id,) in
+            db.query(Reservation.reservation_id).filter(Reservation.reservation_id.in_(reservation_ids))
+        }
+
+    results: list[dict | None] = [None] * len(orders)
+    accepted: list[tuple[int, OrderCreate]] = []
+    for index, data in enumerate(orders):
+        detail = _batch_error(data, prices, customers, reservation_ids)
+        if detail:
+            results[index] = {"index": index, "status_code": status.HTTP_404_NOT_FOUND, "detail": detail}
+        else:
+            accepted.append((index, data))
 
-    if not order:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="ไม่พบรายการสั่งซื้อ",
-        )
+    if not accepted:
+        return {"created": 0, "failed": len(orders), "results": results}
 
-    # อัปเดต fields ที่ส่งมา
+    # multi-row INSERT ... RETURNING — order_id กลับมาตามลำดับของ rows ที่ส่งไป
+    order_ids = db.execute(
+        insert(Order).returning(Order.order_id, sort_by_parameter_order=True),
+        [
+            {
+                "customer_id": data.customer_id,
+                "staff_id": staff.user_id,
+                "reservation_id": data.reservation_id,
+                "table_ids": data.table_ids,
+                "order_status": "pending",
+                "net_price": sum(prices[item.product_id] * item.quantity for item in data.items),
+            }
+            for _, data in accepted
+        ],
+    ).scalars().all()
+
+    db.execute(
+        insert(OrderItem),
+        [
+            {"order_id": order_id, **item.model_dump()}
+            for order_id, (_, data) in zip(order_ids, accepted)
+            for item in data.items
+        ],
+    )
+
+    # โต๊ะของทุก order ใน batch → full ด้วย UPDATE เดียว
+    table_ids = sorted({table_id for _, data in accepted for table_id in data.table_ids})
+    table_deltas = update_table_statuses(db, table_ids, "full")
+
+    created = {
+        order.order_id: order
+        for order in db.query(Order).options(selectinload(Order.items)).filter(Order.order_id.in_(order_ids))
+    }
+    responses = []
+    for order_id, (index, data) in zip(order_ids, accepted):
+        order = created[order_id]
+        result = _order_to_response(order, customers.get(order.customer_id))
+        responses.append(result)
+        results[index] = {"index": index, "status_code": status.HTTP_201_CREATED, "order": result}
+
+    def after_commit():
+        publish_table_changes(table_deltas)
+        eta_service.on_order_opened(db, order_ids)
+        for order_id, (_, data), result in zip(order_ids, accepted, responses):
+            if data.table_ids:
+                availability_service.on_order_opened(order_id, data.table_ids)
+            _publish_order(result)
+        _publish_kitchen_queue(db, {item.product_id for _, data in accepted for item in data.items})
+
+    commit_then(db, after_commit)
+
+    return {"created": len(accepted), "failed": len(orders) - len(accepted), "results": results}
+
+
+def _transition_error(
+    current: str, new_status: str | None, finished: bool, finish_at: datetime | None
+) -> str | None:
+    """ข้อความ error ถ้าเปลี่ยน order (status current, ปิดแล้วหรือยัง) ตามที่ขอไม่ได้"""
+    allowed = new_status is None or new_status == current or new_status in ORDER_STATUS_TRANSITIONS.get(current, ())
+    if not allowed:
+        return f"ไม่สามารถเปลี่ยนสถานะ order จาก {current} เป็น {new_status} ได้"
+    if finish_at is not None and finished:
+        return "order นี้ปิดไปแล้ว"
+    return None
+
+
+def _update_conditions(new_status: str | None, finish_at: datetime | None) -> list:
+    """เงื่อนไข WHERE ของ UPDATE ที่ state machine อนุญาต — finish_at set ได้ครั้งเดียว (ไม่ปล่อยโต๊ะซ้ำ)"""
+    conditions = []
+    if new_status is not None:
+        conditions.append(Order.order_status.in_(allowed_from_statuses(new_status)))
+    if finish_at is not None:
+        conditions.append(Order.finish_at.is_(None))
+    return conditions
+
+
+def update_order(db: Session, order_id: int, data: OrderUpdate) -> OrderResponse:
+    """
+    อัปเดต order status + ถ้า finish_at → table status → empty
+
+    เปลี่ยนด้วย UPDATE ... WHERE order_status IN (status ที่มาเป็น status ใหม่ได้) ไม่ใช่อ่านแล้วตรวจ
+    request ที่เข้ามาพร้อมกันจึงผ่าน state machine ได้ตามลำดับจริง — ไม่มีแถวถูกอัปเดต → 409
+    """
+
+    values = {}
     if data.order_status is not None:
-        order.order_status = data.order_status
+        values["order_status"] = data.order_status
     if data.finish_at is not None:
-        order.finish_at = data.finish_at
+        values["finish_at"] = data.finish_at
+
+    order = None
+    if values:
+        order = db.execute(
+            update(Order)
+            .where(Order.order_id == order_id, *_update_conditions(data.order_status, data.finish_at))
+            .values(**values)
+            .returning(Order)
+            .execution_options(synchronize_session=False)
+        ).scalar_one_or_none()
+
+    if order is None:
+        current = db.query(Order).filter(Order.order_id == order_id).first()
+        if not current:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="ไม่พบรายการสั่งซื้อ",
+            )
+        if values:
+            db.rollback()
+            detail = _transition_error(
+                current.order_status, data.order_status, current.finish_at is not None, data.finish_at
+            )
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=detail or "order ถูกเปลี่ยนไปพร้อมกัน กรุณาลองใหม่อีกครั้ง",
+            )
+        return _enrich_with_customer_detail(db, current)
 
-        # ถ้า set finish_at + order ผูกกับ table → table status → empty
-        if order.table_ids:
-            _update_table_statuses(db, order.table_ids, "empty")
+    # ถ้า set finish_at + order ผูกกับ table → table status → empty
+    table_deltas = []
+    if data.finish_at is not None and order.table_ids:
+        table_deltas = update_table_statuses(db, order.table_ids, "empty")
 
     db.commit()
-    db.refresh(order)
 
-    return _enrich_with_customer_detail(db, order)
+    publish_table_changes(table_deltas)
+    if data.finish_at is not None:
+        availability_service.on_order_closed(order.order_id)
+    if table_deltas:
+        waitlist_service.on_tables_released(db, order.table_ids)
+    if order.order_status not in OPEN_ORDER_STATUSES:
+        # order ที่ไม่อยู่ในคิวครัวอยู่แล้วจะถูกข้าม
+        eta_service.on_order_closed(db, [order])
+
+    result = _enrich_with_customer_detail(db, order)
+    _publish_order(result)
+    if data.order_status is not None:
+        _publish_kitchen_queue(db, {item.product_id for item in order.items})
+
+    return result
+
+
+def update_orders_bulk(db: Session, data: OrderBulkUpdate) -> dict:
+    """
+    เปลี่ยน status หลาย orders ใน transaction เดียว (เช่น ครัวกด "เสร็จ" ทั้งรอบ)
+
+    UPDATE เดียวเฉพาะ orders ที่ state machine อนุญาต (WHERE order_status IN ...)
+    ถ้าส่ง finish_at มา → โต๊ะของทุก order ที่เปลี่ยนได้ → empty ด้วย UPDATE เดียว (order ที่ปิดแล้วได้ 409)
+    order_id ที่ไม่มีอยู่ได้ 404, ที่เปลี่ยนไม่ได้ได้ 409 — order อื่นยังถูกอัปเดตตามปกติ
+    """
+
+    order_ids = list(dict.fromkeys(data.order_ids))
+    values = {"order_status": data.order_status}
+    if data.finish_at is not None:
+        values["finish_at"] = data.finish_at
+
+    rows = db.execute(
+        update(Order)
+        .where(Order.order_id.in_(order_ids), *_update_conditions(data.order_status, data.finish_at))
+        .values(**values)
+        .returning(Order.order_id, Order.table_ids)
+        .execution_options(synchronize_session=False)
+    ).all()
+    updated = {row.order_id: row.table_ids or [] for row in rows}
+
+    # order ที่ไม่ถูกอัปเดต → ดู status ปัจจุบันเพื่อแยก 404 / 409
+    skipped = [order_id for order_id in order_ids if order_id not in updated]
+    current = {}
+    if skipped:
+        current = {
+            row.order_id: row
+            for row in db.query(Order.order_id, Order.order_status, Order.finish_at).filter(Order.order_id.in_(skipped))
+        }
+
+    table_deltas = []
+    if data.finish_at is not None:
+        table_ids = sorted({table_id for ids in updated.values() for table_id in ids})
+        table_deltas = update_table_statuses(db, table_ids, "empty")
+
+    db.commit()
+
+    publish_table_changes(table_deltas)
+    if data.finish_at is not None:
+        for order_id in updated:
+            availability_service.on_order_closed(order_id)
+        for table_ids in updated.values():
+            if table_ids:
+                waitlist_service.on_tables_released(db, table_ids)
+
+    orders = {}
+    if updated:
+        orders = {
+            order.order_id: order
+            for order in db.query(Order).options(selectinload(Order.items)).filter(Order.order_id.in_(updated))
+        }
+    customers = _load_customers(db, {order.customer_id for order in orders.values() if order.customer_id})
+    if data.order_status not in OPEN_ORDER_STATUSES:
+        eta_service.on_order_closed(db, orders.values())
+
+    results = []
+    for order_id in order_ids:
+        if order_id in orders:
+            order = orders[order_id]
+            result = _order_to_response(order, customers.get(order.customer_id))
+            _publish_order(result)
+            results.append({"order_id": order_id, "status_code": status.HTTP_200_OK, "order": result})
+        elif order_id in current:
+            results.append({
+                "order_id": order_id,
+                "status_code": status.HTTP_409_CONFLICT,
+                "detail": _transition_error(
+                    current[order_id].order_status,
+                    data.order_status,
+                    current[order_id].finish_at is not None,
+                    data.finish_at,
+                ),
+            })
+        else:
+            results.append({
+                "order_id": order_id,
+                "status_code": status.HTTP_404_NOT_FOUND,
+                "detail": "ไม่พบรายการสั่งซื้อ",
+            })
+
+    _publish_kitchen_queue(db, {item.product_id for order in orders.values() for item in order.items})
+
+    return {"updated": len(orders), "failed": len(order_ids) - len(orders), "results": results}
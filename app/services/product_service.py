@@ -3,24 +3,88 @@ Product Service
 
 Business logic สำหรับ products endpoints
 - get_all_products: ดึงเมนูทั้งหมด
+- get_all_products_sparse: ดึงเมนูทั้งหมดเฉพาะคอลัมน์ที่ขอ (?fields=)
 - get_product_by_id: ดึงเมนูเดี่ยว (404 ถ้าไม่พบ)
 - create_product: เพิ่มเมนูใหม่
 - update_product: แก้ไขเมนู
 - delete_product: ลบเมนู
+- import_products: bulk upsert ตามชื่อจาก CSV / JSON lines (COPY → staging → INSERT ... ON CONFLICT)
+- export_products: stream เมนูทั้งหมดเป็น CSV / JSON lines (format เดียวกับ import)
+- menu_cache: cache ของ GET /products/ — ล้างครั้งเดียวต่อการเขียนหนึ่งครั้ง
 """
 
+import csv
+import io
+import json
+from collections.abc import Iterator
+
 from fastapi import HTTPException, status
+from psycopg2 import errorcodes
+from pydantic import ValidationError
+from sqlalchemy import Column, Integer, MetaData, String, Table, literal_column, select, tuple_
+from sqlalchemy.dialects.postgresql import ARRAY, insert
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
+from app.config.settings import settings
+from app.core.cache import TTLCache
+from app.core.fields import select_rows
 from app.models.product import Product
 from app.schemas.product import ProductCreate, ProductUpdate
 
+# cache ของ GET /products/ (key ตาม role variant) — ต่อ worker process
+menu_cache = TTLCache("products.menu", ttl_seconds=settings.MENU_CACHE_TTL_SECONDS)
+
+# คอลัมน์ของไฟล์ import/export — list fields ใน CSV คั่นด้วย "|"
+IMPORT_COLUMNS = ("product_name", "price", "sweetness_options", "milk_type_options", "type_options", "image")
+LIST_COLUMNS = ("sweetness_options", "milk_type_options", "type_options")
+LIST_SEPARATOR = "|"
+
+# staging table ชั่วคราวต่อ transaction (ON COMMIT DROP) สำหรับ COPY
+_staging = Table(
+    "product_import",
+    MetaData(),
+    Column("product_name", String(255)),
+    Column("price", Integer),
+    Column("sweetness_options", ARRAY(String)),
+    Column("milk_type_options", ARRAY(String)),
+    Column("type_options", ARRAY(String)),
+    Column("image", String(255)),
+    prefixes=["TEMPORARY"],
+    postgresql_on_commit="DROP",
+)
+
+
+def _duplicate_name(e: IntegrityError) -> HTTPException | None:
+    """unique violation ของ product_name → 409"""
+    if getattr(e.orig, "pgcode", None) == errorcodes.UNIQUE_VIOLATION:
+        return HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="มีเมนูชื่อนี้อยู่แล้ว",
+        )
+    return None
+
+
+def _commit_product(db: Session):
+    """commit การเขียนเมนู — ชื่อซ้ำ → 409"""
+    try:
+        db.commit()
+    except IntegrityError as e:
+        db.rollback()
+        raise _duplicate_name(e) or e
+
 
 def get_all_products(db: Session) -> list[Product]:
     """ดึง products ทั้งหมด"""
     return db.query(Product).all()
 
 
+def get_all_products_sparse(db: Session, fields: tuple[str, ...]) -> list[dict]:
+    """ดึง products ทั้งหมดเฉพาะคอลัมน์ fields"""
+    return select_rows(db, Product, fields)
+
+
 def get_product_by_id(db: Session, product_id: int) -> Product:
     """ดึง product ตาม ID — 404 ถ้าไม่พบ"""
 
@@ -47,8 +111,8 @@ def create_product(db: Session, data: ProductCreate) -> Product:
     )
 
     db.add(new_product)
-    db.commit()
-    db.refresh(new_product)
+    _commit_product(db)
+    menu_cache.invalidate()
 
     return new_product
 
@@ -72,8 +136,8 @@ def update_product(db: Session, product_id: int, data: ProductUpdate) -> Product
     if data.image is not None:
         product.image = data.image
 
-    db.commit()
-    db.refresh(product)
+    _commit_product(db)
+    menu_cache.invalidate()
 
     return product
 
@@ -85,5 +149,170 @@ def delete_product(db: Session, product_id: int) -> dict:
 
     db.delete(product)
     db.commit()
+    menu_cache.invalidate()
 
     return {"message": f"ลบสินค้า '{product.product_name}' สำเร็จ"}
+
+
+def _parse_rows(content: bytes, fmt: str) -> Iterator[tuple[int, dict | None]]:
+    """แยกไฟล์เป็น (เลขบรรทัด, ข้อมูลดิบ) — None ถ้าบรรทัดนั้นอ่านไม่ได้"""
+    text = content.decode("utf-8-sig")
+
+    if fmt == "csv":
+        reader = csv.DictReader(io.StringIO(text))
+        for row in reader:
+            data = {key: value for key, value in row.items() if key in IMPORT_COLUMNS}
+            for column in LIST_COLUMNS:
+                values = (data.get(column) or "").split(LIST_SEPARATOR)
+                data[column] = [v.strip() for v in values if v.strip()]
+            data["image"] = data.get("image") or None
+            yield reader.line_num, data
+        return
+
+    for line_no, line in enumerate(text.splitlines(), start=1):
+        if not line.strip():
+            continue
+        try:
+            data = json.loads(line)
+        except json.JSONDecodeError:
+            data = None
+        yield line_no, data if isinstance(data, dict) else None
+
+
+def _validate_rows(content: bytes, fmt: str) -> list[ProductCreate]:
+    """validate ทุกแถวด้วย ProductCreate — มีแถวผิดแม้แถวเดียว → 422 พร้อม error ต่อบรรทัด"""
+    products: list[ProductCreate] = []
+    errors: list[dict] = []
+    seen: dict[str, int] = {}
+
+    for line_no, data in _parse_rows(content, fmt):
+        if data is None:
+            errors.append({"loc": ["line", line_no], "msg": "อ่านข้อมูลบรรทัดนี้ไม่ได้", "type": "parse_error"})
+            continue
+        try:
+            product = ProductCreate.model_validate(data)
+        except ValidationError as e:
+            errors.extend(
+                {"loc": ["line", line_no, *err["loc"]], "msg": err["msg"], "type": err["type"]}
+                for err in e.errors(include_url=False, include_input=False)
+            )
+            continue
+        if product.product_name in seen:
+            errors.append({
+                "loc": ["line", line_no, "product_name"],
+                "msg": f"ชื่อเมนูซ้ำกับบรรทัด {seen[product.product_name]}",
+                "type": "duplicate",
+            })
+            continue
+        seen[product.product_name] = line_no
+        products.append(product)
+
+    if len(products) + len(errors) > settings.PRODUCT_IMPORT_MAX_ROWS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"import ได้ไม่เกิน {settings.PRODUCT_IMPORT_MAX_ROWS} รายการต่อครั้ง",
+        )
+    if errors:
+        raise HTTPException(status_code=422, detail=errors[:100])
+    if not products:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="ไม่พบข้อมูลเมนูในไฟล์",
+        )
+    return products
+
+
+def _pg_array(values: list[str] | None) -> str:
+    """list → array literal ของ PostgreSQL สำหรับ COPY"""
+    escaped = (v.replace("\\", "\\\\").replace('"', '\\"') for v in values or [])
+    return "{" + ",".join(f'"{v}"' for v in escaped) + "}"
+
+
+def _copy_to_staging(db: Session, products: list[ProductCreate]):
+    """สร้าง staging table แล้ว COPY ทุกแถวเข้าไปในครั้งเดียว"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for p in products:
+        writer.writerow([
+            p.product_name,
+            p.price,
+            _pg_array(p.sweetness_options),
+            _pg_array(p.milk_type_options),
+            _pg_array(p.type_options),
+            p.image or None,  # ช่องว่างใน COPY csv = NULL
+        ])
+    buffer.seek(0)
+
+    connection = db.connection()
+    _staging.create(connection)
+    cursor = connection.connection.cursor()
+    cursor.copy_expert(
+        f"COPY {_staging.name} ({', '.join(IMPORT_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+        buffer,
+    )
+
+
+def import_products(db: Session, content: bytes, fmt: str) -> dict:
+    """
+    bulk upsert เมนูตามชื่อ — ทั้งไฟล์สำเร็จหรือไม่เขียนเลย
+
+    COPY เข้า staging table แล้ว INSERT ... ON CONFLICT (product_name) ครั้งเดียว
+    แถวที่ข้อมูลไม่เปลี่ยนไม่ถูก UPDATE (นับเป็น unchanged) และล้าง menu cache ครั้งเดียวหลัง commit
+    """
+    products = _validate_rows(content, fmt)
+    _copy_to_staging(db, products)
+
+    stmt = insert(Product).from_select(IMPORT_COLUMNS, select(*_staging.columns))
+    updatable = [c for c in IMPORT_COLUMNS if c != "product_name"]
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Product.product_name],
+        set_={c: stmt.excluded[c] for c in updatable},
+        where=tuple_(*(Product.__table__.c[c] for c in updatable)).is_distinct_from(
+            tuple_(*(stmt.excluded[c] for c in updatable))
+        ),
+    ).returning(
+        Product.product_id,
+        Product.product_name,
+        # xmax = 0 → แถวใหม่จาก INSERT, ไม่ใช่ 0 → แถวเดิมที่ถูก UPDATE
+        literal_column("products.xmax = 0").label("inserted"),
+    )
+    rows = db.execute(stmt).all()
+    db.commit()
+
+    if rows:
+        menu_cache.invalidate()
+
+    created = [{"product_id": r.product_id, "product_name": r.product_name} for r in rows if r.inserted]
+    updated = [{"product_id": r.product_id, "product_name": r.product_name} for r in rows if not r.inserted]
+    return {
+        "total": len(products),
+        "created": created,
+        "updated": updated,
+        "unchanged": len(products) - len(rows),
+    }
+
+
+def export_products(bind: Engine, fmt: str) -> Iterator[str]:
+    """
+    stream เมนูทั้งหมดตาม format ของ import (server-side cursor ทีละชุด)
+
+    เปิด connection ของตัวเองจาก engine เพราะ generator ทำงานหลัง route คืนค่าไปแล้ว
+    """
+    columns = [Product.__table__.c[c] for c in IMPORT_COLUMNS]
+    if fmt == "csv":
+        yield ",".join(IMPORT_COLUMNS) + "\r\n"
+
+    with bind.connect() as connection:
+        result = connection.execution_options(stream_results=True, yield_per=500).execute(
+            select(*columns).order_by(Product.product_id)
+        )
+        for row in result:
+            data = row._asdict()
+            if fmt == "csv":
+                for column in LIST_COLUMNS:
+                    data[column] = LIST_SEPARATOR.join(data[column] or [])
+                buffer = io.StringIO()
+                csv.writer(buffer).writerow([data[c] for c in IMPORT_COLUMNS])
+                yield buffer.getvalue()
+            else:
+                yield json.dumps(data, ensure_ascii=False) + "\n"
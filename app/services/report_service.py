@@ -0,0 +1,166 @@
+"""
+Report Service
+
+Business logic สำหรับ reports endpoints
+- close_day: ปิดยอดวันทำการ → สร้าง snapshot (DailyReport) ครั้งเดียว แล้วคืน snapshot เดิมทุกครั้งหลังจากนั้น
+- get_daily_report: ดึง snapshot ตามวันที่ (lookup ด้วย primary key)
+
+ยอดทุกมิติ (ทั้งวัน / status / staff / เมนู / ชั่วโมง) คำนวณด้วย query เดียวแบบ GROUPING SETS
+วันทำการและชั่วโมงนับตามเวลา UTC เหมือน created_at (naive UTC) — นาฬิกาเดียวกับ utcnow()
+"""
+
+from datetime import date, datetime, time, timedelta
+
+from fastapi import HTTPException, status
+from sqlalchemy import Integer, cast, distinct, extract, func, select, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.models.base import utcnow
+from app.models.order import Order, OrderItem
+from app.models.product import Product
+from app.models.report import DailyReport
+from app.models.user import User
+
+# ค่า grouping(order_status, staff_id, product_id, hour) ของแต่ละ grouping set
+# (bit = 1 คือคอลัมน์ที่ไม่ได้อยู่ใน set นั้น, คอลัมน์แรกเป็น bit สูงสุด)
+_GROUP_TOTAL = 0b1111
+_GROUP_STATUS = 0b0111
+_GROUP_STAFF = 0b1011
+_GROUP_PRODUCT = 0b1101
+_GROUP_HOUR = 0b1110
+
+
+def _aggregate_day(db: Session, business_date: date) -> dict:
+    """
+    รวมยอดของ orders ที่สร้างในวันทำการนั้น (00:00-24:00 UTC) ด้วย query เดียว
+
+    join order_items ทำให้ 1 order กลายเป็นหลายแถว → ยอดระดับ order (จำนวน order, net_price)
+    นับเฉพาะแถวแรกของแต่ละ order (row_number() = 1) ไม่ให้นับซ้ำตามจำนวน items
+    revenue และจำนวนที่ขายได้ไม่รวม order ที่ cancelled
+    """
+    day_start = datetime.combine(business_date, time.min)
+    rows = (
+        select(
+            Order.order_id,
+            Order.order_status,
+            Order.staff_id,
+            Order.net_price,
+            cast(extract("hour", Order.created_at), Integer).label("hour"),
+            OrderItem.product_id,
+            Product.product_name,
+            OrderItem.quantity,
+            func.row_number().over(partition_by=Order.order_id, order_by=OrderItem.id).label("rn"),
+        )
+        .outerjoin(OrderItem, OrderItem.order_id == Order.order_id)
+        .outerjoin(Product, Product.product_id == OrderItem.product_id)
+        .where(Order.created_at >= day_start, Order.created_at < day_start + timedelta(days=1))
+        .subquery()
+    )
+
+    first_row = rows.c.rn == 1
+    sold = rows.c.order_status != "cancelled"
+    query = (
+        select(
+            func.grouping(rows.c.order_status, rows.c.staff_id, rows.c.product_id, rows.c.hour).label("grouping"),
+            rows.c.order_status,
+            rows.c.staff_id,
+            rows.c.product_id,
+            rows.c.product_name,
+            rows.c.hour,
+            func.count().filter(first_row).label("orders"),
+            func.coalesce(func.sum(rows.c.net_price).filter(first_row & sold), 0).label("revenue"),
+            func.coalesce(func.sum(rows.c.quantity).filter(sold), 0).label("quantity"),
+            func.count(distinct(rows.c.order_id)).filter(sold).label("product_orders"),
+        )
+        .group_by(
+            func.grouping_sets(
+                tuple_(),
+                tuple_(rows.c.order_status),
+                tuple_(rows.c.staff_id),
+                tuple_(rows.c.product_id, rows.c.product_name),
+                tuple_(rows.c.hour),
+            )
+        )
+    )
+
+    report = {
+        "order_count": 0,
+        "revenue": 0,
+        "item_count": 0,
+        "by_status": [],
+        "by_staff": [],
+        "by_product": [],
+        "by_hour": [],
+    }
+    for row in db.execute(query):
+        if row.grouping == _GROUP_TOTAL:
+            report.update(order_count=row.orders, revenue=row.revenue, item_count=row.quantity)
+        elif row.grouping == _GROUP_STATUS:
+            report["by_status"].append(
+                {"order_status": row.order_status, "orders": row.orders, "revenue": row.revenue}
+            )
+        elif row.grouping == _GROUP_STAFF:
+            report["by_staff"].append(
+                {"staff_id": row.staff_id, "orders": row.orders, "revenue": row.revenue}
+            )
+        elif row.grouping == _GROUP_PRODUCT and row.product_id is not None and row.quantity:
+            report["by_product"].append({
+                "product_id": row.product_id,
+                "product_name": row.product_name,
+                "quantity": row.quantity,
+                "orders": row.product_orders,
+            })
+        elif row.grouping == _GROUP_HOUR:
+            report["by_hour"].append({"hour": row.hour, "orders": row.orders, "revenue": row.revenue})
+
+    report["by_status"].sort(key=lambda r: r["order_status"])
+    report["by_staff"].sort(key=lambda r: r["staff_id"])
+    report["by_product"].sort(key=lambda r: (-r["quantity"], r["product_id"]))
+    report["by_hour"].sort(key=lambda r: r["hour"])
+    return report
+
+
+def get_daily_report(db: Session, business_date: date) -> DailyReport:
+    """ดึง snapshot ของวันที่ปิดยอดแล้ว — 404 ถ้ายังไม่ปิด"""
+    report = db.get(DailyReport, business_date)
+    if not report:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="ยังไม่ได้ปิดยอดของวันนี้",
+        )
+    return report
+
+
+def close_day(db: Session, staff: User, business_date: date | None) -> tuple[DailyReport, bool]:
+    """
+    ปิดยอดวันทำการ (ไม่ระบุ = เมื่อวาน) — คืน (snapshot, True ถ้าเพิ่งสร้าง)
+
+    ปิดได้เฉพาะวันที่จบแล้ว (ก่อนวันนี้ตาม UTC) — วันที่ยังไม่จบจะได้ snapshot ของแค่บางส่วนของวัน
+    snapshot ไม่ถูกแก้ไขหลังสร้าง: ปิดยอดวันเดิมซ้ำได้ snapshot เดิมโดยไม่คำนวณใหม่
+    ถ้าปิดพร้อมกัน 2 request → INSERT ... ON CONFLICT DO NOTHING ให้ request แรกชนะ
+    """
+    today = utcnow().date()
+    business_date = business_date or today - timedelta(days=1)
+    if business_date >= today:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="ปิดยอดได้เฉพาะวันที่จบไปแล้ว",
+        )
+
+    existing = db.get(DailyReport, business_date)
+    if existing:
+        return existing, False
+
+    totals = _aggregate_day(db, business_date)
+    report = db.scalars(
+        insert(DailyReport)
+        .values(business_date=business_date, closed_by=staff.user_id, **totals)
+        .on_conflict_do_nothing(index_elements=[DailyReport.business_date])
+        .returning(DailyReport)
+    ).first()
+    db.commit()
+
+    if report is None:
+        return get_daily_report(db, business_date), False
+    return report, True
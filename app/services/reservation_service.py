@@ -2,22 +2,37 @@
 Reservation Service
 
 Business logic สำหรับ reservations endpoints
-- get_all_reservations: ดึงรายการจองวันนี้ + customer detail
+- get_all_reservations: ดึงรายการจองวันนี้ + customer detail (สร้าง ReservationResponse ตรง ๆ, customers query เดียว)
+- get_all_reservations_sparse: รายการจองวันนี้เฉพาะ field ที่ขอ (?fields=) — ไม่ดึง customers ถ้าไม่ได้ขอ
 - get_reservation_by_id: ดึงรายการจองตาม ID
 - get_reservation_by_user: ดึงรายการจองของ user วันนี้
-- create_reservation: สร้างการจอง + อัปเดต table status → onHold
+- get_calendar: รายการจองตาม reservation_time แบ่งเป็นรายวัน (cache ต่อวัน)
+- create_reservation: สร้างการจอง + จองช่วงเวลาโต๊ะ (409 ถ้าซ้อน) + table status → onHold
+  ไม่ระบุ table_ids → เลือกชุดโต๊ะว่างที่เสียที่นั่งน้อยที่สุดให้อัตโนมัติ
 - update_reservation: อัปเดต status + table status ตาม flow
+- expire_stale_holds: pending ที่ค้างเกิน TTL → expired + ปล่อยโต๊ะ (เรียกจาก hold sweeper)
 """
 
-from datetime import datetime, time
+from datetime import date, datetime, time, timedelta
 
 from fastapi import HTTPException, status
+from psycopg2 import errorcodes
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.dialects.postgresql import Range
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
-from app.models.reservation import Reservation
+from app.config.settings import settings
+from app.core import metrics
+from app.core.cache import TTLCache
+from app.core.transaction import commit_then
+from app.models.base import naive_utc
+from app.models.reservation import Reservation, ReservationTable
 from app.models.table import Table
 from app.models.user import User
-from app.schemas.reservation import ReservationCreate, ReservationUpdate
+from app.schemas.reservation import CustomerDetail, ReservationCreate, ReservationResponse, ReservationUpdate
+from app.services import availability_service
+from app.services.table_service import publish_table_changes, table_events, update_table_statuses
 
 
 # Table status mapping ตาม reservation_status (อ้างอิง Node.js ต้นฉบับ)
@@ -25,8 +40,18 @@ TABLE_STATUS_MAP = {
     "accepted": "reserved",
     "arrive": "full",
     "cancel": "empty",
+    "expired": "empty",
 }
 
+# status ที่จบแล้ว → คืนช่วงเวลาของโต๊ะให้จองใหม่ได้
+RELEASED_STATUSES = {"cancel", "finish", "expired"}
+
+# cache ของ GET /reservations/calendar (key = วันที่ ISO) — ล้างเฉพาะวันที่มีการเขียน
+calendar_cache = TTLCache("reservations.calendar", ttl_seconds=settings.RESERVATION_CALENDAR_CACHE_TTL_SECONDS)
+
+# key ของ advisory lock — ให้ sweep ได้ทีละ worker
+HOLD_SWEEP_LOCK_ID = 0x63616665
+
 
 def _get_today_start() -> datetime:
     """คืน datetime ของจุดเริ่มต้นวันนี้ (00:00:00)"""
@@ -34,49 +59,66 @@ def _get_today_start() -> datetime:
     return datetime.combine(now.date(), time.min)
 
 
-def _enrich_with_customer_detail(db: Session, reservation: Reservation) -> dict:
-    """เพิ่ม customer_detail (name, tel) เข้าไปใน reservation data"""
-    data = {
-        "reservation_id": reservation.reservation_id,
-        "customer_id": reservation.customer_id,
-        "staff_id": reservation.staff_id,
-        "table_ids": reservation.table_ids,
-        "capacity": reservation.capacity,
-        "reservation_time": reservation.reservation_time,
-        "customer_amount": reservation.customer_amount,
-        "reservation_detail": reservation.reservation_detail,
-        "cancel_detail": reservation.cancel_detail,
-        "reservation_status": reservation.reservation_status,
-        "response_at": reservation.response_at,
-        "finish_at": reservation.finish_at,
-        "created_at": reservation.created_at,
-    }
+def _reservation_to_response(reservation: Reservation, customer: User | None) -> ReservationResponse:
+    """
+    แปลง reservation + customer_detail (name, tel) เป็น ReservationResponse
+
+    ข้อมูลมาจาก DB จึงสร้างด้วย model_construct โดยไม่ validate ซ้ำ
+    — field ใหม่ใน ReservationResponse ต้องเพิ่มที่นี่ด้วย
+    """
+    return ReservationResponse.model_construct(
+        reservation_id=reservation.reservation_id,
+        customer_id=reservation.customer_id,
+        staff_id=reservation.staff_id,
+        table_ids=reservation.table_ids,
+        capacity=reservation.capacity,
+        reservation_time=reservation.reservation_time,
+        duration_minutes=reservation.duration_minutes,
+        customer_amount=reservation.customer_amount,
+        reservation_detail=reservation.reservation_detail,
+        cancel_detail=reservation.cancel_detail,
+        reservation_status=reservation.reservation_status,
+        response_at=reservation.response_at,
+        finish_at=reservation.finish_at,
+        created_at=reservation.created_at,
+        updated_seq=reservation.updated_seq,
+        customer_detail=_customer_detail(customer),
+    )
+
+
+def _customer_detail(customer: User | None) -> CustomerDetail:
+    return CustomerDetail.model_construct(
+        customer_name=(customer.name or "-") if customer else "-",
+        customer_tel=(customer.tel or "-") if customer else "-",
+    )
 
-    customer = db.query(User).filter(User.user_id == reservation.customer_id).first()
-    if customer:
-        data["customer_detail"] = {
-            "customer_name": customer.name or "-",
-            "customer_tel": customer.tel or "-",
-        }
-    else:
-        data["customer_detail"] = {
-            "customer_name": "-",
-            "customer_tel": "-",
-        }
 
-    return data
+def _load_customers(db: Session, customer_ids: set[int]) -> dict[int, User]:
+    """customers ของหลาย reservations ด้วย query เดียว"""
+    if not customer_ids:
+        return {}
+    return {u.user_id: u for u in db.query(User).filter(User.user_id.in_(customer_ids))}
 
 
-def _update_table_statuses(db: Session, table_ids: list[int], new_status: str):
-    """อัปเดต status ของหลาย tables พร้อมกัน"""
-    for table_id in table_ids:
-        table = db.query(Table).filter(Table.table_id == table_id).first()
-        if table:
-            table.status = new_status
+def _reservations_to_responses(db: Session, reservations: list[Reservation]) -> list[ReservationResponse]:
+    """แปลงหลาย reservations เป็น ReservationResponse — ดึง customers ทั้งหมดครั้งเดียว"""
+    customers = _load_customers(db, {r.customer_id for r in reservations})
+    return [_reservation_to_response(r, customers.get(r.customer_id)) for r in reservations]
 
 
-def get_all_reservations(db: Session) -> list[dict]:
-    """ดึง reservations วันนี้ เรียงจากใหม่ → เก่า + customer detail"""
+def _enrich_with_customer_detail(db: Session, reservation: Reservation) -> ReservationResponse:
+    """เพิ่ม customer_detail (name, tel) เข้าไปใน reservation data"""
+    customer = db.query(User).filter(User.user_id == reservation.customer_id).first()
+    return _reservation_to_response(reservation, customer)
+
+
+def _calendar_key(value: datetime) -> str:
+    """key ของ calendar_cache — วันที่ของ reservation_time"""
+    return value.date().isoformat()
+
+
+def get_all_reservations(db: Session) -> list[ReservationResponse]:
+    """ดึง reservations วันนี้ เรียงจากใหม่ → เก่า + customer detail (2 queries ไม่ว่ามีกี่รายการ)"""
 
     today_start = _get_today_start()
 
@@ -87,10 +129,39 @@ def get_all_reservations(db: Session) -> list[dict]:
         .all()
     )
 
-    return [_enrich_with_customer_detail(db, r) for r in reservations]
+    return _reservations_to_responses(db, reservations)
+
+
+def get_all_reservations_sparse(db: Session, fields: tuple[str, ...]) -> list[dict]:
+    """
+    reservations วันนี้เฉพาะ fields (ตรวจกับ ReservationResponse แล้ว) เรียงจากใหม่ → เก่า
+
+    SELECT เฉพาะคอลัมน์ที่ขอ — customers ดึงเมื่อขอ customer_detail เท่านั้น
+    """
+    names = [name for name in fields if name != "customer_detail"]
+    if "customer_detail" in fields and "customer_id" not in names:
+        names.append("customer_id")
+
+    rows = db.execute(
+        select(*(getattr(Reservation, name) for name in names))
+        .where(Reservation.created_at >= _get_today_start())
+        .order_by(Reservation.created_at.desc())
+    ).all()
+
+    customers = {}
+    if "customer_detail" in fields:
+        customers = _load_customers(db, {row.customer_id for row in rows})
+    return [
+        {
+            name: _customer_detail(customers.get(row.customer_id)) if name == "customer_detail"
+            else getattr(row, name)
+            for name in fields
+        }
+        for row in rows
+    ]
 
 
-def get_reservation_by_id(db: Session, reservation_id: int) -> dict:
+def get_reservation_by_id(db: Session, reservation_id: int) -> ReservationResponse:
     """ดึง reservation ตาม ID — 404 ถ้าไม่พบ หรือ finish/cancel"""
 
     reservation = (
@@ -108,7 +179,7 @@ def get_reservation_by_id(db: Session, reservation_id: int) -> dict:
     return _enrich_with_customer_detail(db, reservation)
 
 
-def get_reservation_by_user(db: Session, user_id: int) -> dict | None:
+def get_reservation_by_user(db: Session, user_id: int) -> ReservationResponse | None:
     """ดึง reservation ล่าสุดของ user วันนี้"""
 
     today_start = _get_today_start()
@@ -129,42 +200,128 @@ def get_reservation_by_user(db: Session, user_id: int) -> dict | None:
     return _enrich_with_customer_detail(db, reservation)
 
 
-def create_reservation(db: Session, user: User, data: ReservationCreate) -> dict:
+def _load_calendar_days(db: Session, days: list[str]) -> dict[str, list[ReservationResponse]]:
+    """โหลดการจองของหลายวันด้วย query เดียว (range scan บน ix_reservations_time_status) แล้วแบ่งตามวัน"""
+    dates = [date.fromisoformat(day) for day in days]
+    start = datetime.combine(min(dates), time.min)
+    end = datetime.combine(max(dates) + timedelta(days=1), time.min)
+
+    reservations = (
+        db.query(Reservation)
+        .filter(Reservation.reservation_time >= start, Reservation.reservation_time < end)
+        .order_by(Reservation.reservation_time, Reservation.reservation_id)
+        .all()
+    )
+    buckets: dict[str, list[ReservationResponse]] = {day: [] for day in days}
+    for response in _reservations_to_responses(db, reservations):
+        bucket = buckets.get(_calendar_key(response.reservation_time))
+        if bucket is not None:
+            bucket.append(response)
+    return buckets
+
+
+def get_calendar(db: Session, start: date, end: date) -> list[dict]:
+    """
+    การจองที่ reservation_time อยู่ในช่วง [start, end] (รวมทั้งสองวัน) แบ่งเป็นรายวัน
+
+    ทุกวันในช่วงมีใน response (วันที่ไม่มีการจอง = list ว่าง)
+    วันที่อยู่ใน cache แล้วไม่ต้อง query — วันที่ขาดโหลดรวมกันด้วย query เดียว
+    """
+    if end < start:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="วันที่เริ่มต้นต้องไม่อยู่หลังวันที่สิ้นสุด",
+        )
+    day_count = (end - start).days + 1
+    if day_count > settings.RESERVATION_CALENDAR_MAX_DAYS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"ดูปฏิทินได้ไม่เกิน {settings.RESERVATION_CALENDAR_MAX_DAYS} วันต่อครั้ง",
+        )
+
+    days = [(start + timedelta(days=n)).isoformat() for n in range(day_count)]
+    buckets = calendar_cache.get_many_or_load(days, lambda missing: _load_calendar_days(db, missing))
+    return [{"date": day, "reservations": buckets[day]} for day in days]
+
+
+def create_reservation(db: Session, user: User, data: ReservationCreate) -> ReservationResponse:
     """สร้าง reservation ใหม่ + อัปเดต table status → onHold"""
 
-    # ตรวจสอบว่า table_ids ทั้งหมดมีอยู่จริง
-    for table_id in data.table_ids:
-        table = db.query(Table).filter(Table.table_id == table_id).first()
-        if not table:
+    if data.table_ids:
+        table_ids = list(dict.fromkeys(data.table_ids))
+
+        # ตรวจสอบว่า table_ids ทั้งหมดมีอยู่จริง
+        capacities = dict(
+            db.query(Table.table_id, Table.capacity).filter(Table.table_id.in_(table_ids)).all()
+        )
+        for table_id in table_ids:
+            if table_id not in capacities:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail=f"ไม่พบโต๊ะ ID {table_id}",
+                )
+    else:
+        # จองแบบไม่ระบุโต๊ะ → ให้ optimizer เลือกจากโต๊ะที่ว่างในช่วงเวลานั้น
+        assigned = availability_service.assign_tables(
+            db, data.reservation_time, data.customer_amount, data.duration_minutes
+        )
+        if not assigned:
             raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"ไม่พบโต๊ะ ID {table_id}",
+                status_code=status.HTTP_409_CONFLICT,
+                detail="ไม่มีโต๊ะว่างพอสำหรับจำนวนลูกค้าในช่วงเวลานี้",
             )
+        table_ids = [t["table_id"] for t in assigned]
+        capacities = {t["table_id"]: t["capacity"] for t in assigned}
+
+    # เวลาที่มี timezone → naive UTC (tsrange และ index ของ availability เก็บแบบนี้)
+    start = naive_utc(data.reservation_time)
+    during = Range(start, start + timedelta(minutes=data.duration_minutes), bounds="[)")
 
     new_reservation = Reservation(
         customer_id=user.user_id,
-        table_ids=data.table_ids,
-        capacity=data.capacity,
-        reservation_time=data.reservation_time,
+        table_ids=table_ids,
+        capacity=data.capacity or sum(capacities[table_id] for table_id in table_ids),
+        reservation_time=start,
+        duration_minutes=data.duration_minutes,
         customer_amount=data.customer_amount,
         reservation_detail=data.reservation_detail,
         reservation_status="pending",
+        table_slots=[ReservationTable(table_id=table_id, during=during) for table_id in table_ids],
     )
 
     db.add(new_reservation)
 
+    # ตรวจการจองซ้อนด้วย exclusion constraint (GiST index probe ตอน insert)
+    try:
+        db.flush()
+    except IntegrityError as e:
+        db.rollback()
+        if getattr(e.orig, "pgcode", None) == errorcodes.EXCLUSION_VIOLATION:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="โต๊ะที่เลือกถูกจองในช่วงเวลานี้แล้ว",
+            )
+        raise
+
     # อัปเดต table status → onHold
-    _update_table_statuses(db, data.table_ids, "onHold")
+    table_deltas = update_table_statuses(db, table_ids, "onHold")
 
-    db.commit()
-    db.refresh(new_reservation)
+    result = _enrich_with_customer_detail(db, new_reservation)
+
+    def after_commit():
+        publish_table_changes(table_deltas)
+        availability_service.on_reservation_booked(
+            new_reservation.reservation_id, table_ids, during.lower, during.upper
+        )
+        calendar_cache.invalidate([_calendar_key(new_reservation.reservation_time)])
 
-    return _enrich_with_customer_detail(db, new_reservation)
+    commit_then(db, after_commit)
+    return result
 
 
 def update_reservation(
     db: Session, reservation_id: int, staff: User, data: ReservationUpdate
-) -> dict:
+) -> ReservationResponse:
     """อัปเดต reservation status + table status ตาม flow"""
 
     reservation = (
@@ -190,11 +347,80 @@ def update_reservation(
     if data.cancel_detail is not None:
         reservation.cancel_detail = data.cancel_detail
 
+    # จบการจองแล้ว → ลบช่วงเวลาที่จองไว้ ให้คนอื่นจองโต๊ะช่วงนี้ได้
+    if data.reservation_status in RELEASED_STATUSES:
+        reservation.table_slots.clear()
+
     # อัปเดต table status ตาม flow
     new_table_status = TABLE_STATUS_MAP.get(data.reservation_status, "onHold")
-    _update_table_statuses(db, reservation.table_ids, new_table_status)
+    table_deltas = update_table_statuses(db, reservation.table_ids, new_table_status)
 
     db.commit()
-    db.refresh(reservation)
+
+    publish_table_changes(table_deltas)
+    if data.reservation_status in RELEASED_STATUSES:
+        availability_service.on_reservation_released(reservation.reservation_id)
+    calendar_cache.invalidate([_calendar_key(reservation.reservation_time)])
 
     return _enrich_with_customer_detail(db, reservation)
+
+
+def expire_stale_holds(db: Session, ttl_minutes: int) -> list[int]:
+    """
+    pending ที่สร้างนานกว่า ttl_minutes → expired แล้วปล่อยโต๊ะที่ถูก onHold ไว้ — คืน reservation_ids
+
+    ถือ advisory lock ระดับ transaction: worker อื่นที่ sweep พร้อมกันจะข้ามรอบนี้ไปเลย (ไม่รอ)
+    เปลี่ยน status ด้วย UPDATE ... RETURNING เดียว, ปล่อยโต๊ะด้วย UPDATE เดียว
+    โต๊ะที่ยังถูก pending อื่นถือไว้ หรือเปลี่ยนเป็น status อื่นแล้ว (เช่น full) จะไม่ถูกแตะ
+    """
+    if not db.execute(select(func.pg_try_advisory_xact_lock(HOLD_SWEEP_LOCK_ID))).scalar():
+        db.rollback()
+        metrics.incr("reservations.hold_sweep.skipped")
+        return []
+    metrics.incr("reservations.hold_sweep.runs")
+
+    # created_at เป็นเวลา UTC แบบ naive — คิด cutoff จากนาฬิกาของ DB เป็น UTC เช่นกัน
+    # (ไม่ขึ้นกับนาฬิกา/timezone ของ worker และ session timezone)
+    cutoff = func.timezone("UTC", func.now()) - timedelta(minutes=ttl_minutes)
+    expired = db.execute(
+        update(Reservation)
+        .where(Reservation.reservation_status == "pending", Reservation.created_at < cutoff)
+        .values(reservation_status="expired", cancel_detail="หมดเวลารอยืนยันการจอง")
+        .returning(Reservation.reservation_id, Reservation.table_ids, Reservation.reservation_time)
+        .execution_options(synchronize_session=False)
+    ).all()
+    if not expired:
+        db.commit()
+        return []
+
+    reservation_ids = [row.reservation_id for row in expired]
+    db.execute(
+        delete(ReservationTable)
+        .where(ReservationTable.reservation_id.in_(reservation_ids))
+        .execution_options(synchronize_session=False)
+    )
+
+    table_ids = {table_id for row in expired for table_id in row.table_ids}
+    still_held = set(
+        db.execute(
+            select(func.unnest(Reservation.table_ids))
+            .where(Reservation.reservation_status == "pending", Reservation.table_ids.overlap(list(table_ids)))
+        ).scalars()
+    )
+    table_deltas = update_table_statuses(db, sorted(table_ids - still_held), "empty", only_status="onHold")
+
+    db.commit()
+
+    publish_table_changes(table_deltas)
+    calendar_cache.invalidate({_calendar_key(row.reservation_time) for row in expired})
+    for row in expired:
+        availability_service.on_reservation_released(row.reservation_id)
+        table_events.publish({
+            "type": "reservation_expired",
+            "reservation_id": row.reservation_id,
+            "table_ids": row.table_ids,
+        })
+    metrics.incr("reservations.hold_sweep.expired", len(expired))
+    metrics.incr("reservations.hold_sweep.tables_released", len(table_deltas))
+
+    return reservation_ids
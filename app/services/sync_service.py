@@ -0,0 +1,76 @@
+"""
+Sync Service
+
+Business logic สำหรับ delta sync (POS reconnect)
+- get_changes_since: ดึง orders + reservations ที่เปลี่ยนหลัง cursor พร้อม cursor ใหม่
+- current_watermark: xmin ของ snapshot — transaction ที่ xid น้อยกว่านี้จบหมดแล้ว
+
+cursor คือ xid ของ transaction: "ส่งแถวของทุก transaction ที่ xid < cursor ไปแล้ว"
+ใช้ updated_seq เป็น cursor ไม่ได้ — seq ได้ตอนเขียน ไม่ใช่ตอน commit
+(A ได้ seq 100, B ได้ 101 แล้ว commit ก่อน → client ที่ sync ตอนนั้นได้ cursor 101 และไม่เคยเห็นแถว 100)
+จึงส่งเฉพาะแถวที่ updated_xid < xmin ของ snapshot (transaction ที่ยังไม่จบจะถูกส่งรอบถัดไป)
+แล้วเลื่อน cursor ไปที่ xmin — แถวที่ commit ทีหลังมี xid >= cursor เสมอ
+query วิ่งบน index (updated_xid, updated_seq) ต้นทุนจึงขึ้นกับจำนวนแถวที่เปลี่ยน
+"""
+
+from fastapi import HTTPException, status
+from sqlalchemy import BigInteger, Text, cast, func, select
+from sqlalchemy.orm import Session, selectinload
+
+from app.models.order import Order
+from app.models.reservation import Reservation
+from app.services.order_service import _orders_to_responses
+from app.services.reservation_service import _reservations_to_responses
+
+
+def current_watermark(db: Session) -> int:
+    """xmin ของ snapshot ปัจจุบัน — ทุก transaction ที่ xid < ค่านี้ commit/rollback ไปแล้ว"""
+    xmin = func.pg_snapshot_xmin(func.pg_current_snapshot())
+    return db.execute(select(cast(cast(xmin, Text), BigInteger))).scalar_one()
+
+
+def _changed(db: Session, model, since: int, until: int, limit: int | None) -> list:
+    """แถวที่ since <= updated_xid < until เรียงตาม (xid, seq) — limit + 1 แถวเพื่อรู้ว่ามีต่อไหม"""
+    query = db.query(model).filter(model.updated_xid >= since, model.updated_xid < until)
+    if model is Order:
+        query = query.options(selectinload(Order.items))
+    query = query.order_by(model.updated_xid, model.updated_seq)
+    return query.all() if limit is None else query.limit(limit + 1).all()
+
+
+def get_changes_since(db: Session, since: int, limit: int) -> dict:
+    """
+    ดึง orders + reservations ของ transaction ที่ xid อยู่ใน [since, xmin) พร้อม cursor ใหม่
+
+    ตัดหน้าที่ขอบ transaction เสมอ (แถวของ transaction เดียวกันอยู่หน้าเดียวกัน)
+    transaction ที่ใหญ่กว่า limit จะถูกส่งทั้งก้อนในหน้าเดียว
+    """
+    until = current_watermark(db)
+    if since > until:
+        # cursor ที่ได้จาก server ไม่เกิน xmin เสมอ (และ xmin ไม่ลดลง) — เช่น cursor แบบ updated_seq เดิม
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="cursor ไม่ถูกต้อง — sync ใหม่ตั้งแต่ since=0",
+        )
+
+    orders = _changed(db, Order, since, until, limit)
+    reservations = _changed(db, Reservation, since, until, limit)
+
+    # ตารางที่ได้เกิน limit: แถวของ transaction สุดท้ายที่ดึงมาอาจยังไม่ครบ
+    # → หน้านี้จบก่อน transaction นั้น (ทั้งสองตาราง) ไม่งั้นอีกตารางจะข้ามแถวที่อยู่ระหว่างกลางไป
+    cursor = min([until] + [rows[limit].updated_xid for rows in (orders, reservations) if len(rows) > limit])
+    orders = [o for o in orders if o.updated_xid < cursor]
+    reservations = [r for r in reservations if r.updated_xid < cursor]
+
+    if cursor < until and not orders and not reservations:
+        # transaction แรกใหญ่กว่า limit — ส่งทั้งก้อน
+        orders = _changed(db, Order, cursor, cursor + 1, None)
+        reservations = _changed(db, Reservation, cursor, cursor + 1, None)
+        cursor += 1
+
+    return {
+        "cursor": cursor,
+        "has_more": cursor < until,
+        "orders": _orders_to_responses(db, orders),
+        "reservations": _reservations_to_responses(db, reservations),
+    }
@@ -3,17 +3,89 @@ Table Service
 
 Business logic สำหรับ tables endpoints
 - get_all_tables: ดึงโต๊ะทั้งหมด
+- get_all_tables_sparse: ดึงโต๊ะทั้งหมดเฉพาะคอลัมน์ที่ขอ (?fields=)
 - get_table_by_id: ดึงโต๊ะเดี่ยว (404 ถ้าไม่พบ)
 - create_table: เพิ่มโต๊ะใหม่
-- update_table: แก้ไขโต๊ะ
+- update_table: แก้ไขโต๊ะ (optimistic lock ด้วย version → 409 ถ้าชนกัน)
 - delete_table: ลบโต๊ะ
+- update_table_statuses: เปลี่ยน status หลายโต๊ะด้วย UPDATE เดียว (ใช้ร่วมกับ orders/reservations)
+- publish_table_changes: ส่ง deltas ไปยัง GET /tables/stream หลัง commit
 """
 
 from fastapi import HTTPException, status
+from sqlalchemy import select, update
 from sqlalchemy.orm import Session
+from sqlalchemy.orm.exc import StaleDataError
 
+from app.config.settings import settings
+from app.core.broadcaster import Broadcaster
+from app.core.fields import select_rows
+from app.models.base import utcnow
 from app.models.table import Table
 from app.schemas.table import TableCreate, TableUpdate
+from app.services import availability_service
+
+# Broadcaster กลางของ worker สำหรับ table status events
+table_events = Broadcaster(
+    "tables.stream",
+    max_subscribers=settings.TABLE_STREAM_MAX_SUBSCRIBERS,
+    queue_size=settings.TABLE_STREAM_QUEUE_SIZE,
+)
+
+
+def _table_delta(table) -> dict:
+    """event สำหรับ stream — เฉพาะ fields ที่ front-of-house ต้องใช้ (รับ Table หรือ row ที่มี fields เดียวกัน)"""
+    return {
+        "type": "update",
+        "table_id": table.table_id,
+        "status": table.status,
+        "last_update": table.last_update.isoformat() if table.last_update else None,
+    }
+
+
+def publish_table_changes(deltas: list[dict]):
+    """ส่ง deltas ไปยัง subscribers — เรียกหลัง db.commit() เท่านั้น"""
+    for delta in deltas:
+        table_events.publish(delta)
+
+
+def _version_conflict() -> HTTPException:
+    """409 เมื่อ version ของโต๊ะไม่ตรง (มีคน commit ไปก่อน)"""
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail="ข้อมูลโต๊ะถูกแก้ไขโดยผู้ใช้อื่น กรุณาโหลดข้อมูลใหม่แล้วลองอีกครั้ง",
+    )
+
+
+def update_table_statuses(
+    db: Session, table_ids: list[int], new_status: str, only_status: str | None = None
+) -> list[dict]:
+    """
+    อัปเดต status ของหลาย tables ด้วย UPDATE เดียว — คืน deltas สำหรับ publish หลัง commit
+    ระบุ only_status → เปลี่ยนเฉพาะโต๊ะที่ status ปัจจุบันเป็นค่านั้น
+    """
+    if not table_ids:
+        return []
+
+    # lock แถวด้วย SELECT ... FOR UPDATE เรียงตาม table_id เสมอ
+    # → transaction ที่แตะโต๊ะชุดเดียวกันรอคิวกันแทนที่จะเขียนทับ และไม่ deadlock
+    query = select(Table.table_id).where(Table.table_id.in_(table_ids))
+    if only_status is not None:
+        query = query.where(Table.status == only_status)
+    locked = db.execute(query.order_by(Table.table_id).with_for_update()).scalars().all()
+    if not locked:
+        return []
+
+    # UPDATE เดียวทุกโต๊ะ + เพิ่ม version เอง (bulk UPDATE ไม่ผ่าน version_id_col ของ mapper)
+    # RETURNING ยังอัปเดต object ที่อยู่ใน session ให้ตรงกับ DB ด้วย
+    rows = db.execute(
+        update(Table)
+        .where(Table.table_id.in_(locked))
+        .values(status=new_status, last_update=utcnow(), version=Table.version + 1)
+        .returning(Table.table_id, Table.status, Table.last_update)
+        .execution_options(synchronize_session="fetch")
+    ).all()
+    return [_table_delta(row) for row in sorted(rows, key=lambda row: row.table_id)]
 
 
 def get_all_tables(db: Session) -> list[Table]:
@@ -21,6 +93,11 @@ def get_all_tables(db: Session) -> list[Table]:
     return db.query(Table).all()
 
 
+def get_all_tables_sparse(db: Session, fields: tuple[str, ...]) -> list[dict]:
+    """ดึง tables ทั้งหมดเฉพาะคอลัมน์ fields"""
+    return select_rows(db, Table, fields)
+
+
 def get_table_by_id(db: Session, table_id: int) -> Table:
     """ดึง table ตาม ID — 404 ถ้าไม่พบ"""
 
@@ -41,20 +118,26 @@ def create_table(db: Session, data: TableCreate) -> Table:
         table_number=data.table_number,
         capacity=data.capacity,
         status=data.status,
+        last_update=utcnow(),
     )
 
     db.add(new_table)
     db.commit()
-    db.refresh(new_table)
+
+    publish_table_changes([_table_delta(new_table)])
+    availability_service.invalidate_tables()
 
     return new_table
 
 
 def update_table(db: Session, table_id: int, data: TableUpdate) -> Table:
-    """แก้ไข table — 404 ถ้าไม่พบ"""
+    """แก้ไข table — 404 ถ้าไม่พบ, 409 ถ้า version ไม่ตรง (มีคนแก้ไปก่อน)"""
 
     table = get_table_by_id(db, table_id)
 
+    if data.version is not None and data.version != table.version:
+        raise _version_conflict()
+
     # อัปเดต fields ที่ส่งมา (ไม่ None)
     if data.table_number is not None:
         table.table_number = data.table_number
@@ -62,9 +145,18 @@ def update_table(db: Session, table_id: int, data: TableUpdate) -> Table:
         table.capacity = data.capacity
     if data.status is not None:
         table.status = data.status
+        table.last_update = utcnow()
 
-    db.commit()
-    db.refresh(table)
+    # UPDATE ... WHERE version = :old — ถ้ามีคน commit ไปก่อนจะได้ 0 แถว → StaleDataError
+    try:
+        db.commit()
+    except StaleDataError:
+        db.rollback()
+        raise _version_conflict()
+
+    publish_table_changes([_table_delta(table)])
+    if data.table_number is not None or data.capacity is not None:
+        availability_service.invalidate_tables()
 
     return table
 
@@ -77,4 +169,7 @@ def delete_table(db: Session, table_id: int) -> dict:
     db.delete(table)
     db.commit()
 
+    publish_table_changes([{"type": "delete", "table_id": table_id}])
+    availability_service.invalidate_tables()
+
     return {"message": f"ลบโต๊ะ '{table.table_number}' สำเร็จ"}
@@ -5,6 +5,7 @@ Business logic สำหรับ users endpoints
 - get_user_profile: ดูข้อมูลตัวเอง
 - update_user_profile: แก้ไขข้อมูล (ต้องยืนยัน password)
 - get_all_users: ดูรายการ users ทั้งหมด (admin)
+- get_all_users_sparse: รายการ users เฉพาะคอลัมน์ที่ขอ (?fields=)
 - get_user_by_id: ดูข้อมูล user ตาม ID (admin)
 """
 
@@ -12,6 +13,7 @@ from fastapi import HTTPException, status
 from sqlalchemy.orm import Session
 
 from app.models.user import User
+from app.core.fields import select_rows
 from app.core.security import verify_password, get_password_hash
 from app.schemas.user import UserUpdate
 
@@ -48,7 +50,6 @@ def update_user_profile(db: Session, user: User, data: UserUpdate) -> User:
         user.password = get_password_hash(data.new_password)
 
     db.commit()
-    db.refresh(user)
 
     return user
 
@@ -58,6 +59,11 @@ def get_all_users(db: Session) -> list[User]:
     return db.query(User).all()
 
 
+def get_all_users_sparse(db: Session, fields: tuple[str, ...]) -> list[dict]:
+    """ดึง users ทั้งหมดเฉพาะคอลัมน์ fields (fields ถูกตรวจกับ UserListResponse แล้ว — ไม่มี password)"""
+    return select_rows(db, User, fields)
+
+
 def get_user_by_id(db: Session, user_id: int) -> User:
     """ดึง user ตาม ID — 404 ถ้าไม่พบ (admin only)"""
 
@@ -0,0 +1,320 @@
+"""
+Waitlist Service
+
+Business logic สำหรับคิวรอโต๊ะ (walk-in)
+- join_waitlist: เข้าคิว (customer เข้าได้ทีละคิว, staff/admin เพิ่ม walk-in ได้)
+- get_waitlist: คิวที่ยังรออยู่ทั้งหมดตามลำดับ (staff/admin)
+- get_entry: ดูคิวเดี่ยว + ลำดับ + เวลารอโดยประมาณ
+- leave_waitlist: ออกจากคิว
+- on_tables_released: โต๊ะว่างจาก order ที่จบ → จับคู่กลุ่มที่นั่งพอดีที่สุดให้อัตโนมัติ
+- expire_stale_matches: กลุ่มที่ได้โต๊ะแล้วไม่มานั่งเกิน TTL → no_show ปล่อยโต๊ะ (งานของ sweeper)
+- invalidate_queue: ล้างคิวในหน่วยความจำ (โหลดจาก DB ใหม่ครั้งถัดไป)
+
+คิวในหน่วยความจำ (WaitlistQueue) เป็นสำเนาของแถว waiting ใน DB ต่อ worker
+อัปเดตตามการเขียนใน worker นี้ และโหลดใหม่ทุก WAITLIST_SYNC_SECONDS เพื่อเห็นการเขียนจาก worker อื่น
+การจับคู่ยืนยันกับ DB เสมอ (UPDATE ... WHERE status = 'waiting') จึงไม่จับคู่กลุ่มเดียวกันซ้ำข้าม worker
+"""
+
+import logging
+import threading
+import time as time_module
+from datetime import datetime, timedelta, timezone
+
+from fastapi import HTTPException, status
+from sqlalchemy import any_, exists, func, select, update
+from sqlalchemy.orm import Session
+
+from app.config.settings import settings
+from app.core import metrics
+from app.core.table_optimizer import best_fit
+from app.core.waitlist_queue import WaitlistQueue
+from app.models.reservation import Reservation
+from app.models.table import Table
+from app.models.user import User
+from app.models.waitlist import WaitlistEntry
+from app.schemas.waitlist import WaitlistJoin
+from app.services.table_service import publish_table_changes, table_events, update_table_statuses
+
+logger = logging.getLogger(__name__)
+
+# key ของ advisory lock — ให้ sweep กลุ่มที่ไม่มาได้ทีละ worker
+MATCH_SWEEP_LOCK_ID = 0x63616666
+
+_lock = threading.Lock()
+_queue: tuple[float, WaitlistQueue] | None = None
+
+
+def _arrived_at(created_at: datetime) -> datetime:
+    """เวลาเข้าคิวแบบ naive UTC — object ที่เพิ่งสร้างยังถือค่าที่มี timezone จาก TimestampMixin"""
+    return created_at.replace(tzinfo=None)
+
+
+def _load_queue(db: Session) -> WaitlistQueue:
+    """สร้างคิวจากแถว waiting ทั้งหมด (partial index ix_waitlist_waiting)"""
+    queue = WaitlistQueue()
+    rows = (
+        db.query(WaitlistEntry.entry_id, WaitlistEntry.party_size, WaitlistEntry.created_at)
+        .filter(WaitlistEntry.status == "waiting")
+        .all()
+    )
+    for entry_id, party_size, created_at in rows:
+        queue.add(entry_id, party_size, created_at)
+    return queue
+
+
+def _get_queue(db: Session) -> WaitlistQueue:
+    """คืนคิวในหน่วยความจำ — โหลดใหม่ถ้ายังไม่มีหรือหมดอายุ (อ่าน/เขียนคิวที่ได้ภายใต้ _lock)"""
+    global _queue
+    with _lock:
+        if _queue and time_module.monotonic() - _queue[0] < settings.WAITLIST_SYNC_SECONDS:
+            return _queue[1]
+
+    queue = _load_queue(db)
+    with _lock:
+        _queue = (time_module.monotonic(), queue)
+    return queue
+
+
+def invalidate_queue():
+    """ล้างคิวในหน่วยความจำ"""
+    global _queue
+    with _lock:
+        _queue = None
+
+
+def _entry_to_dict(entry: WaitlistEntry, position: int | None) -> dict:
+    """แปลง entry เป็น dict สำหรับ response (+ ลำดับ และเวลารอโดยประมาณ ถ้ายังรออยู่)"""
+    waiting = entry.status == "waiting" and position is not None
+    return {
+        "entry_id": entry.entry_id,
+        "customer_id": entry.customer_id,
+        "name": entry.name,
+        "party_size": entry.party_size,
+        "status": entry.status,
+        "table_ids": entry.table_ids or [],
+        "created_at": entry.created_at,
+        "matched_at": entry.matched_at,
+        "position": position if waiting else None,
+        "estimated_wait_minutes": position * settings.WAITLIST_MINUTES_PER_PARTY if waiting else None,
+    }
+
+
+def _position(db: Session, entry: WaitlistEntry) -> int | None:
+    """ลำดับของ entry ในคิวของ worker นี้"""
+    queue = _get_queue(db)
+    with _lock:
+        if entry.status == "waiting" and entry.entry_id not in queue:
+            # เข้าคิวจาก worker อื่นหลังโหลดคิวล่าสุด
+            queue.add(entry.entry_id, entry.party_size, _arrived_at(entry.created_at))
+        return queue.position(entry.entry_id)
+
+
+def _get_own_entry(db: Session, user: User, entry_id: int) -> WaitlistEntry:
+    """ดึง entry — 404 ถ้าไม่พบ, 403 ถ้า customer ดูคิวของคนอื่น"""
+    entry = db.query(WaitlistEntry).filter(WaitlistEntry.entry_id == entry_id).first()
+    if not entry:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="ไม่พบคิว",
+        )
+    if user.user_role == "customer" and entry.customer_id != user.user_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions",
+        )
+    return entry
+
+
+def join_waitlist(db: Session, user: User, data: WaitlistJoin) -> dict:
+    """เข้าคิว — customer: คิวของตัวเอง (409 ถ้ารออยู่แล้ว), staff/admin: walk-in ต้องมี name"""
+    if user.user_role == "customer":
+        waiting = (
+            db.query(WaitlistEntry.entry_id)
+            .filter(WaitlistEntry.customer_id == user.user_id, WaitlistEntry.status == "waiting")
+            .first()
+        )
+        if waiting:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="คุณอยู่ในคิวแล้ว",
+            )
+        customer_id, name = user.user_id, data.name or user.name
+    else:
+        if not data.name:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="กรุณาระบุชื่อลูกค้า",
+            )
+        customer_id, name = None, data.name
+
+    entry = WaitlistEntry(customer_id=customer_id, name=name, party_size=data.party_size, status="waiting")
+    db.add(entry)
+    db.commit()
+    metrics.incr("waitlist.joined")
+
+    return _entry_to_dict(entry, _position(db, entry))
+
+
+def get_waitlist(db: Session) -> list[dict]:
+    """คิวที่ยังรออยู่ เรียงตามเวลาที่เข้าคิว"""
+    entries = (
+        db.query(WaitlistEntry)
+        .filter(WaitlistEntry.status == "waiting")
+        .order_by(WaitlistEntry.created_at, WaitlistEntry.entry_id)
+        .all()
+    )
+    return [_entry_to_dict(entry, position) for position, entry in enumerate(entries, start=1)]
+
+
+def get_entry(db: Session, user: User, entry_id: int) -> dict:
+    """ดูคิวเดี่ยว + ลำดับ + เวลารอโดยประมาณ"""
+    entry = _get_own_entry(db, user, entry_id)
+    return _entry_to_dict(entry, _position(db, entry))
+
+
+def leave_waitlist(db: Session, user: User, entry_id: int) -> dict:
+    """ออกจากคิว — 409 ถ้าไม่ได้รออยู่แล้ว (เช่น ได้โต๊ะไปแล้ว)"""
+    entry = _get_own_entry(db, user, entry_id)
+    if entry.status != "waiting":
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="คิวนี้ไม่ได้อยู่ในสถานะรอแล้ว",
+        )
+
+    entry.status = "left"
+    db.commit()
+
+    queue = _get_queue(db)
+    with _lock:
+        queue.remove(entry.entry_id)
+    metrics.incr("waitlist.left")
+
+    return _entry_to_dict(entry, None)
+
+
+def on_tables_released(db: Session, table_ids: list[int]) -> dict | None:
+    """
+    โต๊ะถูกปล่อย (order จบ) → จับคู่กลุ่มที่ใหญ่ที่สุดที่นั่งพอกับโต๊ะที่ว่าง แล้ว hold โต๊ะไว้ให้
+
+    เรียกหลัง commit ของการปล่อยโต๊ะ — หา candidate จากคิวในหน่วยความจำ (O(log n))
+    แล้วยืนยันด้วย UPDATE ... WHERE status = 'waiting' (candidate ที่ออกไปแล้ว/ถูกจับคู่ที่ worker อื่น → ข้าม)
+    คืน entry ที่ถูกจับคู่ หรือ None
+
+    การเขียนของผู้เรียก commit ไปแล้ว — error ระหว่างจับคู่จึงถูก log แล้วคืน None แทนการ raise
+    (โต๊ะยังว่างอยู่ จะถูกจับคู่ครั้งถัดไปที่มีโต๊ะว่าง)
+    """
+    try:
+        return _match_released(db, table_ids)
+    except Exception:
+        db.rollback()
+        metrics.incr("waitlist.match_errors")
+        logger.exception("waitlist matching failed for tables %s", table_ids)
+        return None
+
+
+def _match_released(db: Session, table_ids: list[int]) -> dict | None:
+    """จับคู่โต๊ะที่ว่างใน table_ids กับกลุ่มในคิว (ดู on_tables_released)"""
+    free = tuple(
+        (table_id, capacity)
+        for table_id, capacity in db.query(Table.table_id, Table.capacity)
+        .filter(Table.table_id.in_(table_ids), Table.status == "empty")
+        .order_by(Table.table_id)
+    )
+    if not free:
+        return None
+    capacity = sum(table_capacity for _, table_capacity in free)
+    adjacency = frozenset(settings.TABLE_ADJACENCY) or None
+
+    queue = _get_queue(db)
+    while True:
+        with _lock:
+            entry_id = queue.best_fit(capacity)
+            if entry_id is None:
+                return None
+            party_size, arrived_at = queue.get(entry_id)
+            queue.remove(entry_id)
+
+        chosen = best_fit(free, party_size, adjacency)
+        if not chosen:
+            with _lock:
+                queue.add(entry_id, party_size, arrived_at)
+            return None
+
+        entry = db.execute(
+            update(WaitlistEntry)
+            .where(WaitlistEntry.entry_id == entry_id, WaitlistEntry.status == "waiting")
+            .values(status="matched", table_ids=list(chosen), matched_at=datetime.now(timezone.utc))
+            .returning(WaitlistEntry)
+            .execution_options(synchronize_session=False)
+        ).scalar_one_or_none()
+        if entry is None:
+            # ออกจากคิว / ถูกจับคู่ที่ worker อื่นไปแล้ว → ลองกลุ่มถัดไป
+            db.rollback()
+            continue
+
+        table_deltas = update_table_statuses(db, list(chosen), "onHold", only_status="empty")
+        if len(table_deltas) != len(chosen):
+            # โต๊ะถูกใช้ไปก่อน (เช่น order ใหม่) → ยกเลิกการจับคู่ กลุ่มนี้ยังรอต่อ
+            db.rollback()
+            with _lock:
+                queue.add(entry_id, party_size, arrived_at)
+            return None
+
+        db.commit()
+
+        publish_table_changes(table_deltas)
+        table_events.publish({
+            "type": "waitlist_matched",
+            "entry_id": entry.entry_id,
+            "party_size": entry.party_size,
+            "table_ids": entry.table_ids,
+        })
+        metrics.incr("waitlist.matched")
+        return _entry_to_dict(entry, None)
+
+
+def expire_stale_matches(db: Session, ttl_minutes: int) -> list[int]:
+    """
+    matched ที่ได้โต๊ะนานกว่า ttl_minutes แต่ไม่มานั่ง → no_show แล้วปล่อยโต๊ะ — คืน entry_ids
+
+    "ไม่มานั่ง" = โต๊ะของ entry ยัง onHold ทุกตัว (นั่งแล้ว → order ใหม่ทำให้โต๊ะ full, entry นั้นไม่ถูกแตะ)
+    โต๊ะที่ยังถูกการจอง pending ถือไว้จะยัง onHold นอกนั้น → empty แล้วจับคู่กับกลุ่มถัดไปในคิวทันที
+    ถือ advisory lock ระดับ transaction: worker อื่นที่ sweep พร้อมกันจะข้ามรอบนี้ไป
+    """
+    if not db.execute(select(func.pg_try_advisory_xact_lock(MATCH_SWEEP_LOCK_ID))).scalar():
+        db.rollback()
+        return []
+
+    # matched_at เป็นเวลา UTC แบบ naive — เทียบกับนาฬิกาของ DB เป็น UTC
+    cutoff = func.timezone("UTC", func.now()) - timedelta(minutes=ttl_minutes)
+    seated = exists().where(Table.table_id == any_(WaitlistEntry.table_ids), Table.status != "onHold")
+    expired = db.execute(
+        update(WaitlistEntry)
+        .where(WaitlistEntry.status == "matched", WaitlistEntry.matched_at < cutoff, ~seated)
+        .values(status="no_show")
+        .returning(WaitlistEntry.entry_id, WaitlistEntry.table_ids)
+        .execution_options(synchronize_session=False)
+    ).all()
+    if not expired:
+        db.commit()
+        return []
+
+    table_ids = {table_id for row in expired for table_id in row.table_ids}
+    still_held = set(
+        db.execute(
+            select(func.unnest(Reservation.table_ids))
+            .where(Reservation.reservation_status == "pending", Reservation.table_ids.overlap(list(table_ids)))
+        ).scalars()
+    )
+    table_deltas = update_table_statuses(db, sorted(table_ids - still_held), "empty", only_status="onHold")
+
+    db.commit()
+
+    publish_table_changes(table_deltas)
+    for row in expired:
+        table_events.publish({"type": "waitlist_no_show", "entry_id": row.entry_id, "table_ids": row.table_ids})
+    metrics.incr("waitlist.no_show", len(expired))
+
+    if table_deltas:
+        on_tables_released(db, [delta["table_id"] for delta in table_deltas])
+    return [row.entry_id for row in expired]
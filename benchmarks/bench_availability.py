@@ -0,0 +1,80 @@
+"""
+Benchmark: GET /tables/availability บน interval index
+
+จำลองร้าน 200 โต๊ะ, 5,000 การจองต่อวัน (25 ช่วงต่อโต๊ะ ไม่ซ้อนกันในโต๊ะเดียวกัน)
++ orders ที่ยังไม่จบ 40 รายการ แล้ววัดเวลาของ find_availability ต่อ 1 query
+(ใส่ index ลง cache ของ availability_service โดยตรง จึงไม่แตะ DB)
+
+Usage:
+    python -m benchmarks.bench_availability --tables 200 --reservations 5000
+"""
+
+import argparse
+import random
+import statistics
+import time
+from datetime import date, datetime, timedelta
+
+from app.core.interval_index import DayIntervalIndex
+from app.services import availability_service
+
+
+def build(tables: int, reservations: int, open_orders: int) -> tuple[date, DayIntervalIndex, list[dict]]:
+    """สร้าง index ของวันพรุ่งนี้ด้วยข้อมูลสุ่ม"""
+    day = date.today() + timedelta(days=1)
+    opening = datetime.combine(day, datetime.min.time()).replace(hour=8)
+    index = DayIntervalIndex()
+    table_rows = [
+        {"table_id": i, "table_number": str(i), "capacity": random.choice([2, 4, 4, 6])}
+        for i in range(1, tables + 1)
+    ]
+    table_rows.sort(key=lambda t: (t["capacity"], t["table_id"]))
+
+    per_table = reservations // tables
+    reservation_id = 0
+    for table in table_rows:
+        cursor = opening
+        for _ in range(per_table):
+            cursor += timedelta(minutes=random.randint(0, 10))
+            end = cursor + timedelta(minutes=random.choice([15, 20, 30]))
+            reservation_id += 1
+            index.add(("reservation", reservation_id), [table["table_id"]], cursor, end)
+            cursor = end
+
+    for order_id in range(open_orders):
+        index.block(("order", order_id), [random.randint(1, tables)])
+
+    return day, index, table_rows
+
+
+def main(tables: int, reservations: int, queries: int):
+    random.seed(42)
+    day, index, table_rows = build(tables, reservations, open_orders=40)
+
+    now = time.monotonic()
+    availability_service._days[day] = (now, index)
+    availability_service._tables = (now, table_rows)
+
+    opening = datetime.combine(day, datetime.min.time()).replace(hour=8)
+    samples = []
+    for _ in range(queries):
+        when = opening + timedelta(minutes=random.randint(0, 12 * 60))
+        party = random.randint(1, 12)
+        start = time.perf_counter()
+        availability_service.find_availability(None, when, party, 90)
+        samples.append((time.perf_counter() - start) * 1_000_000)
+
+    samples.sort()
+    print(f"{tables} tables, {reservations} reservations/day, {queries} queries")
+    print(f"p50 {statistics.median(samples):8.1f} µs")
+    print(f"p99 {samples[int(len(samples) * 0.99) - 1]:8.1f} µs")
+    print(f"max {samples[-1]:8.1f} µs")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tables", type=int, default=200)
+    parser.add_argument("--reservations", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=2000)
+    args = parser.parse_args()
+    main(args.tables, args.reservations, args.queries)
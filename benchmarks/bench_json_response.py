@@ -0,0 +1,107 @@
+"""
+Benchmark: serialize OrderResponse ด้วย JSONResponse เทียบกับ FastJSONResponse (orjson)
+
+สร้าง orders จำลอง (ไม่ใช้ DB) แต่ละ order มี items + customer_detail + datetime
+แล้ววัดเวลาที่ FastAPI ใช้แปลงผลลัพธ์ของ endpoint เป็น bytes ในแต่ละเส้นทาง
+- no response_model: jsonable_encoder → response class (เช่น GET /orders/)
+- response_model + default class: Pydantic validate → dump_json ตรง ๆ
+- response_model + FastJSONResponse: Pydantic validate → dump_python(json) → orjson
+- direct: คืน FastJSONResponse(dicts) เอง (ไม่ผ่าน jsonable_encoder)
+
+Usage:
+    python -m benchmarks.bench_json_response --orders 1000 --items 10 --rounds 20
+"""
+
+import argparse
+import statistics
+import time
+from collections.abc import Callable
+from datetime import datetime, timedelta
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+from app.core import responses
+from app.core.responses import FastJSONResponse
+from app.schemas.order import OrderResponse
+
+
+def make_orders(n: int, items: int) -> list[dict]:
+    """dict แบบเดียวกับที่ order_service._order_to_dict คืน"""
+    created = datetime(2026, 1, 1, 8, 0)
+    return [
+        {
+            "order_id": i,
+            "customer_id": i % 7 or None,
+            "staff_id": 1,
+            "reservation_id": None,
+            "table_ids": [i % 20 + 1],
+            "order_status": "pending",
+            "net_price": 65 * items,
+            "finish_at": None,
+            "created_at": created + timedelta(seconds=i, microseconds=i),
+            "updated_seq": i,
+            "eta": created + timedelta(seconds=i + 300),
+            "items": [
+                {
+                    "id": i * items + k,
+                    "order_id": i,
+                    "product_id": k + 1,
+                    "quantity": 1 + k % 3,
+                    "sweetness": "50%",
+                    "milk_type": "oat",
+                    "product_type": "iced",
+                    "note": "หวานน้อย",
+                }
+                for k in range(items)
+            ],
+            "customer_detail": {"customer_name": f"ลูกค้า {i}", "point": i % 100} if i % 7 else None,
+        }
+        for i in range(n)
+    ]
+
+
+def measure(rounds: int, fn: Callable[[], bytes]) -> tuple[list[float], int]:
+    size = len(fn())  # warm-up
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples, size
+
+
+def main(orders: int, items: int, rounds: int):
+    data = make_orders(orders, items)
+    adapter = TypeAdapter(list[OrderResponse])
+
+    def validated():
+        return adapter.validate_python(data)
+
+    cases = {
+        "no model + JSONResponse": lambda: JSONResponse(jsonable_encoder(data)).body,
+        "no model + FastJSONResponse": lambda: FastJSONResponse(jsonable_encoder(data)).body,
+        "model + default (dump_json)": lambda: adapter.dump_json(validated()),
+        "model + FastJSONResponse": lambda: FastJSONResponse(adapter.dump_python(validated(), mode="json")).body,
+        "direct FastJSONResponse(dicts)": lambda: FastJSONResponse(data).body,
+        "direct FastJSONResponse(models)": lambda: FastJSONResponse(validated()).body,
+    }
+
+    print(f"{orders} orders × {items} items, {rounds} rounds, orjson={'yes' if responses.orjson else 'no'}")
+    baseline = None
+    for label, fn in cases.items():
+        samples, size = measure(rounds, fn)
+        median = statistics.median(samples)
+        baseline = baseline or median
+        print(f"{label:<32} p50 {median:8.2f} ms  {orders / median * 1000:>10,.0f} orders/s  "
+              f"×{baseline / median:5.1f}  {size / 1024:,.0f} KiB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--orders", type=int, default=1000)
+    parser.add_argument("--items", type=int, default=10)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+    main(args.orders, args.items, args.rounds)
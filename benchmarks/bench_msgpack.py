@@ -0,0 +1,106 @@
+"""
+Benchmark: MessagePack เทียบกับ JSON บน payload ของ orders
+
+ใช้ orders จำลองแบบเดียวกับ bench_json_response (ไม่ใช้ DB) แล้ววัดต่อรูปแบบ
+- ขนาด body (ไม่บีบอัด / gzip)
+- encode: object → bytes (ฝั่ง server)
+- decode: bytes → object (ฝั่ง client — POS tablet ต้อง parse ทุก response)
+- request: decode + validate OrderCreate ด้วย Pydantic (เส้นทางของ POST /orders/ ผ่าน MessagePackMiddleware)
+
+response ผ่าน MessagePackMiddleware = JSON ที่ app render แล้ว → loads → msgpack.packb
+แถว "transcode" คือค่าใช้จ่ายเพิ่มฝั่ง server ต่อ response เมื่อ client ขอ msgpack
+
+Usage:
+    python -m benchmarks.bench_msgpack --orders 200 --items 5 --rounds 50
+"""
+
+import argparse
+import gzip
+import json
+import statistics
+import time
+from collections.abc import Callable
+
+from pydantic import TypeAdapter
+
+from app.core import content_negotiation
+from app.core.responses import orjson
+from app.schemas.order import OrderCreate, OrderResponse
+from benchmarks.bench_json_response import make_orders
+
+msgpack = content_negotiation.msgpack
+
+
+def measure(rounds: int, fn: Callable[[], object]) -> float:
+    """p50 (ms) ของ fn — รอบแรกเป็น warm-up"""
+    fn()
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def make_order_creates(n: int, items: int) -> list[dict]:
+    """body ของ POST /orders/ — หนึ่ง order ต่อ request"""
+    return [
+        {
+            "customer_id": i % 7 or None,
+            "table_ids": [i % 20 + 1],
+            "items": [
+                {"product_id": k + 1, "quantity": 1 + k % 3, "sweetness": "50%", "milk_type": "oat", "note": "หวานน้อย"}
+                for k in range(items)
+            ],
+        }
+        for i in range(n)
+    ]
+
+
+def main(orders: int, items: int, rounds: int):
+    if msgpack is None:
+        raise SystemExit("ต้องติดตั้ง msgpack ก่อน: pip install msgpack")
+
+    # รูปแบบเดียวกับ response จริง: ผ่าน OrderResponse แล้วเป็นค่า JSON (datetime = ISO string)
+    adapter = TypeAdapter(list[OrderResponse])
+    payload = adapter.dump_python(adapter.validate_python(make_orders(orders, items)), mode="json")
+    json_body = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode()
+    msgpack_body = msgpack.packb(payload, use_bin_type=True)
+
+    print(f"{orders} orders × {items} items, {rounds} rounds, orjson={'yes' if orjson else 'no'}")
+    print(f"{'format':<8} {'bytes':>9} {'gzip':>9}")
+    for label, body in (("json", json_body), ("msgpack", msgpack_body)):
+        print(f"{label:<8} {len(body):>9,} {len(gzip.compress(body, 6)):>9,}")
+
+    cases = {
+        "encode json (json)": lambda: json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode(),
+        "encode msgpack": lambda: msgpack.packb(payload, use_bin_type=True),
+        "decode json (json)": lambda: json.loads(json_body),
+        "decode msgpack": lambda: msgpack.unpackb(msgpack_body),
+    }
+    if orjson is not None:
+        cases["encode json (orjson)"] = lambda: orjson.dumps(payload)
+        cases["decode json (orjson)"] = lambda: orjson.loads(json_body)
+        cases["transcode json→msgpack"] = lambda: msgpack.packb(orjson.loads(json_body), use_bin_type=True)
+
+    creates = make_order_creates(orders, items)
+    create_json = [json.dumps(c).encode() for c in creates]
+    create_msgpack = [msgpack.packb(c) for c in creates]
+    cases["request json → OrderCreate"] = lambda: [OrderCreate.model_validate_json(b) for b in create_json]
+    cases["request msgpack → OrderCreate"] = lambda: [
+        OrderCreate.model_validate_json(content_negotiation._msgpack_to_json(b)) for b in create_msgpack
+    ]
+
+    print()
+    for label, fn in cases.items():
+        median = measure(rounds, fn)
+        print(f"{label:<32} p50 {median:8.3f} ms  {orders / median * 1000:>12,.0f} orders/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--orders", type=int, default=200)
+    parser.add_argument("--items", type=int, default=5)
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+    main(args.orders, args.items, args.rounds)
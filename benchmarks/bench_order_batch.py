@@ -0,0 +1,99 @@
+"""
+Benchmark: POST /orders/ ทีละ order เทียบกับ POST /orders/batch
+
+วัดที่ระดับ service (ไม่ผ่าน HTTP) เพื่อดูต้นทุน DB ล้วน ๆ
+- single: create_order ทีละ order (transaction + product lookup ต่อ order)
+- batch: create_orders_batch ครั้งเดียวต่อ N orders
+
+ใช้ DATABASE_URL จาก settings + admin/products จาก seed data — สร้างโต๊ะชั่วคราว
+(prefix BENCHBATCH_) และลบ orders/โต๊ะที่สร้างทิ้งเมื่อจบ
+
+Usage:
+    python -m benchmarks.bench_order_batch --sizes 1 10 100 --rounds 5
+"""
+
+import argparse
+import time
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.config.database import DB_CONNECT_ARGS
+from app.config.settings import settings
+from app.models.order import Order, OrderItem
+from app.models.product import Product
+from app.models.table import Table
+from app.models.user import User
+from app.schemas.order import OrderCreate
+from app.services.order_service import create_order, create_orders_batch
+
+PREFIX = "BENCHBATCH_"
+
+
+def make_orders(n: int, product_ids: list[int], table_ids: list[int]) -> list[OrderCreate]:
+    """order ละ 3 items + ผูกโต๊ะวนไปเรื่อย ๆ"""
+    return [
+        OrderCreate(
+            table_ids=[table_ids[i % len(table_ids)]],
+            items=[
+                {"product_id": product_ids[(i + k) % len(product_ids)], "quantity": 1 + k, "note": PREFIX}
+                for k in range(3)
+            ],
+        )
+        for i in range(n)
+    ]
+
+
+def main(sizes: list[int], rounds: int):
+    engine = create_engine(settings.DATABASE_URL, connect_args=DB_CONNECT_ARGS)
+    Session = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
+
+    statements = 0
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def count(*_):
+        nonlocal statements
+        statements += 1
+
+    db = Session()
+    staff = db.query(User).filter(User.username == "admin").one()
+    product_ids = [p for (p,) in db.query(Product.product_id).order_by(Product.product_id)]
+    tables = [Table(table_number=f"{PREFIX}{i}", capacity=4) for i in range(10)]
+    db.add_all(tables)
+    db.commit()
+    table_ids = [t.table_id for t in tables]
+
+    try:
+        print(f"{'size':>5} {'mode':>7} {'orders/s':>10} {'ms/batch':>9} {'stmts/batch':>12}")
+        for size in sizes:
+            orders = make_orders(size, product_ids, table_ids)
+            for mode in ("single", "batch"):
+                elapsed, statements = 0.0, 0
+                for _ in range(rounds):
+                    started = time.perf_counter()
+                    if mode == "single":
+                        for data in orders:
+                            create_order(db, staff, data)
+                    else:
+                        create_orders_batch(db, staff, orders)
+                    elapsed += time.perf_counter() - started
+                print(
+                    f"{size:>5} {mode:>7} {size * rounds / elapsed:>10.0f} "
+                    f"{elapsed / rounds * 1000:>9.1f} {statements / rounds:>12.0f}"
+                )
+    finally:
+        db.rollback()
+        order_ids = [o for (o,) in db.query(OrderItem.order_id).filter(OrderItem.note == PREFIX).distinct()]
+        db.query(OrderItem).filter(OrderItem.order_id.in_(order_ids)).delete(synchronize_session=False)
+        db.query(Order).filter(Order.order_id.in_(order_ids)).delete(synchronize_session=False)
+        db.query(Table).filter(Table.table_number.like(f"{PREFIX}%")).delete(synchronize_session=False)
+        db.commit()
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+    main(args.sizes, args.rounds)
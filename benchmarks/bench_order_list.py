@@ -0,0 +1,188 @@
+"""
+Benchmark: GET /orders/ บนวันที่มี 1,000 orders — latency + allocation ต่อเส้นทาง serialize
+
+วัดที่ระดับ service + serialize (ไม่ผ่าน HTTP) แยกเป็น 3 เส้นทาง
+- dicts: แบบเดิม — query customer ต่อ order + lazy load items, สร้าง dict แล้ว jsonable_encoder + json.dumps
+- validate: get_all_orders (model_construct) แล้วให้ FastAPI validate + serialize ตาม response_model
+- direct: get_all_orders แล้ว model_response (TypeAdapter.dump_json ครั้งเดียว) — แบบที่ route ใช้
+
+allocation = peak ของ tracemalloc ระหว่างหนึ่ง request (รวม ORM objects) วัดแยกจาก latency
+ใช้ DATABASE_URL จาก settings + admin/products จาก seed data — orders ที่สร้าง (note = BENCHLIST_)
+ถูกลบทิ้งเมื่อจบ
+
+Usage:
+    python -m benchmarks.bench_order_list --orders 1000 --items 3 --rounds 10
+"""
+
+import argparse
+import statistics
+import time
+import tracemalloc
+from collections.abc import Callable
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.config.database import DB_CONNECT_ARGS
+from app.config.settings import settings
+from app.core.responses import model_response
+from app.models.order import Order, OrderItem
+from app.models.product import Product
+from app.models.user import User
+from app.schemas.order import OrderResponse
+from app.services.order_service import _get_today_start, get_all_orders
+
+PREFIX = "BENCHLIST_"
+
+
+def legacy_orders(db: Session) -> bytes:
+    """เส้นทางเดิม: customer query ต่อ order, items lazy load, dict → jsonable_encoder → json.dumps"""
+    orders = (
+        db.query(Order)
+        .filter(Order.created_at >= _get_today_start())
+        .order_by(Order.created_at.desc())
+        .all()
+    )
+    result = []
+    for order in orders:
+        customer = None
+        if order.customer_id:
+            customer = db.query(User).filter(User.user_id == order.customer_id).first()
+        result.append({
+            "order_id": order.order_id,
+            "customer_id": order.customer_id,
+            "staff_id": order.staff_id,
+            "reservation_id": order.reservation_id,
+            "table_ids": order.table_ids or [],
+            "order_status": order.order_status,
+            "net_price": order.net_price,
+            "finish_at": order.finish_at,
+            "created_at": order.created_at,
+            "updated_seq": order.updated_seq,
+            "items": [
+                {
+                    "id": item.id,
+                    "order_id": item.order_id,
+                    "product_id": item.product_id,
+                    "quantity": item.quantity,
+                    "sweetness": item.sweetness,
+                    "milk_type": item.milk_type,
+                    "product_type": item.product_type,
+                    "note": item.note,
+                }
+                for item in order.items
+            ],
+            "customer_detail": {
+                "customer_name": customer.name or "-" if customer else "-",
+                "point": customer.point or 0 if customer else 0,
+            } if order.customer_id else None,
+        })
+    return JSONResponse(jsonable_encoder(result)).body
+
+
+def seed(db: Session, orders: int, items: int) -> None:
+    staff = db.query(User).filter(User.username == "admin").one()
+    product_ids = [p for (p,) in db.query(Product.product_id).order_by(Product.product_id)]
+    order_ids = db.execute(
+        insert(Order).returning(Order.order_id, sort_by_parameter_order=True),
+        [
+            {
+                "customer_id": staff.user_id if i % 2 else None,
+                "staff_id": staff.user_id,
+                "table_ids": [],
+                "order_status": "pending",
+                "net_price": 100 * items,
+            }
+            for i in range(orders)
+        ],
+    ).scalars().all()
+    db.execute(
+        insert(OrderItem),
+        [
+            {
+                "order_id": order_id,
+                "product_id": product_ids[(i + k) % len(product_ids)],
+                "quantity": 1 + k % 3,
+                "sweetness": "50%",
+                "milk_type": "oat",
+                "note": PREFIX,
+            }
+            for i, order_id in enumerate(order_ids)
+            for k in range(items)
+        ],
+    )
+    db.commit()
+
+
+def run(Session: sessionmaker, rounds: int, fn: Callable[[Session], bytes]) -> tuple[list[float], float, int]:
+    """(latency ms ต่อรอบ, peak allocation MiB, ขนาด body) — session ใหม่ทุกรอบ (identity map ว่าง)"""
+    samples, size = [], 0
+    for round_ in range(rounds + 1):
+        db = Session()
+        started = time.perf_counter()
+        size = len(fn(db))
+        elapsed = (time.perf_counter() - started) * 1000
+        db.close()
+        if round_:  # รอบแรกเป็น warm-up
+            samples.append(elapsed)
+
+    # วัด allocation แยกอีกรอบ — tracemalloc ทำให้ช้าลงหลายเท่า จึงไม่ปนกับ latency
+    db = Session()
+    tracemalloc.start()
+    fn(db)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    db.close()
+    return samples, peak / 1024 / 1024, size
+
+
+def main(orders: int, items: int, rounds: int):
+    engine = create_engine(settings.DATABASE_URL, connect_args=DB_CONNECT_ARGS)
+    Session = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
+
+    statements = 0
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def count(*_):
+        nonlocal statements
+        statements += 1
+
+    adapter = TypeAdapter(list[OrderResponse])
+    cases = {
+        "dicts": legacy_orders,
+        "validate": lambda db: adapter.dump_json(adapter.validate_python(get_all_orders(db))),
+        "direct": lambda db: model_response(list[OrderResponse], get_all_orders(db)).body,
+    }
+
+    db = Session()
+    seed(db, orders, items)
+    try:
+        print(f"{orders} orders × {items} items (+ orders วันนี้ที่มีอยู่แล้ว), {rounds} rounds")
+        print(f"{'path':<9} {'p50 ms':>9} {'p99 ms':>9} {'peak MiB':>9} {'stmts':>7} {'KiB':>7}")
+        for label, fn in cases.items():
+            statements = 0
+            samples, peak, size = run(Session, rounds, fn)
+            samples.sort()
+            print(
+                f"{label:<9} {statistics.median(samples):>9.1f} {samples[int(len(samples) * 0.99) - 1]:>9.1f} "
+                f"{peak:>9.1f} {statements // (rounds + 2):>7} {size / 1024:>7.0f}"
+            )
+    finally:
+        db.rollback()
+        order_ids = [o for (o,) in db.query(OrderItem.order_id).filter(OrderItem.note == PREFIX).distinct()]
+        db.query(OrderItem).filter(OrderItem.order_id.in_(order_ids)).delete(synchronize_session=False)
+        db.query(Order).filter(Order.order_id.in_(order_ids)).delete(synchronize_session=False)
+        db.commit()
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--orders", type=int, default=1000)
+    parser.add_argument("--items", type=int, default=3)
+    parser.add_argument("--rounds", type=int, default=10)
+    args = parser.parse_args()
+    main(args.orders, args.items, args.rounds)
@@ -0,0 +1,97 @@
+"""
+Benchmark: ต้นทุนของ row locking + version check บน table status
+
+เทียบ throughput ของการเปลี่ยน status โต๊ะชุดเดียวกันจากหลาย workers พร้อมกัน
+- unlocked: UPDATE ทีละโต๊ะแบบเดิม (ไม่มี lock/version — เสี่ยง lost update / deadlock)
+- locked: update_table_statuses (SELECT ... FOR UPDATE เรียงตาม id + versioned UPDATE)
+
+ใช้ DATABASE_URL จาก settings — สร้างโต๊ะชั่วคราว (prefix BENCHLOCK_) แล้วลบทิ้งเมื่อจบ
+
+Usage:
+    python -m benchmarks.bench_table_locking --workers 50 --iterations 20
+"""
+
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import create_engine, update
+from sqlalchemy.orm import sessionmaker
+
+from app.config.database import DB_CONNECT_ARGS
+from app.config.settings import settings
+from app.models.table import Table
+from app.services.table_service import update_table_statuses
+
+PREFIX = "BENCHLOCK_"
+
+
+def _unlocked(db, table_ids: list[int], new_status: str):
+    # เรียง id ให้ก่อน — ถ้าไม่เรียง workload สลับลำดับนี้จะ deadlock ตั้งแต่รอบแรก
+    for table_id in sorted(table_ids):
+        db.execute(update(Table).where(Table.table_id == table_id).values(status=new_status))
+
+
+def _locked(db, table_ids: list[int], new_status: str):
+    update_table_statuses(db, table_ids, new_status)
+
+
+def run(Session, fn, table_ids: list[int], workers: int, iterations: int) -> float:
+    """รัน workload แล้วคืน transactions ต่อวินาที"""
+    start = threading.Barrier(workers + 1)
+
+    def worker(i: int):
+        db = Session()
+        try:
+            start.wait()
+            for n in range(iterations):
+                ids = table_ids if (i + n) % 2 else table_ids[::-1]
+                fn(db, ids, "full" if n % 2 else "empty")
+                db.commit()
+        finally:
+            db.close()
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(worker, i) for i in range(workers)]
+        start.wait()
+        began = time.perf_counter()
+        for f in futures:
+            f.result()
+        elapsed = time.perf_counter() - began
+
+    return workers * iterations / elapsed
+
+
+def main(workers: int, iterations: int, tables: int):
+    engine = create_engine(settings.DATABASE_URL, pool_size=workers, max_overflow=0, connect_args=DB_CONNECT_ARGS)
+    Session = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
+
+    db = Session()
+    rows = [Table(table_number=f"{PREFIX}{i}", capacity=4) for i in range(tables)]
+    db.add_all(rows)
+    db.commit()
+    table_ids = [t.table_id for t in rows]
+    db.close()
+
+    try:
+        results = {}
+        for name, fn in (("unlocked", _unlocked), ("locked", _locked)):
+            run(Session, fn, table_ids, workers, 2)  # warm up
+            results[name] = run(Session, fn, table_ids, workers, iterations)
+            print(f"{name:<10} {results[name]:8.0f} tx/s")
+        print(f"cost       {(1 - results['locked'] / results['unlocked']) * 100:7.1f}% throughput")
+    finally:
+        db = Session()
+        db.query(Table).filter(Table.table_number.like(f"{PREFIX}%")).delete(synchronize_session=False)
+        db.commit()
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=50)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--tables", type=int, default=4)
+    args = parser.parse_args()
+    main(args.workers, args.iterations, args.tables)
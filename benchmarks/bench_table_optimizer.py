@@ -0,0 +1,80 @@
+"""
+Benchmark: best_fit table optimizer
+
+สุ่มโต๊ะว่าง (capacity 2/4/6) แล้ววัดเวลาเลือกชุดโต๊ะสำหรับกลุ่ม --min-party ถึง 60 คน
+วัดแบบ cold (ล้าง cache ทุกครั้ง) และ warm (free-set เดิมซ้ำ → memoized)
+
+--adjacency chain: แถวละ 10 โต๊ะต่อกันเป็นเส้น
+--adjacency grid: ตาราง √tables × √tables ต่อกับโต๊ะบน/ล่าง/ซ้าย/ขวา
+  (จำนวนชุดที่ต่อถึงกันมากที่สุด — ใช้กับกลุ่มใหญ่เพื่อดูผลของ MAX_SEARCH_NODES)
+
+Usage:
+    python -m benchmarks.bench_table_optimizer --tables 100
+    python -m benchmarks.bench_table_optimizer --tables 100 --adjacency grid --min-party 30
+"""
+
+import argparse
+import math
+import random
+import statistics
+import time
+
+from app.core.table_optimizer import best_fit
+
+
+def report(label: str, samples: list[float]):
+    samples.sort()
+    print(f"{label:<5} p50 {statistics.median(samples):8.1f} µs  "
+          f"p99 {samples[int(len(samples) * 0.99) - 1]:8.1f} µs  max {samples[-1]:8.1f} µs")
+
+
+def make_adjacency(tables: int, layout: str | None) -> frozenset[tuple[int, int]] | None:
+    """คู่โต๊ะที่ต่อกันได้ตาม layout (None = รวมโต๊ะใดก็ได้)"""
+    if layout == "chain":
+        return frozenset((i, i + 1) for i in range(1, tables) if i % 10)
+    if layout == "grid":
+        side = math.isqrt(tables)
+        return frozenset(
+            pair
+            for i in range(1, tables + 1)
+            for pair in ((i, i + 1), (i, i + side))
+            if pair[1] <= tables and (pair[1] == i + side or i % side)
+        )
+    return None
+
+
+def main(tables: int, queries: int, adjacency: str | None, min_party: int):
+    random.seed(42)
+    graph = make_adjacency(tables, adjacency)
+    cold, warm = [], []
+
+    for _ in range(queries):
+        free = tuple(
+            (table_id, random.choice([2, 4, 4, 6]))
+            for table_id in range(1, tables + 1)
+            if random.random() < 0.8
+        )
+        party = random.randint(min_party, 60)
+
+        best_fit.cache_clear()
+        start = time.perf_counter()
+        best_fit(free, party, graph)
+        cold.append((time.perf_counter() - start) * 1_000_000)
+
+        start = time.perf_counter()
+        best_fit(free, party, graph)
+        warm.append((time.perf_counter() - start) * 1_000_000)
+
+    print(f"{tables} tables (~80% free), {queries} queries, party {min_party}-60, adjacency={adjacency or 'off'}")
+    report("cold", cold)
+    report("warm", warm)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tables", type=int, default=100)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--adjacency", nargs="?", const="chain", choices=["chain", "grid"])
+    parser.add_argument("--min-party", type=int, default=1)
+    args = parser.parse_args()
+    main(args.tables, args.queries, args.adjacency, args.min_party)
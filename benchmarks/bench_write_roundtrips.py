@@ -0,0 +1,160 @@
+"""
+Benchmark: round trips ต่อ write endpoint — expire_on_commit=True vs False
+
+โหมด expire (แบบเดิม): ทุก attribute หมดอายุหลัง commit → อ่านค่าตอนสร้าง response
+ต้อง SELECT ใหม่ (เทียบเท่า db.refresh เดิม) รวมถึง lazy load ของ order.items
+โหมด keep (ปัจจุบัน): ใช้ค่าที่มีอยู่ + ค่าจาก RETURNING ตอน INSERT/UPDATE
+
+นับ SQL statements ต่อ request (รวม auth lookup ซึ่งเท่ากันทั้งสองโหมด) + latency เฉลี่ย
+ยิงผ่าน TestClient ไปยัง DATABASE_URL — สร้างข้อมูลชั่วคราว (prefix BENCHRT_) แล้วลบทิ้ง
+
+Usage:
+    python -m benchmarks.bench_write_roundtrips --rounds 30
+"""
+
+import argparse
+import itertools
+import time
+from datetime import datetime, timedelta
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.config.database import DB_CONNECT_ARGS, get_db
+from app.config.settings import settings
+from app.main import app
+from app.models.order import Order, OrderItem
+from app.models.product import Product
+from app.models.reservation import Reservation
+from app.models.table import Table
+from app.models.user import User
+
+PREFIX = "BENCHRT_"
+
+engine = create_engine(settings.DATABASE_URL, connect_args=DB_CONNECT_ARGS)
+statements = 0
+
+
+@event.listens_for(engine, "before_cursor_execute")
+def _count(*_):
+    global statements
+    statements += 1
+
+
+def use_sessions(expire_on_commit: bool):
+    Session = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=expire_on_commit, bind=engine)
+
+    def override():
+        db = Session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override
+
+
+def cleanup():
+    db = sessionmaker(bind=engine)()
+    order_ids = [o for (o,) in db.query(OrderItem.order_id).filter(OrderItem.note == PREFIX).distinct()]
+    db.query(OrderItem).filter(OrderItem.order_id.in_(order_ids)).delete(synchronize_session=False)
+    db.query(Order).filter(Order.order_id.in_(order_ids)).delete(synchronize_session=False)
+    db.query(Reservation).filter(Reservation.reservation_detail == PREFIX).delete(synchronize_session=False)
+    db.query(Product).filter(Product.product_name.like(f"{PREFIX}%")).delete(synchronize_session=False)
+    db.query(Table).filter(Table.table_number.like(f"{PREFIX}%")).delete(synchronize_session=False)
+    db.query(User).filter(User.username.like(f"{PREFIX}%")).delete(synchronize_session=False)
+    db.commit()
+    db.close()
+
+
+def main(rounds: int):
+    client = TestClient(app)
+    counter = itertools.count()
+    admin = {"Authorization": "Bearer " + client.post(
+        "/auth/login", json={"username": "admin", "password": "admin"}
+    ).json()["access_token"]}
+    product_id = client.get("/products/").json()[0]["product_id"]
+
+    client.post("/auth/register", json={"username": f"{PREFIX}user", "password": "bench1234"})
+    user = {"Authorization": "Bearer " + client.post(
+        "/auth/login", json={"username": f"{PREFIX}user", "password": "bench1234"}
+    ).json()["access_token"]}
+
+    def fixtures():
+        """ข้อมูลที่ endpoint แบบ update ใช้ (สร้างนอกช่วงที่วัด)"""
+        n = next(counter)
+        table = client.post("/tables/", headers=admin, json={"table_number": f"{PREFIX}{n}", "capacity": 4}).json()
+        product = client.post("/products/", headers=admin, json={"product_name": f"{PREFIX}{n}", "price": 10}).json()
+        order = client.post("/orders/", headers=admin, json={
+            "items": [{"product_id": product_id, "note": PREFIX}],
+        }).json()
+        reservation = client.post("/reservations/", headers=user, json={
+            "table_ids": [table["table_id"]],
+            "reservation_time": (datetime.now() + timedelta(days=30, minutes=n * 120)).isoformat(),
+            "customer_amount": 2,
+            "reservation_detail": PREFIX,
+        }).json()
+        return n, table, product, order, reservation
+
+    endpoints = {
+        "POST /products/": lambda n, t, p, o, r: client.post(
+            "/products/", headers=admin, json={"product_name": f"{PREFIX}new{n}", "price": 10}),
+        "PUT /products/{id}": lambda n, t, p, o, r: client.put(
+            f"/products/{p['product_id']}", headers=admin, json={"price": 20}),
+        "POST /tables/": lambda n, t, p, o, r: client.post(
+            "/tables/", headers=admin, json={"table_number": f"{PREFIX}new{n}", "capacity": 2}),
+        "PUT /tables/{id}": lambda n, t, p, o, r: client.put(
+            f"/tables/{t['table_id']}", headers=admin, json={"capacity": 6}),
+        "POST /auth/register": lambda n, t, p, o, r: client.post(
+            "/auth/register", json={"username": f"{PREFIX}reg{n}", "password": "bench1234"}),
+        "PUT /users/me": lambda n, t, p, o, r: client.put(
+            "/users/me", headers=user, json={"password": "bench1234", "name": f"bench {n}"}),
+        "POST /orders/": lambda n, t, p, o, r: client.post(
+            "/orders/", headers=admin, json={"items": [{"product_id": product_id, "note": PREFIX}] * 3}),
+        "PATCH /orders/{id}": lambda n, t, p, o, r: client.patch(
+            f"/orders/{o['order_id']}", headers=admin, json={"order_status": "preparing"}),
+        "POST /reservations/": lambda n, t, p, o, r: client.post("/reservations/", headers=user, json={
+            "table_ids": [t["table_id"]],
+            "reservation_time": (datetime.now() + timedelta(days=60, minutes=n * 120)).isoformat(),
+            "customer_amount": 2,
+            "reservation_detail": PREFIX,
+        }),
+        "PATCH /reservations/{id}": lambda n, t, p, o, r: client.patch(
+            f"/reservations/{r['reservation_id']}", headers=admin, json={"reservation_status": "accepted"}),
+    }
+
+    global statements
+    results = {name: {} for name in endpoints}
+    try:
+        for mode, expire in (("expire", True), ("keep", False)):
+            use_sessions(expire)
+            for _ in range(rounds):
+                fixture = fixtures()
+                for name, call in endpoints.items():
+                    statements = 0
+                    started = time.perf_counter()
+                    response = call(*fixture)
+                    elapsed = time.perf_counter() - started
+                    assert response.status_code < 300, (name, response.text)
+                    stats = results[name].setdefault(mode, [0, 0.0])
+                    stats[0] += statements
+                    stats[1] += elapsed
+    finally:
+        app.dependency_overrides.clear()
+        cleanup()
+
+    print(f"{'endpoint':<26} {'stmts expire':>12} {'stmts keep':>10} {'ms expire':>10} {'ms keep':>8}")
+    for name, modes in results.items():
+        (s_exp, t_exp), (s_keep, t_keep) = modes["expire"], modes["keep"]
+        print(
+            f"{name:<26} {s_exp / rounds:>12.1f} {s_keep / rounds:>10.1f} "
+            f"{t_exp / rounds * 1000:>10.2f} {t_keep / rounds * 1000:>8.2f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=30)
+    args = parser.parse_args()
+    main(args.rounds)
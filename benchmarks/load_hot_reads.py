@@ -0,0 +1,66 @@
+"""
+Load test: hot read endpoints (single-flight)
+
+ยิง GET /products/ และ GET /tables/ พร้อมกัน 500 clients ไปยัง server ที่รันอยู่
+แล้วดู latency + จำนวน request ที่ถูก coalesce จาก GET /metrics (admin only → ต้องส่ง --token)
+
+Usage:
+    uvicorn app.main:app --workers 1
+    python -m benchmarks.load_hot_reads --url http://localhost:8000 --clients 500 --token <admin access token>
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+
+async def _burst(client: httpx.AsyncClient, path: str, clients: int) -> list[float]:
+    """ส่ง request พร้อมกัน `clients` ครั้ง คืน latency (ms) ของแต่ละ request"""
+    async def one() -> float:
+        start = time.perf_counter()
+        res = await client.get(path)
+        res.raise_for_status()
+        return (time.perf_counter() - start) * 1000
+
+    return await asyncio.gather(*(one() for _ in range(clients)))
+
+
+async def main(url: str, clients: int, rounds: int, token: str):
+    limits = httpx.Limits(max_connections=clients)
+    admin = {"Authorization": f"Bearer {token}"}
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=30) as client:
+        before = (await client.get("/metrics", headers=admin)).json()
+
+        for path in ("/products/", "/tables/"):
+            latencies: list[float] = []
+            start = time.perf_counter()
+            for _ in range(rounds):
+                latencies += await _burst(client, path, clients)
+            elapsed = time.perf_counter() - start
+
+            latencies.sort()
+            print(
+                f"{path:<12} {len(latencies)} req in {elapsed:.2f}s "
+                f"({len(latencies) / elapsed:.0f} req/s) "
+                f"p50={statistics.median(latencies):.1f}ms "
+                f"p99={latencies[int(len(latencies) * 0.99) - 1]:.1f}ms"
+            )
+
+        after = (await client.get("/metrics", headers=admin)).json()
+
+    for name in sorted(after):
+        if name.startswith("singleflight."):
+            print(f"{name:<45} +{after[name] - before.get(name, 0)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--clients", type=int, default=500)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--token", required=True, help="access token ของ admin (สำหรับ GET /metrics)")
+    args = parser.parse_args()
+    asyncio.run(main(args.url, args.clients, args.rounds, args.token))
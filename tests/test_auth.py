@@ -12,13 +12,13 @@ from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
 from app.main import app
-from app.config.database import get_db
+from app.config.database import DB_CONNECT_ARGS, get_db
 from app.config.settings import settings
 from app.models.base import Base
 from app.models.user import User
 
-engine = create_engine(settings.TEST_DATABASE_URL)
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+engine = create_engine(settings.TEST_DATABASE_URL, connect_args=DB_CONNECT_ARGS)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
 
 
 def override_get_db():
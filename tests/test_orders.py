@@ -3,27 +3,52 @@ Orders Tests
 
 Integration tests สำหรับ orders endpoints
 - POST /orders/ — สร้าง order + items (staff/admin)
+- POST /orders/batch — สร้างหลาย orders ในครั้งเดียว (staff/admin)
 - GET /orders/ — ดู orders วันนี้ (staff/admin)
 - GET /orders/{id} — ดู order เดี่ยว (staff/admin)
 - PATCH /orders/{id} — อัปเดต status/finish (staff/admin)
+- PATCH /orders/bulk — เปลี่ยน status หลาย orders + state machine (staff/admin)
+- WS /orders/ws — kitchen feed (staff/admin)
+- Idempotency-Key — retry POST /orders/ ไม่สร้าง order ซ้ำ
+- GET /orders/kitchen-queue — items ที่ยังไม่เสร็จ รวมตามเมนู + options (staff/admin)
+- GET /orders/{id}/eta — ETA จากเวลาทำล่าสุดต่อเมนู + คิวครัว (เจ้าของ order หรือ staff/admin)
+- FastJSONResponse — default response class (orjson) ให้ผลเหมือน JSONResponse
+- MessagePack — POST /orders/ ด้วย body แบบ msgpack + Accept: application/msgpack
 """
 
+import asyncio
+import threading
+import time as time_module
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
 import pytest
-from datetime import datetime
+from datetime import datetime, timedelta
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
 from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
 from app.main import app
-from app.config.database import get_db
+from app.config.database import DB_CONNECT_ARGS, get_db
 from app.config.settings import settings
+from app.core import content_negotiation
+from app.core.content_negotiation import MSGPACK_MEDIA_TYPE, accepts_msgpack
+from app.core.prep_estimator import PrepTimeEstimator
+from app.core.responses import FastJSONResponse
+from app.models.idempotency import IdempotencyKey
 from app.models.order import Order, OrderItem
 from app.models.table import Table
 from app.models.user import User
+from app.schemas.order import OrderResponse
+from app.services import eta_service, hold_sweeper, idempotency_service, order_service, table_service
+from app.services.order_service import get_order_by_id
 
 # Test DB setup
-engine = create_engine(settings.TEST_DATABASE_URL)
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+engine = create_engine(settings.TEST_DATABASE_URL, connect_args=DB_CONNECT_ARGS)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
 
 
 def override_get_db():
@@ -105,6 +130,28 @@ def create_test_order(token: str, product_id: int, table_ids: list[int] | None =
     return res.json()
 
 
+KITCHEN_FLOW = ("preparing", "ready", "completed")
+
+
+def advance_order(token: str, order_id: int, to_status: str) -> dict:
+    """เดิน order ผ่านครัวตามลำดับจนถึง to_status (ไม่รวม to_status) แล้วคืน response ล่าสุด"""
+    res = None
+    for status in KITCHEN_FLOW[:KITCHEN_FLOW.index(to_status)]:
+        res = client.patch(f"/orders/{order_id}", headers=auth_header(token), json={"order_status": status})
+        assert res.status_code == 200
+    return res.json() if res else {}
+
+
+def receive_events(ws, event_type: str, count: int) -> list[dict]:
+    """อ่าน events จาก kitchen feed จนได้ชนิดที่ต้องการครบ count (ข้ามชนิดอื่น)"""
+    events = []
+    while len(events) < count:
+        event = ws.receive_json()
+        if event["type"] == event_type:
+            events.append(event)
+    return events
+
+
 @pytest.fixture(autouse=True)
 def cleanup_test_data():
     """ลบ test data ก่อนและหลังแต่ละ test"""
@@ -117,6 +164,9 @@ def cleanup_test_data():
 
 def _cleanup(db):
     """ลบ test data ทั้งหมด"""
+    db.query(IdempotencyKey).filter(
+        IdempotencyKey.key.like(f"{TEST_PREFIX}%")
+    ).delete(synchronize_session=False)
     # ลบ order items ที่มี note ขึ้นต้นด้วย TEST_PREFIX
     db.query(OrderItem).filter(
         OrderItem.note.like(f"{TEST_PREFIX}%")
@@ -138,6 +188,7 @@ def _cleanup(db):
         User.username.like(f"%{TEST_SUFFIX}")
     ).delete(synchronize_session=False)
     db.commit()
+    eta_service.invalidate_queue()
 
 
 # ===== POST /orders/ =====
@@ -162,6 +213,15 @@ class TestCreateOrder:
         assert order["items"][0]["quantity"] == 2
         assert order["items"][0]["sweetness"] == "50%"
 
+    def test_create_response_timestamps_match_get(self):
+        """created_at ใน response ของ POST (ไม่ refresh) ต้องเป็นรูปแบบเดียวกับที่ GET อ่านจาก DB"""
+        admin_token = get_admin_token()
+        order = create_test_order(admin_token, get_seed_product_id())
+
+        fetched = client.get(f"/orders/{order['order_id']}", headers=auth_header(admin_token)).json()
+        assert order["created_at"] == fetched["created_at"]
+        assert "+" not in order["created_at"]
+
     def test_create_order_table_status_full(self):
         """สร้าง order ผูก table → table status เปลี่ยนเป็น full"""
         admin_token = get_admin_token()
@@ -213,6 +273,75 @@ class TestCreateOrder:
         assert res.status_code == 403
 
 
+# ===== POST /orders/batch =====
+
+class TestCreateOrderBatch:
+    """ทดสอบ POST /orders/batch"""
+
+    def _order(self, product_id: int, quantity: int = 1, table_ids: list[int] | None = None) -> dict:
+        return {
+            "table_ids": table_ids or [],
+            "items": [{"product_id": product_id, "quantity": quantity, "note": f"{TEST_PREFIX}batch"}],
+        }
+
+    def test_batch_partial_failure(self):
+        """order ที่อ้างถึงสินค้าที่ไม่มี → 404 เฉพาะตัว ส่วน order อื่นถูกสร้าง"""
+        token = get_admin_token()
+        product_id = get_seed_product_id()
+
+        response = client.post("/orders/batch", headers=auth_header(token), json={"orders": [
+            self._order(product_id, quantity=1),
+            self._order(999999),
+            self._order(product_id, quantity=3),
+        ]})
+        assert response.status_code == 200
+        data = response.json()
+        assert data["created"] == 2
+        assert data["failed"] == 1
+        assert [r["status_code"] for r in data["results"]] == [201, 404, 201]
+        assert data["results"][1]["order"] is None
+        assert "999999" in data["results"][1]["detail"]
+
+        first, third = data["results"][0]["order"], data["results"][2]["order"]
+        assert third["net_price"] == first["net_price"] * 3
+        assert third["items"][0]["quantity"] == 3
+
+        # order ที่สร้างแล้วอ่านกลับได้ตามปกติ
+        res = client.get(f"/orders/{third['order_id']}", headers=auth_header(token))
+        assert res.status_code == 200
+
+    def test_batch_updates_all_tables(self):
+        """โต๊ะของทุก order ใน batch → full"""
+        token = get_admin_token()
+        product_id = get_seed_product_id()
+        a = create_test_table(token, "86")
+        b = create_test_table(token, "87")
+
+        response = client.post("/orders/batch", headers=auth_header(token), json={"orders": [
+            self._order(product_id, table_ids=[a["table_id"]]),
+            self._order(product_id, table_ids=[a["table_id"], b["table_id"]]),
+        ]})
+        assert response.json()["created"] == 2
+
+        for table in (a, b):
+            res = client.get(f"/tables/{table['table_id']}", headers=auth_header(token))
+            assert res.json()["status"] == "full"
+            assert res.json()["version"] == table["version"] + 1
+
+    def test_batch_empty(self):
+        """ไม่มี orders → 422"""
+        response = client.post("/orders/batch", headers=auth_header(get_admin_token()), json={"orders": []})
+        assert response.status_code == 422
+
+    def test_batch_customer_forbidden(self):
+        """customer ไม่มีสิทธิ์ → 403"""
+        token = create_customer_and_get_token("batch")
+        response = client.post("/orders/batch", headers=auth_header(token), json={
+            "orders": [self._order(get_seed_product_id())],
+        })
+        assert response.status_code == 403
+
+
 # ===== GET /orders/ =====
 
 class TestListOrders:
@@ -226,6 +355,55 @@ class TestListOrders:
         assert res.status_code == 200
         assert isinstance(res.json(), list)
 
+    def test_list_matches_single_order(self):
+        """order ใน list (สร้างด้วย model_construct) มี fields เหมือน GET /orders/{id}"""
+        admin_token = get_admin_token()
+        customer_token = create_customer_and_get_token("list")
+        customer_id = client.get("/users/me", headers=auth_header(customer_token)).json()["user_id"]
+        order = client.post("/orders/", headers=auth_header(admin_token), json={
+            "customer_id": customer_id,
+            "items": [{"product_id": get_seed_product_id(), "note": f"{TEST_PREFIX}list"}],
+        }).json()
+
+        listed = client.get("/orders/", headers=auth_header(admin_token)).json()
+        single = client.get(f"/orders/{order['order_id']}", headers=auth_header(admin_token)).json()
+        (match,) = [o for o in listed if o["order_id"] == order["order_id"]]
+        assert match == single
+        assert match["customer_detail"]["point"] == 0
+        assert match["items"][0]["note"] == f"{TEST_PREFIX}list"
+
+    def test_list_sparse_fields(self):
+        """?fields= คืนเฉพาะ field ที่ขอ (ตามลำดับใน schema) และค่าตรงกับ response เต็ม"""
+        admin_token = get_admin_token()
+        customer_token = create_customer_and_get_token("sparse")
+        customer_id = client.get("/users/me", headers=auth_header(customer_token)).json()["user_id"]
+        order = client.post("/orders/", headers=auth_header(admin_token), json={
+            "customer_id": customer_id,
+            "items": [{"product_id": get_seed_product_id(), "note": f"{TEST_PREFIX}sparse"}],
+        }).json()
+
+        res = client.get("/orders/?fields=order_status,order_id", headers=auth_header(admin_token))
+        assert res.status_code == 200
+        (match,) = [o for o in res.json() if o["order_id"] == order["order_id"]]
+        assert list(match) == ["order_id", "order_status"]
+        assert match["order_status"] == "pending"
+
+        res = client.get("/orders/?fields=order_id,items,customer_detail", headers=auth_header(admin_token))
+        (match,) = [o for o in res.json() if o["order_id"] == order["order_id"]]
+        assert match["items"] == order["items"]
+        assert match["customer_detail"] == {"customer_name": "-", "point": 0}
+
+    def test_list_sparse_unknown_field(self):
+        """field ที่ไม่มีใน OrderResponse → 400"""
+        admin_token = get_admin_token()
+
+        res = client.get("/orders/?fields=order_id,password", headers=auth_header(admin_token))
+        assert res.status_code == 400
+        assert "password" in res.json()["detail"]
+
+        res = client.get("/orders/?fields=,", headers=auth_header(admin_token))
+        assert res.status_code == 400
+
     def test_list_orders_customer_forbidden(self):
         """customer ดู orders ไม่ได้ → 403"""
         customer_token = create_customer_and_get_token("2")
@@ -268,6 +446,7 @@ class TestUpdateOrder:
         admin_token = get_admin_token()
         product_id = get_seed_product_id()
         order = create_test_order(admin_token, product_id)
+        advance_order(admin_token, order["order_id"], "completed")
 
         res = client.patch(
             f"/orders/{order['order_id']}",
@@ -277,6 +456,19 @@ class TestUpdateOrder:
         assert res.status_code == 200
         assert res.json()["order_status"] == "completed"
 
+    def test_update_order_returns_new_change_seq(self):
+        """response หลังอัปเดตมี updated_seq ใหม่จาก RETURNING (ไม่ใช่ค่าเดิมที่ค้างใน session)"""
+        admin_token = get_admin_token()
+        order = create_test_order(admin_token, get_seed_product_id())
+
+        res = client.patch(
+            f"/orders/{order['order_id']}",
+            headers=auth_header(admin_token),
+            json={"order_status": "preparing"},
+        )
+        assert res.json()["updated_seq"] > order["updated_seq"]
+        assert res.json()["items"][0]["id"] == order["items"][0]["id"]
+
     def test_finish_order_table_empty(self):
         """set finish_at → table status เปลี่ยนเป็น empty"""
         admin_token = get_admin_token()
@@ -290,6 +482,7 @@ class TestUpdateOrder:
         assert table_res.json()["status"] == "full"
 
         # set finish_at
+        advance_order(admin_token, order["order_id"], "completed")
         res = client.patch(
             f"/orders/{order['order_id']}",
             headers=auth_header(admin_token),
@@ -310,6 +503,7 @@ class TestUpdateOrder:
         product_id = get_seed_product_id()
 
         order = create_test_order(admin_token, product_id)  # no table_ids
+        advance_order(admin_token, order["order_id"], "completed")
 
         res = client.patch(
             f"/orders/{order['order_id']}",
@@ -345,3 +539,783 @@ class TestUpdateOrder:
         assert res.status_code == 201
         assert res.json()["customer_id"] == customer_id
         assert res.json()["customer_detail"] is not None
+
+
+class TestOrderStatusTransitions:
+    """ทดสอบ state machine ของ order_status ผ่าน PATCH /orders/{id}"""
+
+    def test_forward_transitions(self):
+        """pending → preparing → ready → completed ได้ตามลำดับ"""
+        admin_token = get_admin_token()
+        order = create_test_order(admin_token, get_seed_product_id())
+
+        for next_status in ("preparing", "ready", "completed"):
+            res = client.patch(
+                f"/orders/{order['order_id']}",
+                headers=auth_header(admin_token),
+                json={"order_status": next_status},
+            )
+            assert res.status_code == 200
+            assert res.json()["order_status"] == next_status
+
+    def test_illegal_transition_409(self):
+        """completed → preparing ไม่ได้ → 409 และ status ไม่เปลี่ยน"""
+        admin_token = get_admin_token()
+        order = create_test_order(admin_token, get_seed_product_id())
+        advance_order(admin_token, order["order_id"], "completed")
+        client.patch(
+            f"/orders/{order['order_id']}",
+            headers=auth_header(admin_token),
+            json={"order_status": "completed"},
+        )
+
+        res = client.patch(
+            f"/orders/{order['order_id']}",
+            headers=auth_header(admin_token),
+            json={"order_status": "preparing"},
+        )
+        assert res.status_code == 409
+
+        res = client.get(f"/orders/{order['order_id']}", headers=auth_header(admin_token))
+        assert res.json()["order_status"] == "completed"
+
+    def test_skip_kitchen_states_409(self):
+        """pending → ready / completed ข้ามครัวไม่ได้ → 409"""
+        admin_token = get_admin_token()
+        order = create_test_order(admin_token, get_seed_product_id())
+
+        for next_status in ("ready", "completed"):
+            res = client.patch(
+                f"/orders/{order['order_id']}",
+                headers=auth_header(admin_token),
+                json={"order_status": next_status},
+            )
+            assert res.status_code == 409
+
+        res = client.get(f"/orders/{order['order_id']}", headers=auth_header(admin_token))
+        assert res.json()["order_status"] == "pending"
+
+    def test_cancel_only_open_orders(self):
+        """ยกเลิกได้เฉพาะ order ที่ครัวยังทำไม่เสร็จ — ready → cancelled → 409"""
+        admin_token = get_admin_token()
+        order = create_test_order(admin_token, get_seed_product_id())
+        advance_order(admin_token, order["order_id"], "completed")
+
+        res = client.patch(
+            f"/orders/{order['order_id']}",
+            headers=auth_header(admin_token),
+            json={"order_status": "cancelled"},
+        )
+        assert res.status_code == 409
+
+    def test_finish_twice_does_not_release_table_again(self):
+        """ส่ง finish_at ซ้ำบน order ที่ปิดแล้ว → 409 และโต๊ะที่ order ใหม่นั่งอยู่ไม่ถูกปล่อย"""
+        admin_token = get_admin_token()
+        product_id = get_seed_product_id()
+        table = create_test_table(admin_token, "89")
+        order = create_test_order(admin_token, product_id, [table["table_id"]])
+        advance_order(admin_token, order["order_id"], "completed")
+        finish = {"order_status": "completed", "finish_at": datetime.now().isoformat()}
+        res = client.patch(f"/orders/{order['order_id']}", headers=auth_header(admin_token), json=finish)
+        assert res.status_code == 200
+
+        create_test_order(admin_token, product_id, [table["table_id"]])
+        res = client.patch(f"/orders/{order['order_id']}", headers=auth_header(admin_token), json=finish)
+        assert res.status_code == 409
+
+        table_res = client.get(f"/tables/{table['table_id']}", headers=auth_header(admin_token))
+        assert table_res.json()["status"] == "full"
+
+    def test_concurrent_updates_single_winner(self):
+        """สอง request เปลี่ยน status จากค่าเดิมพร้อมกัน — UPDATE แบบมีเงื่อนไขให้ผ่านได้ทีละ request"""
+        admin_token = get_admin_token()
+        order = create_test_order(admin_token, get_seed_product_id())
+        advance_order(admin_token, order["order_id"], "ready")
+
+        def patch(status: str) -> int:
+            return client.patch(
+                f"/orders/{order['order_id']}",
+                headers=auth_header(admin_token),
+                json={"order_status": status},
+            ).status_code
+
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            codes = sorted(pool.map(patch, ["completed", "cancelled"]))
+        assert codes == [200, 409]
+
+    def test_same_status_allowed(self):
+        """set status เดิมซ้ำ (retry) → 200"""
+        admin_token = get_admin_token()
+        order = create_test_order(admin_token, get_seed_product_id())
+
+        res = client.patch(
+            f"/orders/{order['order_id']}",
+            headers=auth_header(admin_token),
+            json={"order_status": "pending"},
+        )
+        assert res.status_code == 200
+
+    def test_unknown_status_422(self):
+        """status ที่ไม่อยู่ใน state machine → 422"""
+        admin_token = get_admin_token()
+        order = create_test_order(admin_token, get_seed_product_id())
+
+        res = client.patch(
+            f"/orders/{order['order_id']}",
+            headers=auth_header(admin_token),
+            json={"order_status": "lost"},
+        )
+        assert res.status_code == 422
+
+
+class TestBulkUpdateOrders:
+    """ทดสอบ PATCH /orders/bulk"""
+
+    def test_bulk_update_status(self):
+        """เปลี่ยน status หลาย orders ในครั้งเดียว — ผลตามลำดับที่ส่งมา"""
+        admin_token = get_admin_token()
+        product_id = get_seed_product_id()
+        orders = [create_test_order(admin_token, product_id) for _ in range(3)]
+        order_ids = [o["order_id"] for o in orders]
+
+        res = client.patch("/orders/bulk", headers=auth_header(admin_token), json={
+            "order_ids": order_ids,
+            "order_status": "preparing",
+        })
+        assert res.status_code == 200
+        body = res.json()
+        assert body["updated"] == 3
+        assert body["failed"] == 0
+        assert [r["order_id"] for r in body["results"]] == order_ids
+        for result, order in zip(body["results"], orders):
+            assert result["status_code"] == 200
+            assert result["order"]["order_status"] == "preparing"
+            assert result["order"]["updated_seq"] > order["updated_seq"]
+            assert len(result["order"]["items"]) == 1
+
+    def test_bulk_rejects_per_id(self):
+        """order ที่เปลี่ยนไม่ได้ → 409, ไม่มีอยู่ → 404 — order อื่นยังถูกอัปเดต"""
+        admin_token = get_admin_token()
+        product_id = get_seed_product_id()
+        done = create_test_order(admin_token, product_id)
+        client.patch(
+            f"/orders/{done['order_id']}",
+            headers=auth_header(admin_token),
+            json={"order_status": "cancelled"},
+        )
+        ok = create_test_order(admin_token, product_id)
+
+        res = client.patch("/orders/bulk", headers=auth_header(admin_token), json={
+            "order_ids": [done["order_id"], ok["order_id"], 999999],
+            "order_status": "preparing",
+        })
+        assert res.status_code == 200
+        body = res.json()
+        assert body["updated"] == 1
+        assert body["failed"] == 2
+        assert [r["status_code"] for r in body["results"]] == [409, 200, 404]
+
+        res = client.get(f"/orders/{done['order_id']}", headers=auth_header(admin_token))
+        assert res.json()["order_status"] == "cancelled"
+
+    def test_bulk_finish_releases_tables(self):
+        """bulk completed + finish_at → โต๊ะของทุก order → empty"""
+        admin_token = get_admin_token()
+        product_id = get_seed_product_id()
+        tables = [create_test_table(admin_token, number) for number in ("83", "84")]
+        orders = [create_test_order(admin_token, product_id, [t["table_id"]]) for t in tables]
+        for order in orders:
+            advance_order(admin_token, order["order_id"], "completed")
+
+        res = client.patch("/orders/bulk", headers=auth_header(admin_token), json={
+            "order_ids": [o["order_id"] for o in orders],
+            "order_status": "completed",
+            "finish_at": datetime.now().isoformat(),
+        })
+        assert res.json()["updated"] == 2
+        for result in res.json()["results"]:
+            assert result["order"]["finish_at"] is not None
+
+        for table in tables:
+            table_res = client.get(f"/tables/{table['table_id']}", headers=auth_header(admin_token))
+            assert table_res.json()["status"] == "empty"
+
+    def test_bulk_no_token_401(self):
+        """ไม่มี token → 401"""
+        res = client.patch("/orders/bulk", json={"order_ids": [1], "order_status": "ready"})
+        assert res.status_code == 401
+
+
+# ===== Idempotency-Key =====
+
+class TestIdempotency:
+    """ทดสอบ header Idempotency-Key ของ POST /orders/"""
+
+    def _payload(self, product_id: int, table_ids: list[int] | None = None) -> dict:
+        return {
+            "table_ids": table_ids or [],
+            "items": [{"product_id": product_id, "quantity": 1, "note": f"{TEST_PREFIX}idem"}],
+        }
+
+    def _headers(self, token: str, key: str) -> dict:
+        return {**auth_header(token), "Idempotency-Key": key}
+
+    def test_retry_returns_same_order(self):
+        """ส่งซ้ำด้วย key เดิม → ได้ order เดิม ไม่สร้างใหม่"""
+        token = get_admin_token()
+        key = f"{TEST_PREFIX}{uuid.uuid4()}"
+        payload = self._payload(get_seed_product_id())
+
+        first = client.post("/orders/", headers=self._headers(token, key), json=payload)
+        retry = client.post("/orders/", headers=self._headers(token, key), json=payload)
+
+        assert first.status_code == 201
+        assert retry.status_code == 201
+        assert retry.headers["Idempotent-Replayed"] == "true"
+        assert retry.json() == first.json()
+
+    def test_concurrent_duplicates_create_one_order(self):
+        """retry พร้อมกัน 10 ครั้ง → order เดียว และสถานะโต๊ะเปลี่ยนครั้งเดียว"""
+        token = get_admin_token()
+        table = create_test_table(token, "85")
+        key = f"{TEST_PREFIX}{uuid.uuid4()}"
+        payload = self._payload(get_seed_product_id(), [table["table_id"]])
+
+        with ThreadPoolExecutor(max_workers=10) as pool:
+            responses = list(pool.map(
+                lambda _: client.post("/orders/", headers=self._headers(token, key), json=payload),
+                range(10),
+            ))
+
+        assert all(r.status_code == 201 for r in responses)
+        assert len({r.json()["order_id"] for r in responses}) == 1
+
+        table_after = client.get(f"/tables/{table['table_id']}", headers=auth_header(token)).json()
+        assert table_after["status"] == "full"
+        assert table_after["version"] == table["version"] + 1
+
+    def test_same_key_different_body(self):
+        """key เดิมแต่ body ต่าง → 422"""
+        token = get_admin_token()
+        key = f"{TEST_PREFIX}{uuid.uuid4()}"
+        product_id = get_seed_product_id()
+
+        client.post("/orders/", headers=self._headers(token, key), json=self._payload(product_id))
+        other = self._payload(product_id)
+        other["items"][0]["quantity"] = 3
+
+        response = client.post("/orders/", headers=self._headers(token, key), json=other)
+        assert response.status_code == 422
+
+    def test_failed_request_can_be_retried(self):
+        """request แรก error → key ถูกปล่อย retry ด้วย key เดิมแล้วทำงานใหม่"""
+        token = get_admin_token()
+        key = f"{TEST_PREFIX}{uuid.uuid4()}"
+
+        failed = client.post("/orders/", headers=self._headers(token, key), json=self._payload(999999))
+        again = client.post("/orders/", headers=self._headers(token, key), json=self._payload(999999))
+
+        assert failed.status_code == 404
+        assert again.status_code == 404
+        assert "Idempotent-Replayed" not in again.headers
+
+    def test_order_and_stored_response_commit_together(self, monkeypatch):
+        """เก็บ response ไม่สำเร็จ (เช่น worker ตายหลัง handler) → order ไม่ถูกสร้าง retry แล้วได้ order เดียว"""
+        token = get_admin_token()
+        key = f"{TEST_PREFIX}{uuid.uuid4()}"
+        payload = self._payload(get_seed_product_id())
+        payload["items"][0]["note"] = f"{TEST_PREFIX}{key}"
+
+        def crash(*args, **kwargs):
+            raise RuntimeError("worker died")
+
+        with monkeypatch.context() as patch:
+            patch.setattr(idempotency_service, "_complete", crash)
+            with pytest.raises(RuntimeError):
+                client.post("/orders/", headers=self._headers(token, key), json=payload)
+
+        def count_orders() -> int:
+            db = TestingSessionLocal()
+            try:
+                return db.query(OrderItem).filter(OrderItem.note == payload["items"][0]["note"]).count()
+            finally:
+                db.close()
+
+        assert count_orders() == 0
+        retry = client.post("/orders/", headers=self._headers(token, key), json=payload)
+        assert retry.status_code == 201
+        assert "Idempotent-Replayed" not in retry.headers
+        assert count_orders() == 1
+
+    def test_lost_claim_publishes_nothing(self, monkeypatch):
+        """claim ถูก request อื่นทับระหว่าง handler → 409, order ถูก rollback และไม่มี event/index ของ order นั้น"""
+        token = get_admin_token()
+        table = create_test_table(token, "86")
+        key = f"{TEST_PREFIX}{uuid.uuid4()}"
+        payload = self._payload(get_seed_product_id(), [table["table_id"]])
+        payload["items"][0]["note"] = f"{TEST_PREFIX}{key}"
+
+        claim = idempotency_service._claim
+        published: list[dict] = []
+        opened: list[list[int]] = []
+        monkeypatch.setattr(
+            idempotency_service, "_claim", lambda *args: claim(*args) - timedelta(seconds=1)
+        )
+        monkeypatch.setattr(order_service.order_events, "publish", published.append)
+        monkeypatch.setattr(table_service.table_events, "publish", published.append)
+        monkeypatch.setattr(eta_service, "on_order_opened", lambda db, order_ids: opened.append(order_ids))
+
+        res = client.post("/orders/", headers=self._headers(token, key), json=payload)
+
+        assert res.status_code == 409
+        assert published == []
+        assert opened == []
+        assert client.get(f"/tables/{table['table_id']}", headers=auth_header(token)).json()["status"] == "empty"
+        db = TestingSessionLocal()
+        assert db.query(OrderItem).filter(OrderItem.note == payload["items"][0]["note"]).count() == 0
+        db.close()
+
+    def test_expired_keys_purged_by_sweeper_not_requests(self):
+        """POST ไม่ลบ key ที่หมดอายุของคนอื่น — purge_expired (งานของ sweeper) ลบให้"""
+        token = get_admin_token()
+        user_id = client.get("/users/me", headers=auth_header(token)).json()["user_id"]
+        expired_key = f"{TEST_PREFIX}{uuid.uuid4()}"
+        db = TestingSessionLocal()
+        db.add(IdempotencyKey(
+            scope="orders", user_id=user_id, key=expired_key, fingerprint="0" * 64,
+            expires_at=datetime.now() - timedelta(hours=1),
+        ))
+        db.commit()
+
+        res = client.post(
+            "/orders/", headers=self._headers(token, f"{TEST_PREFIX}{uuid.uuid4()}"),
+            json=self._payload(get_seed_product_id()),
+        )
+        assert res.status_code == 201
+        assert db.get(IdempotencyKey, ("orders", user_id, expired_key)) is not None
+
+        assert idempotency_service.purge_expired(db) >= 1
+        db.commit()
+        db.expire_all()
+        assert db.get(IdempotencyKey, ("orders", user_id, expired_key)) is None
+        db.close()
+
+    def test_purge_runs_without_hold_sweeper(self, monkeypatch):
+        """ปิด RESERVATION_HOLD_SWEEP_ENABLED → ยังลบ key ที่หมดอายุตาม IDEMPOTENCY_PURGE_*"""
+        monkeypatch.setattr(settings, "RESERVATION_HOLD_SWEEP_ENABLED", False)
+        monkeypatch.setattr(settings, "WAITLIST_MATCH_SWEEP_ENABLED", False)
+        monkeypatch.setattr(settings, "IDEMPOTENCY_PURGE_INTERVAL_SECONDS", 0)
+        purged = threading.Event()
+        monkeypatch.setattr(hold_sweeper, "purge_idempotency_keys", purged.set)
+
+        async def run_briefly():
+            sweepers = hold_sweeper.start_sweepers()
+            assert len(sweepers) == 1
+            await asyncio.to_thread(purged.wait, 5)
+            for sweeper in sweepers:
+                sweeper.cancel()
+            await asyncio.gather(*sweepers, return_exceptions=True)
+
+        asyncio.run(run_briefly())
+        assert purged.is_set()
+
+
+# ===== GET /orders/kitchen-queue =====
+
+class TestKitchenQueue:
+    """ทดสอบ GET /orders/kitchen-queue และ delta บน kitchen feed"""
+
+    def _order(self, token: str, product_id: int, milk_type: str, quantity: int = 1) -> dict:
+        res = client.post("/orders/", headers=auth_header(token), json={"items": [{
+            "product_id": product_id,
+            "quantity": quantity,
+            "product_type": "iced",
+            "milk_type": milk_type,
+            "note": f"{TEST_PREFIX}queue",
+        }]})
+        return res.json()
+
+    def _groups(self, token: str, milk_type: str) -> list[dict]:
+        res = client.get("/orders/kitchen-queue", headers=auth_header(token))
+        assert res.status_code == 200
+        return [g for g in res.json() if g["milk_type"] == milk_type]
+
+    def test_same_options_grouped(self):
+        """items เมนู + options เดียวกันจากหลาย orders → กลุ่มเดียว พร้อมจำนวนรวมและ order ids"""
+        token = get_admin_token()
+        product_id = get_seed_product_id()
+        milk = f"{TEST_PREFIX}oat"
+        first = self._order(token, product_id, milk, quantity=2)
+        second = self._order(token, product_id, milk, quantity=3)
+        self._order(token, product_id, f"{TEST_PREFIX}soy")
+
+        groups = self._groups(token, milk)
+        assert len(groups) == 1
+        assert groups[0]["quantity"] == 5
+        assert groups[0]["order_ids"] == [first["order_id"], second["order_id"]]
+        assert groups[0]["product_type"] == "iced"
+
+    def test_completed_order_leaves_queue(self):
+        """order ที่เสร็จแล้วไม่อยู่ใน queue"""
+        token = get_admin_token()
+        milk = f"{TEST_PREFIX}almond"
+        order = self._order(token, get_seed_product_id(), milk)
+
+        advance_order(token, order["order_id"], "completed")
+        client.patch(f"/orders/{order['order_id']}", headers=auth_header(token), json={"order_status": "completed"})
+        assert self._groups(token, milk) == []
+
+    def test_feed_pushes_queue_delta(self):
+        """สร้าง order → kitchen feed ได้กลุ่มใหม่ของเมนูนั้น"""
+        token = get_admin_token()
+        product_id = get_seed_product_id()
+        milk = f"{TEST_PREFIX}coconut"
+
+        with client.websocket_connect(f"/orders/ws?token={token}") as ws:
+            snapshot = ws.receive_json()
+            assert isinstance(snapshot["kitchen_queue"], list)
+
+            order = self._order(token, product_id, milk, quantity=4)
+            (delta,) = receive_events(ws, "kitchen_queue", 1)
+
+        assert delta["product_ids"] == [product_id]
+        group = next(g for g in delta["groups"] if g["milk_type"] == milk)
+        assert group["quantity"] == 4
+        assert group["order_ids"] == [order["order_id"]]
+
+    def test_concurrent_deltas_published_in_query_order(self, monkeypatch):
+        """delta ที่ query ก่อนต้อง publish ก่อน — request ที่ช้าไม่ส่งกลุ่มเก่าทับกลุ่มใหม่"""
+        product_id = get_seed_product_id()
+        calls: list[int] = []
+        first_query_started, release_first = threading.Event(), threading.Event()
+
+        def slow_queue(db, product_ids):
+            calls.append(len(calls) + 1)
+            state = calls[-1]
+            if state == 1:
+                first_query_started.set()
+                release_first.wait(timeout=5)
+            return [{
+                "product_id": product_id, "product_name": "x", "quantity": state,
+                "order_ids": [state], "oldest_at": datetime.now(),
+            }]
+
+        published: list[dict] = []
+        monkeypatch.setattr(order_service, "get_kitchen_queue", slow_queue)
+        monkeypatch.setattr(order_service.order_events, "publish", published.append)
+
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            older = pool.submit(order_service._publish_kitchen_queue, None, {product_id})
+            assert first_query_started.wait(timeout=5)
+            newer = pool.submit(order_service._publish_kitchen_queue, None, {product_id})
+            time_module.sleep(0.1)
+            release_first.set()
+            older.result(), newer.result()
+
+        assert [event["groups"][0]["quantity"] for event in published] == [1, 2]
+
+    def test_kitchen_queue_customer_forbidden(self):
+        """customer ดู kitchen queue ไม่ได้ → 403"""
+        token = create_customer_and_get_token("queue")
+        res = client.get("/orders/kitchen-queue", headers=auth_header(token))
+        assert res.status_code == 403
+
+
+# ===== WS /orders/ws (kitchen feed) =====
+
+class TestKitchenFeed:
+    """ทดสอบ WebSocket /orders/ws"""
+
+    def test_feed_snapshot_then_new_order(self):
+        """เชื่อมต่อ → ได้ snapshot ก่อน แล้วได้ order ใหม่เมื่อมีการสร้าง"""
+        token = get_admin_token()
+        product_id = get_seed_product_id()
+
+        with client.websocket_connect(f"/orders/ws?token={token}") as ws:
+            snapshot = ws.receive_json()
+            assert snapshot["type"] == "snapshot"
+            assert isinstance(snapshot["orders"], list)
+
+            order = create_test_order(token, product_id)
+            event = ws.receive_json()
+
+        assert event["type"] == "order"
+        assert event["version"] > snapshot["version"]
+        assert event["order"]["order_id"] == order["order_id"]
+        assert event["order"]["items"][0]["product_id"] == product_id
+
+    def test_feed_resume_since_version(self):
+        """reconnect ด้วย ?since= → ได้เฉพาะ events ที่พลาดไป ไม่ต้องโหลด snapshot"""
+        token = get_admin_token()
+        product_id = get_seed_product_id()
+
+        with client.websocket_connect(f"/orders/ws?token={token}") as ws:
+            snapshot = ws.receive_json()
+        last_seen, epoch = snapshot["version"], snapshot["epoch"]
+
+        missed = create_test_order(token, product_id)
+        client.patch(
+            f"/orders/{missed['order_id']}",
+            headers=auth_header(token),
+            json={"order_status": "preparing"},
+        )
+
+        with client.websocket_connect(f"/orders/ws?token={token}&since={last_seen}&epoch={epoch}") as ws:
+            created, updated = receive_events(ws, "order", 2)
+
+        assert created["type"] == "order"
+        assert created["order"]["order_id"] == missed["order_id"]
+        assert updated["order"]["order_status"] == "preparing"
+        assert updated["version"] > created["version"] > last_seen
+        assert created["epoch"] == updated["epoch"] == epoch
+
+    def test_feed_resume_other_epoch_gets_snapshot(self):
+        """since มาจาก worker อื่น / ก่อน restart (epoch ไม่ตรง) → ได้ snapshot ไม่ใช่ events ของ version อื่น"""
+        token = get_admin_token()
+
+        with client.websocket_connect(f"/orders/ws?token={token}") as ws:
+            snapshot = ws.receive_json()
+
+        for query in (f"&epoch=other{snapshot['epoch']}", ""):
+            url = f"/orders/ws?token={token}&since={snapshot['version']}{query}"
+            with client.websocket_connect(url) as ws:
+                resumed = ws.receive_json()
+            assert resumed["type"] == "snapshot"
+            assert resumed["epoch"] == snapshot["epoch"]
+
+    def test_feed_customer_forbidden(self):
+        """customer เชื่อมต่อ kitchen feed ไม่ได้"""
+        token = create_customer_and_get_token("ws")
+        with pytest.raises(WebSocketDisconnect):
+            with client.websocket_connect(f"/orders/ws?token={token}") as ws:
+                ws.receive_json()
+
+    def test_feed_no_token(self):
+        """ไม่มี token → เชื่อมต่อไม่ได้"""
+        with pytest.raises(WebSocketDisconnect):
+            with client.websocket_connect("/orders/ws") as ws:
+                ws.receive_json()
+
+
+# ===== ETA =====
+
+class TestPrepTimeEstimator:
+    """ทดสอบ PrepTimeEstimator — rolling window ต่อเมนู + ลำดับในคิว"""
+
+    def setup_method(self):
+        self.now = datetime(2026, 1, 1, 12, 0)
+
+    def test_rolling_window_drops_oldest(self):
+        """ค่าเฉลี่ยใช้เฉพาะ window_size ค่าล่าสุดของเมนูนั้น"""
+        estimator = PrepTimeEstimator(window_size=2, default_prep_seconds=300)
+        for seconds in (600, 120, 180):
+            estimator.record([1], seconds)
+        assert estimator.product_seconds(1) == 150
+
+    def test_order_prep_is_slowest_product(self):
+        """เวลาทำของ order = เมนูที่ช้าที่สุด, เมนูที่ยังไม่มีข้อมูล → ค่าเฉลี่ยรวม"""
+        estimator = PrepTimeEstimator(window_size=10, default_prep_seconds=300)
+        assert estimator.prep_seconds([1]) == 300
+        estimator.record([1], 60)
+        estimator.record([2], 240)
+        assert estimator.prep_seconds([1, 2]) == 240
+        assert estimator.prep_seconds([3]) == 150
+
+    def test_ahead_moves_up_when_orders_close(self):
+        """order ที่ปิดไปแล้วไม่นับเป็นคิวก่อนหน้า"""
+        estimator = PrepTimeEstimator(window_size=10, default_prep_seconds=300)
+        for order_id in (1, 2, 3):
+            estimator.open(order_id)
+        assert [estimator.ahead(order_id) for order_id in (1, 2, 3)] == [0, 1, 2]
+
+        assert estimator.close(1)
+        assert not estimator.close(1)
+        assert estimator.ahead(3) == 1
+        estimator.open(4)
+        assert estimator.ahead(4) == 2
+
+    def test_ahead_ignores_orders_that_joined_later(self):
+        """order ที่เข้าคิวทีหลังแล้วปิดก่อน ไม่ทำให้ order ที่อยู่ก่อนขยับขึ้น"""
+        estimator = PrepTimeEstimator(window_size=10, default_prep_seconds=300)
+        estimator.reset_queue([1, 2])
+        estimator.open(3)
+        estimator.open(4)
+
+        assert estimator.close(4)
+        assert estimator.close(3)
+        assert estimator.ahead(2) == 1
+        assert estimator.close(1)
+        assert [estimator.ahead(2), estimator.ahead(5)] == [0, 1]
+
+    def test_estimate_waits_for_orders_ahead(self):
+        """order ที่อยู่ในรอบที่ครัวทำอยู่ → created_at + prep, เกินกว่านั้นรอทีละ prep / parallel"""
+        estimator = PrepTimeEstimator(window_size=10, default_prep_seconds=300, parallel_orders=2)
+        estimator.record([1], 120)
+        estimator.reset_queue([10, 11, 12, 13])
+
+        created_at = self.now - timedelta(seconds=30)
+        assert estimator.estimate(10, [1], created_at, self.now) == (0, 120, created_at + timedelta(seconds=120))
+        assert estimator.estimate(11, [1], created_at, self.now)[0] == 1
+        assert estimator.estimate(13, [1], created_at, self.now) == (3, 120, self.now + timedelta(seconds=240))
+
+
+class TestOrderEta:
+    """ทดสอบ ETA บน OrderResponse และ GET /orders/{id}/eta"""
+
+    def test_new_order_has_eta(self):
+        """order ใหม่มี eta และ order ถัดไปรอคิวมากกว่า 1"""
+        token = get_admin_token()
+        product_id = get_seed_product_id()
+        first = create_test_order(token, product_id)
+        second = create_test_order(token, product_id)
+        assert first["eta"] is not None
+
+        first_eta = client.get(f"/orders/{first['order_id']}/eta", headers=auth_header(token)).json()
+        second_eta = client.get(f"/orders/{second['order_id']}/eta", headers=auth_header(token)).json()
+        assert first_eta["order_status"] == "pending"
+        assert second_eta["queue_ahead"] == first_eta["queue_ahead"] + 1
+        assert second_eta["prep_seconds"] is not None
+
+    def test_completed_order_records_prep_time(self):
+        """order ที่เสร็จแล้วไม่มี eta — order ถัดไปขยับขึ้นในคิว"""
+        token = get_admin_token()
+        product_id = get_seed_product_id()
+        first = create_test_order(token, product_id)
+        second = create_test_order(token, product_id)
+        before = client.get(f"/orders/{second['order_id']}/eta", headers=auth_header(token)).json()
+
+        advance_order(token, first["order_id"], "ready")
+        res = client.patch(f"/orders/{first['order_id']}", headers=auth_header(token), json={"order_status": "ready"})
+        assert res.json()["eta"] is None
+
+        after = client.get(f"/orders/{second['order_id']}/eta", headers=auth_header(token)).json()
+        assert after["queue_ahead"] == before["queue_ahead"] - 1
+        # เวลาทำจริงของ order แรก (ไม่กี่วินาที) แทนค่า default
+        assert after["prep_seconds"] < settings.ORDER_ETA_DEFAULT_PREP_SECONDS
+
+        closed = client.get(f"/orders/{first['order_id']}/eta", headers=auth_header(token)).json()
+        assert closed == {
+            "order_id": first["order_id"],
+            "order_status": "ready",
+            "queue_ahead": None,
+            "prep_seconds": None,
+            "eta": None,
+        }
+
+    def test_customer_sees_own_order_only(self):
+        """customer ดู ETA ของ order ตัวเองได้ ของคนอื่น → 403"""
+        admin_token = get_admin_token()
+        customer_token = create_customer_and_get_token("eta")
+        customer_id = client.get("/users/me", headers=auth_header(customer_token)).json()["user_id"]
+        product_id = get_seed_product_id()
+
+        own = client.post("/orders/", headers=auth_header(admin_token), json={
+            "customer_id": customer_id,
+            "items": [{"product_id": product_id, "note": f"{TEST_PREFIX}eta"}],
+        }).json()
+        other = create_test_order(admin_token, product_id)
+
+        res = client.get(f"/orders/{own['order_id']}/eta", headers=auth_header(customer_token))
+        assert res.status_code == 200
+        assert res.json()["eta"] is not None
+        res = client.get(f"/orders/{other['order_id']}/eta", headers=auth_header(customer_token))
+        assert res.status_code == 403
+
+    def test_eta_not_found(self):
+        """order ที่ไม่มีอยู่ → 404"""
+        token = get_admin_token()
+        res = client.get("/orders/999999/eta", headers=auth_header(token))
+        assert res.status_code == 404
+
+
+# ===== FastJSONResponse =====
+
+class TestFastJSONResponse:
+    """ทดสอบ FastJSONResponse — bytes เหมือน JSONResponse + jsonable_encoder"""
+
+    def test_same_bytes_as_json_response(self):
+        """datetime, ภาษาไทย, None และ nested items ได้ผลเหมือนเดิม"""
+        token = get_admin_token()
+        order = create_test_order(token, get_seed_product_id())
+        db = TestingSessionLocal()
+        try:
+            data = get_order_by_id(db, order["order_id"])
+        finally:
+            db.close()
+        expected = JSONResponse(jsonable_encoder(data)).body
+        assert FastJSONResponse(data).body == expected
+        assert FastJSONResponse(OrderResponse.model_validate(data)).body == JSONResponse(
+            jsonable_encoder(OrderResponse.model_validate(data))
+        ).body
+
+    def test_list_route_uses_fast_response(self):
+        """GET /orders/ (ไม่มี response_model) ยังคืน JSON เดิม"""
+        token = get_admin_token()
+        order = create_test_order(token, get_seed_product_id())
+        res = client.get("/orders/", headers=auth_header(token))
+        assert res.headers["content-type"] == "application/json"
+        assert any(o["order_id"] == order["order_id"] for o in res.json())
+
+
+# ===== MessagePack =====
+
+msgpack = content_negotiation.msgpack
+MSGPACK_HEADERS = {"Content-Type": MSGPACK_MEDIA_TYPE, "Accept": MSGPACK_MEDIA_TYPE}
+
+
+class TestMessagePack:
+    """ทดสอบ MessagePackMiddleware กับ POST /orders/ (OrderCreate) และ GET"""
+
+    @pytest.mark.skipif(msgpack is None, reason="ไม่ได้ติดตั้ง msgpack")
+    def test_accepts_msgpack(self):
+        """เลือก msgpack เมื่อ q ไม่น้อยกว่า JSON — */* อย่างเดียวยังเป็น JSON"""
+        assert accepts_msgpack("application/msgpack")
+        assert accepts_msgpack("application/json, application/x-msgpack")
+        assert not accepts_msgpack("application/json, application/msgpack;q=0.5")
+        assert not accepts_msgpack("*/*")
+        assert not accepts_msgpack(None)
+
+    @pytest.mark.skipif(msgpack is None, reason="ไม่ได้ติดตั้ง msgpack")
+    def test_create_order_msgpack_round_trip(self):
+        """body แบบ msgpack ผ่าน OrderCreate เหมือน JSON — response เป็น msgpack ที่ค่าเหมือน JSON"""
+        token = get_admin_token()
+        body = msgpack.packb({"items": [{"product_id": get_seed_product_id(), "quantity": 2, "note": TEST_PREFIX}]})
+
+        res = client.post("/orders/", headers={**auth_header(token), **MSGPACK_HEADERS}, content=body)
+        assert res.status_code == 201
+        assert res.headers["content-type"] == MSGPACK_MEDIA_TYPE
+        created = msgpack.unpackb(res.content)
+
+        assert created["items"][0]["quantity"] == 2
+
+        url = f"/orders/{created['order_id']}"
+        as_json = client.get(url, headers=auth_header(token))
+        as_msgpack = client.get(url, headers={**auth_header(token), "Accept": MSGPACK_MEDIA_TYPE})
+        decoded = msgpack.unpackb(as_msgpack.content)
+        assert "Accept" in as_json.headers["vary"]
+        assert decoded == {**as_json.json(), "eta": decoded["eta"]}  # eta ขึ้นกับเวลาที่เรียก
+
+    @pytest.mark.skipif(msgpack is None, reason="ไม่ได้ติดตั้ง msgpack")
+    def test_create_order_msgpack_validation(self):
+        """validation เดียวกับ JSON (422 ตอบเป็น msgpack) — body ที่ decode ไม่ได้ → 400"""
+        token = get_admin_token()
+        headers = {**auth_header(token), **MSGPACK_HEADERS}
+
+        res = client.post("/orders/", headers=headers, content=msgpack.packb({"items": []}))
+        assert res.status_code == 422
+        assert msgpack.unpackb(res.content)["detail"][0]["loc"] == ["body", "items"]
+
+        res = client.post("/orders/", headers=headers, content=b"\xc1")
+        assert res.status_code == 400
+
+    @pytest.mark.skipif(msgpack is not None, reason="ติดตั้ง msgpack แล้ว")
+    def test_msgpack_unavailable(self):
+        """ไม่ได้ติดตั้ง msgpack → body แบบ msgpack ได้ 415 และ Accept: msgpack ได้ JSON"""
+        token = get_admin_token()
+        res = client.post("/orders/", headers={**auth_header(token), **MSGPACK_HEADERS}, content=b"\x80")
+        assert res.status_code == 415
+
+        res = client.get("/orders/", headers={**auth_header(token), "Accept": MSGPACK_MEDIA_TYPE})
+        assert res.status_code == 200
+        assert res.headers["content-type"] == "application/json"
+        assert not accepts_msgpack(MSGPACK_MEDIA_TYPE)
@@ -7,22 +7,38 @@ Integration tests สำหรับ products endpoints
 - POST /products/ — เพิ่มเมนู (staff/admin)
 - PUT /products/{id} — แก้เมนู (staff/admin)
 - DELETE /products/{id} — ลบเมนู (staff/admin)
+- single-flight สำหรับ GET /products/ ที่เข้ามาพร้อมกัน
+- POST /products/import, GET /products/export — bulk import/export (admin)
+- การบีบอัด response (gzip) + menu cache ที่เก็บตัวที่บีบอัดแล้ว
 """
 
+import gzip
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import pytest
 from fastapi.testclient import TestClient
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse, StreamingResponse
+from starlette.routing import Route
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
 from app.main import app
-from app.config.database import get_db
+from app.config.database import DB_CONNECT_ARGS, get_db
 from app.config.settings import settings
+from app.core import metrics
+from app.core.compression import CompressionMiddleware, negotiate_encoding
+from app.core.content_negotiation import MSGPACK_MEDIA_TYPE, msgpack
+from app.core.singleflight import SingleFlight
 from app.models.product import Product
 from app.models.user import User
 
 # Test DB setup
-engine = create_engine(settings.TEST_DATABASE_URL)
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+engine = create_engine(settings.TEST_DATABASE_URL, connect_args=DB_CONNECT_ARGS)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
 
 
 def override_get_db():
@@ -136,6 +152,26 @@ class TestListProducts:
         assert "type_options" in test_product
         assert len(test_product["sweetness_options"]) == 4
 
+    def test_list_products_sparse_fields(self):
+        """?fields= คืนเฉพาะ field ที่ขอ — ตรวจกับ schema ตาม role"""
+        token = get_admin_token()
+        product = create_test_product(token)
+
+        response = client.get("/products/?fields=product_id,type_options", headers=auth_header(token))
+        assert response.status_code == 200
+        (match,) = [p for p in response.json() if p["product_id"] == product["product_id"]]
+        assert match == {"product_id": product["product_id"], "type_options": product["type_options"]}
+
+        response = client.get("/products/?fields=product_id,price")
+        assert response.status_code == 200
+        (match,) = [p for p in response.json() if p["product_id"] == product["product_id"]]
+        assert match == {"product_id": product["product_id"], "price": product["price"]}
+
+    def test_list_products_sparse_public_cannot_request_staff_fields(self):
+        """public ขอ field ที่มีเฉพาะ staff → 400"""
+        response = client.get("/products/?fields=product_id,sweetness_options")
+        assert response.status_code == 400
+
 
 # ===== GET /products/{id} (public) =====
 
@@ -202,6 +238,17 @@ class TestCreateProduct:
         })
         assert response.status_code == 403
 
+    def test_create_product_duplicate_name(self):
+        """ชื่อเมนูซ้ำ → 409"""
+        token = get_admin_token()
+        create_test_product(token, "Duplicate")
+
+        response = client.post("/products/", headers=auth_header(token), json={
+            "product_name": f"{TEST_PREFIX}Duplicate",
+            "price": 10,
+        })
+        assert response.status_code == 409
+
 
 # ===== PUT /products/{id} (staff/admin) =====
 
@@ -266,3 +313,280 @@ class TestDeleteProduct:
             headers=auth_header(token_customer),
         )
         assert response.status_code == 403
+
+
+# ===== Single-flight (hot read coalescing) =====
+
+class TestSingleFlight:
+    """ทดสอบการรวม request ที่เหมือนกันซึ่งเข้ามาพร้อมกัน"""
+
+    def test_500_concurrent_calls_share_one_fetch(self):
+        """500 clients พร้อมกัน → fetch จริงแค่ไม่กี่ครั้ง และทุกคนได้ผลลัพธ์เดียวกัน"""
+        flight = SingleFlight("test_flight")
+        fetch_count = 0
+        start = threading.Barrier(500)
+
+        def fetch():
+            nonlocal fetch_count
+            fetch_count += 1
+            time.sleep(0.2)  # จำลอง DB query ที่ช้า
+            return ["menu"]
+
+        def client_call():
+            start.wait()
+            return flight.do("products:public", fetch)
+
+        with ThreadPoolExecutor(max_workers=500) as pool:
+            results = list(pool.map(lambda _: client_call(), range(500)))
+
+        assert all(r is results[0] for r in results)
+        assert fetch_count < 10
+        stats = metrics.snapshot()
+        assert stats["test_flight.products:public.executed"] == fetch_count
+        assert stats["test_flight.products:public.coalesced"] == 500 - fetch_count
+
+    def test_metrics_admin_only(self):
+        """GET /metrics เปิดเผย counters ภายใน — admin เท่านั้น"""
+        assert client.get("/metrics").status_code == 401
+        assert client.get("/metrics", headers=auth_header(create_customer_and_get_token())).status_code == 403
+
+        response = client.get("/metrics", headers=auth_header(get_admin_token()))
+        assert response.status_code == 200
+        assert isinstance(response.json(), dict)
+
+    def test_keys_do_not_share_results(self):
+        """key ต่างกัน (เช่น role variant) ไม่ใช้ผลลัพธ์ร่วมกัน"""
+        flight = SingleFlight("test_flight_keys")
+        assert flight.do("products:public", lambda: "public") == "public"
+        assert flight.do("products:staff", lambda: "staff") == "staff"
+
+    def test_error_propagates_to_waiters(self):
+        """ถ้า fetch ล้มเหลว ทุก request ที่รออยู่ได้ error เดียวกัน และ key ถูกล้าง"""
+        flight = SingleFlight("test_flight_error")
+        start = threading.Barrier(20)
+
+        def fetch():
+            time.sleep(0.1)
+            raise RuntimeError("db down")
+
+        def client_call():
+            start.wait()
+            try:
+                flight.do("tables:public", fetch)
+            except RuntimeError as e:
+                return str(e)
+
+        with ThreadPoolExecutor(max_workers=20) as pool:
+            results = list(pool.map(lambda _: client_call(), range(20)))
+
+        assert results == ["db down"] * 20
+        assert flight.do("tables:public", lambda: "ok") == "ok"
+
+    def test_list_products_concurrent_clients(self):
+        """GET /products/ พร้อมกันหลาย client ยังได้ผลลัพธ์ถูกต้อง"""
+        with ThreadPoolExecutor(max_workers=20) as pool:
+            responses = list(pool.map(lambda _: client.get("/products/"), range(20)))
+
+        assert all(r.status_code == 200 for r in responses)
+        assert all(r.json() == responses[0].json() for r in responses)
+
+
+# ===== Bulk import / export (admin) =====
+
+def import_file(token: str, filename: str, content: str, **params):
+    """POST /products/import ด้วยไฟล์ upload"""
+    return client.post(
+        "/products/import",
+        headers=auth_header(token),
+        params=params,
+        files={"file": (filename, content.encode(), "application/octet-stream")},
+    )
+
+
+class TestProductImport:
+    """ทดสอบ POST /products/import และ GET /products/export"""
+
+    CSV_HEADER = "product_name,price,sweetness_options,milk_type_options,type_options,image\n"
+
+    def test_import_csv_creates_then_diffs(self):
+        """import ครั้งแรกสร้างใหม่ → import ซ้ำ (แก้ราคา 1 เมนู) ได้ updated 1, unchanged 1"""
+        token = get_admin_token()
+        content = (
+            self.CSV_HEADER
+            + f"{TEST_PREFIX}Mocha,80,0|50|100,oat|soy,hot|iced,\n"
+            + f"{TEST_PREFIX}Matcha,90,,,iced,matcha.png\n"
+        )
+
+        first = import_file(token, "menu.csv", content)
+        assert first.status_code == 200
+        data = first.json()
+        assert data["total"] == 2
+        assert {p["product_name"] for p in data["created"]} == {f"{TEST_PREFIX}Mocha", f"{TEST_PREFIX}Matcha"}
+        assert data["updated"] == []
+
+        second = import_file(token, "menu.csv", content.replace("Mocha,80", "Mocha,85"))
+        data = second.json()
+        assert data["created"] == []
+        assert [p["product_name"] for p in data["updated"]] == [f"{TEST_PREFIX}Mocha"]
+        assert data["unchanged"] == 1
+
+        mocha_id = data["updated"][0]["product_id"]
+        mocha = client.get(f"/products/{mocha_id}", headers=auth_header(token)).json()
+        assert mocha["price"] == 85
+        assert mocha["sweetness_options"] == ["0", "50", "100"]
+        assert mocha["milk_type_options"] == ["oat", "soy"]
+
+    def test_import_invalidates_menu_cache(self):
+        """GET /products/ หลัง import เห็นเมนูใหม่ทันที"""
+        token = get_admin_token()
+        client.get("/products/")  # โหลด cache ก่อน
+
+        import_file(token, "menu.jsonl", json.dumps({"product_name": f"{TEST_PREFIX}Cocoa", "price": 60}))
+
+        names = [p["product_name"] for p in client.get("/products/").json()]
+        assert f"{TEST_PREFIX}Cocoa" in names
+
+    def test_import_invalid_rows_write_nothing(self):
+        """มีแถวผิด → 422 บอกเลขบรรทัด และไม่มีเมนูไหนถูกเขียน"""
+        token = get_admin_token()
+        content = "\n".join([
+            json.dumps({"product_name": f"{TEST_PREFIX}Ok", "price": 50}),
+            json.dumps({"product_name": f"{TEST_PREFIX}Bad", "price": -1}),
+            "not json",
+        ])
+
+        response = import_file(token, "menu.jsonl", content)
+        assert response.status_code == 422
+        lines = {err["loc"][1] for err in response.json()["detail"]}
+        assert lines == {2, 3}
+
+        names = [p["product_name"] for p in client.get("/products/").json()]
+        assert f"{TEST_PREFIX}Ok" not in names
+
+    def test_import_unknown_format(self):
+        """ไม่ระบุ format และนามสกุลไฟล์ไม่รู้จัก → 400"""
+        response = import_file(get_admin_token(), "menu.txt", "x")
+        assert response.status_code == 400
+
+    def test_import_too_large(self, monkeypatch):
+        """ไฟล์ใหญ่กว่า PRODUCT_IMPORT_MAX_BYTES → 413 และไม่มีเมนูไหนถูกเขียน"""
+        content = self.CSV_HEADER + f"{TEST_PREFIX}Big,50,,,,\n"
+        monkeypatch.setattr(settings, "PRODUCT_IMPORT_MAX_BYTES", len(content.encode()) - 1)
+
+        response = import_file(get_admin_token(), "menu.csv", content)
+        assert response.status_code == 413
+
+        names = [p["product_name"] for p in client.get("/products/").json()]
+        assert f"{TEST_PREFIX}Big" not in names
+
+        monkeypatch.setattr(settings, "PRODUCT_IMPORT_MAX_BYTES", len(content.encode()))
+        assert import_file(get_admin_token(), "menu.csv", content).status_code == 200
+
+    def test_import_customer_forbidden(self):
+        """customer ไม่มีสิทธิ์ import → 403"""
+        response = import_file(create_customer_and_get_token(), "menu.csv", self.CSV_HEADER)
+        assert response.status_code == 403
+
+    def test_export_round_trip(self):
+        """export แล้ว import กลับ → ไม่มีอะไรเปลี่ยน"""
+        token = get_admin_token()
+        import_file(token, "menu.csv", self.CSV_HEADER + f"{TEST_PREFIX}Export,70,0|100,oat,hot,\n")
+
+        for fmt in ("csv", "jsonl"):
+            exported = client.get("/products/export", headers=auth_header(token), params={"format": fmt})
+            assert exported.status_code == 200
+            assert f"{TEST_PREFIX}Export" in exported.text
+
+            again = import_file(token, f"menu.{fmt}", exported.text)
+            assert again.json()["created"] == []
+            assert again.json()["updated"] == []
+
+
+# ===== Response compression =====
+
+class TestResponseCompression:
+    """ทดสอบ CompressionMiddleware + PrecompressedBody ของ menu cache"""
+
+    def test_negotiate_encoding(self):
+        """เลือก encoding ตาม q-value — identity/q=0 → ไม่บีบอัด"""
+        assert negotiate_encoding("gzip, deflate") == "gzip"
+        assert negotiate_encoding("deflate;q=1.0, gzip;q=0.5") == "gzip"
+        assert negotiate_encoding("gzip;q=0") is None
+        assert negotiate_encoding("identity") is None
+        assert negotiate_encoding(None) is None
+
+    def test_menu_served_precompressed(self):
+        """GET /products/ (ใหญ่กว่า threshold) → gzip และ cache hit ใช้ตัวที่บีบอัดไว้แล้ว"""
+        token = get_admin_token()
+        for i in range(10):
+            create_test_product(token, f"Compressed {i}")
+        headers = {**auth_header(token), "Accept-Encoding": "gzip"}
+
+        first = client.get("/products/", headers=headers)
+        assert first.headers["content-encoding"] == "gzip"
+        assert "Accept-Encoding" in first.headers["vary"]
+
+        before = metrics.snapshot().get("compression.precompressed_hits", 0)
+        second = client.get("/products/", headers=headers)
+        assert second.json() == first.json()
+        assert metrics.snapshot().get("compression.precompressed_hits", 0) == before + 1
+
+        plain = client.get("/products/", headers={**auth_header(token), "Accept-Encoding": "identity"})
+        assert "content-encoding" not in plain.headers
+        assert plain.json() == first.json()
+
+    @pytest.mark.skipif(msgpack is None, reason="ไม่ได้ติดตั้ง msgpack")
+    def test_menu_msgpack_compressed(self):
+        """Accept: msgpack + gzip → แปลงเป็น msgpack ก่อนแล้วจึงบีบอัด (ไม่ใช่ JSON ที่บีบไว้ใน cache)"""
+        token = get_admin_token()
+        for i in range(10):
+            create_test_product(token, f"Msgpack {i}")
+        headers = {**auth_header(token), "Accept-Encoding": "gzip"}
+
+        as_json = client.get("/products/", headers=headers)
+        as_msgpack = client.get("/products/", headers={**headers, "Accept": MSGPACK_MEDIA_TYPE})
+        assert as_msgpack.headers["content-type"] == MSGPACK_MEDIA_TYPE
+        assert as_msgpack.headers["content-encoding"] == "gzip"
+        assert msgpack.unpackb(as_msgpack.content) == as_json.json()
+
+    def test_small_response_not_compressed(self):
+        """body เล็กกว่า COMPRESSION_MINIMUM_SIZE → ส่งตามเดิม"""
+        response = client.get("/health", headers={"Accept-Encoding": "gzip"})
+        assert response.status_code == 200
+        assert "content-encoding" not in response.headers
+
+    def test_streaming_export_compressed(self):
+        """StreamingResponse (export) ถูกบีบอัดทีละ chunk — เนื้อหาเหมือนแบบไม่บีบอัด"""
+        token = get_admin_token()
+        create_test_product(token)
+
+        compressed = client.get("/products/export", headers={**auth_header(token), "Accept-Encoding": "gzip"})
+        plain = client.get("/products/export", headers={**auth_header(token), "Accept-Encoding": "identity"})
+        assert compressed.headers["content-encoding"] == "gzip"
+        assert "content-length" not in compressed.headers
+        assert compressed.text == plain.text
+
+    def test_event_stream_passthrough(self):
+        """text/event-stream และ response ที่มี Content-Encoding แล้ว → middleware ไม่แตะ"""
+
+        def events(request):
+            return StreamingResponse(iter(["data: x\n\n"] * 500), media_type="text/event-stream")
+
+        def encoded(request):
+            return PlainTextResponse(gzip.compress(b"x" * 5000), headers={"Content-Encoding": "gzip"})
+
+        def stream(request):
+            return StreamingResponse(iter([b"y" * 1000] * 5), media_type="text/plain")
+
+        inner = Starlette(routes=[Route("/events", events), Route("/encoded", encoded), Route("/stream", stream)])
+        with TestClient(CompressionMiddleware(inner, minimum_size=1024)) as test_client:
+            sse = test_client.get("/events", headers={"Accept-Encoding": "gzip"})
+            assert "content-encoding" not in sse.headers
+            assert sse.text == "data: x\n\n" * 500
+
+            already = test_client.get("/encoded", headers={"Accept-Encoding": "gzip"})
+            assert already.content == b"x" * 5000  # ถูก decode ครั้งเดียว (ไม่ถูกบีบซ้ำ)
+
+            streamed = test_client.get("/stream", headers={"Accept-Encoding": "gzip"})
+            assert streamed.headers["content-encoding"] == "gzip"
+            assert streamed.content == b"y" * 5000
@@ -0,0 +1,262 @@
+"""
+Reports Tests
+
+Integration tests สำหรับ reports endpoints
+- POST /reports/close-day — ปิดยอดวัน + snapshot ไม่เปลี่ยนหลังสร้าง (staff/admin)
+- GET /reports/close-day/{date} — ดู snapshot ของวันที่ปิดยอดแล้ว (staff/admin)
+"""
+
+import pytest
+from datetime import date, datetime, time, timedelta
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, update
+from sqlalchemy.orm import sessionmaker
+
+from app.main import app
+from app.config.database import DB_CONNECT_ARGS, get_db
+from app.config.settings import settings
+from app.models.base import utcnow
+from app.models.order import Order, OrderItem
+from app.models.report import DailyReport
+from app.models.user import User
+
+# Test DB setup
+engine = create_engine(settings.TEST_DATABASE_URL, connect_args=DB_CONNECT_ARGS)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
+
+
+def override_get_db():
+    db = TestingSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+app.dependency_overrides[get_db] = override_get_db
+client = TestClient(app)
+
+TEST_PREFIX = "TESTRPT_"
+TEST_SUFFIX = "_testrpt"
+
+# วันในอดีตที่ไม่มี order — ใช้ทดสอบวันว่าง
+EMPTY_DAY = date(2000, 1, 1)
+# วันในอดีตที่ test ย้าย created_at ของ order ไปไว้ (ปิดยอดได้เฉพาะวันที่จบแล้ว)
+REPORT_DAY = date(2001, 1, 1)
+
+
+# === Helpers ===
+
+def get_admin_token() -> str:
+    """Login ด้วย admin (seed data) แล้วคืน token"""
+    res = client.post("/auth/login", json={
+        "username": "admin",
+        "password": "admin",
+    })
+    return res.json()["access_token"]
+
+
+def create_customer_and_get_token() -> str:
+    """สร้าง customer test user แล้วคืน token"""
+    client.post("/auth/register", json={
+        "username": f"rptcust{TEST_SUFFIX}",
+        "password": "test1234",
+    })
+    res = client.post("/auth/login", json={
+        "username": f"rptcust{TEST_SUFFIX}",
+        "password": "test1234",
+    })
+    return res.json()["access_token"]
+
+
+def auth_header(token: str) -> dict:
+    return {"Authorization": f"Bearer {token}"}
+
+
+def get_seed_product_ids() -> list[int]:
+    """ดึง product_id จาก seed data (public endpoint)"""
+    return [p["product_id"] for p in client.get("/products/").json()]
+
+
+def create_test_order(token: str, items: list[tuple[int, int]]) -> dict:
+    """สร้าง takeaway order จาก [(product_id, quantity)] แล้วคืน response data"""
+    res = client.post("/orders/", headers=auth_header(token), json={
+        "items": [
+            {"product_id": product_id, "quantity": quantity, "note": f"{TEST_PREFIX}report"}
+            for product_id, quantity in items
+        ],
+    })
+    return res.json()
+
+
+def move_order_to(order: dict, created_at: datetime):
+    """ย้าย created_at ของ order (naive UTC เหมือนที่ DB เก็บ)"""
+    db = TestingSessionLocal()
+    db.execute(update(Order).where(Order.order_id == order["order_id"]).values(created_at=created_at))
+    db.commit()
+    db.close()
+
+
+def yesterday() -> date:
+    return utcnow().date() - timedelta(days=1)
+
+
+@pytest.fixture(autouse=True)
+def cleanup_test_data():
+    """ลบ test data ก่อนและหลังแต่ละ test"""
+    db = TestingSessionLocal()
+    _cleanup(db)
+    yield
+    _cleanup(db)
+    db.close()
+
+
+def _cleanup(db):
+    """ลบ test data ทั้งหมด"""
+    db.query(DailyReport).filter(
+        DailyReport.business_date.in_([yesterday(), REPORT_DAY, EMPTY_DAY])
+    ).delete(synchronize_session=False)
+    test_orders = db.query(OrderItem.order_id).filter(OrderItem.note.like(f"{TEST_PREFIX}%"))
+    db.query(OrderItem).filter(OrderItem.order_id.in_(test_orders)).delete(synchronize_session=False)
+    db.query(Order).filter(
+        Order.order_id.notin_(db.query(OrderItem.order_id).distinct())
+    ).delete(synchronize_session=False)
+    db.query(User).filter(User.username.like(f"%{TEST_SUFFIX}")).delete(synchronize_session=False)
+    db.commit()
+
+
+# ===== POST /reports/close-day =====
+
+class TestCloseDay:
+    """ทดสอบ POST /reports/close-day"""
+
+    def test_close_day_totals(self):
+        """ยอดรวมตรงกับ orders ของวันนั้น — order ที่มีหลาย items ไม่ถูกนับซ้ำ"""
+        token = get_admin_token()
+        first, second = get_seed_product_ids()[:2]
+        orders = [create_test_order(token, [(first, 2), (second, 1)])]
+        cancelled = create_test_order(token, [(first, 3)])
+        orders.append(client.patch(
+            f"/orders/{cancelled['order_id']}",
+            headers=auth_header(token),
+            json={"order_status": "cancelled"},
+        ).json())
+        for hour, order in zip((9, 23), orders):
+            move_order_to(order, datetime.combine(REPORT_DAY, time(hour, 30)))
+        sold = [o for o in orders if o["order_status"] != "cancelled"]
+
+        res = client.post(
+            "/reports/close-day", headers=auth_header(token), json={"business_date": REPORT_DAY.isoformat()}
+        )
+        assert res.status_code == 201
+        report = res.json()
+        assert report["business_date"] == REPORT_DAY.isoformat()
+        assert report["order_count"] == len(orders)
+        assert report["revenue"] == sum(o["net_price"] for o in sold)
+        assert report["item_count"] == sum(i["quantity"] for o in sold for i in o["items"])
+
+        # ทุกมิติรวมกันได้เท่ายอดทั้งวัน
+        for dimension in ("by_status", "by_staff", "by_hour"):
+            assert sum(r["orders"] for r in report[dimension]) == report["order_count"]
+            assert sum(r["revenue"] for r in report[dimension]) == report["revenue"]
+        assert sum(r["quantity"] for r in report["by_product"]) == report["item_count"]
+        assert [r["hour"] for r in report["by_hour"]] == [9, 23]
+
+        by_status = {r["order_status"]: r for r in report["by_status"]}
+        assert by_status["cancelled"]["revenue"] == 0
+
+        by_product = {r["product_id"]: r["quantity"] for r in report["by_product"]}
+        expected_first = sum(
+            i["quantity"] for o in sold for i in o["items"] if i["product_id"] == first
+        )
+        assert by_product[first] == expected_first
+
+    def test_day_window_is_utc(self):
+        """วันทำการคือ 00:00-24:00 UTC ตาม created_at — order หลังเที่ยงคืน UTC เป็นของวันถัดไป"""
+        token = get_admin_token()
+        product_id = get_seed_product_ids()[0]
+        inside = create_test_order(token, [(product_id, 1)])
+        after = create_test_order(token, [(product_id, 1)])
+        move_order_to(inside, datetime.combine(REPORT_DAY, time(23, 59)))
+        move_order_to(after, datetime.combine(REPORT_DAY + timedelta(days=1), time(0, 1)))
+
+        res = client.post(
+            "/reports/close-day", headers=auth_header(token), json={"business_date": REPORT_DAY.isoformat()}
+        )
+        assert res.json()["order_count"] == 1
+
+    def test_snapshot_is_immutable(self):
+        """ปิดยอดซ้ำ → 200 + snapshot เดิม แม้มี order ของวันนั้นเพิ่มหลังปิดยอด"""
+        token = get_admin_token()
+        product_id = get_seed_product_ids()[0]
+        body = {"business_date": REPORT_DAY.isoformat()}
+        move_order_to(create_test_order(token, [(product_id, 1)]), datetime.combine(REPORT_DAY, time(10)))
+
+        first = client.post("/reports/close-day", headers=auth_header(token), json=body).json()
+        move_order_to(create_test_order(token, [(product_id, 5)]), datetime.combine(REPORT_DAY, time(11)))
+
+        res = client.post("/reports/close-day", headers=auth_header(token), json=body)
+        assert res.status_code == 200
+        assert res.json() == first
+
+        res = client.get(f"/reports/close-day/{REPORT_DAY.isoformat()}", headers=auth_header(token))
+        assert res.status_code == 200
+        assert res.json() == first
+
+    def test_default_is_yesterday(self):
+        """ไม่ระบุวัน → ปิดยอดเมื่อวาน (วันล่าสุดที่จบแล้วตาม UTC)"""
+        token = get_admin_token()
+        res = client.post("/reports/close-day", headers=auth_header(token), json={})
+        assert res.status_code in (200, 201)
+        assert res.json()["business_date"] == yesterday().isoformat()
+
+    def test_close_empty_day(self):
+        """วันที่ไม่มี order → ยอดเป็น 0"""
+        token = get_admin_token()
+
+        res = client.post(
+            "/reports/close-day",
+            headers=auth_header(token),
+            json={"business_date": EMPTY_DAY.isoformat()},
+        )
+        assert res.status_code == 201
+        report = res.json()
+        assert report["order_count"] == 0
+        assert report["revenue"] == 0
+        assert report["by_status"] == []
+        assert report["by_product"] == []
+
+    def test_close_unfinished_day_400(self):
+        """วันนี้ (ยังไม่จบ) หรือวันที่ยังไม่ถึง → 400"""
+        token = get_admin_token()
+
+        for business_date in (utcnow().date(), date(2999, 1, 1)):
+            res = client.post(
+                "/reports/close-day",
+                headers=auth_header(token),
+                json={"business_date": business_date.isoformat()},
+            )
+            assert res.status_code == 400
+
+    def test_customer_forbidden(self):
+        """customer ไม่มีสิทธิ์ → 403"""
+        token = create_customer_and_get_token()
+        res = client.post("/reports/close-day", headers=auth_header(token), json={})
+        assert res.status_code == 403
+
+
+# ===== GET /reports/close-day/{date} =====
+
+class TestGetDailyReport:
+    """ทดสอบ GET /reports/close-day/{date}"""
+
+    def test_not_closed_404(self):
+        """วันที่ยังไม่ปิดยอด → 404"""
+        token = get_admin_token()
+        res = client.get(f"/reports/close-day/{EMPTY_DAY.isoformat()}", headers=auth_header(token))
+        assert res.status_code == 404
+
+    def test_no_token_401(self):
+        """ไม่มี token → 401"""
+        res = client.get(f"/reports/close-day/{EMPTY_DAY.isoformat()}")
+        assert res.status_code == 401
@@ -2,29 +2,34 @@
 Reservations Tests
 
 Integration tests สำหรับ reservations endpoints
-- POST /reservations/ — สร้างการจอง (ทุก role)
+- POST /reservations/ — สร้างการจอง (ทุก role) + เลือกโต๊ะอัตโนมัติ + Idempotency-Key
 - GET /reservations/me — ดูการจองของตัวเอง
 - GET /reservations/ — ดูรายการจองทั้งหมด (staff/admin)
+- GET /reservations/calendar — รายการจองตามวันที่จอง แบ่งรายวัน (staff/admin)
 - GET /reservations/{id} — ดูรายการจองเดี่ยว (staff/admin)
 - PATCH /reservations/{id} — อัปเดต status (staff/admin)
+- hold sweeper — pending ที่ค้างเกิน TTL → expired + ปล่อยโต๊ะ
+- MessagePack — POST /reservations/ ด้วย body แบบ msgpack (ReservationCreate)
 """
 
 import pytest
 from datetime import datetime, timedelta
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, func, select, text, update
 from sqlalchemy.orm import sessionmaker
 
 from app.main import app
-from app.config.database import get_db
+from app.config.database import DB_CONNECT_ARGS, SessionLocal, get_db
 from app.config.settings import settings
+from app.core.content_negotiation import MSGPACK_MEDIA_TYPE, msgpack
 from app.models.reservation import Reservation
 from app.models.table import Table
 from app.models.user import User
+from app.services.reservation_service import HOLD_SWEEP_LOCK_ID, expire_stale_holds
 
 # Test DB setup
-engine = create_engine(settings.TEST_DATABASE_URL)
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+engine = create_engine(settings.TEST_DATABASE_URL, connect_args=DB_CONNECT_ARGS)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
 
 
 def override_get_db():
@@ -80,17 +85,22 @@ def create_test_table(token: str, number: str = "90") -> dict:
     return res.json()
 
 
-def create_test_reservation(token: str, table_ids: list[int]) -> dict:
-    """สร้าง test reservation แล้วคืน response data"""
-    reservation_time = (datetime.now() + timedelta(hours=1)).isoformat()
-    res = client.post("/reservations/", headers=auth_header(token), json={
+def post_reservation(token: str, table_ids: list[int], reservation_time: datetime, duration_minutes: int = 90):
+    """POST /reservations/ แล้วคืน response (ไว้ตรวจ status code)"""
+    return client.post("/reservations/", headers=auth_header(token), json={
         "table_ids": table_ids,
         "capacity": 4,
-        "reservation_time": reservation_time,
+        "reservation_time": reservation_time.isoformat(),
+        "duration_minutes": duration_minutes,
         "customer_amount": 2,
         "reservation_detail": f"{TEST_PREFIX}test reservation",
     })
-    return res.json()
+
+
+def create_test_reservation(token: str, table_ids: list[int]) -> dict:
+    """สร้าง test reservation แล้วคืน response data"""
+    reservation_time = datetime.now() + timedelta(hours=1)
+    return post_reservation(token, table_ids, reservation_time).json()
 
 
 @pytest.fixture(autouse=True)
@@ -171,6 +181,169 @@ class TestCreateReservation:
         })
         assert res.status_code == 401
 
+    @pytest.mark.skipif(msgpack is None, reason="ไม่ได้ติดตั้ง msgpack")
+    def test_create_reservation_msgpack(self):
+        """body แบบ msgpack ผ่าน ReservationCreate เหมือน JSON (รวม validation)"""
+        admin_token = get_admin_token()
+        table = create_test_table(admin_token, "93")
+        customer_token = create_customer_and_get_token("msgpack")
+        headers = {**auth_header(customer_token), "Content-Type": MSGPACK_MEDIA_TYPE, "Accept": MSGPACK_MEDIA_TYPE}
+        data = {
+            "table_ids": [table["table_id"]],
+            "capacity": 4,
+            "reservation_time": (datetime.now() + timedelta(hours=1)).isoformat(),
+            "customer_amount": 2,
+            "reservation_detail": f"{TEST_PREFIX}msgpack",
+        }
+
+        res = client.post("/reservations/", headers=headers, content=msgpack.packb(data))
+        assert res.status_code == 201
+        reservation = msgpack.unpackb(res.content)
+        assert reservation["table_ids"] == [table["table_id"]]
+        assert reservation["reservation_status"] == "pending"
+
+        res = client.post("/reservations/", headers=headers, content=msgpack.packb({**data, "customer_amount": 0}))
+        assert res.status_code == 422
+
+
+# ===== Time-range conflicts =====
+
+class TestReservationConflicts:
+    """ทดสอบการกันจองโต๊ะซ้อนช่วงเวลา (exclusion constraint)"""
+
+    def test_overlapping_reservation_conflict(self):
+        """จองโต๊ะเดียวกันช่วงเวลาซ้อนกัน → 409"""
+        admin_token = get_admin_token()
+        table = create_test_table(admin_token, "70")
+        customer_token = create_customer_and_get_token("c1")
+        start = datetime.now() + timedelta(days=1)
+
+        first = post_reservation(customer_token, [table["table_id"]], start)
+        assert first.status_code == 201
+        assert first.json()["duration_minutes"] == 90
+
+        overlap = post_reservation(customer_token, [table["table_id"]], start + timedelta(minutes=60))
+        assert overlap.status_code == 409
+
+    def test_back_to_back_reservations_allowed(self):
+        """จองต่อเนื่องพอดี (เริ่มตอนที่การจองก่อนหน้าจบ) → ไม่ชน"""
+        admin_token = get_admin_token()
+        table = create_test_table(admin_token, "71")
+        customer_token = create_customer_and_get_token("c2")
+        start = datetime.now() + timedelta(days=1)
+
+        first = post_reservation(customer_token, [table["table_id"]], start, duration_minutes=60)
+        second = post_reservation(customer_token, [table["table_id"]], start + timedelta(minutes=60))
+        assert first.status_code == 201
+        assert second.status_code == 201
+
+    def test_conflict_on_any_table_rejects_whole_reservation(self):
+        """ชนแค่บางโต๊ะ → ทั้งการจองถูกปฏิเสธ และโต๊ะอื่นไม่ถูกจอง"""
+        admin_token = get_admin_token()
+        a = create_test_table(admin_token, "72")
+        b = create_test_table(admin_token, "73")
+        customer_token = create_customer_and_get_token("c3")
+        start = datetime.now() + timedelta(days=1)
+
+        assert post_reservation(customer_token, [b["table_id"]], start).status_code == 201
+        assert post_reservation(customer_token, [a["table_id"], b["table_id"]], start).status_code == 409
+        assert post_reservation(customer_token, [a["table_id"]], start).status_code == 201
+
+    def test_cancel_releases_time_slot(self):
+        """cancel การจอง → จองช่วงเวลาเดิมได้อีก"""
+        admin_token = get_admin_token()
+        table = create_test_table(admin_token, "74")
+        customer_token = create_customer_and_get_token("c4")
+        start = datetime.now() + timedelta(days=1)
+
+        first = post_reservation(customer_token, [table["table_id"]], start).json()
+        client.patch(
+            f"/reservations/{first['reservation_id']}",
+            headers=auth_header(admin_token),
+            json={"reservation_status": "cancel"},
+        )
+
+        again = post_reservation(customer_token, [table["table_id"]], start)
+        assert again.status_code == 201
+
+
+# ===== Automatic table assignment =====
+
+class TestAutoAssignTables:
+    """ทดสอบการจองแบบไม่ระบุโต๊ะ — ระบบเลือกชุดโต๊ะที่เสียที่นั่งน้อยที่สุด"""
+
+    def _post(self, token: str, customer_amount: int, reservation_time: datetime):
+        return client.post("/reservations/", headers=auth_header(token), json={
+            "reservation_time": reservation_time.isoformat(),
+            "customer_amount": customer_amount,
+            "reservation_detail": f"{TEST_PREFIX}auto assign",
+        })
+
+    def test_large_party_gets_best_fit(self):
+        """11 คน → โต๊ะ 6+6 และ capacity คำนวณจากโต๊ะที่ได้"""
+        token = create_customer_and_get_token("auto1")
+        start = datetime.now().replace(microsecond=0) + timedelta(days=500)
+
+        res = self._post(token, 11, start)
+        assert res.status_code == 201
+        data = res.json()
+        assert len(data["table_ids"]) == 2
+        assert data["capacity"] == 12
+
+    def test_second_party_gets_remaining_tables(self):
+        """จองช่วงเดียวกันอีกกลุ่ม → ได้โต๊ะที่ยังว่าง ไม่ซ้ำกับกลุ่มแรก"""
+        token = create_customer_and_get_token("auto2")
+        start = datetime.now().replace(microsecond=0) + timedelta(days=501)
+
+        first = self._post(token, 11, start).json()
+        second = self._post(token, 11, start)
+        assert second.status_code == 201
+        assert not set(first["table_ids"]) & set(second.json()["table_ids"])
+        assert second.json()["capacity"] >= 11
+
+    def test_not_enough_free_tables(self):
+        """จำนวนคนมากกว่าที่นั่งที่ยังว่างในช่วงนั้น → 409"""
+        token = create_customer_and_get_token("auto3")
+        start = datetime.now().replace(microsecond=0) + timedelta(days=502)
+
+        assert self._post(token, 40, start).status_code == 201
+        res = self._post(token, 40, start)
+        assert res.status_code == 409
+
+    def test_party_above_max_party_size(self):
+        """customer_amount เกิน MAX_PARTY_SIZE → 422 (ไม่ถึง optimizer)"""
+        token = create_customer_and_get_token("auto4")
+        start = datetime.now().replace(microsecond=0) + timedelta(days=503)
+
+        res = self._post(token, settings.MAX_PARTY_SIZE + 1, start)
+        assert res.status_code == 422
+
+
+# ===== Idempotency-Key =====
+
+class TestReservationIdempotency:
+    """ทดสอบ header Idempotency-Key ของ POST /reservations/"""
+
+    def test_retry_returns_same_reservation(self):
+        """ส่งซ้ำด้วย key เดิม → ได้การจองเดิม ไม่ชนกับตัวเองเป็น 409"""
+        table = create_test_table(get_admin_token(), "75")
+        token = create_customer_and_get_token("idem")
+        headers = {**auth_header(token), "Idempotency-Key": f"{TEST_PREFIX}retry-1"}
+        payload = {
+            "table_ids": [table["table_id"]],
+            "reservation_time": (datetime.now() + timedelta(days=2)).isoformat(),
+            "customer_amount": 2,
+            "reservation_detail": f"{TEST_PREFIX}idempotent",
+        }
+
+        first = client.post("/reservations/", headers=headers, json=payload)
+        retry = client.post("/reservations/", headers=headers, json=payload)
+
+        assert first.status_code == 201
+        assert retry.status_code == 201
+        assert retry.json()["reservation_id"] == first.json()["reservation_id"]
+        assert retry.headers["Idempotent-Replayed"] == "true"
+
 
 # ===== GET /reservations/me =====
 
@@ -211,6 +384,42 @@ class TestListReservations:
         assert res.status_code == 200
         assert isinstance(res.json(), list)
 
+    def test_list_matches_single_reservation(self):
+        """รายการจองใน list มี fields + customer_detail เหมือน GET /reservations/{id}"""
+        admin_token = get_admin_token()
+        customer_token = create_customer_and_get_token("list")
+        table = create_test_table(admin_token, "91")
+        reservation = create_test_reservation(customer_token, [table["table_id"]])
+
+        listed = client.get("/reservations/", headers=auth_header(admin_token)).json()
+        single = client.get(
+            f"/reservations/{reservation['reservation_id']}", headers=auth_header(admin_token)
+        ).json()
+        (match,) = [r for r in listed if r["reservation_id"] == reservation["reservation_id"]]
+        assert match == single
+        assert match["customer_detail"]["customer_name"] == "-"
+
+    def test_list_sparse_fields(self):
+        """?fields= คืนเฉพาะ field ที่ขอ — customer_detail ได้โดยไม่ต้องขอ customer_id"""
+        admin_token = get_admin_token()
+        customer_token = create_customer_and_get_token("sparse")
+        table = create_test_table(admin_token, "92")
+        reservation = create_test_reservation(customer_token, [table["table_id"]])
+
+        res = client.get(
+            "/reservations/?fields=reservation_id,table_ids,customer_detail", headers=auth_header(admin_token)
+        )
+        assert res.status_code == 200
+        (match,) = [r for r in res.json() if r["reservation_id"] == reservation["reservation_id"]]
+        assert match == {
+            "reservation_id": reservation["reservation_id"],
+            "table_ids": [table["table_id"]],
+            "customer_detail": {"customer_name": "-", "customer_tel": "-"},
+        }
+
+        res = client.get("/reservations/?fields=reservation_id,nope", headers=auth_header(admin_token))
+        assert res.status_code == 400
+
     def test_list_reservations_customer_forbidden(self):
         """customer ไม่มีสิทธิ์ดูรายการจองทั้งหมด → 403"""
         customer_token = create_customer_and_get_token("5")
@@ -312,3 +521,203 @@ class TestUpdateReservation:
             json={"reservation_status": "accepted"},
         )
         assert res.status_code == 403
+
+
+# ===== GET /reservations/calendar =====
+
+def get_calendar(token: str, start, end):
+    """GET /reservations/calendar แล้วคืน response"""
+    return client.get(
+        f"/reservations/calendar?from={start.isoformat()}&to={end.isoformat()}",
+        headers=auth_header(token),
+    )
+
+
+def day_reservation_ids(calendar: list[dict], day) -> list[int]:
+    """reservation_ids ใน bucket ของวันนั้น"""
+    bucket = next(d for d in calendar if d["date"] == day.isoformat())
+    return [r["reservation_id"] for r in bucket["reservations"]]
+
+
+class TestReservationCalendar:
+    """ทดสอบ GET /reservations/calendar"""
+
+    def test_calendar_buckets_by_reservation_time(self):
+        """การจองที่สร้างวันนี้สำหรับวันหน้า → อยู่ใน bucket ของวันที่จอง, ทุกวันในช่วงมี bucket"""
+        admin_token = get_admin_token()
+        table = create_test_table(admin_token, "C1")
+        customer_token = create_customer_and_get_token("c1")
+        reservation_time = datetime.combine(datetime.now().date() + timedelta(days=10), datetime.min.time()).replace(hour=18)
+        reservation = post_reservation(customer_token, [table["table_id"]], reservation_time).json()
+
+        day = reservation_time.date()
+        res = get_calendar(admin_token, day - timedelta(days=2), day + timedelta(days=2))
+        assert res.status_code == 200
+        calendar = res.json()
+        assert [d["date"] for d in calendar] == [
+            (day + timedelta(days=n)).isoformat() for n in range(-2, 3)
+        ]
+        assert reservation["reservation_id"] in day_reservation_ids(calendar, day)
+        assert reservation["reservation_id"] not in day_reservation_ids(calendar, day - timedelta(days=1))
+
+        bucket = next(d for d in calendar if d["date"] == day.isoformat())
+        entry = next(r for r in bucket["reservations"] if r["reservation_id"] == reservation["reservation_id"])
+        assert entry["customer_detail"] is not None
+
+    def test_calendar_invalidated_on_write(self):
+        """สร้าง/อัปเดตการจองหลังจากดูปฏิทินแล้ว → ครั้งถัดไปเห็นข้อมูลใหม่"""
+        admin_token = get_admin_token()
+        table = create_test_table(admin_token, "C2")
+        customer_token = create_customer_and_get_token("c2")
+        reservation_time = datetime.combine(datetime.now().date() + timedelta(days=11), datetime.min.time()).replace(hour=12)
+        day = reservation_time.date()
+
+        before = get_calendar(admin_token, day, day).json()
+        reservation = post_reservation(customer_token, [table["table_id"]], reservation_time).json()
+        assert reservation["reservation_id"] not in day_reservation_ids(before, day)
+
+        after = get_calendar(admin_token, day, day).json()
+        assert reservation["reservation_id"] in day_reservation_ids(after, day)
+
+        client.patch(
+            f"/reservations/{reservation['reservation_id']}",
+            headers=auth_header(admin_token),
+            json={"reservation_status": "accepted"},
+        )
+        updated = get_calendar(admin_token, day, day).json()
+        entry = updated[0]["reservations"]
+        assert next(
+            r for r in entry if r["reservation_id"] == reservation["reservation_id"]
+        )["reservation_status"] == "accepted"
+
+    def test_calendar_invalid_range_400(self):
+        """to ก่อน from หรือช่วงยาวเกินกำหนด → 400"""
+        admin_token = get_admin_token()
+        today = datetime.now().date()
+
+        assert get_calendar(admin_token, today, today - timedelta(days=1)).status_code == 400
+        too_long = today + timedelta(days=settings.RESERVATION_CALENDAR_MAX_DAYS)
+        assert get_calendar(admin_token, today, too_long).status_code == 400
+
+    def test_calendar_customer_forbidden(self):
+        """customer ไม่มีสิทธิ์ → 403"""
+        customer_token = create_customer_and_get_token("c3")
+        today = datetime.now().date()
+        assert get_calendar(customer_token, today, today).status_code == 403
+
+
+# ===== Hold sweeper =====
+
+def backdate_reservation(reservation_id: int, minutes: int):
+    """เลื่อน created_at ของการจองย้อนหลัง (จำลอง pending ที่ค้างมานาน)"""
+    db = TestingSessionLocal()
+    db.execute(
+        update(Reservation)
+        .where(Reservation.reservation_id == reservation_id)
+        .values(created_at=Reservation.created_at - timedelta(minutes=minutes))
+    )
+    db.commit()
+    db.close()
+
+
+def run_sweep(ttl_minutes: int = 30, session_timezone: str | None = None) -> list[int]:
+    """sweep หนึ่งรอบด้วย session ของ test DB (ตั้ง timezone อื่นเฉพาะ transaction นี้ได้)"""
+    db = TestingSessionLocal()
+    try:
+        if session_timezone:
+            db.execute(text("SELECT set_config('timezone', :tz, true)"), {"tz": session_timezone})
+        return expire_stale_holds(db, ttl_minutes)
+    finally:
+        db.close()
+
+
+class TestHoldSweeper:
+    """ทดสอบ expire_stale_holds (งานของ hold sweeper)"""
+
+    def test_stale_pending_expired_and_table_released(self):
+        """pending เกิน TTL → expired, โต๊ะ → empty, ช่วงเวลาจองใหม่ได้"""
+        admin_token = get_admin_token()
+        table = create_test_table(admin_token, "A1")
+        customer_token = create_customer_and_get_token("s1")
+        reservation_time = datetime.now() + timedelta(hours=2)
+        reservation = post_reservation(customer_token, [table["table_id"]], reservation_time).json()
+        backdate_reservation(reservation["reservation_id"], 60)
+
+        assert reservation["reservation_id"] in run_sweep()
+
+        res = client.get(f"/reservations/{reservation['reservation_id']}", headers=auth_header(admin_token))
+        assert res.json()["reservation_status"] == "expired"
+        table_res = client.get(f"/tables/{table['table_id']}", headers=auth_header(admin_token))
+        assert table_res.json()["status"] == "empty"
+
+        res = post_reservation(customer_token, [table["table_id"]], reservation_time)
+        assert res.status_code == 201
+
+    def test_fresh_pending_kept(self):
+        """pending ที่ยังไม่เกิน TTL → ไม่ถูกแตะ"""
+        admin_token = get_admin_token()
+        table = create_test_table(admin_token, "A2")
+        customer_token = create_customer_and_get_token("s2")
+        reservation = create_test_reservation(customer_token, [table["table_id"]])
+
+        assert reservation["reservation_id"] not in run_sweep()
+
+        res = client.get(f"/reservations/{reservation['reservation_id']}", headers=auth_header(admin_token))
+        assert res.json()["reservation_status"] == "pending"
+
+    def test_table_held_by_other_pending_stays_on_hold(self):
+        """โต๊ะที่ยังมี pending อื่นถืออยู่ → ยัง onHold"""
+        admin_token = get_admin_token()
+        table = create_test_table(admin_token, "A3")
+        customer_token = create_customer_and_get_token("s3")
+        stale = post_reservation(customer_token, [table["table_id"]], datetime.now() + timedelta(hours=2)).json()
+        post_reservation(customer_token, [table["table_id"]], datetime.now() + timedelta(hours=5))
+        backdate_reservation(stale["reservation_id"], 60)
+
+        assert stale["reservation_id"] in run_sweep()
+
+        table_res = client.get(f"/tables/{table['table_id']}", headers=auth_header(admin_token))
+        assert table_res.json()["status"] == "onHold"
+
+    def test_cutoff_independent_of_session_timezone(self):
+        """session timezone ไม่ใช่ UTC → ยังตัดสินจากอายุจริงของ pending (ไม่เลื่อนไปตาม offset)"""
+        admin_token = get_admin_token()
+        table = create_test_table(admin_token, "A5")
+        customer_token = create_customer_and_get_token("s5")
+        fresh = post_reservation(customer_token, [table["table_id"]], datetime.now() + timedelta(hours=2)).json()
+        stale = post_reservation(customer_token, [table["table_id"]], datetime.now() + timedelta(hours=5)).json()
+        backdate_reservation(stale["reservation_id"], 60)
+
+        # UTC-8: ถ้าตีความ created_at ตาม session timezone pending ที่ค้าง 60 นาทีจะดูเหมือนเพิ่งสร้าง
+        expired = run_sweep(session_timezone="America/Los_Angeles")
+        assert stale["reservation_id"] in expired
+        assert fresh["reservation_id"] not in expired
+
+        # UTC+7: ในทางกลับกัน pending ที่เพิ่งสร้างจะดูเหมือนค้างมา 7 ชั่วโมง
+        assert fresh["reservation_id"] not in run_sweep(session_timezone="Asia/Bangkok")
+
+    def test_app_sessions_use_utc(self):
+        """ทุก connection ของ app ตั้ง session timezone เป็น UTC"""
+        db = SessionLocal()
+        try:
+            assert db.execute(text("SHOW timezone")).scalar() == "UTC"
+        finally:
+            db.close()
+
+    def test_skipped_while_other_worker_holds_lock(self):
+        """worker อื่นถือ advisory lock อยู่ → รอบนี้ไม่ทำอะไร"""
+        admin_token = get_admin_token()
+        table = create_test_table(admin_token, "A4")
+        customer_token = create_customer_and_get_token("s4")
+        reservation = create_test_reservation(customer_token, [table["table_id"]])
+        backdate_reservation(reservation["reservation_id"], 60)
+
+        other = TestingSessionLocal()
+        try:
+            other.execute(select(func.pg_advisory_xact_lock(HOLD_SWEEP_LOCK_ID)))
+            assert run_sweep() == []
+        finally:
+            other.rollback()
+            other.close()
+
+        assert reservation["reservation_id"] in run_sweep()
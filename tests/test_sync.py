@@ -0,0 +1,251 @@
+"""
+Sync Tests
+
+Integration tests สำหรับ delta sync endpoint
+- GET /sync?since= — orders + reservations ที่เปลี่ยนหลัง cursor (staff/admin)
+- transaction ที่ commit ไม่ตรงลำดับ seq ต้องไม่หลุดจาก cursor
+"""
+
+import pytest
+from datetime import datetime, timedelta
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.main import app
+from app.config.database import DB_CONNECT_ARGS, get_db
+from app.config.settings import settings
+from app.models.order import Order, OrderItem
+from app.models.reservation import Reservation
+from app.models.user import User
+
+# Test DB setup
+engine = create_engine(settings.TEST_DATABASE_URL, connect_args=DB_CONNECT_ARGS)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
+
+
+def override_get_db():
+    db = TestingSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+app.dependency_overrides[get_db] = override_get_db
+client = TestClient(app)
+
+TEST_PREFIX = "TESTSYNC_"
+TEST_SUFFIX = "_testsync"
+
+
+# === Helpers ===
+
+def get_admin_token() -> str:
+    """Login ด้วย admin (seed data) แล้วคืน token"""
+    res = client.post("/auth/login", json={
+        "username": "admin",
+        "password": "admin",
+    })
+    return res.json()["access_token"]
+
+
+def create_customer_and_get_token() -> str:
+    """สร้าง customer test user แล้วคืน token"""
+    client.post("/auth/register", json={
+        "username": f"synccust{TEST_SUFFIX}",
+        "password": "test1234",
+    })
+    res = client.post("/auth/login", json={
+        "username": f"synccust{TEST_SUFFIX}",
+        "password": "test1234",
+    })
+    return res.json()["access_token"]
+
+
+def auth_header(token: str) -> dict:
+    return {"Authorization": f"Bearer {token}"}
+
+
+def get_seed_product_id() -> int:
+    """ดึง product_id จาก seed data (public endpoint)"""
+    return client.get("/products/").json()[0]["product_id"]
+
+
+def create_test_order(token: str) -> dict:
+    """สร้าง takeaway order แล้วคืน response data"""
+    res = client.post("/orders/", headers=auth_header(token), json={
+        "items": [
+            {
+                "product_id": get_seed_product_id(),
+                "quantity": 1,
+                "note": f"{TEST_PREFIX}sync",
+            }
+        ],
+    })
+    return res.json()
+
+
+def current_cursor(token: str) -> int:
+    """ไล่ sync จนสุดแล้วคืน cursor ปัจจุบัน"""
+    cursor = 0
+    while True:
+        data = client.get(f"/sync?since={cursor}&limit=1000", headers=auth_header(token)).json()
+        cursor = data["cursor"]
+        if not data["has_more"]:
+            return cursor
+
+
+@pytest.fixture(autouse=True)
+def cleanup_test_data():
+    """ลบ test data ก่อนและหลังแต่ละ test"""
+    db = TestingSessionLocal()
+    _cleanup(db)
+    yield
+    _cleanup(db)
+    db.close()
+
+
+def _cleanup(db):
+    """ลบ test data ทั้งหมด"""
+    test_orders = db.query(OrderItem.order_id).filter(OrderItem.note.like(f"{TEST_PREFIX}%"))
+    db.query(OrderItem).filter(OrderItem.order_id.in_(test_orders)).delete(synchronize_session=False)
+    db.query(Order).filter(
+        Order.order_id.notin_(db.query(OrderItem.order_id).distinct())
+    ).delete(synchronize_session=False)
+    test_users = db.query(User.user_id).filter(User.username.like(f"%{TEST_SUFFIX}"))
+    db.query(Reservation).filter(Reservation.customer_id.in_(test_users)).delete(synchronize_session=False)
+    db.query(User).filter(User.username.like(f"%{TEST_SUFFIX}")).delete(synchronize_session=False)
+    db.commit()
+
+
+# ===== GET /sync =====
+
+class TestSync:
+    """ทดสอบ GET /sync"""
+
+    def test_sync_returns_only_changes_since_cursor(self):
+        """ได้เฉพาะแถวที่เปลี่ยนหลัง cursor + cursor ใหม่"""
+        token = get_admin_token()
+        cursor = current_cursor(token)
+
+        order = create_test_order(token)
+
+        res = client.get(f"/sync?since={cursor}", headers=auth_header(token))
+        assert res.status_code == 200
+        data = res.json()
+        assert [o["order_id"] for o in data["orders"]] == [order["order_id"]]
+        assert data["reservations"] == []
+        assert data["cursor"] > cursor
+
+        # ไม่มีอะไรเปลี่ยน → ว่าง + cursor ไม่ถอยหลัง
+        again = client.get(f"/sync?since={data['cursor']}", headers=auth_header(token)).json()
+        assert again["orders"] == []
+        assert again["cursor"] >= data["cursor"]
+
+    def test_update_bumps_updated_seq(self):
+        """update order → updated_seq ใหม่ → กลับมาใน sync อีกครั้ง"""
+        token = get_admin_token()
+        order = create_test_order(token)
+        cursor = current_cursor(token)
+
+        res = client.patch(
+            f"/orders/{order['order_id']}",
+            headers=auth_header(token),
+            json={"order_status": "preparing"},
+        )
+        assert res.json()["updated_seq"] > order["updated_seq"]
+
+        data = client.get(f"/sync?since={cursor}", headers=auth_header(token)).json()
+        assert [o["order_status"] for o in data["orders"]] == ["preparing"]
+
+    def test_sync_includes_reservations(self):
+        """การจองใหม่ถูกส่งมาใน sync ด้วย"""
+        admin_token = get_admin_token()
+        cursor = current_cursor(admin_token)
+        customer_token = create_customer_and_get_token()
+        table_id = client.get("/tables/").json()[0]["table_id"]
+
+        created = client.post("/reservations/", headers=auth_header(customer_token), json={
+            "table_ids": [table_id],
+            "capacity": 4,
+            "reservation_time": (datetime.now() + timedelta(days=30)).isoformat(),
+            "customer_amount": 2,
+        }).json()
+
+        data = client.get(f"/sync?since={cursor}", headers=auth_header(admin_token)).json()
+        assert [r["reservation_id"] for r in data["reservations"]] == [created["reservation_id"]]
+
+    def test_sync_paginates_with_limit(self):
+        """limit น้อยกว่าจำนวนที่เปลี่ยน → has_more + ไล่ต่อด้วย cursor ได้ครบ"""
+        token = get_admin_token()
+        cursor = current_cursor(token)
+        created = {create_test_order(token)["order_id"] for _ in range(3)}
+
+        seen = set()
+        while True:
+            data = client.get(f"/sync?since={cursor}&limit=2", headers=auth_header(token)).json()
+            seen |= {o["order_id"] for o in data["orders"]}
+            cursor = data["cursor"]
+            if not data["has_more"]:
+                break
+
+        assert created <= seen
+
+    def test_sync_paginates_at_transaction_boundary(self):
+        """orders ที่สร้างใน transaction เดียว (batch) อยู่หน้าเดียวกันเสมอ แม้เกิน limit"""
+        token = get_admin_token()
+        cursor = current_cursor(token)
+        item = {"product_id": get_seed_product_id(), "note": f"{TEST_PREFIX}batch"}
+        res = client.post("/orders/batch", headers=auth_header(token), json={"orders": [{"items": [item]}] * 3})
+        created = {r["order"]["order_id"] for r in res.json()["results"]}
+
+        data = client.get(f"/sync?since={cursor}&limit=1", headers=auth_header(token)).json()
+        assert {o["order_id"] for o in data["orders"]} == created
+        assert data["has_more"] is False
+
+    def test_sync_does_not_skip_late_commit(self):
+        """A ได้ seq ก่อน B แต่ commit ทีหลัง → sync ระหว่างนั้นต้องไม่ให้ cursor ข้ามแถวของ A"""
+        token = get_admin_token()
+        cursor = current_cursor(token)
+        staff_id = client.get("/users/me", headers=auth_header(token)).json()["user_id"]
+        product_id = get_seed_product_id()
+
+        def add_order(db):
+            order = Order(staff_id=staff_id, table_ids=[], order_status="pending", net_price=0)
+            db.add(order)
+            db.flush()  # ได้ updated_seq ตอนนี้ (ยังไม่ commit)
+            db.add(OrderItem(order_id=order.order_id, product_id=product_id, note=f"{TEST_PREFIX}late"))
+            db.flush()
+            return order
+
+        session_a, session_b = TestingSessionLocal(), TestingSessionLocal()
+        try:
+            order_a = add_order(session_a)
+            order_b = add_order(session_b)
+            assert order_a.updated_seq < order_b.updated_seq
+            session_b.commit()
+
+            first = client.get(f"/sync?since={cursor}", headers=auth_header(token)).json()
+            seen = {o["order_id"] for o in first["orders"]}
+            assert order_a.order_id not in seen
+
+            session_a.commit()
+            second = client.get(f"/sync?since={first['cursor']}", headers=auth_header(token)).json()
+            seen |= {o["order_id"] for o in second["orders"]}
+            assert {order_a.order_id, order_b.order_id} <= seen
+        finally:
+            session_a.close()
+            session_b.close()
+
+    def test_sync_rejects_cursor_from_future(self):
+        """cursor ที่เกิน watermark (เช่น updated_seq แบบเดิม) → 400"""
+        token = get_admin_token()
+        res = client.get(f"/sync?since={2**62}", headers=auth_header(token))
+        assert res.status_code == 400
+
+    def test_sync_customer_forbidden(self):
+        """customer ไม่มีสิทธิ์ sync → 403"""
+        token = create_customer_and_get_token()
+        res = client.get("/sync?since=0", headers=auth_header(token))
+        assert res.status_code == 403
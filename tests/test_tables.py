@@ -7,22 +7,38 @@ Integration tests สำหรับ tables endpoints
 - POST /tables/ — เพิ่มโต๊ะ (admin)
 - PUT /tables/{id} — แก้ไขโต๊ะ (staff/admin)
 - DELETE /tables/{id} — ลบโต๊ะ (admin)
+- GET /tables/stream — broadcaster ของ table status (public)
+- GET /tables/availability — ค้นหาโต๊ะว่าง (public)
+- best_fit — เลือกชุดโต๊ะสำหรับกลุ่มใหญ่
 """
 
+import asyncio
+import threading
+import time as time_module
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
 import pytest
+from fastapi import HTTPException
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
 from app.main import app
-from app.config.database import get_db
+from app.config.database import DB_CONNECT_ARGS, get_db
 from app.config.settings import settings
+from app.core import table_optimizer
+from app.core.broadcaster import Broadcaster, BroadcasterFull, SubscriptionClosed
+from app.core.table_optimizer import best_fit
+from app.models.reservation import Reservation
 from app.models.table import Table
 from app.models.user import User
+from app.schemas.table import TableUpdate
+from app.services.table_service import table_events, update_table, update_table_statuses
 
 # Test DB setup
-engine = create_engine(settings.TEST_DATABASE_URL)
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+engine = create_engine(settings.TEST_DATABASE_URL, connect_args=DB_CONNECT_ARGS)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
 
 
 def override_get_db():
@@ -79,16 +95,21 @@ def create_test_table(token: str, number: str = "99") -> dict:
 
 @pytest.fixture(autouse=True)
 def cleanup_test_data():
-    """ลบ test tables + test users ก่อนและหลังแต่ละ test"""
+    """ลบ test data ก่อนและหลังแต่ละ test"""
     db = TestingSessionLocal()
-    db.query(Table).filter(Table.table_number.like(f"{TEST_PREFIX}%")).delete(synchronize_session=False)
-    db.query(User).filter(User.username.like(f"%{TEST_SUFFIX}")).delete(synchronize_session=False)
-    db.commit()
+    _cleanup(db)
     yield
+    _cleanup(db)
+    db.close()
+
+
+def _cleanup(db):
+    """ลบ test reservations, tables, users"""
+    test_users = db.query(User.user_id).filter(User.username.like(f"%{TEST_SUFFIX}"))
+    db.query(Reservation).filter(Reservation.customer_id.in_(test_users)).delete(synchronize_session=False)
     db.query(Table).filter(Table.table_number.like(f"{TEST_PREFIX}%")).delete(synchronize_session=False)
     db.query(User).filter(User.username.like(f"%{TEST_SUFFIX}")).delete(synchronize_session=False)
     db.commit()
-    db.close()
 
 
 # ===== GET /tables/ (public) =====
@@ -114,6 +135,186 @@ class TestListTables:
             assert "capacity" in table
             assert "status" in table
 
+    def test_list_tables_sparse_fields(self):
+        """?fields=table_id,status → คืนเฉพาะ 2 fields"""
+        token = get_admin_token()
+        table = create_test_table(token, "98")
+
+        response = client.get("/tables/?fields=status,table_id")
+        assert response.status_code == 200
+        (match,) = [t for t in response.json() if t["table_id"] == table["table_id"]]
+        assert match == {"table_id": table["table_id"], "status": table["status"]}
+
+    def test_list_tables_unknown_field(self):
+        """field ที่ไม่มีใน TableResponse → 400"""
+        response = client.get("/tables/?fields=table_id,secret")
+        assert response.status_code == 400
+
+
+# ===== GET /tables/availability (public) =====
+
+class TestTableAvailability:
+    """ทดสอบ GET /tables/availability"""
+
+    def _availability(self, when: datetime, party_size: int = 2, duration: int = 90) -> dict:
+        res = client.get("/tables/availability", params={
+            "time": when.isoformat(),
+            "party_size": party_size,
+            "duration": duration,
+        })
+        assert res.status_code == 200
+        return res.json()
+
+    def _free_ids(self, data: dict) -> set[int]:
+        return {t["table_id"] for t in data["tables"]}
+
+    def test_reserved_table_not_available(self):
+        """โต๊ะที่ถูกจองในช่วงนั้นไม่อยู่ในผลลัพธ์ (index ที่โหลดแล้วถูกอัปเดตทันที)"""
+        table = create_test_table(get_admin_token())
+        when = datetime.now().replace(microsecond=0) + timedelta(days=3)
+
+        # โหลด index ของวันนั้นก่อน แล้วค่อยจอง → ต้องเห็นผลแบบ incremental
+        assert table["table_id"] in self._free_ids(self._availability(when))
+
+        token = create_customer_and_get_token()
+        res = client.post("/reservations/", headers=auth_header(token), json={
+            "table_ids": [table["table_id"]],
+            "capacity": 4,
+            "reservation_time": when.isoformat(),
+            "customer_amount": 2,
+        })
+        assert res.status_code == 201
+
+        assert table["table_id"] not in self._free_ids(self._availability(when + timedelta(minutes=30)))
+        assert table["table_id"] in self._free_ids(self._availability(when + timedelta(minutes=90)))
+
+    def test_aware_times_independent_of_process_timezone(self):
+        """เวลาที่มี timezone ถูกแปลงเป็น UTC เหมือนที่ DB เก็บ — ไม่ขึ้นกับ TZ ของ worker"""
+        table = create_test_table(get_admin_token())
+        bangkok = timezone(timedelta(hours=7))
+        when = datetime.now(bangkok).replace(minute=0, second=0, microsecond=0) + timedelta(days=11)
+
+        token = create_customer_and_get_token()
+        res = client.post("/reservations/", headers=auth_header(token), json={
+            "table_ids": [table["table_id"]],
+            "capacity": 4,
+            "reservation_time": when.isoformat(),
+            "customer_amount": 2,
+        })
+        assert res.status_code == 201
+
+        monkeypatch = pytest.MonkeyPatch()
+        monkeypatch.setenv("TZ", "America/New_York")
+        time_module.tzset()
+        try:
+            # index ของวันนั้นโหลดจาก DB ตอนนี้ — ถามด้วยเวลาเดียวกันใน UTC
+            utc_when = when.astimezone(timezone.utc)
+            assert table["table_id"] not in self._free_ids(self._availability(utc_when + timedelta(minutes=30)))
+            assert table["table_id"] in self._free_ids(self._availability(utc_when + timedelta(minutes=90)))
+        finally:
+            monkeypatch.undo()
+            time_module.tzset()
+
+    def test_large_party_gets_combination(self):
+        """กลุ่มใหญ่กว่าโต๊ะเดี่ยวทุกตัว → ได้ชุดโต๊ะที่เสียที่นั่งน้อยที่สุด (6+6 สำหรับ 11 คน)"""
+        when = datetime.now().replace(microsecond=0) + timedelta(days=400)
+        data = self._availability(when, party_size=11)
+
+        assert data["tables"] == []
+        assert len(data["combinations"]) == 1
+        assert sorted(t["capacity"] for t in data["combinations"][0]) == [6, 6]
+
+    def test_availability_validation(self):
+        """ไม่ส่ง party_size หรือเกิน MAX_PARTY_SIZE → 422"""
+        res = client.get("/tables/availability", params={"time": datetime.now().isoformat()})
+        assert res.status_code == 422
+
+        res = client.get("/tables/availability", params={
+            "time": datetime.now().isoformat(), "party_size": 10**8,
+        })
+        assert res.status_code == 422
+
+
+# ===== Best-fit table optimizer =====
+
+class TestTableOptimizer:
+    """ทดสอบ best_fit — เลือกชุดโต๊ะที่เสียที่นั่งน้อยที่สุด"""
+
+    def test_prefers_least_wasted_seats(self):
+        """11 คน จากโต๊ะ 6,6,6,4,4,4 → 6+6 (เสีย 1 ที่) ไม่ใช่ 6+6+6"""
+        free = ((1, 6), (2, 6), (3, 6), (4, 4), (5, 4), (6, 4))
+        assert best_fit(free, 11) == (1, 2)
+
+    def test_exact_fit_beats_single_larger_table(self):
+        """8 คน จากโต๊ะ 4,4,10 → 4+4 พอดี ดีกว่าโต๊ะ 10"""
+        assert best_fit(((1, 4), (2, 4), (3, 10)), 8) == (1, 2)
+
+    def test_tie_prefers_fewer_tables(self):
+        """ที่นั่งเท่ากัน → ใช้โต๊ะน้อยกว่า"""
+        assert best_fit(((1, 2), (2, 2), (3, 4)), 4) == (3,)
+
+    def test_not_enough_seats(self):
+        """โต๊ะว่างรวมกันยังไม่พอ → None"""
+        assert best_fit(((1, 4), (2, 4)), 9) is None
+
+    def test_not_enough_seats_returns_before_dp(self, monkeypatch):
+        """ที่นั่งว่างรวมน้อยกว่าจำนวนคน → None ทันที (ไม่สร้างตาราง DP ขนาด party_size)"""
+        monkeypatch.setattr(table_optimizer, "_subset_sum", None)
+        assert best_fit.__wrapped__(((1, 4), (2, 4)), 10**8) is None
+        assert best_fit.__wrapped__(((1, 4), (2, 4)), 10**8, frozenset({(1, 2)})) is None
+
+    def test_respects_adjacency(self):
+        """โต๊ะที่ต่อกันไม่ได้จะไม่ถูกรวมเป็นชุดเดียวกัน"""
+        free = ((1, 6), (2, 6), (3, 4), (4, 4))
+        adjacency = frozenset({(1, 3), (2, 4)})
+        assert best_fit(free, 10, adjacency) in {(1, 3), (2, 4)}
+        assert best_fit(free, 11, adjacency) is None
+
+    def test_chosen_tables_are_connected(self):
+        """โต๊ะเรียงเป็นแถว 1-2-3 → 1+3 ต่อกันไม่ได้ (ไม่มี 2 คั่น) ต้องได้ชุดที่ต่อถึงกันจริง"""
+        free = ((1, 4), (2, 6), (3, 4))
+        chain = frozenset({(1, 2), (2, 3)})
+        assert best_fit(free, 8, chain) == (1, 2)
+        assert best_fit(free, 11, chain) == (1, 2, 3)
+        assert best_fit(free, 8) == (1, 3)
+
+    def test_large_party_on_grid_is_bounded(self):
+        """ตาราง 10×10 กลุ่มใหญ่ → ได้ชุดที่ต่อถึงกันและที่นั่งน้อยสุดโดยไม่ไล่ทุกชุด (เดิมใช้เวลาเป็นนาที)"""
+        grid = frozenset(
+            pair
+            for i in range(1, 101)
+            for pair in ((i, i + 1), (i, i + 10))
+            if pair[1] <= 100 and (pair[1] == i + 10 or i % 10)
+        )
+        cases = [
+            (tuple((i, 4) for i in range(1, 101)), 37, 40),
+            (tuple((i, 4 + 2 * (i % 3 == 0)) for i in range(1, 101)), 41, 42),
+        ]
+        for free, party, seats in cases:
+            start = time_module.perf_counter()
+            chosen = best_fit.__wrapped__(free, party, grid)
+            assert time_module.perf_counter() - start < 0.5
+
+            capacity = dict(free)
+            assert sum(capacity[t] for t in chosen) == seats
+            reached, stack = {chosen[0]}, [chosen[0]]
+            while stack:
+                table_id = stack.pop()
+                for a, b in grid:
+                    other = b if a == table_id else a if b == table_id else None
+                    if other in chosen and other not in reached:
+                        reached.add(other)
+                        stack.append(other)
+            assert reached == set(chosen)
+
+    def test_memoized_per_free_set_and_party_size(self):
+        """เรียกซ้ำด้วย (โต๊ะว่าง, จำนวนคน) เดิม → ใช้ผลจาก cache"""
+        free = tuple((table_id, 4 + 2 * (table_id % 2)) for table_id in range(1, 101))
+        best_fit(free, 37)
+        hits = best_fit.cache_info().hits
+        assert best_fit(free, 37) == best_fit(free, 37)
+        assert best_fit.cache_info().hits == hits + 2
+
 
 # ===== GET /tables/{id} (staff/admin) =====
 
@@ -164,6 +365,9 @@ class TestCreateTable:
         assert data["capacity"] == 6
         assert data["status"] == "empty"
 
+        fetched = client.get(f"/tables/{data['table_id']}", headers=auth_header(token)).json()
+        assert (data["created_at"], data["last_update"]) == (fetched["created_at"], fetched["last_update"])
+
     def test_create_table_customer_forbidden(self):
         """customer ไม่มีสิทธิ์สร้างโต๊ะ → 403"""
         token = create_customer_and_get_token()
@@ -206,6 +410,95 @@ class TestUpdateTable:
         assert response.status_code == 404
 
 
+    def test_update_table_version_conflict(self):
+        """ส่ง version เก่า (มีคนแก้ไปก่อนแล้ว) → 409"""
+        token = get_admin_token()
+        table = create_test_table(token)
+        assert table["version"] == 1
+
+        first = client.put(
+            f"/tables/{table['table_id']}",
+            headers=auth_header(token),
+            json={"status": "full", "version": 1},
+        )
+        assert first.status_code == 200
+        assert first.json()["version"] == 2
+
+        stale = client.put(
+            f"/tables/{table['table_id']}",
+            headers=auth_header(token),
+            json={"status": "empty", "version": 1},
+        )
+        assert stale.status_code == 409
+
+
+# ===== Concurrency (50 parallel workers) =====
+
+class TestTableConcurrency:
+    """ทดสอบว่าไม่มี lost update เมื่อหลายคนแก้โต๊ะเดียวกันพร้อมกัน"""
+
+    WORKERS = 50
+
+    def _run_parallel(self, work) -> list:
+        """รัน work(i) พร้อมกัน WORKERS งาน แต่ละงานใช้ session ของตัวเอง"""
+        start = threading.Barrier(self.WORKERS)
+
+        def worker(i: int):
+            db = TestingSessionLocal()
+            try:
+                start.wait()
+                return work(db, i)
+            finally:
+                db.close()
+
+        with ThreadPoolExecutor(max_workers=self.WORKERS) as pool:
+            return list(pool.map(worker, range(self.WORKERS)))
+
+    def _get_version(self, table_id: int) -> int:
+        db = TestingSessionLocal()
+        try:
+            return db.query(Table.version).filter(Table.table_id == table_id).scalar()
+        finally:
+            db.close()
+
+    def test_concurrent_update_table_no_lost_updates(self):
+        """50 workers แก้โต๊ะเดียวกัน → ทุกครั้งที่สำเร็จถูกนับใน version, ที่เหลือได้ 409"""
+        table = create_test_table(get_admin_token())
+
+        def work(db, i):
+            try:
+                update_table(db, table["table_id"], TableUpdate(status=f"s{i}"))
+                return "ok"
+            except HTTPException as e:
+                assert e.status_code == 409
+                return "conflict"
+
+        results = self._run_parallel(work)
+
+        succeeded = results.count("ok")
+        assert succeeded >= 1
+        assert succeeded + results.count("conflict") == self.WORKERS
+        assert self._get_version(table["table_id"]) == 1 + succeeded
+
+    def test_concurrent_bulk_status_updates_serialize(self):
+        """50 workers เปลี่ยน status โต๊ะชุดเดียวกัน (สลับลำดับ) → ไม่ deadlock, ไม่หาย"""
+        token = get_admin_token()
+        a = create_test_table(token, "91")
+        b = create_test_table(token, "92")
+
+        def work(db, i):
+            ids = [a["table_id"], b["table_id"]]
+            update_table_statuses(db, ids if i % 2 else ids[::-1], "full" if i % 2 else "empty")
+            db.commit()
+            return "ok"
+
+        results = self._run_parallel(work)
+
+        assert results == ["ok"] * self.WORKERS
+        assert self._get_version(a["table_id"]) == 1 + self.WORKERS
+        assert self._get_version(b["table_id"]) == 1 + self.WORKERS
+
+
 # ===== DELETE /tables/{id} (admin) =====
 
 class TestDeleteTable:
@@ -238,3 +531,87 @@ class TestDeleteTable:
             headers=auth_header(token_customer),
         )
         assert response.status_code == 403
+
+
+# ===== Table status stream (broadcaster) =====
+
+class TestTableStream:
+    """ทดสอบ broadcaster ที่อยู่เบื้องหลัง GET /tables/stream"""
+
+    async def test_update_table_publishes_delta(self):
+        """แก้ไข status โต๊ะ → subscriber ได้ delta หลัง commit"""
+        token = get_admin_token()
+        table = create_test_table(token)
+        subscription, _ = table_events.subscribe()
+        try:
+            client.put(
+                f"/tables/{table['table_id']}",
+                headers=auth_header(token),
+                json={"status": "full"},
+            )
+            event = await subscription.get(timeout=1)
+        finally:
+            table_events.unsubscribe(subscription)
+
+        assert event["type"] == "update"
+        assert event["table_id"] == table["table_id"]
+        assert event["status"] == "full"
+        assert event["last_update"] is not None
+
+    async def test_delete_table_publishes_delete(self):
+        """ลบโต๊ะ → subscriber ได้ event ประเภท delete"""
+        token = get_admin_token()
+        table = create_test_table(token)
+        subscription, _ = table_events.subscribe()
+        try:
+            client.delete(f"/tables/{table['table_id']}", headers=auth_header(token))
+            event = await subscription.get(timeout=1)
+        finally:
+            table_events.unsubscribe(subscription)
+
+        assert event["type"] == "delete"
+        assert event["table_id"] == table["table_id"]
+
+    async def test_1000_idle_subscribers_bounded(self):
+        """1,000 subscribers ที่ไม่อ่าน → queue มีขอบเขต, ถูกตัดเมื่อเต็ม, ไม่รับเกิน limit"""
+        broadcaster = Broadcaster("test.stream", max_subscribers=1000, queue_size=4)
+        subscriptions = [broadcaster.subscribe()[0] for _ in range(1000)]
+
+        with pytest.raises(BroadcasterFull):
+            broadcaster.subscribe()
+
+        for i in range(4):
+            broadcaster.publish({"n": i})
+        await asyncio.sleep(0)
+        assert broadcaster.subscriber_count == 1000
+
+        # event ที่ 5 ทำให้ queue เต็ม → ทุก subscriber ที่ไม่อ่านถูกตัด
+        broadcaster.publish({"n": 4})
+        await asyncio.sleep(0)
+        assert broadcaster.subscriber_count == 0
+        with pytest.raises(SubscriptionClosed):
+            await subscriptions[0].get(timeout=1)
+
+    async def test_resume_from_history(self):
+        """subscribe ด้วย since + epoch → ได้ backlog จาก history, ถ้าย้อนไม่ถึง/epoch ไม่ตรงได้ None"""
+        broadcaster = Broadcaster("test.history", max_subscribers=10, queue_size=10, history_size=3)
+        for i in range(5):
+            broadcaster.publish({"n": i})
+        epoch = broadcaster.epoch
+
+        _, backlog = broadcaster.subscribe(since=3, epoch=epoch)
+        assert [e["n"] for e in backlog] == [3, 4]
+        assert {e["epoch"] for e in backlog} == {epoch}
+
+        _, backlog = broadcaster.subscribe(since=5, epoch=epoch)
+        assert backlog == []
+
+        _, backlog = broadcaster.subscribe(since=1, epoch=epoch)
+        assert backlog is None
+
+        # version ของ instance อื่น (worker อื่น / ก่อน restart) ใช้ไม่ได้ แม้ตัวเลขจะอยู่ในช่วง
+        other = Broadcaster("test.history", max_subscribers=10, queue_size=10, history_size=3)
+        _, backlog = broadcaster.subscribe(since=3, epoch=other.epoch)
+        assert backlog is None
+        _, backlog = broadcaster.subscribe(since=3)
+        assert backlog is None
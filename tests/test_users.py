@@ -4,22 +4,27 @@ Users Tests
 Integration tests สำหรับ users endpoints
 - GET /users/me — ดูข้อมูลตัวเอง
 - PUT /users/me — แก้ไขข้อมูล
+- GET /users/me/history — ประวัติ orders + reservations (keyset pagination)
 - GET /users/ — ดูรายการ users (admin only)
 - GET /users/{id} — ดูข้อมูล user ตาม ID (admin only)
 """
 
 import pytest
+from datetime import datetime, timedelta
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
 from app.main import app
-from app.config.database import get_db
+from app.config.database import DB_CONNECT_ARGS, get_db
 from app.config.settings import settings
+from app.models.order import Order, OrderItem
+from app.models.reservation import Reservation
+from app.models.table import Table
 from app.models.user import User
 
-engine = create_engine(settings.TEST_DATABASE_URL)
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+engine = create_engine(settings.TEST_DATABASE_URL, connect_args=DB_CONNECT_ARGS)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
 
 
 def override_get_db():
@@ -34,6 +39,7 @@ app.dependency_overrides[get_db] = override_get_db
 client = TestClient(app)
 
 TEST_SUFFIX = "_testuser"
+TEST_PREFIX = "TESTUSR_"
 
 
 def create_test_user(username: str, password: str = "test1234") -> dict:
@@ -74,12 +80,22 @@ def get_admin_token() -> str:
 def cleanup_test_users():
     """ลบ test users ก่อนและหลังแต่ละ test"""
     db = TestingSessionLocal()
-    db.query(User).filter(User.username.like(f"%{TEST_SUFFIX}")).delete(synchronize_session=False)
-    db.commit()
+    _cleanup(db)
     yield
+    _cleanup(db)
+    db.close()
+
+
+def _cleanup(db):
+    """ลบ test users พร้อม orders / reservations / tables ที่สร้างใน test"""
+    test_users = db.query(User.user_id).filter(User.username.like(f"%{TEST_SUFFIX}"))
+    test_orders = db.query(Order.order_id).filter(Order.customer_id.in_(test_users))
+    db.query(OrderItem).filter(OrderItem.order_id.in_(test_orders)).delete(synchronize_session=False)
+    db.query(Order).filter(Order.customer_id.in_(test_users)).delete(synchronize_session=False)
+    db.query(Reservation).filter(Reservation.customer_id.in_(test_users)).delete(synchronize_session=False)
+    db.query(Table).filter(Table.table_number.like(f"{TEST_PREFIX}%")).delete(synchronize_session=False)
     db.query(User).filter(User.username.like(f"%{TEST_SUFFIX}")).delete(synchronize_session=False)
     db.commit()
-    db.close()
 
 
 # ===== GET /users/me =====
@@ -191,6 +207,18 @@ class TestListUsers:
         assert isinstance(response.json(), list)
         assert len(response.json()) >= 1  # อย่างน้อยมี admin
 
+    def test_admin_list_users_sparse_fields(self):
+        """?fields= คืนเฉพาะ field ที่ขอ — password ไม่อยู่ใน schema จึงขอไม่ได้"""
+        token = get_admin_token()
+
+        response = client.get("/users/?fields=username,user_id", headers=auth_header(token))
+        assert response.status_code == 200
+        assert all(list(u) == ["user_id", "username"] for u in response.json())
+        assert any(u["username"] == "admin" for u in response.json())
+
+        response = client.get("/users/?fields=user_id,password", headers=auth_header(token))
+        assert response.status_code == 400
+
     def test_customer_cannot_list(self):
         """customer เข้าถึง → 403"""
         create_test_user("normie")
@@ -229,3 +257,116 @@ class TestGetUserById:
 
         response = client.get("/users/1", headers=auth_header(token))
         assert response.status_code == 403
+
+
+# ===== GET /users/me/history =====
+
+def create_history(customer_token: str, customer_id: int) -> list[tuple[str, int]]:
+    """สร้าง orders + reservations สลับกันให้ customer แล้วคืน [(type, id)] ตามลำดับที่สร้าง"""
+    admin_token = get_admin_token()
+    product_id = client.get("/products/").json()[0]["product_id"]
+    table = client.post("/tables/", headers=auth_header(admin_token), json={
+        "table_number": f"{TEST_PREFIX}history",
+        "capacity": 4,
+    }).json()
+
+    created = []
+    for n in range(3):
+        order = client.post("/orders/", headers=auth_header(admin_token), json={
+            "customer_id": customer_id,
+            "items": [{"product_id": product_id, "quantity": 1}],
+        }).json()
+        created.append(("order", order["order_id"]))
+
+        reservation = client.post("/reservations/", headers=auth_header(customer_token), json={
+            "table_ids": [table["table_id"]],
+            "reservation_time": (datetime.now() + timedelta(days=30 + n)).isoformat(),
+            "customer_amount": 2,
+        }).json()
+        created.append(("reservation", reservation["reservation_id"]))
+    return created
+
+
+def history_key(item: dict) -> tuple[str, int]:
+    """(type, id) ของรายการในประวัติ"""
+    if item["type"] == "order":
+        return "order", item["order"]["order_id"]
+    return "reservation", item["reservation"]["reservation_id"]
+
+
+class TestMyHistory:
+    """ทดสอบ GET /users/me/history"""
+
+    def test_pages_cover_history_newest_first(self):
+        """เดินทุกหน้าด้วย cursor → ได้ทุกรายการครั้งเดียว เรียงใหม่ → เก่า"""
+        user = create_test_user("historian")
+        token = get_token("historian")
+        created = create_history(token, user["user_id"])
+
+        seen = []
+        cursor = None
+        while True:
+            params = {"limit": 4} if cursor is None else {"limit": 4, "cursor": cursor}
+            res = client.get("/users/me/history", headers=auth_header(token), params=params)
+            assert res.status_code == 200
+            page = res.json()
+            assert len(page["items"]) <= 4
+            seen.extend(page["items"])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+
+        assert [history_key(item) for item in seen] == list(reversed(created))
+        created_at = [item["created_at"] for item in seen]
+        assert created_at == sorted(created_at, reverse=True)
+        assert len(seen[-1]["order"]["items"]) == 1
+
+    def test_same_created_at_not_skipped(self):
+        """created_at เท่ากันทุกแถว → cursor ตัดสินด้วย (type, id) ไม่ข้าม/ไม่ซ้ำ"""
+        user = create_test_user("samemoment")
+        token = get_token("samemoment")
+        created = create_history(token, user["user_id"])
+
+        db = TestingSessionLocal()
+        moment = datetime(2026, 1, 1, 12, 0, 0)
+        db.query(Order).filter(Order.customer_id == user["user_id"]).update({"created_at": moment})
+        db.query(Reservation).filter(Reservation.customer_id == user["user_id"]).update({"created_at": moment})
+        db.commit()
+        db.close()
+
+        seen = []
+        cursor = None
+        while True:
+            params = {"limit": 1} if cursor is None else {"limit": 1, "cursor": cursor}
+            page = client.get("/users/me/history", headers=auth_header(token), params=params).json()
+            seen.extend(history_key(item) for item in page["items"])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+
+        assert sorted(seen) == sorted(created)
+        assert len(seen) == len(set(seen))
+
+    def test_history_only_own(self):
+        """ไม่เห็นประวัติของลูกค้าคนอื่น"""
+        other = create_test_user("otherguest")
+        create_history(get_token("otherguest"), other["user_id"])
+        create_test_user("newcomer")
+        token = get_token("newcomer")
+
+        res = client.get("/users/me/history", headers=auth_header(token))
+        assert res.status_code == 200
+        assert res.json() == {"items": [], "next_cursor": None}
+
+    def test_invalid_cursor_400(self):
+        """cursor ที่อ่านไม่ได้ → 400"""
+        create_test_user("badcursor")
+        token = get_token("badcursor")
+
+        res = client.get("/users/me/history", headers=auth_header(token), params={"cursor": "not-a-cursor"})
+        assert res.status_code == 400
+
+    def test_history_no_token(self):
+        """ไม่มี token → 401"""
+        res = client.get("/users/me/history")
+        assert res.status_code == 401
@@ -0,0 +1,439 @@
+"""
+Waitlist Tests
+
+Integration tests สำหรับ waitlist endpoints
+- POST /waitlist/ — เข้าคิว (customer / walk-in โดย staff)
+- GET /waitlist/ — คิวที่รออยู่ (staff/admin)
+- GET /waitlist/{id} — ลำดับ + เวลารอโดยประมาณ
+- DELETE /waitlist/{id} — ออกจากคิว
+- PATCH /orders/{id} (finish_at) — โต๊ะว่าง → จับคู่กลุ่มในคิวอัตโนมัติ
++ WaitlistQueue (unit) — ลำดับตามขนาดกลุ่ม + เวลาที่มาถึง
++ expire_stale_matches — กลุ่มที่ได้โต๊ะแล้วไม่มานั่ง → no_show ปล่อยโต๊ะ
+"""
+
+import asyncio
+import threading
+
+import pytest
+from datetime import datetime, timedelta
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, update
+from sqlalchemy.orm import sessionmaker
+
+from app.main import app
+from app.config.database import DB_CONNECT_ARGS, get_db
+from app.config.settings import settings
+from app.core.waitlist_queue import WaitlistQueue
+from app.models.order import Order, OrderItem
+from app.models.table import Table
+from app.models.user import User
+from app.models.waitlist import WaitlistEntry
+from app.services import hold_sweeper, waitlist_service
+
+# Test DB setup
+engine = create_engine(settings.TEST_DATABASE_URL, connect_args=DB_CONNECT_ARGS)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
+
+
+def override_get_db():
+    db = TestingSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+app.dependency_overrides[get_db] = override_get_db
+client = TestClient(app)
+
+TEST_PREFIX = "TESTWL_"
+TEST_SUFFIX = "_testwl"
+
+
+# === Helpers ===
+
+def get_admin_token() -> str:
+    """Login ด้วย admin (seed data) แล้วคืน token"""
+    res = client.post("/auth/login", json={
+        "username": "admin",
+        "password": "admin",
+    })
+    return res.json()["access_token"]
+
+
+def create_customer_and_get_token(suffix: str) -> str:
+    """สร้าง customer test user แล้วคืน token"""
+    username = f"wlcust{suffix}{TEST_SUFFIX}"
+    client.post("/auth/register", json={
+        "username": username,
+        "password": "test1234",
+    })
+    res = client.post("/auth/login", json={
+        "username": username,
+        "password": "test1234",
+    })
+    return res.json()["access_token"]
+
+
+def auth_header(token: str) -> dict:
+    return {"Authorization": f"Bearer {token}"}
+
+
+def join_walk_in(token: str, party_size: int, name: str = "walk-in") -> dict:
+    """staff เพิ่ม walk-in เข้าคิว แล้วคืน response data"""
+    res = client.post("/waitlist/", headers=auth_header(token), json={
+        "party_size": party_size,
+        "name": f"{TEST_PREFIX}{name}",
+    })
+    return res.json()
+
+
+def seat_order(token: str, capacity: int, number: str) -> tuple[dict, dict]:
+    """สร้างโต๊ะ + order ที่นั่งโต๊ะนั้นอยู่ (โต๊ะ full) แล้วคืน (table, order)"""
+    table = client.post("/tables/", headers=auth_header(token), json={
+        "table_number": f"{TEST_PREFIX}{number}",
+        "capacity": capacity,
+    }).json()
+    product_id = client.get("/products/").json()[0]["product_id"]
+    order = client.post("/orders/", headers=auth_header(token), json={
+        "table_ids": [table["table_id"]],
+        "items": [{"product_id": product_id, "quantity": 1, "note": f"{TEST_PREFIX}waitlist"}],
+    }).json()
+    return table, order
+
+
+def finish_order(token: str, order_id: int):
+    """PATCH order ผ่านครัว → completed + finish_at (ปล่อยโต๊ะ)"""
+    for status in ("preparing", "ready"):
+        client.patch(f"/orders/{order_id}", headers=auth_header(token), json={"order_status": status})
+    return client.patch(f"/orders/{order_id}", headers=auth_header(token), json={
+        "order_status": "completed",
+        "finish_at": datetime.now().isoformat(),
+    })
+
+
+@pytest.fixture(autouse=True)
+def cleanup_test_data():
+    """ลบ test data ก่อนและหลังแต่ละ test"""
+    db = TestingSessionLocal()
+    _cleanup(db)
+    yield
+    _cleanup(db)
+    db.close()
+
+
+def _cleanup(db):
+    """ลบ test data ทั้งหมด + ล้างคิวในหน่วยความจำ"""
+    test_users = db.query(User.user_id).filter(User.username.like(f"%{TEST_SUFFIX}"))
+    db.query(WaitlistEntry).filter(
+        WaitlistEntry.name.like(f"{TEST_PREFIX}%") | WaitlistEntry.customer_id.in_(test_users)
+    ).delete(synchronize_session=False)
+    test_orders = db.query(OrderItem.order_id).filter(OrderItem.note.like(f"{TEST_PREFIX}%"))
+    db.query(OrderItem).filter(OrderItem.order_id.in_(test_orders)).delete(synchronize_session=False)
+    db.query(Order).filter(
+        Order.order_id.notin_(db.query(OrderItem.order_id).distinct())
+    ).delete(synchronize_session=False)
+    db.query(Table).filter(Table.table_number.like(f"{TEST_PREFIX}%")).delete(synchronize_session=False)
+    db.query(User).filter(User.username.like(f"%{TEST_SUFFIX}")).delete(synchronize_session=False)
+    db.commit()
+    waitlist_service.invalidate_queue()
+
+
+# ===== WaitlistQueue =====
+
+class TestWaitlistQueue:
+    """ทดสอบ WaitlistQueue — best fit ตามขนาดกลุ่ม, มาก่อนได้ก่อน"""
+
+    def setup_method(self):
+        self.start = datetime(2026, 1, 1, 12, 0)
+
+    def arrived(self, minutes: int) -> datetime:
+        return self.start + timedelta(minutes=minutes)
+
+    def test_best_fit_largest_party_that_fits(self):
+        """ความจุ 5 → กลุ่ม 4 คน (ใหญ่สุดที่นั่งพอ) ไม่ใช่กลุ่ม 2 หรือ 6"""
+        queue = WaitlistQueue()
+        queue.add(1, 2, self.arrived(0))
+        queue.add(2, 4, self.arrived(1))
+        queue.add(3, 6, self.arrived(2))
+        assert queue.best_fit(5) == 2
+        assert queue.best_fit(1) is None
+
+    def test_same_size_first_come_first_served(self):
+        """ขนาดเท่ากัน → มาก่อนได้ก่อน"""
+        queue = WaitlistQueue()
+        queue.add(1, 4, self.arrived(5))
+        queue.add(2, 4, self.arrived(1))
+        assert queue.best_fit(4) == 2
+
+    def test_remove_and_position(self):
+        """ลำดับคิวนับตามเวลาที่มาถึง — ออกจากคิวแล้วคนข้างหลังขยับขึ้น"""
+        queue = WaitlistQueue()
+        for entry_id in range(1, 5):
+            queue.add(entry_id, entry_id, self.arrived(entry_id))
+        assert queue.position(3) == 3
+
+        queue.remove(2)
+        assert queue.position(3) == 2
+        assert queue.position(2) is None
+        assert queue.ordered() == [1, 3, 4]
+
+    def test_removed_entries_skipped(self):
+        """กลุ่มที่ออกไปแล้วไม่ถูกเลือก — ตกไปขนาดถัดไปที่นั่งพอ"""
+        queue = WaitlistQueue()
+        queue.add(1, 2, self.arrived(0))
+        queue.add(2, 4, self.arrived(1))
+        queue.remove(2)
+        assert queue.best_fit(4) == 1
+        assert len(queue) == 1
+
+
+# ===== POST /waitlist/ =====
+
+class TestJoinWaitlist:
+    """ทดสอบ POST /waitlist/"""
+
+    def test_customer_join(self):
+        """customer เข้าคิว → waiting + position + เวลารอโดยประมาณ"""
+        token = create_customer_and_get_token("1")
+
+        res = client.post("/waitlist/", headers=auth_header(token), json={"party_size": 2})
+        assert res.status_code == 201
+        entry = res.json()
+        assert entry["status"] == "waiting"
+        assert entry["position"] >= 1
+        assert entry["estimated_wait_minutes"] == entry["position"] * settings.WAITLIST_MINUTES_PER_PARTY
+
+    def test_customer_join_twice_409(self):
+        """customer ที่รออยู่แล้ว เข้าคิวซ้ำ → 409"""
+        token = create_customer_and_get_token("2")
+        client.post("/waitlist/", headers=auth_header(token), json={"party_size": 2})
+
+        res = client.post("/waitlist/", headers=auth_header(token), json={"party_size": 3})
+        assert res.status_code == 409
+
+    def test_staff_walk_in_requires_name(self):
+        """staff เพิ่ม walk-in โดยไม่ระบุชื่อ → 400"""
+        token = get_admin_token()
+        res = client.post("/waitlist/", headers=auth_header(token), json={"party_size": 2})
+        assert res.status_code == 400
+
+    def test_positions_follow_arrival(self):
+        """กลุ่มที่มาทีหลังอยู่ลำดับถัดไป"""
+        token = get_admin_token()
+        first = join_walk_in(token, 2, "first")
+        second = join_walk_in(token, 6, "second")
+        assert second["position"] == first["position"] + 1
+
+        res = client.get("/waitlist/", headers=auth_header(token))
+        ids = [entry["entry_id"] for entry in res.json()]
+        assert ids.index(second["entry_id"]) == ids.index(first["entry_id"]) + 1
+
+
+# ===== GET / DELETE /waitlist/{id} =====
+
+class TestWaitlistEntry:
+    """ทดสอบ GET /waitlist/{id} และ DELETE /waitlist/{id}"""
+
+    def test_leave_moves_queue_up(self):
+        """คนข้างหน้าออกจากคิว → ลำดับขยับขึ้น"""
+        token = get_admin_token()
+        first = join_walk_in(token, 2, "leaver")
+        second = join_walk_in(token, 2, "stayer")
+
+        res = client.delete(f"/waitlist/{first['entry_id']}", headers=auth_header(token))
+        assert res.status_code == 200
+        assert res.json()["status"] == "left"
+
+        res = client.get(f"/waitlist/{second['entry_id']}", headers=auth_header(token))
+        assert res.json()["position"] == second["position"] - 1
+
+        res = client.delete(f"/waitlist/{first['entry_id']}", headers=auth_header(token))
+        assert res.status_code == 409
+
+    def test_customer_cannot_see_other_entry(self):
+        """customer ดูคิวของคนอื่น → 403"""
+        entry = join_walk_in(get_admin_token(), 2, "private")
+        token = create_customer_and_get_token("3")
+
+        res = client.get(f"/waitlist/{entry['entry_id']}", headers=auth_header(token))
+        assert res.status_code == 403
+
+    def test_entry_not_found(self):
+        """entry_id ไม่มี → 404"""
+        res = client.get("/waitlist/999999", headers=auth_header(get_admin_token()))
+        assert res.status_code == 404
+
+
+# ===== จับคู่อัตโนมัติเมื่อโต๊ะว่าง =====
+
+class TestWaitlistMatching:
+    """ทดสอบการจับคู่กลุ่มในคิวเมื่อ order จบและปล่อยโต๊ะ"""
+
+    def test_finish_order_matches_best_fitting_party(self):
+        """โต๊ะ 4 ที่ว่าง → กลุ่ม 4 คนได้โต๊ะ (กลุ่ม 2 และ 6 ยังรอ), โต๊ะ → onHold"""
+        token = get_admin_token()
+        table, order = seat_order(token, 4, "m1")
+        small = join_walk_in(token, 2, "small")
+        fits = join_walk_in(token, 4, "fits")
+        large = join_walk_in(token, 6, "large")
+
+        assert finish_order(token, order["order_id"]).status_code == 200
+
+        matched = client.get(f"/waitlist/{fits['entry_id']}", headers=auth_header(token)).json()
+        assert matched["status"] == "matched"
+        assert matched["table_ids"] == [table["table_id"]]
+        assert matched["position"] is None
+
+        for entry in (small, large):
+            res = client.get(f"/waitlist/{entry['entry_id']}", headers=auth_header(token))
+            assert res.json()["status"] == "waiting"
+
+        table_res = client.get(f"/tables/{table['table_id']}", headers=auth_header(token))
+        assert table_res.json()["status"] == "onHold"
+
+    def test_no_party_fits_table_stays_empty(self):
+        """ไม่มีกลุ่มที่นั่งพอ → โต๊ะว่างตามปกติ"""
+        token = get_admin_token()
+        table, order = seat_order(token, 2, "m2")
+        large = join_walk_in(token, 5, "toolarge")
+
+        finish_order(token, order["order_id"])
+
+        res = client.get(f"/waitlist/{large['entry_id']}", headers=auth_header(token))
+        assert res.json()["status"] == "waiting"
+        table_res = client.get(f"/tables/{table['table_id']}", headers=auth_header(token))
+        assert table_res.json()["status"] == "empty"
+
+    def test_left_party_not_matched(self):
+        """กลุ่มที่ออกจากคิวแล้วไม่ถูกจับคู่"""
+        token = get_admin_token()
+        table, order = seat_order(token, 4, "m3")
+        gone = join_walk_in(token, 4, "gone")
+        client.delete(f"/waitlist/{gone['entry_id']}", headers=auth_header(token))
+
+        finish_order(token, order["order_id"])
+
+        res = client.get(f"/waitlist/{gone['entry_id']}", headers=auth_header(token))
+        assert res.json()["status"] == "left"
+        table_res = client.get(f"/tables/{table['table_id']}", headers=auth_header(token))
+        assert table_res.json()["status"] == "empty"
+
+    def test_match_error_does_not_fail_order_update(self, monkeypatch):
+        """จับคู่ error (เช่น DB) หลัง order commit แล้ว → PATCH ยังสำเร็จ โต๊ะว่าง"""
+        token = get_admin_token()
+        table, order = seat_order(token, 4, "m4")
+        waiting = join_walk_in(token, 4, "unlucky")
+
+        def broken_queue(db):
+            raise RuntimeError("connection lost")
+
+        monkeypatch.setattr(waitlist_service, "_get_queue", broken_queue)
+        res = finish_order(token, order["order_id"])
+
+        assert res.status_code == 200
+        assert res.json()["order_status"] == "completed"
+        table_res = client.get(f"/tables/{table['table_id']}", headers=auth_header(token))
+        assert table_res.json()["status"] == "empty"
+        monkeypatch.undo()
+        assert client.get(f"/waitlist/{waiting['entry_id']}", headers=auth_header(token)).json()["status"] == "waiting"
+
+
+# ===== No-show sweep =====
+
+def backdate_match(entry_id: int, minutes: int):
+    """เลื่อน matched_at ย้อนหลัง (จำลองกลุ่มที่ได้โต๊ะแล้วไม่มา)"""
+    db = TestingSessionLocal()
+    db.execute(
+        update(WaitlistEntry)
+        .where(WaitlistEntry.entry_id == entry_id)
+        .values(matched_at=WaitlistEntry.matched_at - timedelta(minutes=minutes))
+    )
+    db.commit()
+    db.close()
+
+
+def run_match_sweep(ttl_minutes: int = 10) -> list[int]:
+    """sweep กลุ่มที่ไม่มาหนึ่งรอบด้วย session ของ test DB"""
+    db = TestingSessionLocal()
+    try:
+        return waitlist_service.expire_stale_matches(db, ttl_minutes)
+    finally:
+        db.close()
+
+
+class TestWaitlistNoShow:
+    """ทดสอบ expire_stale_matches (งานเบื้องหลัง WAITLIST_MATCH_SWEEP_*)"""
+
+    def _matched(self, token: str, number: str, name: str) -> tuple[dict, dict]:
+        """โต๊ะ 4 ที่นั่งถูกปล่อยแล้วจับคู่กับกลุ่ม 4 คน — คืน (table, entry)"""
+        table, order = seat_order(token, 4, number)
+        entry = join_walk_in(token, 4, name)
+        finish_order(token, order["order_id"])
+        assert client.get(f"/waitlist/{entry['entry_id']}", headers=auth_header(token)).json()["status"] == "matched"
+        return table, entry
+
+    def test_no_show_releases_table(self):
+        """matched เกิน TTL และโต๊ะยัง onHold → no_show, โต๊ะ → empty"""
+        token = get_admin_token()
+        table, entry = self._matched(token, "n1", "noshow")
+
+        assert entry["entry_id"] not in run_match_sweep()
+        backdate_match(entry["entry_id"], 30)
+        assert entry["entry_id"] in run_match_sweep()
+
+        res = client.get(f"/waitlist/{entry['entry_id']}", headers=auth_header(token))
+        assert res.json()["status"] == "no_show"
+        table_res = client.get(f"/tables/{table['table_id']}", headers=auth_header(token))
+        assert table_res.json()["status"] == "empty"
+
+    def test_released_table_goes_to_next_party(self):
+        """โต๊ะที่ปล่อยจากกลุ่มที่ไม่มา → จับคู่กับกลุ่มถัดไปในคิวทันที"""
+        token = get_admin_token()
+        table, entry = self._matched(token, "n2", "first")
+        following = join_walk_in(token, 3, "next")
+        backdate_match(entry["entry_id"], 30)
+
+        assert entry["entry_id"] in run_match_sweep()
+
+        matched = client.get(f"/waitlist/{following['entry_id']}", headers=auth_header(token)).json()
+        assert matched["status"] == "matched"
+        assert matched["table_ids"] == [table["table_id"]]
+        table_res = client.get(f"/tables/{table['table_id']}", headers=auth_header(token))
+        assert table_res.json()["status"] == "onHold"
+
+    def test_seated_party_not_marked_no_show(self):
+        """กลุ่มที่มานั่งแล้ว (order ใหม่ → โต๊ะ full) ไม่ถูกแตะแม้เกิน TTL"""
+        token = get_admin_token()
+        table, entry = self._matched(token, "n3", "seated")
+        product_id = client.get("/products/").json()[0]["product_id"]
+        client.post("/orders/", headers=auth_header(token), json={
+            "table_ids": [table["table_id"]],
+            "items": [{"product_id": product_id, "quantity": 1, "note": f"{TEST_PREFIX}seated"}],
+        })
+        backdate_match(entry["entry_id"], 30)
+
+        assert entry["entry_id"] not in run_match_sweep()
+        res = client.get(f"/waitlist/{entry['entry_id']}", headers=auth_header(token))
+        assert res.json()["status"] == "matched"
+        table_res = client.get(f"/tables/{table['table_id']}", headers=auth_header(token))
+        assert table_res.json()["status"] == "full"
+
+    def test_sweep_runs_without_hold_sweeper(self, monkeypatch):
+        """ปิด RESERVATION_HOLD_SWEEP_ENABLED → ยัง sweep กลุ่มที่ไม่มานั่งตาม WAITLIST_MATCH_SWEEP_*"""
+        monkeypatch.setattr(settings, "RESERVATION_HOLD_SWEEP_ENABLED", False)
+        monkeypatch.setattr(settings, "IDEMPOTENCY_PURGE_ENABLED", False)
+        monkeypatch.setattr(settings, "WAITLIST_MATCH_SWEEP_INTERVAL_SECONDS", 0)
+        swept = threading.Event()
+        monkeypatch.setattr(hold_sweeper, "sweep_waitlist_once", swept.set)
+
+        async def run_briefly():
+            sweepers = hold_sweeper.start_sweepers()
+            assert len(sweepers) == 1
+            await asyncio.to_thread(swept.wait, 5)
+            for sweeper in sweepers:
+                sweeper.cancel()
+            await asyncio.gather(*sweepers, return_exceptions=True)
+
+        asyncio.run(run_briefly())
+        assert swept.is_set()